@@ -4,5 +4,48 @@ Contains the core CBSE Learning Agent implementation
 """
 
 from .learning_agent import LearningAgent, LEARNING_AGENT_PROMPT
+from .token_profiler import TokenProfiler, count_tokens
+from .model_router import ModelRouter, Route
+from .single_flight import SingleFlight, StreamFlight
+from .engine import AgentEngine, get_engine
+from .session import SessionState
+from .cassette import RecordingClient, ReplayClient
+from .cancellation import CancelToken, CANCELLATION_STATS
+from .render_queue import RenderQueue, RENDER_QUEUE
+from .render_workers import RenderWorkerPool, get_render_pool
+from .render_service import RenderService, get_render_service
+from .curriculum_index import CurriculumIndex, get_curriculum_index
+from .prompt_cache import PROMPT_CACHE_STATS
+from .profiling import SamplingProfiler, ProfileReport
+from .math_solver import Solution, solve_problem
 
-__all__ = ['LearningAgent', 'LEARNING_AGENT_PROMPT']
+__all__ = [
+    'LearningAgent',
+    'LEARNING_AGENT_PROMPT',
+    'TokenProfiler',
+    'count_tokens',
+    'ModelRouter',
+    'Route',
+    'SingleFlight',
+    'StreamFlight',
+    'AgentEngine',
+    'get_engine',
+    'SessionState',
+    'RecordingClient',
+    'ReplayClient',
+    'CancelToken',
+    'CANCELLATION_STATS',
+    'RenderQueue',
+    'RENDER_QUEUE',
+    'RenderWorkerPool',
+    'get_render_pool',
+    'RenderService',
+    'get_render_service',
+    'CurriculumIndex',
+    'get_curriculum_index',
+    'PROMPT_CACHE_STATS',
+    'SamplingProfiler',
+    'ProfileReport',
+    'Solution',
+    'solve_problem',
+]
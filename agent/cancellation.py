@@ -0,0 +1,120 @@
+"""
+Turn Cancellation
+Cancel tokens that stop an abandoned turn's model requests and renders, plus wasted-work metrics
+"""
+
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class TurnCancelled(asyncio.CancelledError):
+    """Raised when a turn notices its cancel token before the cancellation reached its task"""
+
+
+class CancelToken:
+    """
+    Cancellation signal for one piece of work, safe to trigger from any thread
+
+    Binding a task makes cancel() interrupt whatever the task is awaiting
+    (a model request, a stream, a render) by cancelling it on its own loop.
+    Once finished, the token ignores cancel() so a late trigger cannot hit
+    whatever the task does next.
+    """
+
+    __slots__ = ("reason", "_lock", "_callbacks", "_cancelled", "_finished")
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._cancelled = False
+        self._finished = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def active(self) -> bool:
+        """Neither cancelled nor finished"""
+        return not (self._cancelled or self._finished)
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the work
+
+        Returns:
+            True if this call cancelled it (False if it was already cancelled or finished)
+        """
+        with self._lock:
+            if self._cancelled or self._finished:
+                return False
+            self._cancelled = True
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return True
+
+    def finish(self):
+        """Mark the work done; later cancel() calls do nothing"""
+        with self._lock:
+            self._finished = True
+            self._callbacks = []
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Run callback on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._cancelled:
+                if not self._finished:
+                    self._callbacks.append(callback)
+                return
+        callback()
+
+    def bind_task(self, task: asyncio.Task = None):
+        """Cancel task (default: the current one) when the token is cancelled"""
+        task = task or asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        self.add_callback(lambda: loop.call_soon_threadsafe(task.cancel))
+
+    def check(self):
+        """Raise TurnCancelled if the token has been cancelled"""
+        if self._cancelled:
+            raise TurnCancelled(self.reason)
+
+
+class CancellationStats:
+    """Process-wide counters of abandoned work and the work that was avoided"""
+
+    FIELDS = (
+        "turns_cancelled",        # turns abandoned before they finished
+        "seconds_abandoned",      # time those turns had run when cancelled
+        "messages_rolled_back",   # history entries removed to keep it consistent
+        "requests_cancelled",     # model requests aborted while waiting for the response
+        "streams_closed_early",   # reply streams closed before the model finished
+        "renders_skipped",        # queued renders dropped before they started
+        "renders_discarded",      # renders that finished after everybody had gone
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["seconds_abandoned"] = round(counts["seconds_abandoned"], 3)
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+
+CANCELLATION_STATS = CancellationStats()
@@ -0,0 +1,308 @@
+"""
+Record/Replay Cassettes for Model Traffic
+Captures chat completion responses and stream-chunk timing, and replays them offline
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+CASSETTE_VERSION = 1
+
+# The folder part of a diagram path in "Diagram created successfully: <path>";
+# the file name is kept, the machine-specific folder is not
+_DIAGRAM_FOLDER = re.compile(r"(created successfully: )[^\n]*[\\/]")
+
+
+class CassetteMismatch(LookupError):
+    """Raised in strict replay when a request has no recorded response"""
+
+
+def request_fingerprint(kwargs: dict) -> str:
+    """
+    Hash of what determines a response: model, messages, tools, stream flag
+
+    Tool result contents are left out, and diagram paths elsewhere (late
+    diagram outcomes are system messages) are cut to their file names,
+    because the absolute paths differ between the recording machine and the
+    replaying one.
+    """
+    messages = []
+    for message in kwargs.get("messages", []):
+        message = {key: value for key, value in message.items()
+                   if not (message.get("role") == "tool" and key == "content")}
+        if isinstance(message.get("content"), str):
+            message["content"] = _DIAGRAM_FOLDER.sub(r"\1", message["content"])
+        messages.append(message)
+    payload = {
+        "model": kwargs.get("model"),
+        "messages": messages,
+        "tools": [tool["function"]["name"] for tool in kwargs.get("tools") or []],
+        "stream": bool(kwargs.get("stream")),
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Recording
+
+class _RecordedStream:
+    """Passes an upstream stream through while noting each chunk's arrival time"""
+
+    def __init__(self, upstream, on_done, started: float):
+        self._upstream = upstream
+        self._on_done = on_done
+        self._started = started
+        self._chunks: List[list] = []
+        self._finished = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._upstream:
+                self._chunks.append([round(time.perf_counter() - self._started, 4), chunk.model_dump(mode="json")])
+                yield chunk
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._on_done(self._chunks)
+
+    async def close(self):
+        self._finish()
+        close = getattr(self._upstream, "close", None)
+        if close is not None:
+            await close()
+
+
+class _RecordingCompletions:
+    def __init__(self, cassette: "RecordingClient", inner):
+        self._cassette = cassette
+        self._inner = inner
+
+    async def create(self, **kwargs):
+        started = time.perf_counter()
+        response = await self._inner.create(**kwargs)
+        entry = {
+            "fingerprint": request_fingerprint(kwargs),
+            "model": kwargs.get("model"),
+            "last_message": kwargs.get("messages", [{}])[-1],
+            "tools": len(kwargs.get("tools") or []),
+            "stream": bool(kwargs.get("stream")),
+        }
+        if not kwargs.get("stream"):
+            entry["latency_s"] = round(time.perf_counter() - started, 4)
+            entry["response"] = response.model_dump(mode="json")
+            self._cassette._write(entry)
+            return response
+
+        entry["open_latency_s"] = round(time.perf_counter() - started, 4)
+
+        def on_done(chunks):
+            entry["chunks"] = chunks
+            self._cassette._write(entry)
+        return _RecordedStream(response, on_done, started)
+
+
+class RecordingClient:
+    """
+    Wraps a real AsyncOpenAI client and appends every completion to a cassette
+
+    Each interaction is written as one JSON line as soon as it finishes, so an
+    interrupted session still leaves a usable cassette. Failed requests are
+    not recorded.
+    """
+
+    def __init__(self, client, path):
+        """
+        Args:
+            client: The real AsyncOpenAI client
+            path: Cassette file (JSON lines) to append to
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self._append({"cassette_version": CASSETTE_VERSION, "recorded_at": time.time()})
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _RecordingCompletions(self, client.chat.completions)
+
+    def _write(self, entry: dict):
+        self._append(entry)
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+
+def load_cassette(path) -> List[dict]:
+    """Interactions of a cassette file in recording order"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "cassette_version" in record:
+                if record["cassette_version"] > CASSETTE_VERSION:
+                    raise ValueError(f"{path} was written by a newer cassette format")
+                continue
+            entries.append(record)
+    return entries
+
+
+class _ReplayStream:
+    """Yields recorded chunks on their recorded schedule, scaled by speed"""
+
+    def __init__(self, chunks: List[list], speed: float):
+        self._chunks = chunks
+        self._speed = speed
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        started = time.perf_counter()
+        for offset, data in self._chunks:
+            if self.closed:
+                return
+            if self._speed > 0:
+                delay = offset / self._speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield ChatCompletionChunk.model_validate(data)
+
+    async def close(self):
+        self.closed = True
+
+
+class _ReplayCompletions:
+    def __init__(self, cassette: "ReplayClient"):
+        self._cassette = cassette
+
+    async def create(self, **kwargs):
+        entry = self._cassette._next(kwargs)
+        speed = self._cassette.speed
+        if entry["stream"]:
+            if speed > 0:
+                await asyncio.sleep(entry.get("open_latency_s", 0) / speed)
+            # Chunk offsets were measured from the request start
+            opened = entry.get("open_latency_s", 0)
+            chunks = [[max(offset - opened, 0), data] for offset, data in entry.get("chunks", [])]
+            return _ReplayStream(chunks, speed)
+        if speed > 0:
+            await asyncio.sleep(entry.get("latency_s", 0) / speed)
+        return ChatCompletion.model_validate(entry["response"])
+
+
+class ReplayClient:
+    """
+    Offline stand-in for AsyncOpenAI that answers from a cassette
+
+    Requests are matched by fingerprint first; when the conversation has
+    drifted (or the fingerprint is unknown) the next unused interaction in
+    recording order is used, unless strict is set.
+    """
+
+    def __init__(self, path, speed: float = 1.0, strict: bool = False):
+        """
+        Args:
+            path: Cassette file written by RecordingClient
+            speed: Timing scale: 1.0 = as recorded, 2.0 = twice as fast, 0 = no delays
+            strict: Raise CassetteMismatch instead of falling back to recording order
+        """
+        self.path = Path(path)
+        self.speed = speed
+        self.strict = strict
+        self.entries = load_cassette(self.path)
+        self._by_fingerprint: Dict[str, Deque[int]] = defaultdict(deque)
+        for index, entry in enumerate(self.entries):
+            self._by_fingerprint[entry["fingerprint"]].append(index)
+        self._used = [False] * len(self.entries)
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self.matched = 0
+        self.fallbacks = 0
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _ReplayCompletions(self)
+
+    def _next(self, kwargs: dict) -> dict:
+        with self._lock:
+            candidates = self._by_fingerprint.get(request_fingerprint(kwargs))
+            while candidates and self._used[candidates[0]]:
+                candidates.popleft()
+            if candidates:
+                index = candidates.popleft()
+                self.matched += 1
+            else:
+                if self.strict:
+                    raise CassetteMismatch(f"no recorded response for this request in {self.path}")
+                while self._cursor < len(self._used) and self._used[self._cursor]:
+                    self._cursor += 1
+                if self._cursor >= len(self._used):
+                    raise CassetteMismatch(f"{self.path} has no more recorded responses")
+                index = self._cursor
+                self.fallbacks += 1
+            self._used[index] = True
+            return self.entries[index]
+
+    def questions(self) -> List[str]:
+        """User messages that started requests, in recording order (to drive a replayed session)"""
+        seen = []
+        for entry in self.entries:
+            message = entry.get("last_message") or {}
+            if message.get("role") == "user" and (not seen or seen[-1] != message.get("content")):
+                seen.append(message.get("content"))
+        return seen
+
+
+def cassette_mode() -> Optional[str]:
+    """"record" or "replay" when LEARNING_AGENT_CASSETTE is set, else None"""
+    if not os.getenv("LEARNING_AGENT_CASSETTE"):
+        return None
+    mode = os.getenv("LEARNING_AGENT_CASSETTE_MODE", "replay").lower()
+    if mode not in ("record", "replay"):
+        raise ValueError(f"LEARNING_AGENT_CASSETTE_MODE must be record or replay, not {mode!r}")
+    return mode
+
+
+def cassette_client_from_env(client=None):
+    """
+    Client selected by LEARNING_AGENT_CASSETTE / LEARNING_AGENT_CASSETTE_MODE
+
+    Args:
+        client: The real client (wrapped in record mode; not needed for replay)
+
+    Returns:
+        A RecordingClient or ReplayClient, or client unchanged when no cassette is set
+    """
+    mode = cassette_mode()
+    path = os.getenv("LEARNING_AGENT_CASSETTE")
+    if mode == "record":
+        if client is None:
+            raise ValueError("Recording a cassette needs a real client (set GITHUB_TOKEN)")
+        return RecordingClient(client, path)
+    if mode == "replay":
+        return ReplayClient(path, speed=float(os.getenv("LEARNING_AGENT_CASSETTE_SPEED", "1")))
+    return client
@@ -0,0 +1,145 @@
+"""
+Dynamic Context Assembly
+Picks the system prompt sections and tool schemas relevant to each request
+"""
+
+import os
+import re
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from .prompts import build_system_prompt
+
+# Keyword classifier: cheap regexes over the message and recent turns
+SUBJECT_PATTERNS = {
+    "maths": re.compile(
+        r"\b(math|maths|mathematics|algebra|equation|quadratic|linear|polynomial|factor|"
+        r"graph|plot|slope|parabola|root|geometry|triangle|angle|circle|area|perimeter|"
+        r"theorem|proof|number system|irrational|rational|coordinate|statistics|mean|median|"
+        r"mode|probability|heron|surface area|volume|trigonometry|solve|simplify|x\^?2)\b"
+        r"|[=²³√]|\d\s*[-+*/^]\s*\d|\d+x\b",
+        re.IGNORECASE,
+    ),
+    "science": re.compile(
+        r"\b(science|physics|chemistry|biology|cell|organelle|nucleus|mitochondria|tissue|"
+        r"motion|velocity|speed|acceleration|distance[- ]time|force|newton|gravitation|"
+        r"gravity|work|energy|power|sound|wave|matter|atom|molecule|element|compound|mixture|"
+        r"solution|evaporation|diffusion|organism|diversity|disease|crop|food resources)\b",
+        re.IGNORECASE,
+    ),
+    "social_science": re.compile(
+        r"\b(history|geography|civics|economics|political science|democracy|constitution|"
+        r"election|revolution|french revolution|socialism|nazism|hitler|forest society|"
+        r"pastoralists|india size|physical features|drainage|river|climate|monsoon|vegetation|"
+        r"wildlife|population|poverty|food security|village palampur|people as resource|"
+        r"rights|electoral)\b",
+        re.IGNORECASE,
+    ),
+    "english": re.compile(
+        r"\b(english|grammar|noun|pronoun|verb|adjective|adverb|tense|clause|preposition|"
+        r"essay|letter writing|story|poem|poet|author|chapter summary|beehive|moments|"
+        r"paragraph|comprehension|reported speech|active voice|passive voice)\b",
+        re.IGNORECASE,
+    ),
+    "hindi": re.compile(r"\bhindi\b|[ऀ-ॿ]", re.IGNORECASE),
+}
+
+
+def classify_subjects(text: str) -> FrozenSet[str]:
+    """
+    Detect which subjects a piece of text is about
+
+    Args:
+        text: Student message (or several joined together)
+
+    Returns:
+        Set of subject keys from SUBJECTS (empty when nothing matched)
+    """
+    return frozenset(subject for subject, pattern in SUBJECT_PATTERNS.items() if pattern.search(text))
+
+
+class AssembledContext:
+    """The system prompt and tool schemas chosen for one request"""
+
+    __slots__ = ("subjects", "system_prompt", "tools")
+
+    def __init__(self, subjects: Optional[FrozenSet[str]], system_prompt: str, tools: List[dict]):
+        self.subjects = subjects
+        self.system_prompt = system_prompt
+        self.tools = tools
+
+
+class ContextAssembler:
+    """
+    Chooses prompt sections and a tool subset per request
+
+    The current message is classified first; if it matches no subject
+    (e.g. "why?"), the recent user turns decide. If nothing matches at all
+    the full prompt and every tool are sent.
+    """
+
+    def __init__(self, tool_schemas: List[dict], tool_subjects: Dict[str, Sequence[str]] = None,
+                 recent_turns: int = 2):
+        """
+        Args:
+            tool_schemas: All tool definitions the agent can offer
+            tool_subjects: Dict of tool name -> subjects it serves (tools not listed are always offered)
+            recent_turns: Number of previous user messages considered for follow-ups
+        """
+        self.tool_schemas = tool_schemas
+        self.tool_subjects = {
+            name: frozenset(subjects) for name, subjects in (tool_subjects or {}).items()
+        }
+        self.recent_turns = recent_turns
+        self._tool_cache: Dict[Optional[FrozenSet[str]], List[dict]] = {}
+
+    def _tools_for(self, subjects: Optional[FrozenSet[str]]) -> List[dict]:
+        if subjects not in self._tool_cache:
+            self._tool_cache[subjects] = [
+                schema for schema in self.tool_schemas
+                if subjects is None
+                or schema["function"]["name"] not in self.tool_subjects
+                or self.tool_subjects[schema["function"]["name"]] & subjects
+            ]
+        return self._tool_cache[subjects]
+
+    def assemble(self, user_message: str, history: List[dict] = None,
+                 previous: Optional[AssembledContext] = None) -> AssembledContext:
+        """
+        Build the context for a request
+
+        Args:
+            user_message: The new student message
+            history: Conversation before this message (API message dicts)
+            previous: The session's context so far; its subjects are kept and only
+                ever widened, so the system prompt and tools (the cached prompt
+                prefix) change as rarely as possible
+
+        Returns:
+            AssembledContext with the subjects, system prompt and tool list to send
+        """
+        subjects = classify_subjects(user_message)
+        if not subjects and history:
+            recent = [
+                m.get("content") or "" for m in history if m.get("role") == "user"
+            ][-self.recent_turns:]
+            subjects = classify_subjects("\n".join(recent))
+        if previous is not None:
+            if previous.subjects is None:
+                return previous  # Already sending everything
+            if subjects <= previous.subjects:
+                return previous
+            subjects = subjects | previous.subjects
+        if not subjects:
+            subjects = None  # Nothing to go on: send everything
+
+        tools = self._tools_for(subjects)
+        system_prompt = build_system_prompt(
+            sorted(subjects) if subjects is not None else None,
+            [schema["function"]["name"] for schema in tools],
+        )
+        return AssembledContext(subjects, system_prompt, tools)
+
+
+def dynamic_context_enabled() -> bool:
+    """Whether LEARNING_AGENT_DYNAMIC_CONTEXT=1 asks for per-request context assembly"""
+    return os.getenv("LEARNING_AGENT_DYNAMIC_CONTEXT", "").lower() in ("1", "true", "yes")
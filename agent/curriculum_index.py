@@ -0,0 +1,338 @@
+"""
+Curriculum Retrieval Index
+Syllabus snippets as a memory-mapped matrix of hashed TF-IDF vectors, with top-k search per question
+
+Files in an index directory (written by build_index, see run_build_index.py):
+
+    meta.json      format version, vector dimensions, snippet count
+    columns.npy    (dimensions + 1,) uint64 start of each dimension's entries
+    rows.npy       (entries,) uint32 snippet of each entry
+    weights.npy    (entries,) float32 value of each entry
+    idf.npy        (dimensions,) float32 inverse document frequencies
+    offsets.npy    (snippets + 1,) uint64 byte offsets into snippets.txt
+    snippets.txt   UTF-8 "title<US>text" records back to back (US = \\x1f)
+
+columns/rows/weights are the (snippets, dimensions) matrix of L2-normalised
+snippet vectors in compressed sparse column form. A query only has a dozen
+or so nonzero dimensions, so it reads just those columns instead of the
+whole matrix (a dense 5000 x 1024 scan is about 1 ms of memory traffic; the
+columns take tens of microseconds).
+
+Everything is memory-mapped, so opening an index reads only meta.json and
+the array headers; a query touches its columns and the few snippets it
+returns.
+"""
+
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+INDEX_VERSION = 2
+
+# Hashed feature space: large enough that collisions rarely matter for a
+# syllabus (a few thousand snippets), small enough that a query is one
+# sub-millisecond matrix-vector product
+DIMENSIONS = 1024
+
+META_FILE = "meta.json"
+COLUMNS_FILE = "columns.npy"
+ROWS_FILE = "rows.npy"
+WEIGHTS_FILE = "weights.npy"
+IDF_FILE = "idf.npy"
+OFFSETS_FILE = "offsets.npy"
+SNIPPETS_FILE = "snippets.txt"
+
+TITLE_SEPARATOR = "\x1f"
+
+# Snippets are paragraphs merged up to about this many words
+SNIPPET_WORDS = 120
+
+# Defaults for what is sent with a question. A one-word question that
+# matches one word of a 120-word snippet scores about 0.07, and unrelated
+# questions score about 0 (or below, where hashed features collide)
+DEFAULT_TOP_K = 3
+MIN_SCORE = 0.05
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[ऀ-ॿ]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how i if in into is it its
+me my no not of on or our so than that the their them then there these they this to was we
+were what when where which who why will with you your explain tell about please
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words (Latin or Devanagari) minus stopwords, with plural -s trimmed"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _features(text: str) -> Iterator[str]:
+    """Words and adjacent word pairs"""
+    tokens = tokenize(text)
+    yield from tokens
+    for first, second in zip(tokens, tokens[1:]):
+        yield f"{first} {second}"
+
+
+def hash_counts(text: str, dimensions: int = DIMENSIONS) -> np.ndarray:
+    """
+    Signed, hashed, sublinear term frequencies of a text
+
+    CRC32 keeps the hashing identical across processes (str hashes are
+    salted per process); its top bit gives the sign, so colliding features
+    tend to cancel instead of adding up.
+    """
+    counts = {}
+    for feature in _features(text):
+        counts[feature] = counts.get(feature, 0) + 1
+    if not counts:
+        return np.zeros(dimensions, dtype=np.float32)
+    digests = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in counts),
+                          dtype=np.uint32, count=len(counts))
+    values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    values[digests >= 0x80000000] *= -1
+    return np.bincount(digests % dimensions, weights=values, minlength=dimensions).astype(np.float32)
+
+
+def split_snippets(text: str, max_words: int = SNIPPET_WORDS) -> List[str]:
+    """Split chapter text into snippets of whole paragraphs, about max_words words each"""
+    snippets, current, words = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        length = len(paragraph.split())
+        if current and words + length > max_words:
+            snippets.append("\n".join(current))
+            current, words = [], 0
+        current.append(paragraph)
+        words += length
+    if current:
+        snippets.append("\n".join(current))
+    return snippets
+
+
+def load_records(paths: Iterable[Union[str, Path]]) -> Iterator[Tuple[str, str]]:
+    """
+    (title, snippet text) pairs from curriculum source files
+
+    .jsonl files hold one snippet per line ({"title": ..., "text": ...},
+    with optional "subject" and "chapter" joined into the title); .txt and
+    .md files hold a chapter each, titled by their first heading (or file
+    name) and split into paragraph snippets. Directories are read recursively.
+    """
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from load_records(sorted(p for p in path.rglob("*") if p.is_file()))
+            continue
+        suffix = path.suffix.lower()
+        if suffix == ".jsonl":
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    parts = [record.get("subject"), record.get("chapter"), record.get("title")]
+                    title = " · ".join(str(part) for part in parts if part)
+                    yield title or path.stem, record["text"]
+        elif suffix in (".txt", ".md"):
+            text = path.read_text(encoding="utf-8")
+            heading = re.match(r"\s*#*\s*(.+)", text)
+            title = heading.group(1).strip() if heading and text.lstrip().startswith("#") else path.stem
+            for snippet in split_snippets(text):
+                yield title, snippet
+
+
+def build_index(records: Iterable[Tuple[str, str]], directory: Union[str, Path],
+                dimensions: int = DIMENSIONS) -> int:
+    """
+    Build an index directory from (title, text) snippets (offline)
+
+    meta.json is written last, so an interrupted build is never opened as
+    a complete index.
+
+    Returns:
+        Number of snippets indexed
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meta_path = directory / META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    rows, offsets = [], [0]
+    with open(directory / SNIPPETS_FILE, "wb") as out:
+        for title, text in records:
+            title = " ".join(title.replace(TITLE_SEPARATOR, " ").split())
+            text = text.strip()
+            if not text:
+                continue
+            # The title's words count too ("Motion", "Tissues")
+            rows.append(hash_counts(f"{title}\n{text}", dimensions))
+            offsets.append(offsets[-1] + out.write(f"{title}{TITLE_SEPARATOR}{text}".encode("utf-8")))
+    if not rows:
+        raise ValueError("no curriculum snippets to index")
+
+    counts = np.vstack(rows)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1)
+
+    # Column-major entries: np.nonzero on the transpose orders them by dimension, then snippet
+    dimension_of, snippet_of = np.nonzero(vectors.T)
+    columns = np.zeros(dimensions + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(dimension_of, minlength=dimensions), out=columns[1:])
+    np.save(directory / COLUMNS_FILE, columns)
+    np.save(directory / ROWS_FILE, snippet_of.astype(np.uint32))
+    np.save(directory / WEIGHTS_FILE, vectors.T[dimension_of, snippet_of].astype(np.float32))
+    np.save(directory / IDF_FILE, idf)
+    np.save(directory / OFFSETS_FILE, np.asarray(offsets, dtype=np.uint64))
+    meta_path.write_text(json.dumps({
+        "version": INDEX_VERSION,
+        "dimensions": dimensions,
+        "snippets": len(rows),
+    }, indent=2), encoding="utf-8")
+    return len(rows)
+
+
+class Snippet:
+    """One retrieved syllabus snippet"""
+
+    __slots__ = ("title", "text", "score")
+
+    def __init__(self, title: str, text: str, score: float):
+        self.title = title
+        self.text = text
+        self.score = score
+
+
+class CurriculumIndex:
+    """
+    Read-only view of an index directory
+
+    Safe to share between threads and sessions: nothing is mutated after
+    opening, and the memory-mapped pages are shared with every other
+    process that opens the same index.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Raises:
+            ValueError: if the directory does not hold a complete index of this version
+        """
+        self.directory = Path(directory)
+        meta_path = self.directory / META_FILE
+        if not meta_path.is_file():
+            raise ValueError(f"no curriculum index in {self.directory} (build one with run_build_index.py)")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"curriculum index version {meta.get('version')} is not {INDEX_VERSION}; rebuild it")
+        self.dimensions = meta["dimensions"]
+        self.count = meta["snippets"]
+        self.columns = np.load(self.directory / COLUMNS_FILE)
+        self.rows = np.load(self.directory / ROWS_FILE, mmap_mode="r")
+        self.weights = np.load(self.directory / WEIGHTS_FILE, mmap_mode="r")
+        self.offsets = np.load(self.directory / OFFSETS_FILE, mmap_mode="r")
+        self.idf = np.load(self.directory / IDF_FILE)
+        with open(self.directory / SNIPPETS_FILE, "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def snippet(self, i: int, score: float = 0.0) -> Snippet:
+        """Decode snippet i from the text file"""
+        record = self._text[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+        title, _, text = record.partition(TITLE_SEPARATOR)
+        return Snippet(title, text, score)
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K, min_score: float = MIN_SCORE) -> List[Snippet]:
+        """
+        The k snippets most similar to the query (cosine similarity)
+
+        Args:
+            query: Student question
+            k: Most snippets returned
+            min_score: Snippets scoring lower are left out (unrelated questions get none)
+
+        Returns:
+            Snippets, best first
+        """
+        vector = hash_counts(query, self.dimensions) * self.idf
+        norm = float(np.linalg.norm(vector))
+        if norm == 0 or not self.count:
+            return []
+        # Sparse matrix-vector product over the query's nonzero dimensions only
+        spans = [(int(self.columns[d]), int(self.columns[d + 1]), vector[d] / norm)
+                 for d in np.flatnonzero(vector)]
+        rows = np.concatenate([self.rows[start:end] for start, end, _ in spans])
+        weights = np.concatenate([self.weights[start:end] * value for start, end, value in spans])
+        scores = np.bincount(rows, weights=weights, minlength=self.count)
+        if k < len(scores):
+            best = np.argpartition(scores, -k)[-k:]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(scores[best])[::-1]]
+        return [self.snippet(i, float(scores[i])) for i in best if scores[i] >= min_score]
+
+
+REFERENCE_HEADER = "**Curriculum reference**"
+
+
+def format_reference(snippets: List[Snippet]) -> Optional[str]:
+    """System message text for retrieved snippets, or None when there are none"""
+    if not snippets:
+        return None
+    parts = [
+        f"{REFERENCE_HEADER} (NCERT Std 9 excerpts matching this question; base facts on "
+        "them where relevant, without mentioning them):"
+    ]
+    for snippet in snippets:
+        parts.append(f"[{snippet.title}]\n{snippet.text}")
+    return "\n\n".join(parts)
+
+
+_INDEX: Optional[CurriculumIndex] = None
+_INDEX_LOCK = threading.Lock()
+# Directories that failed to open, so the warning is printed once
+_UNUSABLE = set()
+
+
+def get_curriculum_index() -> Optional[CurriculumIndex]:
+    """
+    The process-wide index named by LEARNING_AGENT_CURRICULUM_INDEX, or None
+
+    A missing or unreadable index is reported once and the agent runs
+    without retrieval.
+    """
+    global _INDEX
+    directory = os.getenv("LEARNING_AGENT_CURRICULUM_INDEX")
+    if not directory or directory in _UNUSABLE:
+        return None
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.directory != Path(directory):
+            try:
+                _INDEX = CurriculumIndex(directory)
+            except (OSError, ValueError) as e:
+                print(f"Warning: curriculum retrieval disabled: {e}")
+                _UNUSABLE.add(directory)
+                return None
+        return _INDEX
@@ -0,0 +1,161 @@
+"""
+Shared Agent Engine
+Process-wide client, system prompt and tools used by every LearningAgent session
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from .prompts import LEARNING_AGENT_PROMPT
+from .context import ContextAssembler, dynamic_context_enabled
+from .cassette import cassette_client_from_env, cassette_mode
+from .curriculum_index import CurriculumIndex, get_curriculum_index
+from .prompt_cache import canonical_tools
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4.1-mini"  # Fast, smart, affordable - outperforms gpt-4o-mini
+
+
+class AgentEngine:
+    """
+    The stateless part of the agent, created once per process and tool set
+
+    Holds the API client, system prompt, tool functions/schemas/validator and
+    the default context assembler. Sessions (LearningAgent) only add their
+    own conversation state on top.
+    """
+
+    def __init__(self, tool_functions: Dict[str, Callable] = None, diagram_tools: List[dict] = None,
+                 tool_validator=None, registry=None, system_prompt: str = LEARNING_AGENT_PROMPT,
+                 model: str = DEFAULT_MODEL, client: AsyncOpenAI = None,
+                 curriculum_index: CurriculumIndex = None):
+        """
+        Args:
+            tool_functions: Dict mapping tool names to function implementations
+            diagram_tools: List of tool definitions for OpenAI function calling
+            tool_validator: Optional validator that checks and normalizes tool arguments
+            registry: Optional ToolRegistry supplying functions, schemas, validator and
+                per-tool facts
+            system_prompt: Full system prompt
+            model: Default model when no router picks one
+            client: Optional API client (created from GITHUB_TOKEN otherwise, or
+                a cassette client when LEARNING_AGENT_CASSETTE is set)
+            curriculum_index: Optional CurriculumIndex whose snippets are sent with
+                each question (default: LEARNING_AGENT_CURRICULUM_INDEX)
+        """
+        if client is None and cassette_mode() == "replay":
+            # Offline: answers come from a recorded cassette
+            client = cassette_client_from_env()
+        if client is None:
+            # Get GitHub token from environment
+            github_token = os.getenv("GITHUB_TOKEN")
+            if not github_token:
+                raise ValueError(
+                    "GITHUB_TOKEN not found! Please:\n"
+                    "1. Copy .env.example to .env\n"
+                    "2. Get your GitHub token from: https://github.com/settings/tokens\n"
+                    "3. Add it to the .env file"
+                )
+
+            # Connect to GitHub Models
+            client = AsyncOpenAI(
+                base_url="https://models.github.ai/inference",
+                api_key=github_token,
+            )
+            client = cassette_client_from_env(client)
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+
+        if registry is not None:
+            tool_functions = tool_functions or registry.functions()
+            diagram_tools = diagram_tools or registry.schemas()
+            tool_validator = tool_validator or registry.validator
+        self.tool_functions = tool_functions or {}
+        # Canonical order and key layout, so the tools part of every request is byte-identical
+        self.diagram_tools = canonical_tools(diagram_tools or [])
+        self.tool_validator = tool_validator
+        # Facts a tool's diagram shows, computed from its arguments (for overlapped renders)
+        self.tool_facts: Dict[str, Callable] = registry.facts() if registry is not None else {}
+
+        # Shared per-request prompt/tool selection when LEARNING_AGENT_DYNAMIC_CONTEXT=1
+        self.context_assembler: Optional[ContextAssembler] = None
+        if dynamic_context_enabled():
+            self.context_assembler = ContextAssembler(
+                self.diagram_tools, registry.subjects() if registry is not None else None
+            )
+
+        # Syllabus snippets retrieved per question (memory-mapped, shared by all sessions)
+        self.curriculum_index = curriculum_index or get_curriculum_index()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def run_sync(self, coroutine, timeout: float = None,
+                 cancel_when: Callable[[], bool] = None, poll_interval: float = 0.25):
+        """
+        Run a coroutine on the engine's background event loop and wait for it
+
+        For synchronous callers such as Streamlit, whose script threads would
+        otherwise start a fresh event loop per message. Keeping every request
+        on one long-lived loop lets the shared client reuse its connections.
+
+        Args:
+            coroutine: Coroutine to run
+            timeout: Optional limit in seconds
+            cancel_when: Optional check, polled while waiting, that cancels the
+                coroutine when it returns True (e.g. the browser session has gone)
+            poll_interval: Seconds between cancel_when checks
+
+        Raises:
+            concurrent.futures.CancelledError: if cancel_when cancelled the coroutine
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="agent-engine-loop", daemon=True
+                ).start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        if cancel_when is None:
+            return future.result(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = poll_interval if deadline is None else min(poll_interval, deadline - time.monotonic())
+            try:
+                return future.result(max(wait, 0))
+            except concurrent.futures.TimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                if cancel_when():
+                    future.cancel()
+                    return future.result()
+
+
+_ENGINES: Dict[object, AgentEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(registry=None) -> AgentEngine:
+    """
+    The process-wide engine for a tool registry (created on first use)
+
+    Args:
+        registry: ToolRegistry whose tools the engine offers (None for no tools)
+    """
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(registry)
+        if engine is None:
+            engine = AgentEngine(registry=registry)
+            _ENGINES[registry] = engine
+        return engine
@@ -0,0 +1,398 @@
+"""
+Session Export
+Writes a tutoring conversation to a self-contained HTML file or a PDF, with its diagrams embedded
+"""
+
+import base64
+import html
+import io
+import json
+import re
+import textwrap
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+from tools.diagram_tools import DIAGRAM_MEDIA_TYPES
+
+DIAGRAM_RESULT_PATTERN = re.compile(r"Diagram created successfully: (.+)$")
+
+# Base64 is streamed in chunks that are a multiple of 3 bytes, so chunk
+# encodings concatenate into one valid string
+_BASE64_CHUNK = 3 * 64 * 1024
+
+# $$...$$, \[...\], $...$ and \(...\) in a line of text (display forms first)
+MATH_PATTERN = re.compile(r"\$\$(.+?)\$\$|\\\[(.+?)\\\]|\$(.+?)\$|\\\((.+?)\\\)")
+
+# Font size of typeset maths in the HTML export, in points
+HTML_MATH_SIZE = 12
+
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+  body {{ font-family: -apple-system, "Segoe UI", Roboto, sans-serif; max-width: 820px; margin: 2rem auto; padding: 0 1rem; color: #222; }}
+  h1 {{ color: #1f77b4; font-size: 1.8rem; }}
+  .meta {{ color: #666; margin-bottom: 2rem; }}
+  .message {{ padding: 0.8rem 1rem; border-radius: 10px; margin: 0.8rem 0; }}
+  .user {{ background: #e3f2fd; }}
+  .assistant {{ background: #f5f5f5; }}
+  .role {{ font-weight: bold; margin-bottom: 0.3rem; }}
+  figure {{ margin: 1rem 0; text-align: center; }}
+  figure img {{ max-width: 100%; }}
+  figcaption {{ color: #666; font-size: 0.85rem; }}
+  code {{ background: #f0f0f0; padding: 2px 6px; border-radius: 3px; }}
+  img.math {{ vertical-align: middle; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<div class="meta">Exported {date}</div>
+"""
+
+ROLE_NAMES = {"user": "Student", "assistant": "Tutor"}
+
+# PDF page layout (A4 portrait, in figure-relative units)
+PAGE_SIZE = (8.27, 11.69)
+PAGE_MARGIN = 0.07
+LINE_HEIGHT = 0.0175
+WRAP_WIDTH = 92
+
+# Diagrams are embedded at about 150 dpi across the text width
+PDF_IMAGE_WIDTH = 1100
+
+
+# ---------------------------------------------------------------------------
+# Walking the session
+
+Block = Tuple[str, str]  # ("user" | "assistant", text) or ("diagram", path)
+
+
+def iter_blocks(agent) -> Iterator[Block]:
+    """
+    Walk a session's history as text and diagram blocks, in conversation order
+
+    Args:
+        agent: LearningAgent whose conversation is exported
+    """
+    for message in agent.state.messages:
+        if message.role in ROLE_NAMES:
+            if message.content:
+                yield message.role, message.content
+        elif message.tool_call_id:
+            # Tool results, and late diagram outcomes appended after an overlapped answer
+            match = DIAGRAM_RESULT_PATTERN.search(message.content or "")
+            if match:
+                yield "diagram", match.group(1).strip()
+
+
+def _tool_calls_by_id(agent) -> Dict[str, Tuple[str, str]]:
+    calls = {}
+    for message in agent.state.messages:
+        for call_id, name, arguments in message.tool_calls or ():
+            calls[call_id] = (name, arguments)
+    return calls
+
+
+def diagram_source(agent) -> Callable[[str], Optional[Path]]:
+    """
+    Resolver from a diagram path in the history to a file that exists
+
+    Diagrams already on disk are reused as-is. Only a diagram that has been
+    cleaned up since is rendered again from its recorded tool call, through
+    agent.render_diagram (the render queue and workers, like a turn's
+    diagrams). Call it off the event loop: re-renders block.
+    """
+    rerender: Dict[str, Tuple[str, str]] = {}
+    calls = _tool_calls_by_id(agent)
+    for message in agent.state.messages:
+        if message.tool_call_id in calls:
+            match = DIAGRAM_RESULT_PATTERN.search(message.content or "")
+            if match:
+                rerender[match.group(1).strip()] = calls[message.tool_call_id]
+
+    def resolve(path: str) -> Optional[Path]:
+        if Path(path).is_file():
+            return Path(path)
+        name, arguments = rerender.get(path, (None, None))
+        if name is None:
+            return None
+        try:
+            result = Path(agent.render_diagram(name, json.loads(arguments or "{}")))
+        except Exception:
+            return None
+        return result if result.is_file() else None
+    return resolve
+
+
+# ---------------------------------------------------------------------------
+# HTML
+
+@lru_cache(maxsize=1024)
+def _math_html(tex: str) -> str:
+    """Maths typeset by matplotlib's mathtext as an embedded SVG, or the source as text if it does not parse"""
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.mathtext import math_to_image
+
+    svg = io.BytesIO()
+    try:
+        math_to_image(f"${tex}$", svg, prop=FontProperties(size=HTML_MATH_SIZE), format="svg")
+    except ValueError:
+        return f"<code>{html.escape(tex, quote=False)}</code>"
+    return (f'<img class="math" alt="{html.escape(tex)}" '
+            f'src="data:image/svg+xml;base64,{base64.b64encode(svg.getvalue()).decode("ascii")}">')
+
+
+def _markdown_to_html(text: str) -> str:
+    """Small Markdown subset (headings, lists, bold, code) with $...$ maths typeset offline"""
+    out = []
+    in_list = False
+    paragraph = []
+
+    def inline_text(text: str) -> str:
+        text = html.escape(text, quote=False)
+        text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+        text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+        return text
+
+    def inline(line: str) -> str:
+        parts, position = [], 0
+        for match in MATH_PATTERN.finditer(line):
+            tex = next(group for group in match.groups() if group is not None)
+            parts.append(inline_text(line[position:match.start()]))
+            parts.append(_math_html(tex.strip()))
+            position = match.end()
+        parts.append(inline_text(line[position:]))
+        return "".join(parts)
+
+    def flush_paragraph():
+        if paragraph:
+            out.append("<p>" + "<br>".join(inline(line) for line in paragraph) + "</p>")
+            paragraph.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        heading = re.match(r"^(#{1,4})\s+(.*)", stripped)
+        item = re.match(r"^(?:[-*•]|\d+[.)])\s+(.*)", stripped)
+        if item:
+            flush_paragraph()
+            if not in_list:
+                out.append("<ul>")
+                in_list = True
+            out.append(f"<li>{inline(item.group(1))}</li>")
+            continue
+        if in_list:
+            out.append("</ul>")
+            in_list = False
+        if heading:
+            flush_paragraph()
+            level = min(len(heading.group(1)) + 2, 6)
+            out.append(f"<h{level}>{inline(heading.group(2))}</h{level}>")
+        elif stripped:
+            paragraph.append(stripped)
+        else:
+            flush_paragraph()
+    flush_paragraph()
+    if in_list:
+        out.append("</ul>")
+    return "\n".join(out)
+
+
+def _write_base64(source: Path, out):
+    """Stream a file into out as base64 without holding it in memory"""
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(_BASE64_CHUNK)
+            if not chunk:
+                break
+            out.write(base64.b64encode(chunk).decode("ascii"))
+
+
+def export_html(agent, path: Union[str, Path], title: str = "CBSE Learning Session") -> Path:
+    """
+    Write the session as one self-contained HTML file
+
+    Messages are written as they are walked and diagrams are base64-streamed
+    straight from their files (PNG, GIF or MP4), so memory stays flat for long sessions.
+    Maths is typeset with matplotlib's mathtext and embedded as SVG, so the
+    file needs no network access to display it.
+
+    Args:
+        agent: LearningAgent whose conversation is exported
+        path: Output .html file
+        title: Document title
+
+    Returns:
+        Path of the written file
+    """
+    path = Path(path)
+    resolve = diagram_source(agent)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(HTML_HEAD.format(
+            title=html.escape(title), date=time.strftime("%d %b %Y, %H:%M"),
+        ))
+        for kind, value in iter_blocks(agent):
+            if kind == "diagram":
+                source = resolve(value)
+                if source is None:
+                    out.write(f'<p class="meta">(Diagram {html.escape(Path(value).name)} is no longer available)</p>\n')
+                    continue
+                media_type = DIAGRAM_MEDIA_TYPES.get(source.suffix, "image/png")
+                element = "video controls loop" if source.suffix == ".mp4" else 'img alt="diagram"'
+                out.write(f'<figure><{element} src="data:{media_type};base64,')
+                _write_base64(source, out)
+                out.write('"></video>' if source.suffix == ".mp4" else '">')
+                out.write(f'<figcaption>{html.escape(source.name)}</figcaption></figure>\n')
+            else:
+                out.write(f'<div class="message {kind}"><div class="role">{ROLE_NAMES[kind]}</div>\n')
+                out.write(_markdown_to_html(value))
+                out.write("\n</div>\n")
+        out.write("</body>\n</html>\n")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# PDF
+
+@lru_cache(maxsize=1024)
+def _pdf_line(line: str) -> str:
+    """Keep $...$ as mathtext when matplotlib can typeset it, otherwise show it literally"""
+    if "$" not in line:
+        return line
+    from matplotlib.mathtext import MathTextParser
+    try:
+        MathTextParser("path").parse(line)
+        return line
+    except ValueError:
+        return line.replace("$", r"\$")
+
+
+def _page_pixels(source: Path):
+    """Diagram as 8-bit RGB, downscaled to what fits the page width"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        if image.width > PDF_IMAGE_WIDTH:
+            height = round(image.height * PDF_IMAGE_WIDTH / image.width)
+            image = image.resize((PDF_IMAGE_WIDTH, height), Image.LANCZOS)
+        return np.asarray(image)
+
+
+class _PdfWriter:
+    """Lays text lines and images onto A4 pages, emitting each page as soon as it is full"""
+
+    def __init__(self, pdf, title: str):
+        self.pdf = pdf
+        self.figure = None
+        self.y = 0.0
+        self._new_page()
+        self.figure.text(PAGE_MARGIN, self.y, title, fontsize=16, fontweight="bold", color="#1f77b4")
+        self.y -= 2 * LINE_HEIGHT
+
+    def _new_page(self):
+        from matplotlib.figure import Figure
+        if self.figure is not None:
+            self.pdf.savefig(self.figure)
+        self.figure = Figure(figsize=PAGE_SIZE)
+        self.y = 1 - PAGE_MARGIN
+
+    def _room(self, height: float):
+        if self.y - height < PAGE_MARGIN:
+            self._new_page()
+
+    def heading(self, text: str):
+        self._room(2 * LINE_HEIGHT)
+        self.y -= 0.5 * LINE_HEIGHT
+        self.figure.text(PAGE_MARGIN, self.y, text, fontsize=11, fontweight="bold")
+        self.y -= LINE_HEIGHT
+
+    def paragraph(self, text: str):
+        for raw_line in text.splitlines() or [""]:
+            raw_line = raw_line.replace("**", "").replace("`", "")
+            for line in textwrap.wrap(raw_line, WRAP_WIDTH) or [""]:
+                self._room(LINE_HEIGHT)
+                self.figure.text(PAGE_MARGIN, self.y, _pdf_line(line), fontsize=9.5, va="top")
+                self.y -= LINE_HEIGHT
+
+    def image(self, source: Path):
+        # Decoded per placement: the PDF backend keeps its own copy of what it draws
+        pixels = _page_pixels(source)
+        height_px, width_px = pixels.shape[:2]
+        width = 1 - 2 * PAGE_MARGIN
+        height = min(width * height_px / width_px * PAGE_SIZE[0] / PAGE_SIZE[1], 0.5)
+        self._room(height + LINE_HEIGHT)
+        self.y -= height
+        ax = self.figure.add_axes([PAGE_MARGIN, self.y, width, height])
+        ax.imshow(pixels, interpolation="none")
+        ax.axis("off")
+        self.y -= LINE_HEIGHT
+
+    def close(self):
+        self.pdf.savefig(self.figure)
+        self.figure = None
+
+
+def export_pdf(agent, path: Union[str, Path], title: str = "CBSE Learning Session") -> Path:
+    """
+    Write the session as a PDF
+
+    Pages are emitted through PdfPages as soon as they fill up, so only one
+    page is held in memory at a time. The PDF backend keeps the pixels of
+    every placed diagram until the file is closed, so memory grows with the
+    number of diagrams; each is downscaled to PDF_IMAGE_WIDTH first to bound
+    that. Inline $...$ maths is typeset with matplotlib's mathtext where it parses.
+
+    Args:
+        agent: LearningAgent whose conversation is exported
+        path: Output .pdf file
+        title: Document title
+
+    Returns:
+        Path of the written file
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    path = Path(path)
+    resolve = diagram_source(agent)
+    with PdfPages(path, metadata={"Title": title}) as pdf:
+        writer = _PdfWriter(pdf, title)
+        for kind, value in iter_blocks(agent):
+            if kind == "diagram":
+                source = resolve(value)
+                if source is None:
+                    writer.paragraph(f"(Diagram {Path(value).name} is no longer available)")
+                elif source.suffix == ".mp4":
+                    writer.paragraph(f"(Animation {source.name} is in the HTML export)")
+                else:
+                    # Animated GIF/PNG: the first frame
+                    writer.image(source)
+            else:
+                writer.heading(ROLE_NAMES[kind])
+                writer.paragraph(value)
+        writer.close()
+    return path
+
+
+def export_session(agent, path: Union[str, Path], title: str = "CBSE Learning Session") -> Path:
+    """
+    Export a session, choosing HTML or PDF from the file extension
+
+    Args:
+        agent: LearningAgent whose conversation is exported
+        path: Output file ending in .html/.htm or .pdf
+        title: Document title
+
+    Returns:
+        Path of the written file
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".pdf":
+        return export_pdf(agent, path, title)
+    if suffix in (".html", ".htm"):
+        return export_html(agent, path, title)
+    raise ValueError(f"Unsupported export format {suffix!r} (use .html or .pdf)")
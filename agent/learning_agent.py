@@ -3,150 +3,695 @@ CBSE Std 9 Learning Assistant Agent
 Core agent implementation with autonomous diagram generation
 """
 
-import os
 import json
-from typing import List, Dict
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
+import asyncio
+import functools
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
 
-# Load environment variables
-load_dotenv()
+from .prompts import LEARNING_AGENT_PROMPT
+from .token_profiler import TokenProfiler
+from .model_router import ModelRouter, get_default_router
+from .context import ContextAssembler
+from .engine import AgentEngine, get_engine
+from .session import SessionState, empty_usage
+from .single_flight import SingleFlight, StreamFlight, request_key, coalesce_requests_enabled
+from .cancellation import CancelToken, CANCELLATION_STATS
+from .render_queue import (
+    RENDER_QUEUE, RenderQuotaExceeded, RenderSkipped, RenderTicket, RenderWaiter, overlap_renders_enabled
+)
+from .render_workers import RenderWorkerPool, get_render_pool
+from .render_service import get_render_service
+from .curriculum_index import format_reference
+from .prompt_cache import PROMPT_CACHE_STATS, cached_tokens, hit_ratio
+from .profiling import SamplingProfiler, should_profile
+from .math_solver import DIRECT, math_solver_mode, solve_problem
 
-# CBSE Std 9 specific system prompt
-LEARNING_AGENT_PROMPT = """You are a friendly and patient learning tutor for a 13-year-old CBSE Standard 9 student.
+# pyplot keeps global figure state, so in-process diagram renders hold this
+# lock; RENDER_QUEUE decides which render runs next on its render threads
+_RENDER_LOCK = threading.Lock()
 
-**Your Teaching Style:**
-- Use simple, age-appropriate language
-- Break down complex concepts into easy steps
-- Give real-world examples that relate to a teenager's life
-- Encourage questions and curiosity
-- Be patient and supportive, never condescending
-- Use analogies and visuals (describe them) when helpful
 
-**AGENTIC CAPABILITIES - YOU CAN GENERATE DIAGRAMS!**
-You have special powers to create visual diagrams! When explaining concepts that benefit from visualization, YOU SHOULD AUTOMATICALLY use these tools:
+def _run_tool_locked(tool_function, tool_args: dict):
+    """Run a diagram tool while holding the render lock"""
+    with _RENDER_LOCK:
+        return tool_function(**tool_args)
 
-1. **plot_quadratic_function** - For quadratic equations, parabolas (e.g., y = x² - 5x + 6)
-2. **plot_linear_function** - For linear equations, slopes (e.g., y = 2x + 3)
-3. **draw_cell_diagram** - For plant/animal cell structure
-4. **plot_motion_graph** - For physics motion, speed, velocity
-5. **draw_triangle** - For geometry, triangle types
 
-**When to Generate Diagrams (IMPORTANT):**
-- Math: When discussing equations, graphs, functions, geometry
-- Biology: When explaining cells, their parts
-- Physics: When explaining motion, graphs of movement (distance-time, velocity-time)
-- Geometry: When discussing shapes, triangles
+def _render_call(tool_name: str, tool_function, tool_args: dict):
+    """
+    The blocking call that renders one diagram
+    
+    Registered tools go to the shared render service when one is configured
+    (falling back to local rendering if it is unreachable), otherwise to the
+    local worker processes when enabled; anything else renders in this process.
+    """
+    local = functools.partial(_run_tool_locked, tool_function, tool_args)
+    if not RenderWorkerPool.handles(tool_name, tool_function):
+        return local
+    pool = get_render_pool()
+    if pool is not None:
+        local = functools.partial(pool.render, tool_name, tool_args)
+    service = get_render_service()
+    if service is not None:
+        return functools.partial(service.render_or_fallback, tool_name, tool_args, local)
+    return local
+
+
+async def _admit_render(render, session, priority: int):
+    """
+    Queue a render and wait up to the start deadline for it to begin
+    
+    Args:
+        render: Blocking call that renders the diagram and returns its path
+        session: Quota key of the requesting session
+        priority: Queue priority (lower runs first)
+    
+    Returns:
+        The render's result, or the still-pending RenderTicket when it did
+        not start in time (the diagram is deferred)
+    
+    Raises:
+        RenderQuotaExceeded: if the session already has its share of renders pending
+    """
+    ticket = RENDER_QUEUE.submit(
+        render,
+        session=session,
+        priority=priority,
+    )
+    try:
+        if await ticket.wait_started(RENDER_QUEUE.start_deadline):
+            return await ticket.wait()
+        return ticket
+    except asyncio.CancelledError:
+        # Skipped if still queued, discarded if already running
+        ticket.cancel()
+        raise
+
+
+async def _queue_render(render, session, priority: int) -> RenderTicket:
+    """Queue an overlapped render without waiting for it (see _admit_render)"""
+    return RENDER_QUEUE.submit(render, session=session, priority=priority)
+
 
-**IMPORTANT:** Only use tools for topics they're designed for. If a student asks about something you don't have a tool for (like capacitors, circuits, atoms), politely explain that you can describe it with words but don't have a diagram tool for that specific topic yet.
+class _OverlappedRender:
+    """
+    An overlapped render, queued (and shared through RENDER_FLIGHT) at once,
+    or once the turn's earlier diagrams have freed a place under the session
+    quota (see _deliver_deferred)
+
+    Waited on and cancelled like a RenderWaiter.
+    """
+
+    __slots__ = ("_start", "_session", "_waiter", "_outcome")
+
+    def __init__(self, start, session):
+        # Coroutine function: RENDER_FLIGHT.do for the render
+        self._start = start
+        self._session = session
+        self._waiter: Optional[RenderWaiter] = None
+        self._outcome = None
+
+    @property
+    def expires(self) -> float:
+        return self._waiter.expires if self._waiter is not None else time.monotonic()
+
+    async def try_start(self) -> bool:
+        """Queue the render unless the session is still at its quota"""
+        if self._waiter is not None or self._outcome is not None:
+            return True
+        if not RENDER_QUEUE.has_room(self._session):
+            return False
+        try:
+            result, _ = await self._start()
+        except RenderQuotaExceeded:
+            return False
+        except Exception as e:
+            result = e
+        if isinstance(result, RenderTicket):
+            self._waiter = result.waiter()
+        else:
+            # Shared with a render that already finished (or failed)
+            self._outcome = result
+        return True
 
-After generating a diagram, tell the student: "I've created a visual diagram for you! Check the 'diagrams' folder to see: [filename]"
+    async def wait(self, timeout: float = None):
+        if self._waiter is not None:
+            return await self._waiter.wait(timeout)
+        if isinstance(self._outcome, Exception):
+            raise self._outcome
+        if self._outcome is None:
+            raise RenderQuotaExceeded("this conversation has too many diagrams in progress")
+        return self._outcome
 
-**CBSE Std 9 Subjects You Help With:**
-1. **Mathematics**: Algebra, Geometry, Trigonometry, Statistics, Coordinate Geometry
-2. **Science**: Physics (Motion, Force, Gravitation), Chemistry (Matter, Atoms), Biology (Cells, Tissues)
-3. **Social Science**: History, Geography, Civics, Economics
-4. **English**: Grammar, Literature, Writing skills
-5. **Hindi**: Grammar, Literature (if asked)
+    def cancel(self):
+        if self._waiter is not None:
+            self._waiter.cancel()
 
-**Teaching Approach:**
-1. First, understand what the student needs help with
-2. Check their current understanding level
-3. Decide if a diagram would help - if yes, generate it!
-4. Explain the concept step-by-step
-5. Reference the diagram if you created one
-6. Provide examples
-7. Ask if they need clarification
-8. Offer practice questions when appropriate
-9. Celebrate their understanding!
 
-**Writing Math Equations (IMPORTANT for Web Display):**
-When writing mathematical equations in your responses:
-- Use LaTeX format for complex equations: $equation$ for inline, $$equation$$ for display
-- For simple superscripts: write x² as $x^2$, x³ as $x^3$
-- For fractions: write $\frac{numerator}{denominator}$
-- For square roots: write $\sqrt{number}$
-- Examples:
-  * "The equation $x^2 - 5x + 6 = 0$" instead of "The equation x² - 5x + 6 = 0"
-  * "Using the formula $a = \frac{v - u}{t}$" instead of "Using the formula a = (v - u) / t"
-  * "Newton's Second Law: $F = ma$"
-  * "Energy equation: $E = mc^2$"
+# Identical work running at the same time in different sessions (a class
+# asking the same question) is done once: renders always, first-turn model
+# requests when coalescing is enabled
+RENDER_FLIGHT = SingleFlight()
+REQUEST_FLIGHT = SingleFlight()
+STREAM_FLIGHT = StreamFlight()
 
-**Important Rules:**
-- Never just give direct answers to homework - guide them to discover
-- Show step-by-step working for math/science problems
-- Connect new concepts to what they already know
-- Make learning fun and engaging
-- If a topic is outside Std 9 syllabus, gently mention it but still help
-- PROACTIVELY generate diagrams when they would help understanding!
+# Tool result for a render that could not start in time: the model answers
+# in text and the diagram follows the answer if it is rendered after all
+DEFERRED_RESULT = (
+    "⏳ Diagram deferred: the diagram renderer is busy. Answer fully in text and do not "
+    "refer to the diagram as shown; it will appear after your answer if it finishes in time."
+)
 
-Remember: Your goal is to help them UNDERSTAND, not just memorize! Use your diagram powers wisely!"""
+# Queue priority of renders outside a turn (e.g. re-drawing a diagram for an
+# export): behind every diagram a running turn is waiting for
+BACKGROUND_RENDER_PRIORITY = 1000
+
+# Tool result for an overlapped render: the answer is written from the facts
+# while the diagram renders, and the diagram is attached when it is ready
+RENDERING_RESULT = (
+    "⏳ Diagram rendering alongside your answer; it is shown right after it. "
+    "What it shows, computed from the arguments:"
+)
+
+
+async def _close_stream(stream):
+    """Close an upstream stream (OpenAI AsyncStream or async generator) so it stops generating"""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def _without_usage(stream):
+    """Chunks of a shared stream minus the usage chunk, which belongs to the session that paid for it"""
+    async for chunk in stream:
+        if chunk.choices:
+            yield chunk
 
 
 class LearningAgent:
-    """CBSE Learning Agent with autonomous diagram generation capabilities"""
+    """
+    CBSE Learning Agent with autonomous diagram generation capabilities
+    
+    One instance per conversation. The client, system prompt and tools live
+    on a shared AgentEngine; the instance itself only holds its SessionState
+    and per-session options.
+    """
     
-    def __init__(self, tool_functions: dict = None, diagram_tools: list = None):
+    __slots__ = ("engine", "state", "profiler", "router", "context_assembler",
+                 "coalesce_requests", "overlap_renders", "math_solver", "_client")
+    
+    def __init__(self, tool_functions: dict = None, diagram_tools: list = None,
+                 profiler: TokenProfiler = None, router: ModelRouter = None,
+                 tool_validator=None, registry=None,
+                 context_assembler: ContextAssembler = None,
+                 coalesce_requests: bool = None, engine: AgentEngine = None,
+                 overlap_renders: bool = None, math_solver: str = None):
         """
         Initialize the learning agent
         
         Args:
             tool_functions: Dict mapping tool names to function implementations
             diagram_tools: List of tool definitions for OpenAI function calling
+            profiler: Optional TokenProfiler that receives a breakdown of every request
+            router: Optional ModelRouter choosing a fast or strong model per turn
+                (defaults to the shared router when LEARNING_AGENT_ROUTING=1)
+            tool_validator: Optional validator (tools.get_tool_validator()) that checks
+                and normalizes tool arguments before anything is rendered
+            registry: Optional ToolRegistry (tools.TOOL_REGISTRY) supplying the tool
+                functions, schemas and validator in one object
+            context_assembler: Optional ContextAssembler choosing prompt sections and
+                tools per request (defaults to one built from the tools when
+                LEARNING_AGENT_DYNAMIC_CONTEXT=1)
+            coalesce_requests: Share first-turn model requests with identical concurrent
+                requests from other sessions (default: LEARNING_AGENT_COALESCE_REQUESTS=1)
+            engine: Optional AgentEngine to share (defaults to the process-wide
+                engine for the registry)
+            overlap_renders: Answer from each tool's facts while its diagram renders,
+                attaching the diagram when ready (default: LEARNING_AGENT_OVERLAP_RENDERS=1)
+            math_solver: Solve linear and quadratic equations locally: "facts" sends the
+                exact working to the model, "direct" answers with it without the model
+                (default: LEARNING_AGENT_MATH_SOLVER)
+        """
+        if engine is None:
+            if tool_functions is None and diagram_tools is None and tool_validator is None:
+                engine = get_engine(registry)
+            else:
+                # Hand-picked tools get an engine of their own
+                engine = AgentEngine(tool_functions, diagram_tools, tool_validator, registry)
+        self.engine = engine
+        self.state = SessionState()
+        self._client = None
+        
+        # Optional per-request prompt sections and tool subset
+        self.context_assembler = context_assembler or engine.context_assembler
+        
+        # Optional sharing of identical first-turn requests across sessions
+        if coalesce_requests is None:
+            coalesce_requests = coalesce_requests_enabled()
+        self.coalesce_requests = coalesce_requests
+        
+        # Optional rendering in parallel with the final answer
+        if overlap_renders is None:
+            overlap_renders = overlap_renders_enabled()
+        self.overlap_renders = overlap_renders
+        
+        # Optional exact working for equations, from the local solver
+        if math_solver is None:
+            math_solver = math_solver_mode()
+        self.math_solver = math_solver
+        
+        # Optional prompt token profiling
+        self.profiler = profiler
+        
+        # Optional fast/strong model routing
+        self.router = router if router is not None else get_default_router()
+    
+    @property
+    def client(self):
+        """API client (the engine's, unless this session was given its own)"""
+        return self._client or self.engine.client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    @property
+    def model(self) -> str:
+        return self.engine.model
+    
+    @property
+    def tool_functions(self) -> Dict:
+        return self.engine.tool_functions
+    
+    @property
+    def diagram_tools(self) -> List[Dict]:
+        return self.engine.diagram_tools
+    
+    @property
+    def tool_validator(self):
+        return self.engine.tool_validator
+    
+    @property
+    def tool_facts(self) -> Dict:
+        return self.engine.tool_facts
+    
+    @property
+    def conversation_history(self) -> List[Dict]:
+        """Conversation as API message dicts, system prompt first (built on access)"""
+        return self.state.to_api(self.engine.system_prompt)
+    
+    @property
+    def last_usage(self) -> Dict[str, int]:
+        """Token usage of the last turn"""
+        return self.state.last_usage
+    
+    @property
+    def last_diagrams(self) -> List[str]:
+        """Diagram paths created in the last turn"""
+        return self.state.last_diagrams
+    
+    @property
+    def last_sampled_profile(self):
+        """ProfileReport of the last turn that was profiled (None if none was)"""
+        return self.state.last_sampled
+    
+    @property
+    def last_route(self):
+        """Router decision for the last turn (None without a router)"""
+        return self.state.last_route
+    
+    def prompt_cache_stats(self) -> dict:
+        """Requests, prompt tokens and provider-cached tokens for this session"""
+        state = self.state
+        return {
+            "requests": state.requests_sent,
+            "prompt_tokens": state.prompt_tokens_sent,
+            "cached_tokens": state.cached_tokens_sent,
+            "hit_ratio": hit_ratio(state.prompt_tokens_sent, state.cached_tokens_sent),
+        }
+    
+    @staticmethod
+    def _empty_usage() -> Dict[str, int]:
+        return empty_usage()
+    
+    def _start_turn(self, user_message: str) -> Tuple[CancelToken, Tuple[int, int, float]]:
+        """
+        Reset per-turn results and add the user message to history
+        
+        A turn still running in this session (the student sent a new message)
+        is cancelled and its messages are removed first.
+        
+        Returns:
+            (cancel token bound to the current task, rollback point for _abandon_turn)
         """
-        # Get GitHub token from environment
-        github_token = os.getenv("GITHUB_TOKEN")
-        if not github_token:
-            raise ValueError(
-                "GITHUB_TOKEN not found! Please:\n"
-                "1. Copy .env.example to .env\n"
-                "2. Get your GitHub token from: https://github.com/settings/tokens\n"
-                "3. Add it to the .env file"
+        state = self.state
+        previous = state.cancel_token
+        if previous is not None and previous.cancel("superseded by a new message"):
+            # Its own rollback would run after this turn has started: undo it here
+            CANCELLATION_STATS.record(messages_rolled_back=state.rollback(state.turn_mark, state.epoch))
+            state.epoch += 1
+        token = CancelToken()
+        token.bind_task()
+        state.cancel_token = token
+        state.turn_mark = len(state.messages)
+        rollback_point = (state.turn_mark, state.epoch, time.perf_counter())
+        state.last_usage = empty_usage()
+        state.last_diagrams = []
+        state.deferred = []
+        state.turn_started = time.perf_counter()
+        state.escalated = False
+        reference = self._retrieve_reference(user_message)
+        state.solution = solve_problem(user_message) if self.math_solver else None
+        if self.router is not None or self.context_assembler is not None:
+            history = self.conversation_history
+            if self.router is not None:
+                state.last_route = self.router.classify(user_message, history)
+                state.route = state.last_route.route
+            if self.context_assembler is not None:
+                # Subjects only widen within a session, keeping the prompt prefix cacheable
+                state.context = self.context_assembler.assemble(user_message, history, state.context)
+        # The question's snippets and working go just before it and stay in
+        # history, so later turns resend the same prefix
+        if reference is not None:
+            state.add_turn_context(reference)
+        if state.solution is not None and not self._answers_locally():
+            state.add_turn_context(state.solution.facts())
+        state.add_user(user_message)
+        return token, rollback_point
+    
+    def _retrieve_reference(self, user_message: str):
+        """
+        Curriculum snippets for the question, or None without an index or a match
+        
+        A follow-up that matches nothing on its own ("why is that?") is
+        searched together with the previous question.
+        """
+        index = self.engine.curriculum_index
+        if index is None:
+            return None
+        snippets = index.search(user_message)
+        if not snippets:
+            previous = [m.content for m in self.state.messages if m.role == "user"][-1:]
+            if previous:
+                snippets = index.search(f"{previous[0]}\n{user_message}")
+        return format_reference(snippets)
+    
+    def _end_turn(self, token: CancelToken):
+        """Release the turn's cancel token (whether it finished or not)"""
+        token.finish()
+        if self.state.cancel_token is token:
+            self.state.cancel_token = None
+    
+    def _abandon_turn(self, token: CancelToken, rollback_point: Tuple[int, int, float], error: BaseException):
+        """
+        Undo a turn that did not finish, so history never holds half a turn
+        
+        Covers cancellation (Ctrl-C, Clear, a new message, a disconnect), the
+        caller dropping the stream, and errors.
+        """
+        mark, epoch, started = rollback_point
+        for _, waiter in self.state.deferred:
+            waiter.cancel()
+        self.state.deferred = []
+        removed = self.state.rollback(mark, epoch)
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            CANCELLATION_STATS.record(
+                turns_cancelled=1,
+                seconds_abandoned=time.perf_counter() - started,
+                messages_rolled_back=removed,
             )
+        self.state.pending_profile = None
+    
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the running turn, if any (safe to call from any thread)
         
-        # Connect to GitHub Models
-        self.client = AsyncOpenAI(
-            base_url="https://models.github.ai/inference",
-            api_key=github_token,
-        )
+        The turn's pending model request or stream is closed, renders nobody
+        else is waiting for are skipped or discarded, and its messages are
+        removed from history.
         
-        self.model = "gpt-4.1-mini"  # Fast, smart, affordable - outperforms gpt-4o-mini
-        self.conversation_history: List[Dict[str, str]] = [
-            {"role": "system", "content": LEARNING_AGENT_PROMPT}
-        ]
+        Returns:
+            True if a turn was running
+        """
+        token = self.state.cancel_token
+        return token is not None and token.cancel(reason)
+    
+    def _finish_turn(self):
+        """Report the finished turn to the router's per-route metrics"""
+        state = self.state
+        if self.router is not None and state.route is not None:
+            self.router.record(
+                state.route.name,
+                time.perf_counter() - state.turn_started,
+                state.last_usage,
+                escalated=state.escalated,
+            )
+    
+    async def _maybe_escalate(self, response):
+        """Re-ask on the strong route when a fast-route answer fails the confidence check"""
+        if self.router is None or self.state.route is not self.router.fast:
+            return response
+        choice = response.choices[0]
+        if self.router.check_confidence(choice.message, choice.finish_reason):
+            return response
+        self.state.route = self.router.strong
+        self.state.escalated = True
+        return await self._create_completion("tool_check_escalated", with_tools=True)
+    
+    def _record_usage(self, usage):
+        """Add API-reported token usage to the current turn's totals"""
+        if usage is None:
+            return
+        state = self.state
+        cached = cached_tokens(usage)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            state.last_usage[key] += getattr(usage, key, 0) or 0
+        state.last_usage["cached_tokens"] += cached
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        state.requests_sent += 1
+        state.prompt_tokens_sent += prompt_tokens
+        state.cached_tokens_sent += cached
+        PROMPT_CACHE_STATS.record(prompt_tokens, cached)
+        self._flush_profile(usage)
+    
+    def _flush_profile(self, usage=None):
+        """Hand the last request's token profile to the profiler"""
+        if self.state.pending_profile is not None:
+            self.profiler.record(self.state.pending_profile, usage)
+            self.state.pending_profile = None
+    
+    def _request_messages(self) -> List[Dict]:
+        """History as sent to the model, with the assembled system prompt if any"""
+        context = self.state.context
+        system_prompt = context.system_prompt if context is not None else self.engine.system_prompt
+        return self.state.to_api(system_prompt)
+    
+    async def _create_completion(self, label: str, with_tools: bool = False, stream: bool = False):
+        """
+        Send the conversation history to the model
+        
+        Args:
+            label: Request name used in token profiles
+            with_tools: Let the model call the diagram tools (their schemas are
+                sent either way, so the cached prompt prefix stays the same)
+            stream: Return an async stream of chunks instead of a completion
+        """
+        route = self.state.route
+        context = self.state.context
+        available_tools = context.tools if context is not None else self.engine.diagram_tools
+        tools = available_tools or None
+        messages = self._request_messages()
+        kwargs = {
+            "model": route.model if route else self.engine.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": route.max_tokens if route else 2000,
+        }
+        if tools:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = "auto" if with_tools else "none"
+        if stream:
+            kwargs["stream"] = True
+            kwargs["stream_options"] = {"include_usage": True}
+        
+        if self.profiler is not None:
+            self._flush_profile()
+            self.state.pending_profile = self.profiler.profile_request(messages, tools, label)
         
-        # Tool functions and definitions
-        self.tool_functions = tool_functions or {}
-        self.diagram_tools = diagram_tools or []
+        if self.coalesce_requests and self.state.user_turns() == 1:
+            return await self._create_shared_completion(kwargs, stream)
+        
+        try:
+            response = await self.client.chat.completions.create(**kwargs)
+        except asyncio.CancelledError:
+            CANCELLATION_STATS.record(requests_cancelled=1)
+            raise
+        if not stream:
+            self._record_usage(response.usage)
+        return response
+    
+    async def _create_shared_completion(self, kwargs: dict, stream: bool):
+        """Send the request, or join an identical one already in flight"""
+        key = request_key(kwargs)
+        create = lambda: self.client.chat.completions.create(**kwargs)
+        if stream:
+            response, leader = await STREAM_FLIGHT.subscribe(key, create)
+            if not leader:
+                response = _without_usage(response)
+        else:
+            response, leader = await REQUEST_FLIGHT.do(key, create)
+            if leader:
+                self._record_usage(response.usage)
+        if not leader:
+            # This session sent nothing, so it has no request to profile
+            self.state.pending_profile = None
+        return response
     
-    async def _execute_tool(self, tool_name: str, tool_args: dict) -> str:
-        """Execute a tool function and return the result"""
+    def _parse_tool_arguments(self, tool_call):
+        """
+        Parse a tool call's arguments, validating them when a validator is set
+        
+        Returns:
+            (args, None) on success, or (None, error message for the tool result)
+        """
+        tool_name = tool_call.function.name
+        try:
+            if self.tool_validator is not None:
+                return self.tool_validator.validate(tool_name, tool_call.function.arguments).args, None
+            return json.loads(tool_call.function.arguments or "{}"), None
+        except ValueError as e:
+            return None, f"❌ Invalid arguments for {tool_name}: {str(e)}"
+    
+    async def _execute_tool(self, tool_name: str, tool_args: dict, tool_call_id: str = None) -> str:
+        """
+        Execute a tool function and return the result
+        
+        Renders go through RENDER_QUEUE, a turn's first diagram ahead of its
+        later ones. A render that cannot start within the queue's deadline is
+        deferred: the model is told so and answers in text, and
+        _deliver_deferred() shows the diagram after the answer if it arrives.
+        
+        With overlap_renders, a tool that has facts returns them at once and
+        its render is only queued (shared with identical renders through
+        RENDER_FLIGHT), so the final answer streams while the diagram is
+        drawn; _deliver_deferred() attaches it afterwards. Overlapped renders
+        beyond the session quota are held and queued as earlier ones finish.
+        """
         try:
             if tool_name in self.tool_functions:
-                result = self.tool_functions[tool_name](**tool_args)
+                render = _render_call(tool_name, self.tool_functions[tool_name], tool_args)
+                if self.state.sampler is not None:
+                    # The render thread is sampled while it works on this turn
+                    render = self.state.sampler.wrap(render)
+                priority = len(self.state.last_diagrams) + len(self.state.deferred)
+                facts = self._tool_facts(tool_name, tool_args)
+                if facts is not None:
+                    start = functools.partial(
+                        RENDER_FLIGHT.do,
+                        request_key(tool_name, tool_args),
+                        lambda: _queue_render(render, id(self.state), priority),
+                    )
+                    overlapped = _OverlappedRender(start, id(self.state))
+                    # A turn drawing several diagrams is not refused: over the quota, its later ones wait
+                    if not await overlapped.try_start() and not self.state.deferred:
+                        raise RenderQuotaExceeded(
+                            f"this conversation already has {RENDER_QUEUE.session_limit} diagram(s) in progress"
+                        )
+                    self.state.deferred.append((tool_call_id, overlapped))
+                    return f"{RENDERING_RESULT}\n{facts}"
+                result, _ = await RENDER_FLIGHT.do(
+                    request_key(tool_name, tool_args),
+                    lambda: _admit_render(render, id(self.state), priority),
+                )
+                if isinstance(result, RenderTicket):
+                    # Sessions sharing the render each wait on their own claim to it
+                    self.state.deferred.append((tool_call_id, result.waiter()))
+                    return DEFERRED_RESULT
+                self.state.last_diagrams.append(str(result))
                 return f"Diagram created successfully: {result}"
             else:
                 return f"❌ Unknown tool: {tool_name}"
+        except RenderQuotaExceeded as e:
+            return f"❌ Diagram not drawn: {str(e)}. Explain in text instead."
         except Exception as e:
             return f"❌ Error creating diagram: {str(e)}"
     
-    async def chat(self, user_message: str) -> str:
-        """Send a message and get response (non-streaming)"""
+    def _tool_facts(self, tool_name: str, tool_args: dict):
+        """The tool's facts when its render can overlap the answer, otherwise None"""
+        facts_function = self.tool_facts.get(tool_name) if self.overlap_renders else None
+        if facts_function is None:
+            return None
+        try:
+            return facts_function(tool_args)
+        except Exception:
+            # Rendered the usual way, which reports the problem in the tool result
+            return None
+    
+    async def _deliver_deferred(self):
+        """
+        Wait for the turn's deferred and overlapped renders, after its answer
+        
+        Each outcome is appended to history after the answer (the earlier tool
+        result is left as sent, so the cached prompt prefix stays valid) and
+        yielded: the diagram if it rendered before its queue expiry, otherwise
+        a note that it was skipped.
+        """
+        state = self.state
+        while state.deferred:
+            for _, pending in state.deferred:
+                if isinstance(pending, _OverlappedRender) and not await pending.try_start():
+                    break
+            tool_call_id, waiter = state.deferred[0]
+            # Time left to start, plus the deadline again to finish rendering
+            timeout = max(0.0, waiter.expires - time.monotonic()) + RENDER_QUEUE.start_deadline
+            try:
+                result = await waiter.wait(timeout)
+            except (RenderSkipped, asyncio.TimeoutError):
+                waiter.cancel()
+                content = "❌ Diagram skipped: the renderer was too busy"
+            except RenderQuotaExceeded as e:
+                content = f"❌ Diagram not drawn: {str(e)}"
+            except Exception as e:
+                content = f"❌ Error creating diagram: {str(e)}"
+            else:
+                state.last_diagrams.append(str(result))
+                content = f"Diagram created successfully: {result}"
+            state.deferred.pop(0)
+            state.add_late_result(tool_call_id, content)
+            yield content
+    
+    async def chat(self, user_message: str, profile: bool = None) -> str:
+        """
+        Send a message and get response (non-streaming)
+        
+        Args:
+            user_message: The student's message
+            profile: Sample this turn's Python stacks (default: LEARNING_AGENT_PROFILE rate)
+        """
         # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+        token, rollback_point = self._start_turn(user_message)
+        sampler = self._start_sampling(profile, "chat")
+        try:
+            return await self._chat_turn(token)
+        except BaseException as e:
+            self._abandon_turn(token, rollback_point, e)
+            raise
+        finally:
+            self._end_turn(token)
+            self._stop_sampling(sampler)
+    
+    async def _chat_turn(self, token: CancelToken) -> str:
+        if self._answers_locally():
+            return self._local_answer()
         
         # Get response with tool calling enabled
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=self.conversation_history,
-            tools=self.diagram_tools if self.diagram_tools else None,
-            tool_choice="auto" if self.diagram_tools else None,
-            temperature=0.7,
-            max_tokens=2000,
-        )
+        response = await self._create_completion("tool_check", with_tools=True)
+        response = await self._maybe_escalate(response)
+        token.check()
         
         assistant_message = response.choices[0].message
         tool_calls = assistant_message.tool_calls
@@ -154,76 +699,73 @@ class LearningAgent:
         # If agent wants to use tools, execute them
         if tool_calls:
             # Add assistant's tool call to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message.content,
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
-                    } for tc in tool_calls
-                ]
-            })
+            self.state.add_assistant(assistant_message.content, tool_calls)
             
             # Execute each tool
             for tool_call in tool_calls:
                 tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
+                tool_args, error = self._parse_tool_arguments(tool_call)
                 
                 print(f"\nAgent is creating a diagram: {tool_name}...", flush=True)
-                result = await self._execute_tool(tool_name, tool_args)
+                result = error or await self._execute_tool(tool_name, tool_args, tool_call.id)
+                token.check()
                 
                 # Add tool result to history
-                self.conversation_history.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": result
-                })
+                self.state.add_tool_result(tool_call.id, result)
             
             # Get final response after tool execution
-            final_response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                temperature=0.7,
-                max_tokens=2000,
-            )
+            final_response = await self._create_completion("final")
+            token.check()
             
             final_content = final_response.choices[0].message.content
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": final_content
-            })
+            self.state.add_assistant(final_content)
+            async for _ in self._deliver_deferred():
+                token.check()
+            self._finish_turn()
             
             return final_content
         else:
             # No tools used, just return the response
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message.content
-            })
+            self.state.add_assistant(assistant_message.content)
+            self._finish_turn()
             return assistant_message.content
     
-    async def chat_stream(self, user_message: str):
-        """Send a message and get streaming response with tool support"""
+    async def chat_stream(self, user_message: str, profile: bool = None):
+        """
+        Send a message and get streaming response with tool support
+        
+        Cancelling the consuming task (or agent.cancel(), or closing the
+        generator early) stops the turn and rolls its messages back.
+        
+        Args:
+            user_message: The student's message
+            profile: Sample this turn's Python stacks (default: LEARNING_AGENT_PROFILE rate)
+        """
         # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+        token, rollback_point = self._start_turn(user_message)
+        sampler = self._start_sampling(profile, "chat_stream")
+        turn = self._stream_turn(token)
+        try:
+            async for chunk in turn:
+                yield chunk
+        except BaseException as e:
+            self._abandon_turn(token, rollback_point, e)
+            raise
+        finally:
+            # Closes the upstream stream when the caller stopped mid-reply
+            await turn.aclose()
+            self._end_turn(token)
+            self._stop_sampling(sampler)
+    
+    async def _stream_turn(self, token: CancelToken):
+        if self._answers_locally():
+            yield self._local_answer()
+            return
         
         # First, check if tools are needed (non-streaming call)
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=self.conversation_history,
-            tools=self.diagram_tools if self.diagram_tools else None,
-            tool_choice="auto" if self.diagram_tools else None,
-            temperature=0.7,
-            max_tokens=2000,
-        )
+        response = await self._create_completion("tool_check", with_tools=True)
+        response = await self._maybe_escalate(response)
+        token.check()
         
         assistant_message = response.choices[0].message
         tool_calls = assistant_message.tool_calls
@@ -231,81 +773,139 @@ class LearningAgent:
         # If agent wants to use tools
         if tool_calls:
             # Add assistant's tool call to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message.content,
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
-                    } for tc in tool_calls
-                ]
-            })
+            self.state.add_assistant(assistant_message.content, tool_calls)
             
             # Execute tools
             for tool_call in tool_calls:
                 tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
+                tool_args, error = self._parse_tool_arguments(tool_call)
                 
                 yield f"\n\nCreating diagram: {tool_name}...\n"
-                result = await self._execute_tool(tool_name, tool_args)
-                yield f"{result}\n\n"
+                result = error or await self._execute_tool(tool_name, tool_args, tool_call.id)
+                token.check()
+                if result == DEFERRED_RESULT:
+                    yield "Diagram queued: it will appear after the answer.\n\n"
+                elif result.startswith(RENDERING_RESULT):
+                    yield "Drawing the diagram while the answer is written...\n\n"
+                else:
+                    yield f"{result}\n\n"
                 
                 # Add tool result to history
-                self.conversation_history.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": result
-                })
+                self.state.add_tool_result(tool_call.id, result)
             
             # Get final response with streaming
+            stream = None
+            finished = False
             try:
-                stream = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=self.conversation_history,
-                    temperature=0.7,
-                    max_tokens=2000,
-                    stream=True,
-                )
+                stream = await self._create_completion("final_stream", stream=True)
                 
                 full_response = ""
                 async for chunk in stream:
-                    if chunk.choices[0].delta.content:
+                    # The usage chunk arrives last, with no choices
+                    self._record_usage(getattr(chunk, "usage", None))
+                    if chunk.choices and chunk.choices[0].delta.content:
                         content = chunk.choices[0].delta.content
                         full_response += content
                         yield content
+                finished = True
+                self._flush_profile()
+                token.check()
                 
                 # Add complete response to history
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": full_response
-                })
+                self.state.add_assistant(full_response)
             except Exception as e:
                 error_msg = f"Sorry, I encountered an error: {str(e)}"
                 yield error_msg
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
+                token.check()
+                self.state.add_assistant(error_msg)
+            finally:
+                # Also runs when the caller cancels mid-reply: stop the upstream
+                # response instead of letting it generate (and bill) to the end
+                if stream is not None:
+                    if not finished:
+                        CANCELLATION_STATS.record(streams_closed_early=1)
+                    await _close_stream(stream)
+            
+            # Diagrams deferred by a busy renderer or drawn alongside the answer follow it
+            async for late in self._deliver_deferred():
+                token.check()
+                yield f"\n\n{late}\n"
         else:
             # No tools, just stream the response
             full_response = assistant_message.content
             
             # Add to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": full_response
-            })
+            self.state.add_assistant(full_response)
             
             # Yield the response
             yield full_response
+        
+        self._finish_turn()
+    
+    def _answers_locally(self) -> bool:
+        """Whether the solver's working is the whole answer (direct mode, and the student asked to solve)"""
+        solution = self.state.solution
+        return self.math_solver == DIRECT and solution is not None and solution.requested
+    
+    def _local_answer(self) -> str:
+        """Answer the turn from the solver's working (no model request, so nothing for the router to record)"""
+        answer = self.state.solution.answer_text()
+        self.state.add_assistant(answer)
+        return answer
+    
+    def _start_sampling(self, profile, name: str):
+        """Start the turn's sampling profiler when this turn is profiled"""
+        if not should_profile(profile):
+            return None
+        sampler = SamplingProfiler(name)
+        sampler.start()
+        self.state.sampler = sampler
+        return sampler
+    
+    def _stop_sampling(self, sampler):
+        """Stop the turn's profiler and write its speedscope, flamegraph and summary files"""
+        if sampler is None:
+            return
+        if self.state.sampler is sampler:
+            self.state.sampler = None
+        try:
+            self.state.last_sampled = sampler.stop()
+        except OSError as e:
+            print(f"Could not write the profile: {e}", flush=True)
     
     def clear_history(self):
-        """Clear conversation history (keep system prompt)"""
-        self.conversation_history = [
-            {"role": "system", "content": LEARNING_AGENT_PROMPT}
-        ]
+        """Clear conversation history (keep system prompt), cancelling a running turn"""
+        self.cancel("conversation cleared")
+        self.state.clear()
+    
+    def render_diagram(self, tool_name: str, tool_args: dict, timeout: float = None) -> str:
+        """
+        Render one diagram outside a turn and wait for it (blocking; not for the event loop)
+        
+        Takes the same path as a turn's diagrams: validated arguments, then
+        RENDER_QUEUE under this session's quota (behind renders a turn is
+        waiting for), then the render service, worker pool or this process.
+        
+        Args:
+            tool_name: Registered diagram tool
+            tool_args: Its arguments as the model sent them
+            timeout: Seconds to wait for the result (default: no limit)
+        
+        Returns:
+            Path to the diagram
+        
+        Raises:
+            ValueError: if the tool is unknown or the arguments are invalid
+            RenderQuotaExceeded, RenderSkipped: if the queue would not take or start it
+        """
+        tool_function = self.tool_functions.get(tool_name)
+        if tool_function is None:
+            raise ValueError(f"unknown tool {tool_name}")
+        if self.tool_validator is not None:
+            tool_args = self.tool_validator.validate(tool_name, tool_args).args
+        ticket = RENDER_QUEUE.submit(
+            _render_call(tool_name, tool_function, tool_args),
+            session=id(self.state),
+            priority=BACKGROUND_RENDER_PRIORITY,
+        )
+        return str(ticket.result.result(timeout))
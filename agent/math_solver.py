@@ -0,0 +1,467 @@
+"""
+Local Maths Solver
+Exact step-by-step working for linear and quadratic equations, without the model
+
+Recognizes one-variable problems such as "solve 2x + 3 = 7" or "find the
+roots of x² - 5x + 6" in a student message and solves them with Fractions:
+collecting terms for linear equations, splitting the middle term when a
+quadratic factorises, and the quadratic formula with simplified surds
+otherwise. The working is sent to the model as verified facts, or shown
+directly as the answer.
+"""
+
+import math
+import os
+import re
+from fractions import Fraction
+from typing import List, Optional
+
+# Start of the system message carrying the working (token profiles look for it)
+SOLUTION_HEADER = "**Verified working**"
+
+# Modes for LEARNING_AGENT_MATH_SOLVER
+FACTS = "facts"
+DIRECT = "direct"
+
+# Problems without "=" are only taken as equations when the message asks for this
+SOLVE_WORDS = re.compile(
+    r"\b(solve|solution|roots?|zero(?:e?s)?|find\s+[a-z]|value\s+of\s+[a-z])\b",
+    re.IGNORECASE,
+)
+
+# Asking for the factorised form: the answer is an expression, not roots,
+# so unless the message also asks to solve, it is left to the model
+FACTORISE_WORDS = re.compile(r"\b(factori[sz]e|factori[sz]ation|factors?)\b", re.IGNORECASE)
+
+# Any word: a message with an equation and no words is the bare problem
+WORD = re.compile(r"[A-Za-z]{2,}")
+
+_TOKEN = re.compile(r"(\d+(?:\.\d+)?|\.\d+)|([A-Za-z]+)|(\*\*|[-+*/^()=²³−–×÷])|(\S)")
+_OPERATORS = {"−": "-", "–": "-", "×": "*", "÷": "/", "**": "^"}
+_POWERS = {"²": 2, "³": 3}
+_SUPERSCRIPTS = {2: "²", 3: "³"}
+
+# Largest factor tried when taking square factors out of a discriminant
+SURD_FACTOR_LIMIT = 10000
+
+
+def math_solver_mode() -> Optional[str]:
+    """LEARNING_AGENT_MATH_SOLVER: "facts" (verified working for the model), "direct" (answer locally) or off"""
+    mode = os.getenv("LEARNING_AGENT_MATH_SOLVER", "").lower()
+    if mode in ("1", "true", "yes"):
+        return FACTS
+    return mode if mode in (FACTS, DIRECT) else None
+
+
+# ---------------------------------------------------------------------------
+# Parsing: one side of an equation to polynomial coefficients
+
+class _NotAnEquation(ValueError):
+    pass
+
+
+def _trim(poly: List[Fraction]) -> List[Fraction]:
+    while len(poly) > 1 and poly[-1] == 0:
+        poly.pop()
+    return poly
+
+
+def _add(p: List[Fraction], q: List[Fraction], sign: int = 1) -> List[Fraction]:
+    size = max(len(p), len(q))
+    return _trim([
+        (p[i] if i < len(p) else 0) + sign * (q[i] if i < len(q) else 0) for i in range(size)
+    ])
+
+
+def _multiply(p: List[Fraction], q: List[Fraction]) -> List[Fraction]:
+    product = [Fraction(0)] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        for j, b in enumerate(q):
+            product[i + j] += a * b
+    product = _trim(product)
+    if len(product) > 3:
+        raise _NotAnEquation("degree above 2")
+    return product
+
+
+class _Parser:
+    """Recursive descent over the tokens of one side: sums, products, powers and brackets"""
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> List[Fraction]:
+        poly = self._sum()
+        if self.position != len(self.tokens):
+            raise _NotAnEquation("unexpected token")
+        return poly
+
+    def _sum(self) -> List[Fraction]:
+        poly = self._product()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            sign = 1 if self._take()[1] == "+" else -1
+            poly = _add(poly, self._product(), sign)
+        return poly
+
+    def _product(self) -> List[Fraction]:
+        poly = self._signed()
+        while True:
+            kind, value = self._peek()
+            if (kind, value) == ("op", "*"):
+                self._take()
+                poly = _multiply(poly, self._signed())
+            elif (kind, value) == ("op", "/"):
+                self._take()
+                divisor = self._signed()
+                if len(divisor) > 1 or divisor[0] == 0:
+                    raise _NotAnEquation("division by an expression")
+                poly = [coefficient / divisor[0] for coefficient in poly]
+            elif kind == "var" or (kind, value) == ("op", "("):
+                # Implied multiplication: 2x, 3(x + 1), (x + 1)(x - 2), x(x + 4)
+                poly = _multiply(poly, self._power())
+            else:
+                return poly
+
+    def _signed(self) -> List[Fraction]:
+        if self._peek() in (("op", "+"), ("op", "-")):
+            sign = 1 if self._take()[1] == "+" else -1
+            return [sign * coefficient for coefficient in self._signed()]
+        return self._power()
+
+    def _power(self) -> List[Fraction]:
+        base = self._atom()
+        kind, value = self._peek()
+        exponent = None
+        if kind == "pow":
+            self._take()
+            exponent = value
+        elif (kind, value) == ("op", "^"):
+            self._take()
+            kind, value = self._take()
+            if kind != "num" or value.denominator != 1:
+                raise _NotAnEquation("exponent must be a whole number")
+            exponent = int(value)
+        if exponent is None:
+            return base
+        if exponent > 2:
+            raise _NotAnEquation("degree above 2")
+        poly = [Fraction(1)]
+        for _ in range(exponent):
+            poly = _multiply(poly, base)
+        return poly
+
+    def _atom(self) -> List[Fraction]:
+        kind, value = self._take()
+        if kind == "num":
+            return [value]
+        if kind == "var":
+            return [Fraction(0), Fraction(1)]
+        if (kind, value) == ("op", "("):
+            poly = self._sum()
+            if self._take() != ("op", ")"):
+                raise _NotAnEquation("unclosed bracket")
+            return poly
+        raise _NotAnEquation("expected a number, variable or bracket")
+
+
+def _spans(message: str) -> List[list]:
+    """Runs of maths tokens in the message, split at words and punctuation"""
+    spans, current = [], []
+    for number, word, operator, other in _TOKEN.findall(message):
+        if number:
+            current.append(("num", Fraction(number)))
+        elif word and len(word) == 1:
+            current.append(("var", word))
+        elif operator in _POWERS:
+            current.append(("pow", _POWERS[operator]))
+        elif operator:
+            current.append(("op", _OPERATORS.get(operator, operator)))
+        else:
+            # A word or punctuation ends the run
+            if current:
+                spans.append(current)
+            current = []
+    if current:
+        spans.append(current)
+    return spans
+
+
+def _divides_by_expression(tokens: list) -> bool:
+    """
+    Whether anything is divided by the variable ("x/(x - 1)", "3/x", "x/2x")
+
+    Such equations can have excluded values (x = 1 in (x² - 1)/(x - 1) = 2),
+    so they are left to the model instead of being cleared of fractions.
+    """
+    for i, token in enumerate(tokens):
+        if token != ("op", "/"):
+            continue
+        j = i + 1
+        while j < len(tokens) and tokens[j] in (("op", "+"), ("op", "-")):
+            j += 1
+        if j < len(tokens) and tokens[j][0] == "num":
+            j += 1  # "1/2x" could mean 1/(2x): ambiguous, so it counts too
+        if j >= len(tokens):
+            continue
+        if tokens[j][0] == "var":
+            return True
+        if tokens[j] == ("op", "("):
+            depth = 0
+            for kind, value in tokens[j:]:
+                if (kind, value) == ("op", "("):
+                    depth += 1
+                elif (kind, value) == ("op", ")"):
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif kind == "var":
+                    return True
+    return False
+
+
+def _equation(tokens: list, asks_to_solve: bool):
+    """(left, right, variable) polynomials if the tokens are a one-variable equation"""
+    while tokens and tokens[-1][0] == "op" and tokens[-1][1] != ")":
+        tokens = tokens[:-1]
+    variables = {value for kind, value in tokens if kind == "var"}
+    if len(variables) != 1:
+        return None
+    equals = [i for i, token in enumerate(tokens) if token == ("op", "=")]
+    if len(equals) > 1 or (not equals and not asks_to_solve):
+        return None
+    if equals:
+        left_tokens, right_tokens = tokens[:equals[0]], tokens[equals[0] + 1:]
+    else:
+        left_tokens, right_tokens = tokens, [("num", Fraction(0))]
+    try:
+        left, right = _Parser(left_tokens).parse(), _Parser(right_tokens).parse()
+    except _NotAnEquation:
+        return None
+    if [0, 1] in (left, right) and len(left) + len(right) == 3:
+        return None  # Already solved ("x = 5")
+    return left, right, variables.pop()
+
+
+# ---------------------------------------------------------------------------
+# Formatting
+
+def _fraction(value: Fraction) -> str:
+    return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+
+def _expression(terms, variable: str) -> str:
+    """"2x² - 2x - 3x + 6" from (coefficient, power) pairs, skipping zero terms"""
+    text = ""
+    for coefficient, power in terms:
+        if coefficient == 0:
+            continue
+        magnitude = _fraction(abs(Fraction(coefficient)))
+        if power:
+            if magnitude == "1":
+                magnitude = ""
+            elif "/" in magnitude:
+                magnitude = f"({magnitude})"
+            magnitude += variable + _SUPERSCRIPTS.get(power, "")
+        if not text:
+            text = f"-{magnitude}" if coefficient < 0 else magnitude
+        else:
+            text += f" {'-' if coefficient < 0 else '+'} {magnitude}"
+    return text or "0"
+
+
+def _polynomial(poly: List[Fraction], variable: str) -> str:
+    """Highest power first: [6, -5, 1] gives x² - 5x + 6"""
+    return _expression([(poly[power], power) for power in range(len(poly) - 1, -1, -1)], variable)
+
+
+def _evaluate(poly: List[Fraction], value: Fraction) -> Fraction:
+    return sum(coefficient * value ** power for power, coefficient in enumerate(poly))
+
+
+def _surd(n: int):
+    """(k, r) with n = k²·r, taking out square factors up to SURD_FACTOR_LIMIT"""
+    k, r, factor = 1, n, 2
+    while factor * factor <= r and factor <= SURD_FACTOR_LIMIT:
+        while r % (factor * factor) == 0:
+            r //= factor * factor
+            k *= factor
+        factor += 1
+    return k, r
+
+
+# ---------------------------------------------------------------------------
+# Solving
+
+class Solution:
+    """Exact working for one equation"""
+
+    __slots__ = ("equation", "variable", "degree", "steps", "answer", "requested")
+
+    def __init__(self, equation: str, variable: str, degree: int, steps: List[str], answer: str):
+        self.equation = equation
+        self.variable = variable
+        self.degree = degree
+        self.steps = steps
+        self.answer = answer
+        # Whether the message asked for the solution itself (not, say, why a step works)
+        self.requested = False
+
+    def facts(self) -> str:
+        """The working as a system message for the model"""
+        lines = "\n".join(f"- {step}" for step in self.steps)
+        return (
+            f"{SOLUTION_HEADER} for {self.equation} (exact, computed locally; build the answer on "
+            f"these steps and results and explain them, do not recompute them):\n"
+            f"{lines}\n- Answer: {self.answer}"
+        )
+
+    def answer_text(self) -> str:
+        """The working as a complete answer for the student"""
+        steps = "\n".join(f"**Step {i}:** {step}" for i, step in enumerate(self.steps, 1))
+        return f"Let's solve {self.equation} step by step.\n\n{steps}\n\n**Answer:** {self.answer}"
+
+
+def _solve_linear(left: List[Fraction], right: List[Fraction], poly: List[Fraction],
+                  equation: str, x: str) -> Solution:
+    """ax + b = 0: collect terms, divide, substitute back"""
+    a, b = poly[1], poly[0]
+    steps = []
+    collected = f"{_expression([(a, 1)], x)} = {_fraction(-b)}"
+    if collected != equation:
+        steps.append(f"Collect the {x} terms on the left and the numbers on the right: {collected}")
+    root = -b / a
+    if a != 1:
+        steps.append(f"Divide both sides by {_fraction(a)}: {x} = {_fraction(root)}")
+    steps.append(
+        f"Check: with {x} = {_fraction(root)} the left side is {_fraction(_evaluate(left, root))} "
+        f"and the right side is {_fraction(_evaluate(right, root))}"
+    )
+    return Solution(equation, x, 1, steps, f"{x} = {_fraction(root)}")
+
+
+def _factorisation_steps(a: int, b: int, c: int, root_d: int, x: str) -> List[str]:
+    """Factorise ax² + bx + c (whole numbers, perfect-square discriminant) by splitting the middle term"""
+    if c == 0:
+        return [f"Take out the common factor {x}: {x}({_polynomial([b, a], x)}) = 0"]
+    # m + n = b and mn = ac; both are whole numbers because b and √D have the same parity
+    m, n = (b + root_d) // 2, (b - root_d) // 2
+    first = math.gcd(a, m)
+    inner = _polynomial([Fraction(m // first), Fraction(a // first)], x)
+    # (n, c) is a whole multiple of (a/first, m/first), since ac = mn
+    second = n * first // a
+    return [
+        f"Split the middle term: the numbers with product a × c = {a * c} and sum b = {b} are {m} and {n}",
+        f"Rewrite the middle term: {_expression([(a, 2), (m, 1), (n, 1), (c, 0)], x)} = 0",
+        f"Group: {_expression([(first, 1)], x)}({inner}) {'-' if second < 0 else '+'} {abs(second)}({inner}) = 0",
+        f"Factorise: ({inner})({_polynomial([Fraction(second), Fraction(first)], x)}) = 0",
+    ]
+
+
+def _solve_quadratic(poly: List[Fraction], equation: str, x: str) -> Solution:
+    """ax² + bx + c = 0: factorise when D is a perfect square, otherwise the quadratic formula"""
+    steps = []
+    standard = f"{_polynomial(poly, x)} = 0"
+    if standard != equation:
+        steps.append(f"Bring every term to one side: {standard}")
+    # Whole-number coefficients without a common factor, and a positive x² term
+    scale = Fraction(math.lcm(*(coefficient.denominator for coefficient in poly)))
+    whole = [int(coefficient * scale) for coefficient in poly]
+    scale /= math.gcd(*whole) * (1 if whole[2] > 0 else -1)
+    if scale != 1:
+        poly = [coefficient * scale for coefficient in poly]
+        steps.append(f"Multiply both sides by {_fraction(scale)}: {_polynomial(poly, x)} = 0")
+    c, b, a = (int(coefficient) for coefficient in poly)
+    discriminant = b * b - 4 * a * c
+    steps.append(f"Here a = {a}, b = {b}, c = {c}, so the discriminant D = b² - 4ac = {discriminant}")
+
+    if discriminant < 0:
+        steps.append(f"D < 0, so there are no real roots: the graph of y = {_polynomial(poly, x)} "
+                     f"does not cross the {x}-axis")
+        return Solution(equation, x, 2, steps, "no real roots")
+
+    root_d = math.isqrt(discriminant)
+    if root_d * root_d == discriminant:
+        roots = sorted({Fraction(-b - root_d, 2 * a), Fraction(-b + root_d, 2 * a)})
+        steps.extend(_factorisation_steps(a, b, c, root_d, x))
+        if len(roots) == 1:
+            steps.append(f"Both factors are the same, so there is one repeated root: {x} = {_fraction(roots[0])}")
+            answer = f"{x} = {_fraction(roots[0])} (repeated root)"
+        else:
+            steps.append(f"Set each factor to zero: {x} = {_fraction(roots[0])} or {x} = {_fraction(roots[1])}")
+            answer = f"{x} = {_fraction(roots[0])} or {x} = {_fraction(roots[1])}"
+        checks = "; ".join(
+            f"{_polynomial(poly, x).replace(x, f'({_fraction(root)})')} = {_fraction(_evaluate(poly, root))}"
+            for root in roots
+        )
+        steps.append(f"Check: {checks}")
+        return Solution(equation, x, 2, steps, answer)
+
+    # Quadratic formula, with the surd simplified and common factors cancelled
+    steps.append(f"D is not a perfect square, so use the quadratic formula: "
+                 f"{x} = (-b ± √D) / 2a = ({-b} ± √{discriminant}) / {2 * a}")
+    k, r = _surd(discriminant)
+    if k > 1:
+        steps.append(f"Simplify the surd: √{discriminant} = √({k * k} × {r}) = {k}√{r}")
+    common = math.gcd(math.gcd(b, k), 2 * a)
+    top, coefficient, bottom = -b // common, k // common, 2 * a // common
+    surd = f"{coefficient if coefficient > 1 else ''}√{r}"
+    exact = f"{top} ± {surd}" if top else f"±{surd}"
+    if bottom != 1:
+        exact = f"({exact}) / {bottom}" if top else f"{exact} / {bottom}"
+    if common > 1:
+        steps.append(f"Divide the top and bottom by {common}: {x} = {exact}")
+    low = (-b - math.sqrt(discriminant)) / (2 * a)
+    high = (-b + math.sqrt(discriminant)) / (2 * a)
+    steps.append(f"As decimals: {x} ≈ {low:.3f} or {x} ≈ {high:.3f}")
+    return Solution(equation, x, 2, steps, f"{x} = {exact}")
+
+
+def solve_problem(message: str) -> Optional[Solution]:
+    """
+    Recognize and solve a linear or quadratic equation in a student message
+
+    Args:
+        message: The student's message
+
+    Returns:
+        Solution with exact step-by-step working, or None when the message is
+        not such a problem (several variables or equations, higher degree, no
+        equation, or a request for the factorised form)
+    """
+    asks_to_solve = bool(SOLVE_WORDS.search(message))
+    if FACTORISE_WORDS.search(message) and not asks_to_solve:
+        return None
+    equations = []
+    for tokens in _spans(message):
+        if len({value for kind, value in tokens if kind == "var"}) > 1 or _divides_by_expression(tokens):
+            continue  # Several unknowns, or excluded values: not for the local solver
+        found = _equation(tokens, asks_to_solve)
+        # A stray leading letter ("x 2x + 3 = 7") is dropped, but never numbers, operators or brackets
+        start = 0
+        while found is None and start + 1 < len(tokens) and tokens[start][0] == "var":
+            start += 1
+            found = _equation(tokens[start:], asks_to_solve)
+        if found is not None:
+            equations.append(found)
+    if len(equations) != 1:
+        return None  # Nothing to solve, or a system / several problems: answering one would drop the rest
+    left, right, variable = equations[0]
+    poly = _add(left, right, -1)
+    equation = f"{_polynomial(left, variable)} = {_polynomial(right, variable)}"
+    if len(poly) == 2:
+        solution = _solve_linear(left, right, poly, equation, variable)
+    elif len(poly) == 3:
+        solution = _solve_quadratic(poly, equation, variable)
+    else:
+        return None  # The variable cancels out
+    solution.requested = asks_to_solve or not WORD.search(message)
+    return solution
@@ -0,0 +1,223 @@
+"""
+Model Routing Cascade
+Sends easy turns to a small fast model and escalates harder ones to the larger model
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+FAST_MODEL = os.getenv("LEARNING_AGENT_FAST_MODEL", "gpt-4.1-nano")
+STRONG_MODEL = os.getenv("LEARNING_AGENT_STRONG_MODEL", "gpt-4.1-mini")
+
+# Multi-step maths/science work that the small model tends to get wrong
+MULTI_STEP_KEYWORDS = re.compile(
+    r"\b(solve|prove|proof|derive|factori[sz]e|simplify|calculate|evaluate|find the|"
+    r"theorem|quadratic|polynomial|equation|identity|rationali[sz]e|numerical|"
+    r"word problem|step[- ]by[- ]step|how many|how much|acceleration|velocity|"
+    r"probability|statistics|mean|median|coordinate)\b",
+    re.IGNORECASE,
+)
+
+# Topics that usually end in a diagram tool call
+DIAGRAM_KEYWORDS = re.compile(
+    r"\b(graph|plot|draw|diagram|sketch|show me|visuali[sz]e|parabola|cell|organelle|"
+    r"triangle|distance[- ]time|velocity[- ]time|slope)\b",
+    re.IGNORECASE,
+)
+
+# Acknowledgements and greetings that need no reasoning at all
+SMALL_TALK = re.compile(
+    r"^\s*(thanks?( you)?|thank u|ok(ay)?|cool|great|nice|got it|yes|no|hi|hello|hey|bye|"
+    r"good (morning|night|evening))[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+# Short follow-ups that continue the previous question rather than start a new one
+FOLLOW_UP = re.compile(
+    r"^\s*(why|how|and|but|so|then|what about|explain|again|more|i don'?t (get|understand)|"
+    r"can you|could you|what next)\b",
+    re.IGNORECASE,
+)
+
+MATH_SYMBOLS = re.compile(r"[=^²³√÷×]|\d\s*[-+*/]\s*\d|\d+x|x\s*[+\-]")
+
+# Phrases that suggest the small model is out of its depth
+LOW_CONFIDENCE = re.compile(
+    r"(i'?m not sure|i am not sure|i don'?t know|not certain|cannot determine|can'?t determine|"
+    r"unable to|it'?s unclear|might be wrong|i think the answer)",
+    re.IGNORECASE,
+)
+
+
+class Route:
+    """A model choice for one turn"""
+
+    __slots__ = ("name", "model", "max_tokens")
+
+    def __init__(self, name: str, model: str, max_tokens: int):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def __repr__(self):
+        return f"Route({self.name!r}, {self.model!r}, max_tokens={self.max_tokens})"
+
+
+class RouteDecision:
+    """The router's choice for a turn and the features that led to it"""
+
+    __slots__ = ("route", "reasons", "features")
+
+    def __init__(self, route: Route, reasons: List[str], features: Dict[str, object]):
+        self.route = route
+        self.reasons = reasons
+        self.features = features
+
+
+class ModelRouter:
+    """
+    Local turn classifier with a fast/strong cascade
+
+    A turn goes to the fast route unless it looks like multi-step work,
+    a likely diagram, a long message or a deep conversation. Fast answers
+    that fail check_confidence are re-asked on the strong route.
+    """
+
+    def __init__(self, fast: Route = None, strong: Route = None,
+                 long_message_words: int = 40, deep_conversation_turns: int = 8):
+        """
+        Args:
+            fast: Route for easy turns (default: FAST_MODEL, 800 tokens)
+            strong: Route for hard turns and escalations (default: STRONG_MODEL, 2000 tokens)
+            long_message_words: Messages longer than this go to the strong route
+            deep_conversation_turns: Conversations with more user turns go to the strong route
+        """
+        self.fast = fast or Route("fast", FAST_MODEL, 800)
+        self.strong = strong or Route("strong", STRONG_MODEL, 2000)
+        self.long_message_words = long_message_words
+        self.deep_conversation_turns = deep_conversation_turns
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def classify(self, user_message: str, history: List[dict] = None) -> RouteDecision:
+        """
+        Choose a route for a turn from local features only
+
+        Args:
+            user_message: The new student message
+            history: Conversation before this message (API message dicts)
+
+        Returns:
+            RouteDecision with the chosen route and its reasons
+        """
+        history = history or []
+        words = len(user_message.split())
+        user_turns = sum(1 for m in history if m.get("role") == "user")
+        # A follow-up like "why?" inherits the difficulty of the previous question
+        previous_user = next(
+            (m.get("content") or "" for m in reversed(history) if m.get("role") == "user"),
+            "",
+        )
+        is_follow_up = words < 8 and bool(FOLLOW_UP.match(user_message))
+        context = f"{previous_user}\n{user_message}" if is_follow_up else user_message
+
+        features = {
+            "words": words,
+            "user_turns": user_turns,
+            "follow_up": is_follow_up,
+            "small_talk": bool(SMALL_TALK.match(user_message)),
+            "multi_step": bool(MULTI_STEP_KEYWORDS.search(context))
+            and bool(MATH_SYMBOLS.search(context) or words > 12),
+            "diagram_likely": bool(DIAGRAM_KEYWORDS.search(context)),
+        }
+
+        if features["small_talk"]:
+            return RouteDecision(self.fast, ["small talk"], features)
+
+        reasons = []
+        if features["multi_step"]:
+            reasons.append("multi-step maths/science")
+        if features["diagram_likely"]:
+            reasons.append("diagram tool likely")
+        if words > self.long_message_words:
+            reasons.append("long message")
+        if user_turns > self.deep_conversation_turns:
+            reasons.append("deep conversation")
+
+        if reasons:
+            return RouteDecision(self.strong, reasons, features)
+        return RouteDecision(self.fast, ["simple turn"], features)
+
+    def check_confidence(self, message, finish_reason: Optional[str] = None) -> bool:
+        """
+        Decide whether a fast-route answer can be used as is
+
+        Args:
+            message: The assistant message returned by the fast model
+            finish_reason: The choice's finish_reason
+
+        Returns:
+            False when the answer should be re-asked on the strong route
+        """
+        if finish_reason == "length":
+            return False
+        if getattr(message, "tool_calls", None):
+            return True
+        content = (getattr(message, "content", None) or "").strip()
+        if len(content) < 2:
+            return False
+        return not LOW_CONFIDENCE.search(content)
+
+    def record(self, route_name: str, latency: float, usage: Dict[str, int], escalated: bool = False):
+        """
+        Add a finished turn to the per-route metrics
+
+        Args:
+            route_name: Route that produced the final answer
+            latency: Turn latency in seconds
+            usage: Token usage for the whole turn
+            escalated: Whether the turn started on the fast route and was escalated
+        """
+        with self._lock:
+            entry = self._metrics.setdefault(route_name, {
+                "turns": 0, "escalations": 0, "latency_s": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+            })
+            entry["turns"] += 1
+            entry["escalations"] += int(escalated)
+            entry["latency_s"] += latency
+            entry["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            entry["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-route turn counts, mean latency and mean tokens"""
+        with self._lock:
+            metrics = {name: dict(entry) for name, entry in self._metrics.items()}
+
+        for name, entry in metrics.items():
+            turns = entry["turns"] or 1
+            entry["model"] = self.fast.model if name == self.fast.name else self.strong.model
+            entry["mean_latency_s"] = round(entry["latency_s"] / turns, 3)
+            entry["mean_prompt_tokens"] = round(entry["prompt_tokens"] / turns, 1)
+            entry["mean_completion_tokens"] = round(entry["completion_tokens"] / turns, 1)
+        return metrics
+
+
+_default_router: Optional[ModelRouter] = None
+
+
+def get_default_router() -> Optional[ModelRouter]:
+    """
+    Process-wide router, enabled with LEARNING_AGENT_ROUTING=1
+
+    Returns:
+        Shared ModelRouter, or None when routing is disabled
+    """
+    global _default_router
+    if os.getenv("LEARNING_AGENT_ROUTING", "").lower() not in ("1", "true", "yes"):
+        return None
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
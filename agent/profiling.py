@@ -0,0 +1,262 @@
+"""
+Sampling Profiler
+Opt-in per-request stack sampling with speedscope, flamegraph and hot-function output
+
+A background thread reads the stacks of the threads working on a request
+(sys._current_frames) every few milliseconds, so the profiled code runs at
+full speed with no tracing hooks. Threads take part only while they work for
+the request: the event loop thread for the whole turn, a render thread for
+the duration of one render, the Streamlit script thread for one render pass.
+On a shared event loop, work of other sessions interleaved with the turn is
+sampled too.
+"""
+
+import contextlib
+import functools
+import itertools
+import json
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Where profile files are written
+PROFILE_DIR = Path(os.getenv("LEARNING_AGENT_PROFILE_DIR", "profiles"))
+
+# Seconds between samples (5 ms keeps the sampler under ~1% of a core)
+SAMPLE_INTERVAL = 0.005
+
+# Functions listed in the hot-function summary
+TOP_FUNCTIONS = 15
+
+# A thread whose innermost frame is one of these standard library functions
+# is blocked (waiting for the network, a lock or a queue), not running Python
+IDLE_FUNCTIONS = frozenset({
+    "select", "poll", "wait", "_wait_for_tstate_lock", "sleep", "accept",
+    "recv", "recv_into", "readinto", "read",
+})
+
+_STDLIB = str(Path(sysconfig.get_paths()["stdlib"]).resolve())
+_SEQUENCE = itertools.count(1)
+
+
+def profile_rate() -> float:
+    """Share of requests to profile from LEARNING_AGENT_PROFILE (1 = every request, 0.05 = one in twenty)"""
+    value = os.getenv("LEARNING_AGENT_PROFILE", "").lower()
+    if value in ("true", "yes"):
+        return 1.0
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except ValueError:
+        return 0.0
+
+
+def should_profile(profile: Optional[bool] = None) -> bool:
+    """An explicit per-request choice, otherwise a draw at the configured rate"""
+    if profile is not None:
+        return profile
+    rate = profile_rate()
+    return rate > 0 and random.random() < rate
+
+
+def _frame_name(code) -> str:
+    """"function (file:line)" with the path shortened to the project or library"""
+    path = Path(code.co_filename)
+    try:
+        path = path.resolve().relative_to(Path.cwd())
+    except (ValueError, OSError):
+        path = Path(*path.parts[-2:]) if len(path.parts) > 1 else path
+    return f"{code.co_name} ({path.as_posix()}:{code.co_firstlineno})"
+
+
+def _is_idle(code) -> bool:
+    return code.co_name in IDLE_FUNCTIONS and code.co_filename.startswith(_STDLIB)
+
+
+class ProfileReport:
+    """What one profile found, and where its files were written"""
+
+    __slots__ = ("name", "duration", "samples", "busy", "summary", "files")
+
+    def __init__(self, name: str, duration: float, samples: int, busy: int,
+                 summary: str, files: Dict[str, Path]):
+        self.name = name
+        self.duration = duration
+        self.samples = samples
+        self.busy = busy
+        self.summary = summary
+        self.files = files
+
+
+class SamplingProfiler:
+    """
+    Samples the call stacks of the threads working on one request
+
+    Usage:
+        profiler = SamplingProfiler("chat_stream")
+        profiler.start()                      # samples the calling thread
+        render = profiler.wrap(render)        # ...and any thread while it runs render
+        report = profiler.stop()              # writes the files, returns a ProfileReport
+    """
+
+    def __init__(self, name: str, interval: float = SAMPLE_INTERVAL, directory: Path = None):
+        """
+        Args:
+            name: Label used in the file names and summary (e.g. "chat_stream")
+            interval: Seconds between samples
+            directory: Folder for the profile files (default: LEARNING_AGENT_PROFILE_DIR or profiles/)
+        """
+        self.name = name
+        self.interval = interval
+        self.directory = Path(directory or PROFILE_DIR)
+        self._lock = threading.Lock()
+        # thread id -> [attach count, thread name]
+        self._threads: Dict[int, list] = {}
+        # thread name -> list of (stack of code objects, root first; seconds)
+        self._samples: Dict[str, List[Tuple[tuple, float]]] = {}
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._attached_here = None
+        self._started = 0.0
+
+    def start(self):
+        """Start sampling, beginning with the calling thread"""
+        self._started = time.perf_counter()
+        self._attached_here = self.attach()
+        self._attached_here.__enter__()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.name}", daemon=True)
+        self._sampler.start()
+
+    @contextlib.contextmanager
+    def attach(self):
+        """Sample the calling thread until the block exits"""
+        thread = threading.current_thread()
+        with self._lock:
+            entry = self._threads.setdefault(thread.ident, [0, thread.name])
+            entry[0] += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                entry[0] -= 1
+                if entry[0] == 0:
+                    del self._threads[thread.ident]
+
+    def wrap(self, function):
+        """The function, sampling whichever thread runs it while it runs"""
+        @functools.wraps(function)
+        def sampled(*args, **kwargs):
+            with self.attach():
+                return function(*args, **kwargs)
+        return sampled
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self._lock:
+                threads = [(ident, entry[1]) for ident, entry in self._threads.items()]
+            for ident, thread_name in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if stack:
+                    stack.reverse()
+                    self._samples.setdefault(thread_name, []).append((tuple(stack), elapsed))
+            del frames
+
+    def stop(self, write: bool = True) -> ProfileReport:
+        """
+        Stop sampling and summarize
+
+        Args:
+            write: Also write the speedscope, collapsed-stack and summary files
+
+        Returns:
+            ProfileReport (files is empty when nothing was written)
+        """
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._attached_here is not None:
+            self._attached_here.__exit__(None, None, None)
+            self._attached_here = None
+        duration = time.perf_counter() - self._started
+
+        samples = [sample for thread in self._samples.values() for sample in thread]
+        busy = [stack for stack, _ in samples if not _is_idle(stack[-1])]
+        summary = self._summary(duration, len(samples), busy)
+        files = self._write(summary) if write else {}
+        return ProfileReport(self.name, duration, len(samples), len(busy), summary, files)
+
+    def _summary(self, duration: float, total: int, busy: List[tuple]) -> str:
+        """Top functions by samples spent in them (self) and under them (total), busy samples only"""
+        lines = [
+            f"Profile {self.name}: {duration:.2f} s wall, {total} samples every "
+            f"{self.interval * 1000:.0f} ms over {len(self._samples)} thread(s), {len(busy)} busy"
+        ]
+        if not busy:
+            return "\n".join(lines + ["(no busy samples)"])
+        own = Counter(stack[-1] for stack in busy)
+        under = Counter(code for stack in busy for code in set(stack))
+        lines.append(f"{'self':>7} {'total':>7}  function")
+        for code, count in own.most_common(TOP_FUNCTIONS):
+            lines.append(f"{count / len(busy):>7.1%} {under[code] / len(busy):>7.1%}  {_frame_name(code)}")
+        return "\n".join(lines)
+
+    def _write(self, summary: str) -> Dict[str, Path]:
+        """Write <stem>.speedscope.json, <stem>.collapsed.txt and <stem>.summary.txt"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}_{self.name}_{os.getpid()}_{next(_SEQUENCE)}"
+        files = {
+            "speedscope": self.directory / f"{stem}.speedscope.json",
+            "collapsed": self.directory / f"{stem}.collapsed.txt",
+            "summary": self.directory / f"{stem}.summary.txt",
+        }
+        names: Dict[object, str] = {}
+        frame_index: Dict[object, int] = {}
+        frames = []
+        profiles = []
+        folded: Counter = Counter()
+        for thread_name, thread_samples in self._samples.items():
+            stacks, weights = [], []
+            for stack, seconds in thread_samples:
+                for code in stack:
+                    if code not in frame_index:
+                        names[code] = _frame_name(code)
+                        frame_index[code] = len(frames)
+                        frames.append({"name": names[code], "file": code.co_filename, "line": code.co_firstlineno})
+                stacks.append([frame_index[code] for code in stack])
+                weights.append(round(seconds * 1000, 3))
+                folded[";".join([thread_name] + [names[code] for code in stack])] += 1
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": stacks,
+                "weights": weights,
+            })
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.name} ({stem})",
+            "exporter": "learning-agent",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+        files["speedscope"].write_text(json.dumps(document), encoding="utf-8")
+        files["collapsed"].write_text(
+            "".join(f"{stack} {count}\n" for stack, count in folded.items()), encoding="utf-8"
+        )
+        files["summary"].write_text(summary + "\n", encoding="utf-8")
+        return files
@@ -0,0 +1,63 @@
+"""
+Prompt Cache Friendliness
+Canonical tool schemas and prefix cache hit accounting from the API's cached-token counts
+
+The provider caches the longest previously seen prefix of a request (tool
+schemas, then messages in order), so a request is cheap only if it starts
+with exactly the bytes of an earlier one. The agent keeps that prefix stable:
+
+- tool schemas are canonicalized once per engine (sorted by name, keys sorted)
+- the system prompt is fixed per session (with dynamic context, its subjects
+  only ever widen)
+- history is append-only: late diagram outcomes are added after the answer
+  instead of editing the earlier tool result
+- per-turn extras (curriculum snippets, verified working) are stored in
+  history just before the turn's question, so later turns resend them as is
+"""
+
+import json
+import threading
+from typing import Dict, List
+
+
+def canonical_tools(schemas: List[dict]) -> List[dict]:
+    """Tool schemas ordered by function name, with every object's keys sorted"""
+    canonical = [json.loads(json.dumps(schema, sort_keys=True)) for schema in schemas]
+    return sorted(canonical, key=lambda schema: schema["function"]["name"])
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its cache (0 when not reported)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+
+def hit_ratio(prompt_tokens: int, cached: int) -> float:
+    return round(cached / prompt_tokens, 3) if prompt_tokens else 0.0
+
+
+class PromptCacheStats:
+    """Process-wide prompt and cached token totals across every session"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def record(self, prompt_tokens: int, cached: int):
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["prompt_tokens"] += prompt_tokens
+            self._counts["cached_tokens"] += cached
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["hit_ratio"] = hit_ratio(counts["prompt_tokens"], counts["cached_tokens"])
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self._counts, 0)
+
+
+PROMPT_CACHE_STATS = PromptCacheStats()
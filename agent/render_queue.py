@@ -0,0 +1,300 @@
+"""
+Render Admission Control
+Bounded, prioritized diagram rendering with per-session quotas, start deadlines and queue metrics
+"""
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from .cancellation import CANCELLATION_STATS
+
+
+class RenderQuotaExceeded(RuntimeError):
+    """Raised when a session already has its share of renders queued or running"""
+
+
+class RenderSkipped(RuntimeError):
+    """The render never started: it expired in the queue or was cancelled"""
+
+
+class RenderTicket:
+    """
+    One submitted render: wait for it to start, then for its result
+
+    Both are concurrent futures, so callers on any thread or event loop can
+    wait on them. Waiting never cancels the render; cancel() does. Callers
+    that share one ticket (coalesced renders) each take a waiter() instead,
+    so that one of them giving up does not cancel the render for the rest.
+    """
+
+    __slots__ = ("fn", "session", "priority", "submitted", "expires", "started", "result",
+                 "state", "waiters", "_queue")
+
+    QUEUED, RUNNING, DONE, CANCELLED = "queued", "running", "done", "cancelled"
+
+    def __init__(self, queue: "RenderQueue", fn: Callable[[], Any], session: Optional[Hashable],
+                 priority: int, expires: float):
+        self._queue = queue
+        self.fn = fn
+        self.session = session
+        self.priority = priority
+        self.submitted = time.monotonic()
+        self.expires = expires
+        self.started: concurrent.futures.Future = concurrent.futures.Future()
+        self.result: concurrent.futures.Future = concurrent.futures.Future()
+        self.state = self.QUEUED
+        self.waiters = 0
+
+    async def wait_started(self, timeout: float) -> bool:
+        """True once the render has a worker, False if it was skipped or timeout passed first"""
+        try:
+            return await _wait_shielded(self.started, timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait(self, timeout: float = None) -> Any:
+        """The render's result (raises RenderSkipped if it never ran)"""
+        return await _wait_shielded(self.result, timeout)
+
+    def cancel(self):
+        """Drop the render if still queued; discard its result if it is running"""
+        self._queue._cancel(self)
+
+    def waiter(self) -> "RenderWaiter":
+        """One more caller's claim on this render (see RenderWaiter)"""
+        self._queue._attach(self)
+        return RenderWaiter(self)
+
+
+class RenderWaiter:
+    """
+    One caller's claim on a RenderTicket that several callers may share
+
+    cancel() only detaches this caller; the render itself is cancelled when
+    its last waiter detaches.
+    """
+
+    __slots__ = ("ticket", "_detached")
+
+    def __init__(self, ticket: RenderTicket):
+        self.ticket = ticket
+        self._detached = False
+
+    @property
+    def expires(self) -> float:
+        return self.ticket.expires
+
+    async def wait(self, timeout: float = None) -> Any:
+        """The render's result (raises RenderSkipped if it never ran or this waiter detached)"""
+        if self._detached:
+            raise RenderSkipped("cancelled")
+        return await self.ticket.wait(timeout)
+
+    def cancel(self):
+        """Stop waiting; cancel the render if nobody else is waiting for it"""
+        if not self._detached:
+            self._detached = True
+            self.ticket._queue._detach(self.ticket)
+
+
+async def _wait_shielded(future: concurrent.futures.Future, timeout: Optional[float]) -> Any:
+    """Await a concurrent future; timing out or being cancelled leaves it untouched"""
+    waiter = asyncio.wrap_future(future)
+    # An outcome nobody is awaiting any more must not be logged as unretrieved
+    waiter.add_done_callback(lambda done: done.cancelled() or done.exception())
+    return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+
+
+def overlap_renders_enabled() -> bool:
+    """Whether LEARNING_AGENT_OVERLAP_RENDERS asks for renders to run alongside the final answer"""
+    return os.getenv("LEARNING_AGENT_OVERLAP_RENDERS", "").lower() in ("1", "true", "yes")
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class RenderQueue:
+    """
+    Admission control in front of the renderer
+
+    At most max_concurrent renders run at once; the rest wait in a priority
+    queue (lower priority value first, then arrival order). Each session may
+    have at most session_limit renders queued or running. A queued render
+    that has not started by its expiry is skipped instead of run late.
+    """
+
+    def __init__(self, max_concurrent: int = None, session_limit: int = None,
+                 start_deadline: float = None, late_deadline: float = None):
+        """
+        Args:
+            max_concurrent: Renders running at once (LEARNING_AGENT_RENDER_CONCURRENCY, default
+                the number of render worker processes, or 1 since in-process pyplot renders
+                are serialized anyway)
+            session_limit: Renders one session may have queued or running
+                (LEARNING_AGENT_RENDER_SESSION_LIMIT, default 2)
+            start_deadline: Seconds a turn waits for its render to start before the
+                diagram is deferred (LEARNING_AGENT_RENDER_DEADLINE, default 3)
+            late_deadline: Seconds a deferred render may still wait to start before it
+                is skipped (LEARNING_AGENT_RENDER_LATE_DEADLINE, default 20)
+        """
+        self.max_concurrent = int(max_concurrent or _env_number(
+            "LEARNING_AGENT_RENDER_CONCURRENCY", _env_number("LEARNING_AGENT_RENDER_WORKERS", 0) or 1
+        ))
+        self.session_limit = int(session_limit or _env_number("LEARNING_AGENT_RENDER_SESSION_LIMIT", 2))
+        self.start_deadline = start_deadline if start_deadline is not None else \
+            _env_number("LEARNING_AGENT_RENDER_DEADLINE", 3.0)
+        self.late_deadline = late_deadline if late_deadline is not None else \
+            _env_number("LEARNING_AGENT_RENDER_LATE_DEADLINE", 20.0)
+
+        self._lock = threading.Lock()
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._per_session: Counter = Counter()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="render"
+        )
+        self._counts = dict.fromkeys(
+            ("submitted", "started", "completed", "failed", "rejected", "expired", "cancelled"), 0
+        )
+        self._waits: Deque[float] = deque(maxlen=2048)
+        self._max_depth = 0
+
+    def submit(self, fn: Callable[[], Any], session: Hashable = None, priority: int = 0,
+               expires_in: float = None) -> RenderTicket:
+        """
+        Queue a render
+
+        Args:
+            fn: Blocking render function, run on a render thread
+            session: Quota key (None: no quota)
+            priority: Lower runs first (0 for a turn's first diagram)
+            expires_in: Seconds it may wait to start (default start_deadline + late_deadline)
+
+        Raises:
+            RenderQuotaExceeded: if the session already has session_limit renders pending
+        """
+        if expires_in is None:
+            expires_in = self.start_deadline + self.late_deadline
+        with self._lock:
+            if session is not None and self._per_session[session] >= self.session_limit:
+                self._counts["rejected"] += 1
+                raise RenderQuotaExceeded(
+                    f"this conversation already has {self.session_limit} diagram(s) in progress"
+                )
+            ticket = RenderTicket(self, fn, session, priority, time.monotonic() + expires_in)
+            if session is not None:
+                self._per_session[session] += 1
+            self._counts["submitted"] += 1
+            heapq.heappush(self._heap, (priority, next(self._sequence), ticket))
+            self._max_depth = max(self._max_depth, len(self._heap))
+            self._dispatch_locked()
+        return ticket
+
+    def has_room(self, session: Hashable) -> bool:
+        """Whether the session is below its quota (submit() may still race with others)"""
+        with self._lock:
+            return session is None or self._per_session[session] < self.session_limit
+
+    def _release_locked(self, ticket: RenderTicket):
+        if ticket.session is not None:
+            self._per_session[ticket.session] -= 1
+            if self._per_session[ticket.session] <= 0:
+                del self._per_session[ticket.session]
+
+    def _skip_locked(self, ticket: RenderTicket, reason: str):
+        ticket.state = RenderTicket.CANCELLED
+        self._release_locked(ticket)
+        ticket.started.set_result(False)
+        ticket.result.set_exception(RenderSkipped(reason))
+
+    def _dispatch_locked(self):
+        now = time.monotonic()
+        while self._running < self.max_concurrent and self._heap:
+            _, _, ticket = heapq.heappop(self._heap)
+            if ticket.state != RenderTicket.QUEUED:
+                continue
+            if now > ticket.expires:
+                self._counts["expired"] += 1
+                self._skip_locked(ticket, "the renderer was too busy")
+                continue
+            ticket.state = RenderTicket.RUNNING
+            self._running += 1
+            self._counts["started"] += 1
+            self._waits.append(now - ticket.submitted)
+            ticket.started.set_result(True)
+            self._executor.submit(self._run, ticket)
+
+    def _run(self, ticket: RenderTicket):
+        try:
+            result = ticket.fn()
+        except BaseException as e:
+            outcome, error = None, e
+        else:
+            outcome, error = result, None
+        with self._lock:
+            self._running -= 1
+            self._release_locked(ticket)
+            if ticket.state == RenderTicket.CANCELLED:
+                # Everybody gave up while it ran
+                CANCELLATION_STATS.record(renders_discarded=1)
+            else:
+                ticket.state = RenderTicket.DONE
+                self._counts["failed" if error else "completed"] += 1
+            self._dispatch_locked()
+        if error is not None:
+            ticket.result.set_exception(error)
+        else:
+            ticket.result.set_result(outcome)
+
+    def _attach(self, ticket: RenderTicket):
+        with self._lock:
+            ticket.waiters += 1
+            if ticket.state == RenderTicket.CANCELLED and not ticket.result.done():
+                # Its other waiters left while it ran, but this one still wants the result
+                ticket.state = RenderTicket.RUNNING
+
+    def _detach(self, ticket: RenderTicket):
+        with self._lock:
+            ticket.waiters -= 1
+            abandoned = ticket.waiters <= 0
+        if abandoned:
+            self._cancel(ticket)
+
+    def _cancel(self, ticket: RenderTicket):
+        with self._lock:
+            if ticket.state == RenderTicket.QUEUED:
+                self._counts["cancelled"] += 1
+                CANCELLATION_STATS.record(renders_skipped=1)
+                self._skip_locked(ticket, "cancelled")
+            elif ticket.state == RenderTicket.RUNNING:
+                ticket.state = RenderTicket.CANCELLED
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, running renders, outcome counts and start-wait percentiles"""
+        with self._lock:
+            counts = dict(self._counts)
+            waits = sorted(self._waits)
+            counts.update(
+                depth=sum(1 for *_, ticket in self._heap if ticket.state == RenderTicket.QUEUED),
+                max_depth=self._max_depth,
+                running=self._running,
+                max_concurrent=self.max_concurrent,
+            )
+        if waits:
+            counts["wait_p50_s"] = round(waits[len(waits) // 2], 4)
+            counts["wait_p95_s"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4)
+            counts["wait_max_s"] = round(waits[-1], 4)
+        return counts
+
+
+RENDER_QUEUE = RenderQueue()
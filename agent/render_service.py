@@ -0,0 +1,293 @@
+"""
+Local Render Service
+One rendering daemon per machine, shared over a Unix socket by every app process, with a result cache
+
+Protocol (all integers big-endian), one request per frame on a persistent
+connection:
+
+    request:  op (1 byte), tool name length (2 bytes), arguments length (4 bytes),
+              tool name (UTF-8), arguments (compact JSON)
+    response: status (1 byte), body length (4 bytes), body (UTF-8: diagram path,
+              error message, or JSON for stats)
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from .render_workers import RenderWorkerError, RenderWorkerPool
+from .single_flight import SingleFlight, request_key
+
+REQUEST_HEADER = struct.Struct("!BHI")
+RESPONSE_HEADER = struct.Struct("!BI")
+
+OP_RENDER = 1
+OP_STATS = 2
+
+STATUS_OK = 0
+STATUS_TOOL_ERROR = 1       # the tool raised; the body is its message
+STATUS_SERVICE_ERROR = 2    # unknown op or tool, or the service failed
+
+DEFAULT_SOCKET = "/tmp/learning_agent_render.sock"
+
+
+class RenderServiceUnavailable(ConnectionError):
+    """The render service could not be reached (callers fall back to rendering in-process)"""
+
+
+def _encode_args(tool_args: dict) -> bytes:
+    return json.dumps(tool_args, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class RenderService:
+    """
+    The daemon: renders registered tools in a worker pool sized to the cores
+
+    Identical requests from different app processes share one render while
+    it runs (SingleFlight), and finished diagrams are served from an LRU
+    cache of paths for as long as their files exist.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, workers: int = None, cache_size: int = 4096):
+        """
+        Args:
+            socket_path: Unix socket to listen on
+            workers: Render worker processes (default: one per core)
+            cache_size: Diagram paths kept in the result cache
+        """
+        self.socket_path = socket_path
+        self.pool = RenderWorkerPool(workers or os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self._cache: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+        self._flight = SingleFlight()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.pool.workers, thread_name_prefix="render-service"
+        )
+        self._counts = dict.fromkeys(("requests", "cache_hits", "renders", "errors", "connections"), 0)
+        self._tools = None
+
+    async def serve_forever(self):
+        """Start the workers and serve until cancelled"""
+        from tools import TOOL_REGISTRY
+        self._tools = TOOL_REGISTRY
+        await asyncio.to_thread(self.pool.start)
+        if os.path.exists(self.socket_path):
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False)
+            self.pool.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._counts["connections"] += 1
+        try:
+            while True:
+                try:
+                    op, name_length, args_length = REQUEST_HEADER.unpack(
+                        await reader.readexactly(REQUEST_HEADER.size)
+                    )
+                    name = (await reader.readexactly(name_length)).decode("utf-8")
+                    arguments = await reader.readexactly(args_length)
+                except asyncio.IncompleteReadError:
+                    return
+                status, body = await self._respond(op, name, arguments)
+                writer.write(RESPONSE_HEADER.pack(status, len(body)) + body)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, op: int, tool_name: str, arguments: bytes) -> Tuple[int, bytes]:
+        if op == OP_STATS:
+            return STATUS_OK, json.dumps(self.stats()).encode("utf-8")
+        if op != OP_RENDER:
+            return STATUS_SERVICE_ERROR, f"unknown op {op}".encode("utf-8")
+        self._counts["requests"] += 1
+        if tool_name not in self._tools:
+            return STATUS_SERVICE_ERROR, f"unknown tool {tool_name}".encode("utf-8")
+        try:
+            tool_args = json.loads(arguments or b"{}")
+            return STATUS_OK, (await self.render(tool_name, tool_args)).encode("utf-8")
+        except RenderWorkerError as e:
+            self._counts["errors"] += 1
+            return STATUS_TOOL_ERROR, str(e).encode("utf-8")
+        except ValueError as e:
+            return STATUS_SERVICE_ERROR, f"invalid arguments: {e}".encode("utf-8")
+
+    async def render(self, tool_name: str, tool_args: dict) -> str:
+        """Cached path, a render already in flight, or a new render in the pool"""
+        key = request_key(tool_name, tool_args)
+        path = self._cache.get(key)
+        if path is not None:
+            if os.path.exists(path):
+                self._cache.move_to_end(key)
+                self._counts["cache_hits"] += 1
+                return path
+            # Removed by diagram cleanup
+            del self._cache[key]
+        loop = asyncio.get_running_loop()
+        path, leader = await self._flight.do(
+            key, lambda: loop.run_in_executor(self._executor, self.pool.render, tool_name, tool_args)
+        )
+        if leader:
+            self._counts["renders"] += 1
+            self._cache[key] = path
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return path
+
+    def stats(self) -> Dict[str, object]:
+        """Request, cache and coalescing counts plus the worker pool's stats"""
+        counts = dict(self._counts)
+        counts["cached"] = len(self._cache)
+        counts["coalesced"] = self._flight.followers
+        counts["workers"] = self.pool.stats()
+        return counts
+
+
+class RenderServiceClient:
+    """
+    Blocking client for RenderService, safe to use from several render threads
+
+    Each thread keeps its own connection. After a connection failure the
+    service is treated as down for retry_after seconds, so callers fall back
+    to in-process rendering without paying for a connect attempt each time.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 60.0, retry_after: float = 5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self._counts = dict.fromkeys(("remote", "fallbacks", "failures"), 0)
+
+    def _record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def _connection(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socket_path)
+            except OSError:
+                connection.close()
+                raise
+            self._local.connection = connection
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def _receive(self, connection: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("render service closed the connection")
+            data += chunk
+        return data
+
+    def request(self, op: int, tool_name: str = "", tool_args: dict = None) -> Tuple[int, str]:
+        """
+        Send one request and wait for its response
+
+        Returns:
+            (status, body)
+
+        Raises:
+            RenderServiceUnavailable: if the service cannot be reached
+        """
+        if time.monotonic() < self._down_until:
+            raise RenderServiceUnavailable("render service is down")
+        name = tool_name.encode("utf-8")
+        arguments = _encode_args(tool_args or {})
+        frame = REQUEST_HEADER.pack(op, len(name), len(arguments)) + name + arguments
+        # A kept-alive connection the service has since closed fails on first use: retry once
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                connection.sendall(frame)
+                status, length = RESPONSE_HEADER.unpack(self._receive(connection, RESPONSE_HEADER.size))
+                return status, self._receive(connection, length).decode("utf-8")
+            except OSError as e:
+                self._drop_connection()
+                if attempt or isinstance(e, socket.timeout):
+                    with self._lock:
+                        self._down_until = time.monotonic() + self.retry_after
+                        self._counts["failures"] += 1
+                    raise RenderServiceUnavailable(str(e)) from e
+
+    def render(self, tool_name: str, tool_args: dict) -> str:
+        """
+        Render on the service
+
+        Raises:
+            RenderWorkerError: if the tool failed there
+            RenderServiceUnavailable: if the service cannot be reached or refused the request
+        """
+        status, body = self.request(OP_RENDER, tool_name, tool_args)
+        if status == STATUS_TOOL_ERROR:
+            raise RenderWorkerError(body)
+        if status != STATUS_OK:
+            raise RenderServiceUnavailable(body)
+        self._record(remote=1)
+        return body
+
+    def render_or_fallback(self, tool_name: str, tool_args: dict, fallback: Callable[[], str]) -> str:
+        """Render on the service, or with fallback() when it is unavailable"""
+        try:
+            return self.render(tool_name, tool_args)
+        except RenderServiceUnavailable:
+            self._record(fallbacks=1)
+            return fallback()
+
+    def stats(self) -> Dict[str, object]:
+        """This process's remote renders, fallbacks and connection failures"""
+        with self._lock:
+            counts = dict(self._counts)
+        counts["available"] = time.monotonic() >= self._down_until
+        return counts
+
+
+_CLIENT: Optional[RenderServiceClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_render_service() -> Optional[RenderServiceClient]:
+    """
+    Client for the render service named by LEARNING_AGENT_RENDER_SOCKET, or None
+
+    Always None where Unix sockets are not available.
+    """
+    global _CLIENT
+    socket_path = os.getenv("LEARNING_AGENT_RENDER_SOCKET")
+    if not socket_path or not hasattr(socket, "AF_UNIX"):
+        return None
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT.socket_path != socket_path:
+            _CLIENT = RenderServiceClient(socket_path)
+        return _CLIENT
@@ -0,0 +1,274 @@
+"""
+Supervised Render Workers
+Diagram tools run in worker processes that are recycled before they grow, with RSS and figure metrics
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
+
+
+class RenderWorkerError(RuntimeError):
+    """A render failed in a worker, or the worker died or timed out while rendering"""
+
+
+def _worker_main(connection):
+    """
+    Worker process loop: render requests until told to stop
+
+    Replies (ok, result or error message, rss bytes, figures left open). Any
+    figure still open after a render is closed here, whatever the tool did.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from tools import get_tool_functions
+
+    functions = get_tool_functions()
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None:
+            return
+        tool_name, tool_args = request
+        try:
+            ok, outcome = True, functions[tool_name](**tool_args)
+        except Exception as e:
+            ok, outcome = False, str(e)
+        leaked = len(plt.get_fignums())
+        if leaked:
+            plt.close("all")
+        connection.send((ok, outcome, current_rss(), leaked))
+
+
+class _Worker:
+    """One worker process and its pipe"""
+
+    __slots__ = ("process", "connection", "generation", "renders", "rss", "first_rss", "peak_rss")
+
+    def __init__(self, context, generation: int):
+        parent_end, child_end = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_end,), daemon=True,
+                                       name="render-worker")
+        self.process.start()
+        child_end.close()
+        self.connection = parent_end
+        # Spawn order within the pool: 1 for the first worker, counting up across replacements
+        self.generation = generation
+        self.renders = 0
+        self.rss = 0
+        self.first_rss = 0
+        self.peak_rss = 0
+
+    def stop(self, timeout: float = 2.0):
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.connection.close()
+
+
+class RenderWorkerPool:
+    """
+    Fixed number of render worker processes under supervision
+
+    A worker is replaced after max_renders renders, once its RSS passes the
+    memory ceiling, when a render exceeds render_timeout (it is killed), or
+    when it dies. Replacements start lazily on the next render.
+    """
+
+    def __init__(self, workers: int, max_renders: int = None, memory_limit_mb: float = None,
+                 render_timeout: float = 60.0):
+        """
+        Args:
+            workers: Number of worker processes
+            max_renders: Renders before a worker is recycled
+                (LEARNING_AGENT_RENDER_WORKER_RENDERS, default 500)
+            memory_limit_mb: RSS ceiling before a worker is recycled
+                (LEARNING_AGENT_RENDER_WORKER_MEMORY_MB, default 400)
+            render_timeout: Seconds a render may take before its worker is killed
+        """
+        self.workers = workers
+        self.max_renders = int(max_renders or os.getenv("LEARNING_AGENT_RENDER_WORKER_RENDERS") or 500)
+        self.memory_limit = int(
+            float(memory_limit_mb or os.getenv("LEARNING_AGENT_RENDER_WORKER_MEMORY_MB") or 400) * 2**20
+        )
+        self.render_timeout = render_timeout
+        # spawn: the parent has threads (event loop, render queue), which fork does not copy safely
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.LifoQueue[Optional[_Worker]]" = queue.LifoQueue()
+        for _ in range(workers):
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self._live: List[_Worker] = []
+        self._counts = dict.fromkeys(
+            ("renders", "failed", "figures_leaked", "spawned", "recycled_renders",
+             "recycled_memory", "killed_timeout", "crashed"), 0
+        )
+        # (generation, renders, RSS after its first render, peak RSS) of retired workers
+        self._retired: Deque[Tuple[int, int, int, int]] = deque(maxlen=4096)
+        self._closed = False
+
+    def _record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            self._counts["spawned"] += 1
+            generation = self._counts["spawned"]
+        worker = _Worker(self._context, generation)
+        with self._lock:
+            self._live.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker):
+        with self._lock:
+            if worker in self._live:
+                self._live.remove(worker)
+            if worker.renders:
+                self._retired.append((worker.generation, worker.renders, worker.first_rss, worker.peak_rss))
+        worker.stop()
+
+    def start(self):
+        """Start every worker now instead of on first use (they take a moment to import matplotlib)"""
+        for _ in range(self.workers):
+            worker = self._idle.get()
+            self._idle.put(worker or self._spawn())
+
+    @staticmethod
+    def handles(tool_name: str, tool_function) -> bool:
+        """Whether tool_function is the registered tool the workers run under that name"""
+        from tools import TOOL_REGISTRY
+        spec = TOOL_REGISTRY.get(tool_name)
+        return spec is not None and spec.function is tool_function
+
+    def render(self, tool_name: str, tool_args: dict) -> str:
+        """
+        Render in the next idle worker, blocking until done
+
+        Raises:
+            RenderWorkerError: if the tool raised, or its worker died or timed out
+        """
+        if self._closed:
+            raise RenderWorkerError("render workers are shut down")
+        worker = self._idle.get()
+        try:
+            if worker is not None and not worker.process.is_alive():
+                self._record(crashed=1)
+                self._retire(worker)
+                worker = None
+            if worker is None:
+                worker = self._spawn()
+            try:
+                worker.connection.send((tool_name, tool_args))
+                if not worker.connection.poll(self.render_timeout):
+                    self._record(killed_timeout=1)
+                    self._retire(worker)
+                    worker = None
+                    raise RenderWorkerError(f"render took longer than {self.render_timeout:g}s")
+                ok, outcome, rss, leaked = worker.connection.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                self._record(crashed=1)
+                self._retire(worker)
+                worker = None
+                raise RenderWorkerError("render worker exited unexpectedly")
+
+            worker.renders += 1
+            worker.rss = rss
+            if worker.renders == 1:
+                worker.first_rss = rss
+            worker.peak_rss = max(worker.peak_rss, rss)
+            self._record(renders=1, failed=0 if ok else 1, figures_leaked=leaked)
+            if worker.renders >= self.max_renders:
+                self._record(recycled_renders=1)
+                self._retire(worker)
+                worker = None
+            elif self.memory_limit and rss >= self.memory_limit:
+                self._record(recycled_memory=1)
+                self._retire(worker)
+                worker = None
+            if not ok:
+                raise RenderWorkerError(outcome)
+            return outcome
+        finally:
+            self._idle.put(worker)
+
+    def stats(self) -> Dict[str, float]:
+        """Outcome and recycling counts plus each live worker's renders and RSS"""
+        with self._lock:
+            counts = dict(self._counts)
+            live = [(worker.renders, worker.rss) for worker in self._live]
+        counts["workers"] = len(live)
+        counts["worker_renders"] = [renders for renders, _ in live]
+        counts["worker_rss_mb"] = [round(rss / 2**20, 1) for _, rss in live]
+        return counts
+
+    def worker_history(self) -> List[Tuple[int, int, int, int]]:
+        """
+        (generation, renders, RSS after first render, peak RSS) per worker, in spawn order
+
+        Retired workers keep the peak they reached before they were recycled,
+        so a leak shows as peaks rising from one generation to the next even
+        though recycling keeps the live workers' RSS low.
+        """
+        with self._lock:
+            history = list(self._retired) + [
+                (worker.generation, worker.renders, worker.first_rss, worker.peak_rss)
+                for worker in self._live if worker.renders
+            ]
+        return sorted(history)
+
+    def close(self):
+        """Stop every worker"""
+        self._closed = True
+        with self._lock:
+            live, self._live = self._live, []
+        for worker in live:
+            worker.stop()
+
+
+_POOL: Optional[RenderWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_render_pool() -> Optional[RenderWorkerPool]:
+    """
+    The process-wide worker pool, or None to render in-process
+
+    Enabled by LEARNING_AGENT_RENDER_WORKERS=N (N worker processes).
+    """
+    global _POOL
+    workers = int(os.getenv("LEARNING_AGENT_RENDER_WORKERS") or 0)
+    if workers <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = RenderWorkerPool(workers)
+            atexit.register(_POOL.close)
+        return _POOL
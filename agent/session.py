@@ -0,0 +1,152 @@
+"""
+Per-Session Conversation State
+Compact message records and per-turn bookkeeping for one student conversation
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# (tool call id, function name, JSON arguments)
+ToolCallRecord = Tuple[str, str, str]
+
+
+class Message:
+    """One conversation message, turned into an API dict only when a request is sent"""
+
+    __slots__ = ("role", "content", "tool_calls", "tool_call_id")
+
+    def __init__(self, role: str, content: Optional[str],
+                 tool_calls: Optional[Tuple[ToolCallRecord, ...]] = None,
+                 tool_call_id: Optional[str] = None):
+        self.role = role
+        self.content = content
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+
+    def to_api(self) -> Dict:
+        """OpenAI chat message dict"""
+        message = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": call_id,
+                    "type": "function",
+                    "function": {"name": name, "arguments": arguments},
+                } for call_id, name, arguments in self.tool_calls
+            ]
+        if self.tool_call_id is not None and self.role == "tool":
+            message["tool_call_id"] = self.tool_call_id
+        return message
+
+
+class SessionState:
+    """
+    Everything that belongs to one conversation
+
+    The system prompt, client and tools live on the shared AgentEngine, so an
+    idle session is just its messages and a few per-turn fields.
+    """
+
+    __slots__ = (
+        "messages", "last_usage", "last_diagrams", "last_route",
+        "route", "escalated", "turn_started", "context", "pending_profile",
+        "cancel_token", "turn_mark", "epoch", "deferred",
+        "requests_sent", "prompt_tokens_sent", "cached_tokens_sent",
+        "sampler", "last_sampled", "solution",
+    )
+
+    def __init__(self):
+        self.messages: List[Message] = []
+        self.last_usage: Dict[str, int] = empty_usage()
+        self.last_diagrams: List[str] = []
+        # (tool call id, RenderWaiter) for renders that finish after the answer:
+        # deferred by a busy renderer or overlapped with it
+        self.deferred: List[Tuple[str, object]] = []
+        self.last_route = None
+        self.route = None
+        self.escalated = False
+        self.turn_started = 0.0
+        self.context = None
+        # Local solver working for the running turn's equation (its facts are in history)
+        self.solution = None
+        self.pending_profile = None
+        # Running turn's SamplingProfiler, and the last sampled turn's ProfileReport
+        self.sampler = None
+        self.last_sampled = None
+        # Running turn: its cancel token and where its messages start
+        self.cancel_token = None
+        self.turn_mark = 0
+        # Bumped whenever history is cleared or rolled back under a running turn
+        self.epoch = 0
+        # Whole-session totals for the prompt cache hit ratio
+        self.requests_sent = 0
+        self.prompt_tokens_sent = 0
+        self.cached_tokens_sent = 0
+
+    def add_user(self, content: str):
+        self.messages.append(Message("user", content))
+
+    def add_turn_context(self, content: str):
+        """
+        Record curriculum snippets or verified working for the question that follows
+
+        They stay in history just before their question, so every later
+        request starts with the same bytes as this turn's requests.
+        """
+        self.messages.append(Message("system", content))
+
+    def add_assistant(self, content: Optional[str], tool_calls=None):
+        """
+        Args:
+            content: Assistant text (may be None when it only calls tools)
+            tool_calls: Optional tool calls from the API response
+        """
+        records = None
+        if tool_calls:
+            records = tuple(
+                (call.id, call.function.name, call.function.arguments) for call in tool_calls
+            )
+        self.messages.append(Message("assistant", content, records))
+
+    def add_tool_result(self, tool_call_id: str, content: str):
+        self.messages.append(Message("tool", content, tool_call_id=tool_call_id))
+
+    def add_late_result(self, tool_call_id: str, content: str):
+        """
+        Record a late diagram's outcome after the answer
+
+        History is append-only (editing the earlier tool result would change
+        the prompt prefix the provider has cached), so the outcome is a system
+        message that remembers which tool call it belongs to.
+        """
+        self.messages.append(Message("system", content, tool_call_id=tool_call_id))
+
+    def user_turns(self) -> int:
+        return sum(1 for message in self.messages if message.role == "user")
+
+    def to_api(self, system_prompt: str) -> List[Dict]:
+        """Full request message list with the given system prompt first"""
+        return [{"role": "system", "content": system_prompt}] + [
+            message.to_api() for message in self.messages
+        ]
+
+    def rollback(self, mark: int, epoch: int) -> int:
+        """
+        Drop messages added since mark, unless history changed under the turn
+
+        Returns:
+            Number of messages removed
+        """
+        if epoch != self.epoch:
+            return 0
+        removed = len(self.messages) - mark
+        del self.messages[mark:]
+        return removed
+
+    def clear(self):
+        self.messages = []
+        self.context = None
+        self.epoch += 1
+
+
+def empty_usage() -> Dict[str, int]:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
@@ -0,0 +1,270 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical renders and model requests share one execution instead of running N times
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def request_key(*parts) -> str:
+    """Stable hash of JSON-serializable request parts (tool name + args, completion kwargs, ...)"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def coalesce_requests_enabled() -> bool:
+    """Whether LEARNING_AGENT_COALESCE_REQUESTS asks for first-turn model requests to be shared"""
+    return os.getenv("LEARNING_AGENT_COALESCE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+
+class FlightCancelled(RuntimeError):
+    """The shared execution was cancelled underneath a waiter (e.g. its event loop shut down)"""
+
+
+def _shareable(error: BaseException) -> BaseException:
+    # A CancelledError reaching other waiters would look like they were cancelled themselves
+    if isinstance(error, asyncio.CancelledError):
+        return FlightCancelled("the shared request was cancelled")
+    return error
+
+
+class _Flight:
+    """One in-flight execution and the callers waiting on it"""
+
+    __slots__ = ("future", "task", "loop", "waiters")
+
+    def __init__(self):
+        # A concurrent future so callers on other threads/event loops
+        # (one per Streamlit session) can wait on it too
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution
+
+    The first caller (leader) starts the work as a task; callers arriving
+    while it runs (followers) await the same result. Exceptions reach every
+    waiter. The work is only cancelled once all of its waiters have gone,
+    so one client disconnecting does not fail the others. Nothing is cached
+    after completion - the next call with the key runs the work again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run work() once per key among concurrent callers
+
+        Args:
+            key: Identity of the work (see request_key)
+            work: Coroutine function to run if no identical call is in flight
+
+        Returns:
+            (result, True if this caller ran the work)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.leaders += 1
+            else:
+                self.followers += 1
+            flight.waiters += 1
+
+        if leader:
+            flight.loop = asyncio.get_running_loop()
+            flight.task = asyncio.ensure_future(self._run(key, flight, work))
+
+        shared = asyncio.wrap_future(flight.future)
+        try:
+            # shield: a waiter being cancelled must not cancel the shared result
+            result = await asyncio.shield(shared)
+        except asyncio.CancelledError:
+            # Nobody will read this waiter's copy of the outcome any more
+            shared.add_done_callback(lambda future: future.cancelled() or future.exception())
+            self._leave(key, flight)
+            raise
+        return result, leader
+
+    async def _run(self, key: str, flight: _Flight, work: Callable[[], Awaitable[Any]]):
+        try:
+            result = await work()
+        except BaseException as e:
+            if not flight.future.done():
+                flight.future.set_exception(_shareable(e))
+            if not isinstance(e, Exception):
+                raise
+        else:
+            flight.future.set_result(result)
+        finally:
+            self._forget(key, flight)
+
+    def _leave(self, key: str, flight: _Flight):
+        """A waiter gave up; cancel the work if nobody else wants it"""
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0 and not flight.future.done()
+            if abandoned and self._flights.get(key) is flight:
+                del self._flights[key]
+        if abandoned and flight.task is not None:
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def _forget(self, key: str, flight: _Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/follower counts (followers = executions saved)"""
+        return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self)}
+
+
+class _Broadcast:
+    """Chunks of one upstream stream, replayed to every subscriber"""
+
+    __slots__ = ("chunks", "done", "error", "subscribers", "task", "loop")
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # (subscriber loop, wake-up event) per live subscriber
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class StreamFlight:
+    """
+    Fans one upstream stream out to every concurrent subscriber with the same key
+
+    The leader's stream is read by a pump task; each subscriber (the leader
+    included) iterates its own cursor over the received chunks, so a late
+    joiner first replays what it missed. When the last subscriber stops
+    reading, the pump is cancelled and the upstream stream closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._broadcasts: Dict[str, _Broadcast] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def subscribe(self, key: str,
+                        open_stream: Callable[[], Awaitable[AsyncIterator]]) -> Tuple[AsyncIterator, bool]:
+        """
+        Join (or start) the stream for key
+
+        Args:
+            key: Identity of the request (see request_key)
+            open_stream: Coroutine function returning the upstream async stream
+
+        Returns:
+            (async iterator of chunks, True if this caller opened the upstream stream)
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self._lock:
+            broadcast = self._broadcasts.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = _Broadcast()
+                self._broadcasts[key] = broadcast
+                self.leaders += 1
+            else:
+                self.followers += 1
+            broadcast.subscribers.append((loop, event))
+
+        if leader:
+            broadcast.loop = loop
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, open_stream))
+        return self._iterate(key, broadcast, loop, event), leader
+
+    async def _pump(self, key: str, broadcast: _Broadcast,
+                    open_stream: Callable[[], Awaitable[AsyncIterator]]):
+        stream = None
+        try:
+            stream = await open_stream()
+            async for chunk in stream:
+                self._publish(broadcast, chunk)
+            self._finish(key, broadcast, None)
+        except BaseException as e:
+            self._finish(key, broadcast, _shareable(e))
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                # Stop the upstream HTTP response (and token spend) when abandoned
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+
+    def _publish(self, broadcast: _Broadcast, chunk: Any):
+        with self._lock:
+            broadcast.chunks.append(chunk)
+            subscribers = list(broadcast.subscribers)
+        for loop, event in subscribers:
+            loop.call_soon_threadsafe(event.set)
+
+    def _finish(self, key: str, broadcast: _Broadcast, error: Optional[BaseException]):
+        with self._lock:
+            broadcast.done = True
+            broadcast.error = error
+            subscribers = list(broadcast.subscribers)
+            if self._broadcasts.get(key) is broadcast:
+                del self._broadcasts[key]
+        for loop, event in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    async def _iterate(self, key: str, broadcast: _Broadcast,
+                       loop: asyncio.AbstractEventLoop, event: asyncio.Event):
+        position = 0
+        try:
+            while True:
+                event.clear()
+                with self._lock:
+                    pending = broadcast.chunks[position:]
+                    position += len(pending)
+                    done, error = broadcast.done, broadcast.error
+                for chunk in pending:
+                    yield chunk
+                if pending:
+                    continue
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+                await event.wait()
+        finally:
+            with self._lock:
+                broadcast.subscribers.remove((loop, event))
+                abandoned = not broadcast.subscribers and not broadcast.done
+                if abandoned and self._broadcasts.get(key) is broadcast:
+                    del self._broadcasts[key]
+            if abandoned and broadcast.task is not None:
+                broadcast.loop.call_soon_threadsafe(broadcast.task.cancel)
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/follower counts (followers = upstream streams saved)"""
+        return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._broadcasts)}
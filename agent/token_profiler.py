@@ -0,0 +1,262 @@
+"""
+Prompt Token Profiler
+Breaks each outgoing request down by component and compares the estimate with API usage
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .curriculum_index import REFERENCE_HEADER
+from .math_solver import SOLUTION_HEADER
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")  # gpt-4.1 family tokenizer
+except Exception:  # tiktoken is optional
+    _ENCODING = None
+
+# Chat format overhead (role markers and separators) per message and per request
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REQUEST = 3
+
+COMPONENTS = (
+    "system_prompt",
+    "curriculum_reference",
+    "verified_working",
+    "tool_schemas",
+    "history_user",
+    "history_assistant",
+    "tool_calls",
+    "tool_results",
+    "current_message",
+    "overhead",
+)
+
+# Distinct tool schema lists whose token counts are kept (one per tool subset sent)
+SCHEMA_CACHE_SIZE = 64
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text
+
+    Uses tiktoken when installed, otherwise a word/punctuation heuristic
+    that tracks o200k_base to within roughly 10% on tutoring text.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    pieces = _WORD_PATTERN.findall(text)
+    # Long words split into several tokens, roughly one per 4 characters
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in pieces)
+
+
+class RequestProfile:
+    """Token estimate for one outgoing request, broken down by component"""
+
+    __slots__ = ("label", "components", "estimated_total", "actual_prompt_tokens", "timestamp")
+
+    def __init__(self, label: str, components: Dict[str, int]):
+        self.label = label
+        self.components = components
+        self.estimated_total = sum(components.values())
+        self.actual_prompt_tokens: Optional[int] = None
+        self.timestamp = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "components": dict(self.components),
+            "estimated_total": self.estimated_total,
+            "actual_prompt_tokens": self.actual_prompt_tokens,
+            "timestamp": self.timestamp,
+        }
+
+
+class TokenProfiler:
+    """
+    Rolling per-component token accounting for LearningAgent requests
+
+    One profiler can be shared by many agents; it keeps process-wide totals
+    plus a window of the most recent requests.
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Number of recent requests kept for rolling averages
+        """
+        self.recent = deque(maxlen=window)
+        self.totals = {name: 0 for name in COMPONENTS}
+        self.requests = 0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self.compared_requests = 0
+        # sha1 of the serialized schemas -> their token count, least recently used first
+        self._schema_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count_tools(self, tools: Optional[List[dict]]) -> int:
+        if not tools:
+            return 0
+        # Serializing is cheap next to tokenizing, and the same schemas are sent with every request
+        text = json.dumps(tools, separators=(",", ":"))
+        key = hashlib.sha1(text.encode("utf-8")).digest()
+        with self._lock:
+            tokens = self._schema_cache.get(key)
+            if tokens is not None:
+                self._schema_cache.move_to_end(key)
+                return tokens
+        tokens = count_tokens(text)
+        with self._lock:
+            self._schema_cache[key] = tokens
+            while len(self._schema_cache) > SCHEMA_CACHE_SIZE:
+                self._schema_cache.popitem(last=False)
+        return tokens
+
+    def profile_request(self, messages: List[dict], tools: Optional[List[dict]] = None,
+                        label: str = "request") -> RequestProfile:
+        """
+        Estimate the prompt tokens of a request before it is sent
+
+        Args:
+            messages: The messages list about to be sent
+            tools: Tool schemas sent with the request, if any
+            label: Name for this request in reports (e.g. "tool_check", "final_stream")
+
+        Returns:
+            RequestProfile with per-component estimates
+        """
+        components = {name: 0 for name in COMPONENTS}
+        components["tool_schemas"] = self._count_tools(tools)
+        components["overhead"] = TOKENS_PER_REQUEST + TOKENS_PER_MESSAGE * len(messages)
+
+        last_user_index = max(
+            (i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1
+        )
+        for index, message in enumerate(messages):
+            role = message.get("role")
+            tokens = count_tokens(message.get("content") or "")
+            if role == "system" and index == 0:
+                components["system_prompt"] += tokens
+            elif role == "system":
+                # The turn's curriculum snippets or solver working, or a diagram delivered after an answer
+                content = message.get("content") or ""
+                if content.startswith(REFERENCE_HEADER):
+                    components["curriculum_reference"] += tokens
+                elif content.startswith(SOLUTION_HEADER):
+                    components["verified_working"] += tokens
+                else:
+                    components["tool_results"] += tokens
+            elif role == "user":
+                key = "current_message" if index == last_user_index else "history_user"
+                components[key] += tokens
+            elif role == "tool":
+                components["tool_results"] += tokens
+            else:
+                components["history_assistant"] += tokens
+                for tool_call in message.get("tool_calls") or []:
+                    function = tool_call.get("function", {})
+                    components["tool_calls"] += (
+                        count_tokens(function.get("name", ""))
+                        + count_tokens(function.get("arguments", ""))
+                    )
+
+        return RequestProfile(label, components)
+
+    def record(self, profile: RequestProfile, usage=None):
+        """
+        Add a sent request to the aggregates, with API-reported usage if available
+
+        Args:
+            profile: Profile returned by profile_request
+            usage: The response's usage object (prompt_tokens is compared to the estimate)
+        """
+        actual = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        profile.actual_prompt_tokens = actual
+        with self._lock:
+            self.requests += 1
+            self.estimated_tokens += profile.estimated_total
+            for name, tokens in profile.components.items():
+                self.totals[name] += tokens
+            if actual:
+                self.actual_tokens += actual
+                self.compared_requests += 1
+            self.recent.append(profile)
+
+    def report(self) -> dict:
+        """Aggregate report: totals, shares, rolling averages and estimate accuracy"""
+        with self._lock:
+            recent = list(self.recent)
+            totals = dict(self.totals)
+            requests = self.requests
+            compared = [p for p in recent if p.actual_prompt_tokens]
+
+        grand_total = sum(totals.values()) or 1
+        window_size = len(recent) or 1
+        estimate_vs_actual = None
+        if compared:
+            ratios = [p.estimated_total / p.actual_prompt_tokens for p in compared]
+            estimate_vs_actual = round(sum(ratios) / len(ratios), 3)
+
+        by_label: Dict[str, Dict[str, float]] = {}
+        for profile in recent:
+            entry = by_label.setdefault(profile.label, {"requests": 0, "estimated_tokens": 0})
+            entry["requests"] += 1
+            entry["estimated_tokens"] += profile.estimated_total
+
+        return {
+            "requests": requests,
+            "tokenizer": "tiktoken/o200k_base" if _ENCODING is not None else "heuristic",
+            "totals": totals,
+            "share": {name: round(tokens / grand_total, 3) for name, tokens in totals.items()},
+            "rolling_mean": {
+                name: round(sum(p.components[name] for p in recent) / window_size, 1)
+                for name in COMPONENTS
+            },
+            "rolling_by_label": by_label,
+            "api_prompt_tokens": self.actual_tokens,
+            "estimated_prompt_tokens": self.estimated_tokens,
+            # Mean estimate/actual over the window: >1 means the estimate runs high
+            "estimate_vs_actual": estimate_vs_actual,
+        }
+
+    def format_report(self) -> str:
+        """Human-readable component table, largest first"""
+        report = self.report()
+        lines = [
+            f"Prompt token profile ({report['requests']} requests, {report['tokenizer']})",
+            f"{'component':<22}{'total':>10}{'share':>8}{'avg/req':>10}",
+        ]
+        for name in sorted(COMPONENTS, key=lambda n: report["totals"][n], reverse=True):
+            lines.append(
+                f"{name:<22}{report['totals'][name]:>10}"
+                f"{report['share'][name]:>8.1%}{report['rolling_mean'][name]:>10}"
+            )
+        if report["estimate_vs_actual"] is not None:
+            lines.append(f"Estimate / API prompt_tokens: {report['estimate_vs_actual']}")
+        return "\n".join(lines)
+
+    def dump(self, path, include_requests: bool = False):
+        """
+        Write the report as JSON
+
+        Args:
+            path: Output file path
+            include_requests: Also write every profile in the rolling window
+        """
+        report = self.report()
+        if include_requests:
+            with self._lock:
+                report["recent_requests"] = [p.to_dict() for p in self.recent]
+        Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
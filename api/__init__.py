@@ -0,0 +1,8 @@
+"""
+API Package
+Contains the headless ASGI service for the CBSE Learning Agent
+"""
+
+from .server import LearningAgentAPI, create_app
+
+__all__ = ['LearningAgentAPI', 'create_app']
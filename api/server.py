@@ -0,0 +1,392 @@
+"""
+Headless HTTP API for the CBSE Learning Agent
+Plain ASGI app with session endpoints, SSE streaming and cached diagram downloads
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from agent import LearningAgent
+from agent.cancellation import CANCELLATION_STATS
+from agent.prompt_cache import PROMPT_CACHE_STATS
+from agent.render_queue import RENDER_QUEUE
+from agent.render_workers import get_render_pool
+from agent.render_service import get_render_service
+from tools import TOOL_REGISTRY, cleanup_old_diagrams
+from tools.diagram_tools import DIAGRAM_MEDIA_TYPES, DIAGRAMS_DIR
+
+# Tool results streamed by LearningAgent.chat_stream look like
+# "Diagram created successfully: /abs/path/diagrams/quadratic_1x²+...png"
+DIAGRAM_RESULT_PATTERN = re.compile(r"Diagram created successfully: (.+?\.(?:png|gif|mp4))")
+
+# Only plain file names are served from the diagrams folder
+DIAGRAM_NAME_PATTERN = re.compile(r"^[^/\\]+\.(?:png|gif|mp4)$")
+
+SESSION_PATH_PATTERN = re.compile(r"^/sessions/([0-9a-f]{32})/(messages|clear)$")
+
+
+class Session:
+    """One student conversation held by the API process"""
+
+    __slots__ = ("session_id", "agent", "lock", "last_used")
+
+    def __init__(self, session_id: str, agent: LearningAgent):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """In-memory session registry with idle eviction"""
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout: float = 1800):
+        """
+        Args:
+            max_sessions: Maximum number of live sessions in this process
+            idle_timeout: Seconds after which an unused session is dropped
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, Session] = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        """Create a new session, evicting idle ones if the store is full"""
+        if len(self._sessions) >= self.max_sessions:
+            self.evict_idle()
+        if len(self._sessions) >= self.max_sessions:
+            raise OverflowError("Too many active sessions")
+
+        session_id = uuid.uuid4().hex
+        agent = LearningAgent(registry=TOOL_REGISTRY)
+        session = Session(session_id, agent)
+        self._sessions[session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session:
+            session.touch()
+        return session
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_timeout (busy ones are kept)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = [
+            sid for sid, session in self._sessions.items()
+            if session.last_used < cutoff and not session.lock.locked()
+        ]
+        for sid in stale:
+            del self._sessions[sid]
+        return len(stale)
+
+
+class DiagramCache:
+    """Caches diagram bytes and their ETags keyed by file name, size and mtime"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, int, str, bytes]] = {}
+
+    def load(self, path: Path) -> Optional[Tuple[str, bytes]]:
+        """Return (etag, bytes) for a diagram file, or None if it does not exist"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        cached = self._entries.get(path.name)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2], cached[3]
+
+        data = path.read_bytes()
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[path.name] = (stat.st_mtime, stat.st_size, etag, data)
+        return etag, data
+
+
+def _sse_event(event: str, data: dict) -> bytes:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class LearningAgentAPI:
+    """
+    ASGI application exposing LearningAgent over HTTP
+
+    Endpoints:
+        POST /sessions                  -> {"session_id": ...}
+        POST /sessions/{id}/messages    -> text/event-stream of token/diagram/done events
+                                           (a newer message cancels a running reply;
+                                           {"profile": true} samples the turn and the
+                                           done event lists its profile files)
+        POST /sessions/{id}/clear       -> 204, conversation reset (cancels a running reply)
+        GET  /diagrams/{name}           -> PNG/GIF/MP4 bytes with ETag caching
+        GET  /health                    -> {"status": "ok", "sessions": N, "cancelled": {...},
+                                            "render_queue": {...}, "render_workers": {...},
+                                            "render_service": {...}, "prompt_cache": {...}}
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout: float = 1800,
+                 diagrams_dir: Path = DIAGRAMS_DIR):
+        """
+        Args:
+            max_sessions: Maximum number of live sessions in this process
+            idle_timeout: Seconds after which an unused session is dropped
+            diagrams_dir: Folder that diagram tools write into
+        """
+        self.sessions = SessionStore(max_sessions=max_sessions, idle_timeout=idle_timeout)
+        self.diagrams_dir = Path(diagrams_dir)
+        self.diagram_cache = DiagramCache()
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+
+        try:
+            if path == "/health" and method == "GET":
+                pool = get_render_pool()
+                service = get_render_service()
+                await self._send_json(send, 200, {
+                    "status": "ok",
+                    "sessions": len(self.sessions),
+                    "cancelled": CANCELLATION_STATS.stats(),
+                    "render_queue": RENDER_QUEUE.stats(),
+                    "render_workers": pool.stats() if pool is not None else None,
+                    "render_service": service.stats() if service is not None else None,
+                    "prompt_cache": PROMPT_CACHE_STATS.stats(),
+                })
+            elif path == "/sessions" and method == "POST":
+                await self._create_session(send)
+            elif path.startswith("/diagrams/") and method in ("GET", "HEAD"):
+                await self._serve_diagram(scope, send, path[len("/diagrams/"):])
+            else:
+                match = SESSION_PATH_PATTERN.match(path)
+                if match and method == "POST":
+                    session_id, action = match.groups()
+                    if action == "messages":
+                        await self._post_message(receive, send, session_id)
+                    else:
+                        await self._clear_session(send, session_id)
+                else:
+                    await self._send_json(send, 404, {"error": "Not found"})
+        except Exception as e:
+            await self._send_json(send, 500, {"error": str(e)})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                cleanup_old_diagrams(max_age_seconds=3600)
+                pool = get_render_pool()
+                if pool is not None:
+                    await asyncio.to_thread(pool.start)
+                self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._maintenance_task:
+                    self._maintenance_task.cancel()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _maintenance_loop(self):
+        """Periodically evict idle sessions and old diagram files"""
+        while True:
+            await asyncio.sleep(60)
+            self.sessions.evict_idle()
+            await asyncio.to_thread(cleanup_old_diagrams, 3600)
+
+    async def _create_session(self, send):
+        try:
+            session = self.sessions.create()
+        except OverflowError as e:
+            await self._send_json(send, 503, {"error": str(e)})
+            return
+        await self._send_json(send, 201, {"session_id": session.session_id})
+
+    async def _clear_session(self, send, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is None:
+            await self._send_json(send, 404, {"error": "Unknown session"})
+            return
+        # Cancels a reply that is still streaming; its stream ends with a "cancelled" event
+        session.agent.clear_history()
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _post_message(self, receive, send, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is None:
+            await self._send_json(send, 404, {"error": "Unknown session"})
+            return
+
+        try:
+            payload = json.loads(await self._read_body(receive) or b"{}")
+            message = str(payload.get("message", "")).strip()
+            # Omitted: profiled at the LEARNING_AGENT_PROFILE rate
+            profile = None if payload.get("profile") is None else bool(payload["profile"])
+        except (ValueError, AttributeError):
+            await self._send_json(send, 400, {"error": "Body must be JSON: {\"message\": \"...\"}"})
+            return
+        if not message:
+            await self._send_json(send, 400, {"error": "Message is empty"})
+            return
+        if session.lock.locked():
+            # The student moved on: stop the running reply, then answer this message
+            session.agent.cancel("superseded by a new message")
+
+        async with session.lock:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+
+            stream_task = asyncio.create_task(self._stream_reply(send, session, message, profile))
+            disconnect_task = asyncio.create_task(self._wait_for_disconnect(receive))
+            done, _ = await asyncio.wait(
+                {stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect_task in done:
+                # Client went away: stop generating instead of streaming into the void
+                stream_task.cancel()
+            else:
+                disconnect_task.cancel()
+            await asyncio.gather(stream_task, disconnect_task, return_exceptions=True)
+            if stream_task.cancelled() and disconnect_task not in done:
+                # Cancelled by a newer message or a clear: end the event stream explicitly
+                await send({
+                    "type": "http.response.body",
+                    "body": _sse_event("cancelled", {}),
+                    "more_body": False,
+                })
+            session.touch()
+
+    async def _stream_reply(self, send, session: Session, message: str, profile: Optional[bool] = None):
+        """Relay chat_stream chunks as SSE token and diagram events"""
+        previous_profile = session.agent.last_sampled_profile
+        try:
+            async for chunk in session.agent.chat_stream(message, profile=profile):
+                await send({
+                    "type": "http.response.body",
+                    "body": _sse_event("token", {"text": chunk}),
+                    "more_body": True,
+                })
+                for diagram_path in DIAGRAM_RESULT_PATTERN.findall(chunk):
+                    name = Path(diagram_path).name
+                    await send({
+                        "type": "http.response.body",
+                        "body": _sse_event("diagram", {"name": name, "url": f"/diagrams/{name}"}),
+                        "more_body": True,
+                    })
+            report = session.agent.last_sampled_profile
+            if report is not None and report is not previous_profile:
+                # Profiled turn: where its speedscope/flamegraph files and summary are
+                final_event = _sse_event("done", {
+                    "profile": {kind: str(path) for kind, path in report.files.items()},
+                })
+            else:
+                final_event = _sse_event("done", {})
+        except Exception as e:
+            final_event = _sse_event("error", {"error": str(e)})
+        await send({"type": "http.response.body", "body": final_event, "more_body": False})
+
+    async def _serve_diagram(self, scope, send, name: str):
+        if not DIAGRAM_NAME_PATTERN.match(name):
+            await self._send_json(send, 404, {"error": "Not found"})
+            return
+
+        loaded = await asyncio.to_thread(self.diagram_cache.load, self.diagrams_dir / name)
+        if loaded is None:
+            await self._send_json(send, 404, {"error": "Diagram not found"})
+            return
+
+        etag, data = loaded
+        headers = [
+            (b"etag", etag.encode("ascii")),
+            (b"cache-control", b"private, max-age=3600"),
+        ]
+        request_headers = dict(scope.get("headers") or [])
+        if request_headers.get(b"if-none-match", b"").decode("latin-1") == etag:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers += [
+            (b"content-type", DIAGRAM_MEDIA_TYPES[Path(name).suffix].encode("ascii")),
+            (b"content-length", str(len(data)).encode("ascii")),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        body = b"" if scope["method"] == "HEAD" else data
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        return body
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    @staticmethod
+    async def _send_json(send, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_app(max_sessions: int = 10000, idle_timeout: float = 1800) -> LearningAgentAPI:
+    """
+    Create the ASGI application
+
+    Args:
+        max_sessions: Maximum number of live sessions per process
+        idle_timeout: Seconds after which an unused session is dropped
+
+    Returns:
+        ASGI callable to hand to uvicorn (or any ASGI server)
+    """
+    return LearningAgentAPI(max_sessions=max_sessions, idle_timeout=idle_timeout)
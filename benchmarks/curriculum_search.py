@@ -0,0 +1,89 @@
+"""
+Curriculum Search Benchmark
+Measures index open time and top-k query latency of the memory-mapped curriculum index
+
+Without --index, a synthetic syllabus-sized corpus (random sentences over a
+science/maths vocabulary) is built in a temporary directory first.
+
+Usage:
+    python benchmarks/curriculum_search.py                          # 5000 synthetic snippets
+    python benchmarks/curriculum_search.py --index curriculum_index --queries 2000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.curriculum_index import CurriculumIndex, build_index
+
+VOCABULARY = (
+    "cell membrane nucleus mitochondria chloroplast vacuole tissue organ osmosis diffusion "
+    "motion velocity speed acceleration distance displacement force mass inertia momentum "
+    "gravitation weight pressure buoyancy work energy power sound wave frequency echo "
+    "atom molecule element compound mixture solution suspension colloid evaporation "
+    "polynomial zero factor identity coordinate axis quadrant equation variable line slope "
+    "triangle congruence angle parallel quadrilateral circle chord arc area volume surface "
+    "probability frequency mean median mode histogram statistics rational irrational number"
+).split()
+
+QUESTIONS = [
+    "what is osmosis in plant cells",
+    "difference between speed and velocity",
+    "how do I factorise a polynomial",
+    "explain buoyancy and pressure",
+    "why is the mitochondria called the powerhouse of the cell",
+    "what is a colloid",
+    "how to find the area of a triangle with three sides",
+    "what is the mean median and mode",
+]
+
+
+def synthetic_records(count: int, seed: int = 9):
+    """(title, text) snippets of about 100 words each"""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = [rng.choice(VOCABULARY) for _ in range(100)]
+        yield f"Chapter {i % 30 + 1}", " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark curriculum index search")
+    parser.add_argument("--index", type=Path, help="Existing index directory (default: build a synthetic one)")
+    parser.add_argument("--snippets", type=int, default=5000, help="Synthetic corpus size (default: 5000)")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries to time (default: 1000)")
+    parser.add_argument("--top-k", type=int, default=3, help="Snippets returned per query (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.index
+        if directory is None:
+            directory = Path(scratch)
+            started = time.perf_counter()
+            build_index(synthetic_records(args.snippets), directory)
+            print(f"Built {args.snippets} synthetic snippets in {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        index = CurriculumIndex(directory)
+        print(f"Opened {len(index)} snippets x {index.dimensions} dims in "
+              f"{(time.perf_counter() - started) * 1000:.2f} ms")
+
+        index.search(QUESTIONS[0], args.top_k)  # first touch of the mapped pages
+        timings = []
+        for i in range(args.queries):
+            started = time.perf_counter()
+            index.search(QUESTIONS[i % len(QUESTIONS)], args.top_k)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f"Query latency over {args.queries} queries: p50 {statistics.median(timings):.3f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms, max {timings[-1]:.3f} ms")
+        del index
+
+
+if __name__ == "__main__":
+    main()
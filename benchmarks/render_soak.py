@@ -0,0 +1,179 @@
+"""
+Render Soak Benchmark
+Runs many diagram renders (some failing on purpose) and checks that memory stays flat
+
+Every tenth render fails after its figure is drawn (the file cannot be
+saved), the path that used to leave figures open in pyplot. Files are
+overwritten in place, so the diagrams folder does not grow.
+
+Recycling keeps the live workers small whether or not they leak, so with
+worker processes the check compares the peak RSS each worker reached before
+it was recycled: the last generation of workers against the first.
+
+Usage:
+    python benchmarks/render_soak.py                          # 1,200 renders in 4 worker processes
+    python benchmarks/render_soak.py --renders 20000          # longer soak
+    python benchmarks/render_soak.py --workers 0              # in-process check
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.render_workers import RenderWorkerPool, RenderWorkerError, current_rss
+
+# A save that fails after the figure is drawn
+FAILING_FILENAME = "missing_folder/soak_failure.png"
+
+
+def render_requests(failure_every: int) -> Iterator[Tuple[str, dict]]:
+    """Endless mix of tool calls with varying arguments"""
+    for i in itertools.count():
+        k = i % 17 - 8
+        name, args = [
+            ("plot_quadratic_function", {"a": 1, "b": k, "c": -6, "filename": "soak_quadratic.png"}),
+            ("plot_linear_function", {"m": k or 1, "c": 3, "filename": "soak_linear.png"}),
+            ("draw_triangle", {"sides": [5, 6, 7 + abs(k) % 4], "filename": "soak_triangle.png"}),
+            ("plot_motion_graph", {"graph_type": "velocity-time", "values": [[t, t * (abs(k) + 1)] for t in range(20)],
+                                   "derived": "acceleration", "filename": "soak_motion.png"}),
+            ("plot_expressions", {"expressions": ["sin(x)", f"x**2 / {abs(k) + 2}"], "filename": "soak_expressions.png"}),
+            ("draw_cell_diagram", {"cell_type": "plant" if k % 2 else "animal", "filename": "soak_cell.png"}),
+        ][i % 6]
+        if failure_every and i % failure_every == failure_every - 1:
+            args = dict(args, filename=FAILING_FILENAME)
+        yield name, args
+
+
+def soak_in_process(renders: int, failure_every: int, report_every: int) -> List[Tuple[int, float, int]]:
+    """Render in this process; returns (renders, RSS MB, open pyplot figures) checkpoints"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from tools import get_tool_functions
+
+    functions = get_tool_functions()
+    checkpoints = []
+    for done, (name, args) in enumerate(itertools.islice(render_requests(failure_every), renders), 1):
+        try:
+            functions[name](**args)
+        except OSError:
+            pass
+        if done % report_every == 0 or done == renders:
+            checkpoints.append(_report(done, current_rss(), len(plt.get_fignums())))
+    return checkpoints
+
+
+def soak_workers(renders: int, failure_every: int, report_every: int, pool: RenderWorkerPool
+                 ) -> List[Tuple[int, float, int]]:
+    """Render in the worker pool; returns (renders, highest live worker peak RSS MB, figures leaked) checkpoints"""
+    pool.start()
+    requests = itertools.islice(render_requests(failure_every), renders)
+    checkpoints = []
+    done = 0
+
+    def render(request):
+        try:
+            pool.render(*request)
+        except RenderWorkerError:
+            pass
+
+    with concurrent.futures.ThreadPoolExecutor(pool.workers) as executor:
+        while done < renders:
+            batch = list(itertools.islice(requests, min(report_every, renders - done)))
+            list(executor.map(render, batch))
+            done += len(batch)
+            live_peaks = [peak for _, _, _, peak in pool.worker_history()[-pool.workers:]]
+            checkpoints.append(_report(done, max(live_peaks, default=0), pool.stats()["figures_leaked"]))
+    return checkpoints
+
+
+def generation_growth(history: List[Tuple[int, int, int, int]], workers: int, max_renders: int,
+                      memory_limit: int) -> Optional[Tuple[float, float, float]]:
+    """
+    Peak RSS growth from the first generation of workers to the last
+
+    Only workers that served a full life (recycled by count or by memory)
+    are compared; the last, partly used ones would look smaller.
+
+    Returns:
+        (first generation mean peak MB, last generation mean peak MB, largest growth
+        within one worker's life MB), or None with fewer than two generations
+    """
+    full = [(first, peak) for _, renders, first, peak in history
+            if renders >= max_renders or peak >= memory_limit]
+    if len(full) < 2 * workers:
+        return None
+    mean = lambda peaks: sum(peaks) / len(peaks) / 2**20
+    first_peaks = mean([peak for _, peak in full[:workers]])
+    last_peaks = mean([peak for _, peak in full[-workers:]])
+    within = max(peak - first for first, peak in full) / 2**20
+    return first_peaks, last_peaks, within
+
+
+def _report(done: int, rss: float, figures: int) -> Tuple[int, float, int]:
+    rss_mb = rss / 2**20
+    print(f"{done:>9,} renders  {rss_mb:8.1f} MB  {figures:>4} figures", flush=True)
+    return done, rss_mb, figures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that memory stays flat over many renders")
+    parser.add_argument("--renders", type=int, default=1200, help="Number of renders")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Worker processes (0 renders in this process)")
+    parser.add_argument("--max-renders", type=int, default=100,
+                        help="Renders before a worker is recycled (at least two generations must finish)")
+    parser.add_argument("--memory-mb", type=float, default=400, help="Worker RSS ceiling before recycling")
+    parser.add_argument("--failure-every", type=int, default=10, help="Make every Nth render fail (0: none)")
+    parser.add_argument("--report-every", type=int, default=200, help="Renders between memory readings")
+    parser.add_argument("--tolerance-mb", type=float, default=25,
+                        help="Largest growth after warm-up that still counts as flat")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.workers:
+        pool = RenderWorkerPool(args.workers, max_renders=args.max_renders, memory_limit_mb=args.memory_mb)
+        try:
+            checkpoints = soak_workers(args.renders, args.failure_every, args.report_every, pool)
+            stats, history = pool.stats(), pool.worker_history()
+        finally:
+            pool.close()
+    else:
+        checkpoints = soak_in_process(args.renders, args.failure_every, args.report_every)
+        stats = history = None
+    elapsed = time.perf_counter() - started
+
+    print()
+    print(f"Mode:             {f'{args.workers} worker processes' if args.workers else 'in-process'}")
+    print(f"Renders:          {args.renders:,} in {elapsed:,.0f}s ({args.renders / elapsed:,.1f}/s)")
+    if stats is None:
+        # Compare against the first reading after a tenth of the run (imports and caches are warm by then)
+        warm = checkpoints[min(len(checkpoints) - 1, len(checkpoints) // 10)]
+        growth = checkpoints[-1][1] - warm[1]
+        print(f"Memory growth:    {growth:+.1f} MB after {warm[0]:,} renders")
+    else:
+        print(f"Workers spawned:  {stats['spawned']} "
+              f"(recycled: {stats['recycled_renders']} by count, {stats['recycled_memory']} by memory)")
+        compared = generation_growth(history, args.workers, args.max_renders, pool.memory_limit)
+        if compared is None:
+            print(f"Too few worker generations to compare: raise --renders to at least "
+                  f"{2 * args.workers * args.max_renders:,} or lower --max-renders")
+            sys.exit(2)
+        first_peak, last_peak, within = compared
+        growth = last_peak - first_peak
+        print(f"Peak worker RSS:  {first_peak:.1f} MB first generation, {last_peak:.1f} MB last "
+              f"({growth:+.1f} MB)")
+        print(f"Within one life:  up to {within:+.1f} MB from first render to peak")
+    print(f"Figures left open: {checkpoints[-1][2]}")
+    print(f"Flat:             {'yes' if growth <= args.tolerance_mb else 'NO'}")
+    sys.exit(0 if growth <= args.tolerance_mb else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Replayed Session Benchmark
+Drives LearningAgent.chat_stream from a recorded cassette with no network access
+
+Record a cassette once against the live model:
+    LEARNING_AGENT_CASSETTE=cassettes/quadratic.jsonl LEARNING_AGENT_CASSETTE_MODE=record python run_agent.py
+
+Then benchmark deterministically (speed 0 removes model latency, so only local work is timed):
+    python benchmarks/replay_session.py cassettes/quadratic.jsonl --speed 0 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GITHUB_TOKEN", "offline-benchmark")
+
+from agent import LearningAgent
+from agent.cassette import ReplayClient
+from tools import TOOL_REGISTRY
+
+
+async def replay_once(cassette: Path, speed: float, strict: bool) -> dict:
+    """Run every recorded question through a fresh session and time it"""
+    client = ReplayClient(cassette, speed=speed, strict=strict)
+    agent = LearningAgent(registry=TOOL_REGISTRY)
+    agent.client = client
+
+    turns = []
+    for question in client.questions():
+        started = time.perf_counter()
+        first_token = None
+        tool_time = 0.0
+        tool_started = None
+        chunks = 0
+        async for chunk in agent.chat_stream(question):
+            now = time.perf_counter()
+            chunks += 1
+            if chunk.startswith("\n\nCreating diagram:"):
+                tool_started = now
+                continue
+            if tool_started is not None:
+                tool_time += now - tool_started
+                tool_started = None
+                continue
+            if first_token is None:
+                first_token = now - started
+        turns.append({
+            "total_s": time.perf_counter() - started,
+            "first_token_s": first_token or 0.0,
+            "tool_s": tool_time,
+            "chunks": chunks,
+        })
+    return {"turns": turns, "matched": client.matched, "fallbacks": client.fallbacks}
+
+
+def _summary(values) -> str:
+    if len(values) == 1:
+        return f"{values[0] * 1000:8.1f} ms"
+    return f"{statistics.median(values) * 1000:8.1f} ms median  ({min(values) * 1000:.1f}-{max(values) * 1000:.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a session replayed from a cassette")
+    parser.add_argument("cassette", type=Path, help="Cassette file written in record mode")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Timing scale: 1 = as recorded, 2 = twice as fast, 0 = no model latency")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of replays")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail when a request does not match the recording exactly")
+    args = parser.parse_args()
+
+    runs = [asyncio.run(replay_once(args.cassette, args.speed, args.strict)) for _ in range(args.repeat)]
+    turns = [turn for run in runs for turn in run["turns"]]
+    if not turns:
+        print("The cassette contains no questions")
+        return
+
+    print(f"Cassette: {args.cassette}  speed: {args.speed:g}  replays: {args.repeat}  "
+          f"turns/replay: {len(runs[0]['turns'])}")
+    print(f"Matched requests: {runs[-1]['matched']}  fallbacks: {runs[-1]['fallbacks']}")
+    print(f"Turn total:        {_summary([t['total_s'] for t in turns])}")
+    print(f"First token:       {_summary([t['first_token_s'] for t in turns])}")
+    print(f"Tool execution:    {_summary([t['tool_s'] for t in turns])}")
+    print(f"Chunks per turn:   {statistics.mean(t['chunks'] for t in turns):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Idle Session Memory Benchmark
+Measures bytes per idle LearningAgent session and how many fit in 1 GB
+
+Each session holds a short canned conversation (three turns, one tool call)
+produced by an offline client, so no network or token is needed.
+
+Usage:
+    python benchmarks/session_memory.py --sessions 2000
+    python benchmarks/session_memory.py --sessions 2000 --legacy   # one engine + dict history per session
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GITHUB_TOKEN", "offline-benchmark")
+
+from openai.types.chat import ChatCompletion
+
+from agent import LearningAgent
+from agent.engine import AgentEngine
+from tools import TOOL_REGISTRY
+
+ANSWER = (
+    "A quadratic equation has the form ax² + bx + c = 0. To solve x² - 5x + 6 = 0, "
+    "look for two numbers that multiply to 6 and add to -5: -2 and -3. "
+) * 6
+
+QUESTIONS = [
+    "Explain the quadratic equation x² - 5x + 6 = 0",
+    "Why do we look for two numbers?",
+    "Can you give me another example?",
+]
+
+
+def _completion(content=None, tool_call=None) -> ChatCompletion:
+    message = {"role": "assistant", "content": content}
+    if tool_call:
+        message["tool_calls"] = [{
+            "id": "call_0",
+            "type": "function",
+            "function": {"name": tool_call, "arguments": json.dumps({"a": 1, "b": -5, "c": 6})},
+        }]
+    return ChatCompletion.model_validate({
+        "id": "offline", "object": "chat.completion", "created": 0, "model": "offline",
+        "choices": [{"index": 0, "finish_reason": "tool_calls" if tool_call else "stop", "message": message}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    })
+
+
+class OfflineCompletions:
+    """Answers the first request of a conversation with a tool call, everything else with text"""
+
+    async def create(self, **kwargs):
+        users = sum(1 for m in kwargs["messages"] if m["role"] == "user")
+        if users == 1 and kwargs.get("tools") and kwargs["messages"][-1]["role"] == "user":
+            # An unregistered tool name: exercises tool-call history without rendering
+            return _completion(tool_call="offline_lookup")
+        return _completion(ANSWER)
+
+
+class OfflineClient:
+    def __init__(self):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = OfflineCompletions()
+
+
+async def _converse(agent: LearningAgent):
+    for question in QUESTIONS:
+        await agent.chat(question)
+
+
+def build_sessions(count: int, legacy: bool):
+    """Create sessions with their conversations; legacy mimics one client/tool copy/dict history each"""
+    client = OfflineClient()
+    sessions = []
+    for _ in range(count):
+        if legacy:
+            engine = AgentEngine(registry=TOOL_REGISTRY)
+            agent = LearningAgent(engine=engine)
+        else:
+            agent = LearningAgent(registry=TOOL_REGISTRY)
+        agent.client = client
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(_converse(agent))
+        if legacy:
+            # Old layout kept the API dicts themselves as history
+            sessions.append((agent, agent.conversation_history))
+        else:
+            sessions.append(agent)
+    return sessions
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def measure(count: int, legacy: bool) -> Tuple[float, float]:
+    """
+    Bytes retained per session
+
+    Returns:
+        (Python heap bytes per session from tracemalloc, RSS bytes per session)
+        RSS also covers native memory such as each client's TLS context.
+    """
+    # Create the shared engine (and warm caches) before measuring
+    build_sessions(1, legacy)
+    gc.collect()
+    rss_before = _rss_bytes()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build_sessions(count, legacy)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss_after = _rss_bytes()
+    del sessions
+    return (after - before) / count, max(rss_after - rss_before, 0) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure idle session memory")
+    parser.add_argument("--sessions", type=int, default=1000, help="Number of sessions to create")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Give every session its own engine and dict history (pre-engine layout)")
+    args = parser.parse_args()
+
+    heap, rss = measure(args.sessions, args.legacy)
+    layout = "legacy (engine per session)" if args.legacy else "shared engine"
+    print(f"Layout:                    {layout}")
+    print(f"Sessions measured:         {args.sessions}")
+    print(f"Python heap per session:   {heap:,.0f} bytes")
+    if rss:
+        # RSS is what actually runs out on a server
+        print(f"RSS per session:           {rss:,.0f} bytes")
+        print(f"Idle sessions / GB (RSS):  {int(1024 ** 3 // max(rss, heap)):,}")
+    else:
+        print(f"Idle sessions / GB (heap): {int(1024 ** 3 // heap):,}")
+
+
+if __name__ == "__main__":
+    main()
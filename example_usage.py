@@ -4,7 +4,7 @@ Example: How to use the modular Learning Agent
 
 import asyncio
 from agent import LearningAgent
-from tools import get_tool_functions, DIAGRAM_TOOLS, cleanup_old_diagrams
+from tools import TOOL_REGISTRY, cleanup_old_diagrams
 
 
 async def example_basic_usage():
@@ -14,11 +14,7 @@ async def example_basic_usage():
     print("=" * 60)
     
     # Initialize agent with tools
-    tool_functions = get_tool_functions()
-    agent = LearningAgent(
-        tool_functions=tool_functions,
-        diagram_tools=DIAGRAM_TOOLS
-    )
+    agent = LearningAgent(registry=TOOL_REGISTRY)
     
     # Ask a question
     question = "Explain the quadratic equation x² - 5x + 6 = 0"
@@ -37,11 +33,7 @@ async def example_diagram_generation():
     print("Example 2: Autonomous Diagram Generation")
     print("=" * 60)
     
-    tool_functions = get_tool_functions()
-    agent = LearningAgent(
-        tool_functions=tool_functions,
-        diagram_tools=DIAGRAM_TOOLS
-    )
+    agent = LearningAgent(registry=TOOL_REGISTRY)
     
     # Question that should trigger diagram
     question = "Show me a plant cell diagram"
@@ -1,11 +1,125 @@
 """
 CBSE Std 9 Learning Agent - Command Line Runner
 Simple entry point for the modular agent package
+
+The loop is fully asynchronous: stdin is read without blocking the event
+loop, so background work keeps running while the student types, and Ctrl-C
+during a reply stops that reply (and its upstream stream) instead of the
+whole session.
 """
 
 import asyncio
+import io
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Optional, Set
+
 from agent import LearningAgent
-from tools import get_tool_functions, DIAGRAM_TOOLS, cleanup_old_diagrams
+from agent.export import export_session
+from agent.cancellation import CANCELLATION_STATS
+from agent.render_workers import get_render_pool
+from tools import TOOL_REGISTRY, cleanup_old_diagrams
+
+# How often old diagrams are cleaned up in the background (seconds)
+CLEANUP_INTERVAL = 600
+
+
+class AsyncLineReader:
+    """
+    Reads stdin lines without blocking the event loop
+
+    Uses loop.add_reader on the stdin file descriptor where the event loop
+    supports it (Unix), otherwise a daemon thread feeding the loop
+    (Windows' proactor loop).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stream=None):
+        self.loop = loop
+        self.stream = stream or sys.stdin
+        self._lines: asyncio.Queue = asyncio.Queue()
+        self._buffer = b""
+        self._fd: Optional[int] = None
+        try:
+            fd = self.stream.fileno()
+            loop.add_reader(fd, self._on_readable)
+            self._fd = fd
+        except (NotImplementedError, AttributeError, ValueError, io.UnsupportedOperation, OSError):
+            threading.Thread(target=self._read_in_thread, daemon=True).start()
+
+    def _on_readable(self):
+        data = os.read(self._fd, 65536)
+        if not data:
+            self._push_eof()
+            return
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self._lines.put_nowait(line.decode("utf-8", errors="replace"))
+
+    def _push_eof(self):
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._fd = None
+        if self._buffer:
+            self._lines.put_nowait(self._buffer.decode("utf-8", errors="replace"))
+            self._buffer = b""
+        self._lines.put_nowait(None)
+
+    def _read_in_thread(self):
+        while True:
+            line = self.stream.readline()
+            if not line:
+                self.loop.call_soon_threadsafe(self._lines.put_nowait, None)
+                return
+            self.loop.call_soon_threadsafe(self._lines.put_nowait, line.rstrip("\n"))
+
+    async def readline(self, prompt: str = "") -> Optional[str]:
+        """Print a prompt and wait for the next line (None at end of input)"""
+        if prompt:
+            print(prompt, end="", flush=True)
+        return await self._lines.get()
+
+    def interrupt(self):
+        """Wake a pending readline as if the line were empty (used for Ctrl-C at the prompt)"""
+        self._lines.put_nowait("")
+
+    def close(self):
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._fd = None
+
+
+def _warm_up_renderer():
+    """Import matplotlib and build its font cache before the first diagram is needed"""
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(1, 1))
+    figure.add_subplot().plot([0, 1], [0, 1])
+    figure.savefig(io.BytesIO(), format="png")
+
+
+async def _cleanup_periodically():
+    """Remove old diagrams every CLEANUP_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL)
+        await asyncio.to_thread(cleanup_old_diagrams, 3600)
+
+
+async def _stream_reply(agent: LearningAgent, question: str, profile: Optional[bool] = None):
+    """Print one streamed reply (and its profile summary when the turn was sampled)"""
+    previous_profile = agent.last_sampled_profile
+    print("\nAgent: ", end="", flush=True)
+    async for chunk in agent.chat_stream(question, profile=profile):
+        print(chunk, end="", flush=True)
+    print()  # New line after response
+    report = agent.last_sampled_profile
+    if report is not None and report is not previous_profile:
+        print(f"\n{report.summary}")
+        if report.files:
+            print(f"Open {report.files['speedscope']} in https://www.speedscope.app "
+                  f"(flamegraph input: {report.files['collapsed']})")
 
 
 async def main():
@@ -15,50 +129,115 @@ async def main():
     print("AI Tutor with Autonomous Diagram Generation")
     print("=" * 60)
     print()
-    
-    # Clean up old diagrams
-    cleanup_old_diagrams(max_age_seconds=3600)
-    
+
+    loop = asyncio.get_running_loop()
+    background: Set[asyncio.Task] = set()
+
+    def run_in_background(coroutine):
+        task = asyncio.create_task(coroutine)
+        background.add(task)
+        task.add_done_callback(background.discard)
+
+    # Clean up old diagrams and warm up the renderer while the student types
+    run_in_background(asyncio.to_thread(cleanup_old_diagrams, 3600))
+    run_in_background(asyncio.to_thread(_warm_up_renderer))
+    pool = get_render_pool()
+    if pool is not None:
+        run_in_background(asyncio.to_thread(pool.start))
+    run_in_background(_cleanup_periodically())
+
     # Initialize agent with tools
     print("Initializing agent...")
-    tool_functions = get_tool_functions()
-    agent = LearningAgent(
-        tool_functions=tool_functions,
-        diagram_tools=DIAGRAM_TOOLS
-    )
-    print("Agent ready! (Type 'quit' to exit, 'clear' to reset)\n")
-    
-    while True:
-        try:
+    agent = LearningAgent(registry=TOOL_REGISTRY)
+    print("Agent ready! (Type 'quit' to exit, 'clear' to reset, '/export [file.html|file.pdf]' to save,\n"
+          "'/profile <question>' to profile a reply, Ctrl-C stops a reply)\n")
+
+    reader = AsyncLineReader(loop)
+    reply_task: Optional[asyncio.Task] = None
+    interrupted_at_prompt = False
+
+    def on_interrupt():
+        nonlocal interrupted_at_prompt
+        if reply_task is not None and not reply_task.done():
+            reply_task.cancel()
+        else:
+            interrupted_at_prompt = True
+            reader.interrupt()
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+    except NotImplementedError:
+        signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(on_interrupt))
+
+    try:
+        while True:
             # Get user input
-            question = input("\nYou: ").strip()
-            
+            question = await reader.readline("\nYou: ")
+
+            if question is None or interrupted_at_prompt:
+                print("\n\nGoodbye! Keep learning!")
+                break
+
+            question = question.strip()
             if not question:
                 continue
-            
+
             if question.lower() in ['quit', 'exit', 'bye']:
                 print("\nGoodbye! Keep learning!")
                 break
-            
+
+            if question.lower().split()[0] == '/export':
+                # /export [file.html|file.pdf]
+                parts = question.split(maxsplit=1)
+                target = parts[1] if len(parts) > 1 else time.strftime("session_%Y%m%d_%H%M.html")
+                try:
+                    path = await asyncio.to_thread(export_session, agent, target)
+                    print(f"Session exported to {path}\n")
+                except (ValueError, OSError) as e:
+                    print(f"\nError: {e}")
+                continue
+
             if question.lower() == 'clear':
                 agent.clear_history()
-                cleanup_old_diagrams(max_age_seconds=0)
+                await asyncio.to_thread(cleanup_old_diagrams, 0)
                 print("Conversation cleared!\n")
                 continue
-            
-            # Get response
-            print("\nAgent: ", end="", flush=True)
-            
-            async for chunk in agent.chat_stream(question):
-                print(chunk, end="", flush=True)
-            
-            print()  # New line after response
-            
-        except KeyboardInterrupt:
-            print("\n\nGoodbye! Keep learning!")
-            break
-        except Exception as e:
-            print(f"\nError: {e}")
+
+            profile = None
+            if question.lower().split()[0] == '/profile':
+                # /profile <question>: sample this reply's Python stacks
+                parts = question.split(maxsplit=1)
+                if len(parts) < 2:
+                    print("Usage: /profile <question>")
+                    continue
+                question, profile = parts[1], True
+
+            # Get response; Ctrl-C cancels this task only
+            reply_task = asyncio.create_task(_stream_reply(agent, question, profile))
+            try:
+                await reply_task
+            except asyncio.CancelledError:
+                if not reply_task.cancelled():
+                    raise
+                print("\n[stopped]")
+            except Exception as e:
+                print(f"\nError: {e}")
+            finally:
+                reply_task = None
+    finally:
+        reader.close()
+        abandoned = CANCELLATION_STATS.stats()
+        if abandoned["turns_cancelled"]:
+            print(f"Stopped replies: {abandoned['turns_cancelled']} "
+                  f"(streams closed early: {abandoned['streams_closed_early']}, "
+                  f"renders skipped: {abandoned['renders_skipped']})")
+        cache = agent.prompt_cache_stats()
+        if cache["requests"]:
+            print(f"Prompt cache: {cache['cached_tokens']}/{cache['prompt_tokens']} prompt tokens cached "
+                  f"({cache['hit_ratio']:.0%} over {cache['requests']} requests)")
+        for task in list(background):
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+"""
+Headless HTTP API Runner
+Serves the Learning Agent over HTTP with server-sent-event streaming
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    """Run the ASGI service with uvicorn"""
+    parser = argparse.ArgumentParser(description="CBSE Std 9 Learning Agent HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Worker processes, one event loop each (default: 1, use 0 for one per core)"
+    )
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1:
+        # Sessions live in worker memory, so a session must keep hitting the same worker
+        print(f"Starting {workers} workers - put a sticky load balancer in front "
+              "(e.g. hash on the session id in the URL)")
+
+    uvicorn.run(
+        "api:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="auto",        # uvloop when installed
+        http="auto",        # httptools when installed
+        timeout_keep_alive=30,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+CBSE Std 9 Learning Agent - Bulk Question Runner
+Runs a JSONL question bank through independent agent sessions and streams results to JSONL
+
+Input lines:  {"id": "ch2-q14", "question": "Explain the quadratic equation x² - 5x + 6 = 0"}
+Output lines: {"id", "question", "answer", "diagrams", "usage", "latency_s", "attempts", "error"}
+
+Usage:
+    python run_batch.py questions.jsonl results.jsonl --concurrency 8 --artifacts-dir artifacts
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Set
+
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+from agent import LearningAgent, TokenProfiler
+from tools import TOOL_REGISTRY
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class RateGate:
+    """
+    Shared pacing for all workers
+
+    Spaces request starts to stay under a requests-per-minute budget, and
+    pauses every worker after the API reports a rate limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Wait until this worker may start a request"""
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + self.interval
+        delay = start - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hold back all workers for the given number of seconds"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error: Exception, attempt: int) -> float:
+    """Use the server's retry-after header when present, else exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        value = response.headers.get("retry-after")
+        try:
+            return max(float(value), 1.0)
+        except (TypeError, ValueError):
+            pass
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+
+def load_completed_ids(output_path: Path) -> Set[str]:
+    """Ids that already have a successful result in the output file"""
+    completed = set()
+    if not output_path.exists():
+        return completed
+
+    with output_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written last line from an interrupted run
+            if record.get("id") is not None and not record.get("error"):
+                completed.add(str(record["id"]))
+    return completed
+
+
+def artifact_folder_name(question_id: str) -> str:
+    """
+    A safe folder name for a question id from the input file
+
+    Anything but letters, digits, "-", "_" and inner dots is replaced, so an
+    id like "../x" cannot leave the artifacts folder; a changed id gets a
+    short hash of the original so two ids never share a folder.
+    """
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", question_id).strip("._") or "question"
+    if name != question_id:
+        name = f"{name}_{hashlib.sha1(question_id.encode('utf-8')).hexdigest()[:8]}"
+    return name
+
+
+def copy_artifacts(diagrams, artifacts_dir: Optional[Path], question_id: str):
+    """Copy a question's diagrams out of the auto-cleaned diagrams folder"""
+    if artifacts_dir is None:
+        return diagrams
+
+    target_dir = artifacts_dir / artifact_folder_name(question_id)
+    copied = []
+    for diagram in diagrams:
+        source = Path(diagram)
+        if source.exists():
+            target_dir.mkdir(parents=True, exist_ok=True)
+            target = target_dir / source.name
+            shutil.copyfile(source, target)
+            copied.append(str(target))
+    return copied
+
+
+async def answer_question(item: dict, gate: RateGate,
+                          max_retries: int, artifacts_dir: Optional[Path],
+                          profiler: Optional[TokenProfiler] = None) -> dict:
+    """Run one question through a fresh agent session"""
+    question_id = str(item["id"])
+    record = {
+        "id": question_id,
+        "question": item["question"],
+        "answer": None,
+        "diagrams": [],
+        "usage": None,
+        "latency_s": None,
+        "attempts": 0,
+        "error": None,
+    }
+
+    for attempt in range(max_retries + 1):
+        record["attempts"] = attempt + 1
+        agent = LearningAgent(
+            registry=TOOL_REGISTRY,
+            profiler=profiler
+        )
+        await gate.wait()
+        started = time.perf_counter()
+        try:
+            answer = await agent.chat(item["question"])
+        except RETRYABLE_ERRORS as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            if attempt < max_retries:
+                delay = _retry_after_seconds(e, attempt)
+                if isinstance(e, RateLimitError):
+                    gate.pause(delay)
+                await asyncio.sleep(delay)
+            continue
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            break
+
+        record.update(
+            answer=answer,
+            diagrams=agent.last_diagrams,
+            usage=agent.last_usage,
+            latency_s=round(time.perf_counter() - started, 3),
+            error=None,
+        )
+        try:
+            record["diagrams"] = await asyncio.to_thread(
+                copy_artifacts, agent.last_diagrams, artifacts_dir, question_id
+            )
+        except OSError as e:
+            # Only this question fails (and is retried on the next run)
+            record["error"] = f"copying diagrams failed: {type(e).__name__}: {e}"
+        break
+
+    return record
+
+
+async def run_batch(input_path: Path, output_path: Path, concurrency: int = 4,
+                    requests_per_minute: float = 0, max_retries: int = 5,
+                    artifacts_dir: Optional[Path] = None,
+                    token_report: Optional[Path] = None):
+    """
+    Answer every question in input_path, appending results to output_path as they complete
+
+    Args:
+        input_path: JSONL file with "id" and "question" fields
+        output_path: JSONL file to append results to (ids already answered are skipped)
+        concurrency: Maximum number of questions in flight
+        requests_per_minute: Question start budget across all workers (0 = unlimited)
+        max_retries: Retries per question for rate limits and transient API errors
+        artifacts_dir: Optional folder to copy each question's diagrams into
+        token_report: Optional JSON file for a per-component prompt token report
+    """
+    completed = load_completed_ids(output_path)
+    if completed:
+        print(f"Resuming: skipping {len(completed)} already answered question(s)")
+
+    gate = RateGate(requests_per_minute)
+    profiler = TokenProfiler(window=1000) if token_report else None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"done": 0, "failed": 0}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def producer():
+        queued = set()
+        with input_path.open(encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    print(f"Skipping line {line_number}: not valid JSON", file=sys.stderr)
+                    continue
+                if "id" not in item or "question" not in item:
+                    print(f"Skipping line {line_number}: needs 'id' and 'question'", file=sys.stderr)
+                    continue
+                if str(item["id"]) in completed:
+                    continue
+                if str(item["id"]) in queued:
+                    print(f"Skipping line {line_number}: id {item['id']} is repeated", file=sys.stderr)
+                    continue
+                queued.add(str(item["id"]))
+                await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker(out):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record = await answer_question(
+                item, gate, max_retries, artifacts_dir, profiler
+            )
+            # Single-threaded event loop: whole lines are written and flushed one at a time
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["error"]:
+                stats["failed"] += 1
+                print(f"[failed] {record['id']}: {record['error']}", file=sys.stderr)
+            else:
+                stats["done"] += 1
+                print(f"[done] {record['id']} ({record['latency_s']}s, "
+                      f"{record['usage']['total_tokens']} tokens)")
+
+    with output_path.open("a", encoding="utf-8") as out:
+        await asyncio.gather(producer(), *(worker(out) for _ in range(concurrency)))
+
+    print(f"\nFinished: {stats['done']} answered, {stats['failed']} failed "
+          f"(failed ids are retried on the next run)")
+    if profiler is not None:
+        profiler.dump(token_report)
+        print()
+        print(profiler.format_report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL question bank through the Learning Agent")
+    parser.add_argument("input", type=Path, help="Input JSONL with 'id' and 'question' fields")
+    parser.add_argument("output", type=Path, help="Output JSONL (appended to; completed ids are skipped)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions in flight (default: 4)")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="Max question starts per minute across workers (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries per question on rate limits/transient errors (default: 5)")
+    parser.add_argument("--artifacts-dir", type=Path, default=None,
+                        help="Copy each question's diagrams into this folder")
+    parser.add_argument("--token-report", type=Path, default=None,
+                        help="Write a per-component prompt token report (JSON) to this file")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_batch(
+            args.input, args.output,
+            concurrency=max(1, args.concurrency),
+            requests_per_minute=args.rpm,
+            max_retries=args.max_retries,
+            artifacts_dir=args.artifacts_dir,
+            token_report=args.token_report,
+        ))
+    except KeyboardInterrupt:
+        print("\nInterrupted - run the same command again to resume.")
+
+
+if __name__ == "__main__":
+    main()
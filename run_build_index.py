@@ -0,0 +1,48 @@
+"""
+Curriculum Index Builder
+Builds the memory-mapped retrieval index of syllabus snippets used to ground answers
+
+Sources are .jsonl files ({"subject", "chapter", "title", "text"} per snippet)
+and .txt/.md chapter files (split into paragraph snippets), or directories of
+them. Point the agent at the result with LEARNING_AGENT_CURRICULUM_INDEX.
+
+Usage:
+    python run_build_index.py curriculum/ --out curriculum_index
+    python run_build_index.py curriculum/ --out curriculum_index --query "what is osmosis"
+"""
+
+import argparse
+import sys
+import time
+
+from agent.curriculum_index import DIMENSIONS, CurriculumIndex, build_index, load_records
+
+
+def main():
+    """Build the index, then optionally run a test query against it"""
+    parser = argparse.ArgumentParser(description="Build the CBSE Std 9 curriculum retrieval index")
+    parser.add_argument("sources", nargs="+", help="Curriculum .jsonl/.txt/.md files or directories")
+    parser.add_argument("--out", default="curriculum_index", help="Index directory (default: curriculum_index)")
+    parser.add_argument("--dimensions", type=int, default=DIMENSIONS,
+                        help=f"Hashed vector dimensions (default: {DIMENSIONS})")
+    parser.add_argument("--query", help="Search the new index for this question and print the matches")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        count = build_index(load_records(args.sources), args.out, args.dimensions)
+    except (OSError, ValueError, KeyError) as e:
+        sys.exit(f"Could not build the index: {e}")
+    print(f"Indexed {count} snippets into {args.out}/ in {time.perf_counter() - started:.2f}s")
+
+    if args.query:
+        index = CurriculumIndex(args.out)
+        started = time.perf_counter()
+        snippets = index.search(args.query)
+        print(f"Query took {(time.perf_counter() - started) * 1000:.3f} ms")
+        for snippet in snippets:
+            print(f"\n[{snippet.score:.3f}] {snippet.title}\n{snippet.text[:300]}")
+
+
+if __name__ == "__main__":
+    main()
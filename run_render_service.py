@@ -0,0 +1,47 @@
+"""
+Local Render Service Runner
+Serves diagram rendering to every Learning Agent process on this machine over a Unix socket
+
+Point the app processes at it with LEARNING_AGENT_RENDER_SOCKET (same path);
+they fall back to rendering themselves while it is not running. Start it
+from the app's working directory so diagrams land in the same folder.
+
+Usage:
+    python run_render_service.py --socket /tmp/learning_agent_render.sock --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+
+from agent.render_service import DEFAULT_SOCKET, RenderService
+
+
+def main():
+    """Run the render service until interrupted"""
+    parser = argparse.ArgumentParser(description="CBSE Std 9 Learning Agent render service")
+    parser.add_argument(
+        "--socket", default=os.getenv("LEARNING_AGENT_RENDER_SOCKET") or DEFAULT_SOCKET,
+        help=f"Unix socket path (default: LEARNING_AGENT_RENDER_SOCKET or {DEFAULT_SOCKET})"
+    )
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Render worker processes (default: 0, one per core)")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="Rendered diagram paths kept in the shared cache (default: 4096)")
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("The render service needs Unix domain sockets, which this platform does not have")
+
+    service = RenderService(args.socket, workers=args.workers or None, cache_size=args.cache_size)
+    print(f"Render service on {args.socket} with {service.pool.workers} worker(s) (Ctrl-C to stop)")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("\nRender service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Test Configuration
+Makes the agent, tools and benchmarks packages importable when pytest runs from any directory
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,77 @@
+"""
+Fake OpenAI Client
+Scripted chat completions and streams for agent tests, without network access
+"""
+
+import asyncio
+import json
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+USAGE = {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55}
+
+
+def completion(content: str = None, tool_calls=None) -> ChatCompletion:
+    """A complete reply: text, or (tool name, arguments) pairs to call"""
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+            for i, (name, args) in enumerate(tool_calls)
+        ]
+    return ChatCompletion.model_validate({
+        "id": "c", "object": "chat.completion", "created": 0, "model": "m",
+        "choices": [{"index": 0, "finish_reason": "tool_calls" if tool_calls else "stop", "message": message}],
+        "usage": USAGE,
+    })
+
+
+def chunk(text: str = None, usage: dict = None) -> ChatCompletionChunk:
+    data = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m", "choices": []}
+    if text is not None:
+        data["choices"] = [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+    if usage:
+        data["usage"] = usage
+    return ChatCompletionChunk.model_validate(data)
+
+
+class FakeStream:
+    def __init__(self, texts, delay: float = 0.0):
+        self.chunks = [chunk(text) for text in texts] + [chunk(usage=USAGE)]
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+class _Completions:
+    def __init__(self, script, delay: float):
+        self.script = script
+        self.delay = delay
+        self.calls = []
+        self.streams = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0 if kwargs.get("stream") else self.delay)
+        response = self.script(kwargs)
+        if isinstance(response, FakeStream):
+            self.streams.append(response)
+        return response
+
+
+class FakeClient:
+    """Answers every request with script(request kwargs), non-streamed ones after delay seconds"""
+
+    def __init__(self, script, delay: float = 0.0):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _Completions(script, delay)
@@ -0,0 +1,121 @@
+"""Tests for cancelling a turn and rolling its history back"""
+
+import asyncio
+import threading
+
+import pytest
+
+from agent import LearningAgent
+from agent.cancellation import CANCELLATION_STATS
+from agent.engine import AgentEngine
+from tools import TOOL_REGISTRY
+
+from fake_openai import FakeClient, FakeStream, completion
+
+WORDS = [f"w{i} " for i in range(50)]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.delenv("LEARNING_AGENT_RENDER_SOCKET", raising=False)
+    monkeypatch.delenv("LEARNING_AGENT_CASSETTE", raising=False)
+    CANCELLATION_STATS.reset()
+
+
+def script(request):
+    """A diagram request is answered with a tool call and a slow stream, anything else directly"""
+    if request.get("stream"):
+        return FakeStream(WORDS, delay=0.01)
+    last = request["messages"][-1]
+    if request.get("tools") and last.get("role") == "user" and "plot" in str(last.get("content")):
+        return completion(tool_calls=[("plot_linear_function", {"m": 2, "c": 1})])
+    return completion("Plain answer")
+
+
+def make_agent(delay: float = 0.0) -> LearningAgent:
+    engine = AgentEngine(registry=TOOL_REGISTRY, client=FakeClient(script, delay))
+    engine.tool_functions = {name: (lambda **args: "diagrams/line.png") for name in TOOL_REGISTRY.functions()}
+    return LearningAgent(engine=engine)
+
+
+def completions(agent: LearningAgent):
+    return agent.engine.client.chat.completions
+
+
+async def consume(agent: LearningAgent, message: str, parts: list = None):
+    async for part in agent.chat_stream(message):
+        if parts is not None:
+            parts.append(part)
+
+
+def test_cancel_during_stream_closes_it_and_rolls_back():
+    agent = make_agent()
+
+    async def run():
+        parts = []
+        turn = asyncio.create_task(consume(agent, "plot y = 2x + 1", parts))
+        while not completions(agent).streams or len(parts) < 5:
+            await asyncio.sleep(0.01)
+        assert agent.cancel() is True
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+        assert completions(agent).streams[0].closed
+        assert agent.state.messages == []
+
+        await consume(agent, "hello")
+
+    asyncio.run(run())
+
+    assert [message.role for message in agent.state.messages] == ["user", "assistant"]
+    assert CANCELLATION_STATS.stats()["turns_cancelled"] == 1
+    assert agent.cancel() is False
+
+
+def test_cancel_from_another_thread():
+    agent = make_agent(delay=1.0)
+
+    async def run():
+        turn = asyncio.create_task(consume(agent, "hello"))
+        await asyncio.sleep(0.1)
+        cancelled = []
+        canceller = threading.Thread(target=lambda: cancelled.append(agent.cancel("test")))
+        canceller.start()
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+        canceller.join()
+        return cancelled
+
+    assert asyncio.run(run()) == [True]
+    assert agent.state.messages == []
+    assert agent.state.cancel_token is None
+
+
+def test_new_message_supersedes_the_running_turn():
+    agent = make_agent(delay=0.3)
+
+    async def run():
+        first = asyncio.create_task(consume(agent, "first"))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(consume(agent, "second"))
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+
+    assert isinstance(first, asyncio.CancelledError)
+    assert second is None
+    assert [message.content for message in agent.state.messages] == ["second", "Plain answer"]
+
+
+def test_failed_request_rolls_back():
+    agent = make_agent()
+    assert asyncio.run(agent.chat("hello")) == "Plain answer"
+
+    def down(request):
+        raise RuntimeError("api down")
+
+    completions(agent).script = down
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.chat("again"))
+
+    assert [message.content for message in agent.state.messages] == ["hello", "Plain answer"]
@@ -0,0 +1,63 @@
+"""Tests for record/replay cassettes"""
+
+import asyncio
+
+import pytest
+
+from agent.cassette import CassetteMismatch, RecordingClient, ReplayClient, request_fingerprint
+
+from fake_openai import FakeClient, completion
+
+
+def request(diagram_folder: str, question: str = "Plot y = x^2") -> dict:
+    """A final-answer request after a late diagram, as a session sends it"""
+    path = f"{diagram_folder}/quadratic_1x²+0x+0.png"
+    return {
+        "model": "gpt-4.1-mini",
+        "messages": [
+            {"role": "system", "content": "You are a tutor."},
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": None, "tool_calls": [{"id": "call_0"}]},
+            {"role": "tool", "tool_call_id": "call_0", "content": f"Diagram created successfully: {path}"},
+            {"role": "assistant", "content": "Here it is."},
+            {"role": "system", "content": f"Diagram created successfully: {path}"},
+            {"role": "user", "content": "Thanks!"},
+        ],
+    }
+
+
+def test_fingerprint_ignores_the_diagram_folder():
+    recorded = request("/home/teacher/app/diagrams")
+    replayed = request("C:\\Users\\Student Name\\app\\diagrams")
+    assert request_fingerprint(recorded) == request_fingerprint(replayed)
+
+
+def test_fingerprint_depends_on_the_conversation():
+    assert request_fingerprint(request("/a", "Plot y = x^2")) != request_fingerprint(request("/a", "Plot y = x^3"))
+    streamed = dict(request("/a"), stream=True)
+    assert request_fingerprint(request("/a")) != request_fingerprint(streamed)
+
+
+def test_replay_matches_requests_recorded_on_another_machine(tmp_path):
+    cassette = tmp_path / "session.jsonl"
+    answers = iter(["First answer", "Second answer"])
+    recorder = RecordingClient(FakeClient(lambda kwargs: completion(next(answers))), cassette)
+
+    async def record():
+        await recorder.chat.completions.create(**request("/srv/app/diagrams", "Plot y = x^2"))
+        await recorder.chat.completions.create(**request("/srv/app/diagrams", "Plot y = x^3"))
+
+    asyncio.run(record())
+
+    replay = ReplayClient(cassette, speed=0, strict=True)
+
+    async def ask(question):
+        response = await replay.chat.completions.create(**request("/tmp/other/diagrams", question))
+        return response.choices[0].message.content
+
+    # Out of recording order: only fingerprints can match these
+    assert asyncio.run(ask("Plot y = x^3")) == "Second answer"
+    assert asyncio.run(ask("Plot y = x^2")) == "First answer"
+    assert replay.matched == 2 and replay.fallbacks == 0
+    with pytest.raises(CassetteMismatch):
+        asyncio.run(ask("Plot y = x^4"))
@@ -0,0 +1,42 @@
+"""Tests for declarative cell diagrams and their variants"""
+
+import os
+
+import pytest
+
+from tools import diagram_tools
+from tools.cell_scene import variant_filename
+
+
+@pytest.fixture
+def diagrams(tmp_path, monkeypatch):
+    monkeypatch.setattr(diagram_tools, "DIAGRAMS_DIR", tmp_path)
+    return tmp_path
+
+
+def test_variant_filename_names_the_whole_variant():
+    assert variant_filename("plant") == "plant_cell.png"
+    assert variant_filename("animal", ["nucleus", "mitochondria"], zoom=True) == \
+        "animal_cell_hl-mitochondria-nucleus_zoom.png"
+    # Extras already highlighted are not repeated; isolate/zoom need a highlight
+    assert variant_filename("plant", ["chloroplast"], extras=["chloroplast", "golgi"]) == \
+        "plant_cell_hl-chloroplast_with-golgi.png"
+    assert variant_filename("plant", isolate=True) == "plant_cell.png"
+
+
+def test_repeated_variant_reuses_the_image(diagrams, monkeypatch):
+    first = diagram_tools.draw_cell_diagram("animal", highlight=["mitochondria"])
+    assert os.path.basename(first) == "animal_cell_hl-mitochondria.png"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("drew the variant again")
+
+    monkeypatch.setattr(diagram_tools, "get_cell_scene", fail)
+    assert diagram_tools.draw_cell_diagram("Animal", highlight=["mitochondria"]) == first
+
+
+def test_custom_filename_is_always_drawn(diagrams):
+    path = diagrams / "my_cell.png"
+    path.write_bytes(b"old")
+    diagram_tools.draw_cell_diagram("plant", filename="my_cell.png")
+    assert path.read_bytes().startswith(b"\x89PNG")
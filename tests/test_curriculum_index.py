@@ -0,0 +1,128 @@
+"""Tests for the curriculum retrieval index"""
+
+import json
+
+import numpy as np
+import pytest
+
+from agent import curriculum_index
+from agent.curriculum_index import (
+    META_FILE, REFERENCE_HEADER, CurriculumIndex, build_index, format_reference,
+    get_curriculum_index, hash_counts, load_records, split_snippets, tokenize,
+)
+
+RECORDS = [
+    ("Motion", "Velocity is the rate of change of displacement. Acceleration is the rate of change of velocity."),
+    ("Tissues", "Plant tissues are meristematic or permanent. Xylem and phloem conduct water and food."),
+    ("Atoms and Molecules", "An atom is the smallest particle of an element. Molecules are groups of atoms bonded together."),
+    ("Sound", "Sound travels as a longitudinal wave through a medium such as air or water."),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    build_index(RECORDS, tmp_path)
+    return CurriculumIndex(tmp_path)
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("What are the Molecules of glass?") == ["molecule", "glass"]
+
+
+def test_hash_counts_are_stable_and_sized():
+    first = hash_counts("rate of change of velocity", dimensions=64)
+    assert first.shape == (64,)
+    assert np.array_equal(first, hash_counts("rate of change of velocity", dimensions=64))
+    assert not hash_counts("the of and").any()
+
+
+def test_split_snippets_keeps_whole_paragraphs():
+    text = "\n\n".join(" ".join(["word"] * 50) for _ in range(3))
+    snippets = split_snippets(text, max_words=120)
+    assert [len(snippet.split()) for snippet in snippets] == [100, 50]
+
+
+def test_search_ranks_the_matching_snippet_first(index):
+    assert len(index) == len(RECORDS)
+    results = index.search("what is acceleration and velocity")
+    assert results[0].title == "Motion"
+    assert results[0].text == RECORDS[0][1]
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+
+
+def test_search_respects_k_and_min_score(index):
+    assert len(index.search("water", k=1)) == 1
+    assert index.search("cricket batting averages") == []
+    assert index.search("the of and") == []
+
+
+def test_a_sparse_search_matches_the_dense_scores(index):
+    vectors = np.zeros((len(index), index.dimensions), dtype=np.float64)
+    for dimension in range(index.dimensions):
+        start, end = int(index.columns[dimension]), int(index.columns[dimension + 1])
+        vectors[index.rows[start:end], dimension] = index.weights[start:end]
+    query = hash_counts("atoms bonded into molecules") * index.idf
+    dense = vectors @ (query / np.linalg.norm(query))
+
+    results = index.search("atoms bonded into molecules", k=len(index), min_score=-1.0)
+
+    titles = [title for title, _ in RECORDS]
+    for result in results:
+        assert result.score == pytest.approx(dense[titles.index(result.title)], abs=1e-5)
+
+
+def test_an_interrupted_or_old_index_is_refused(tmp_path):
+    build_index(RECORDS, tmp_path)
+    meta = json.loads((tmp_path / META_FILE).read_text())
+    meta["version"] = 1
+    (tmp_path / META_FILE).write_text(json.dumps(meta))
+    with pytest.raises(ValueError, match="rebuild"):
+        CurriculumIndex(tmp_path)
+    (tmp_path / META_FILE).unlink()
+    with pytest.raises(ValueError, match="no curriculum index"):
+        CurriculumIndex(tmp_path)
+
+
+def test_build_index_rejects_empty_input(tmp_path):
+    with pytest.raises(ValueError):
+        build_index([("Empty", "   ")], tmp_path)
+
+
+def test_load_records_reads_jsonl_and_markdown(tmp_path):
+    (tmp_path / "science.jsonl").write_text(
+        json.dumps({"subject": "Science", "chapter": "Motion", "title": "Speed", "text": "Speed is distance over time."}) + "\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "sound.md").write_text("# Sound\n\nSound is a wave.\n\nEchoes are reflected sound.\n", encoding="utf-8")
+
+    records = list(load_records([tmp_path]))
+
+    assert records[0] == ("Science · Motion · Speed", "Speed is distance over time.")
+    assert records[1][0] == "Sound"
+    assert "Echoes are reflected sound." in records[1][1]
+
+
+def test_format_reference(index):
+    assert format_reference([]) is None
+    text = format_reference(index.search("sound wave"))
+    assert text.startswith(REFERENCE_HEADER)
+    assert "[Sound]" in text
+
+
+def test_get_curriculum_index_from_environment(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(curriculum_index, "_INDEX", None)
+    monkeypatch.setattr(curriculum_index, "_UNUSABLE", set())
+    monkeypatch.delenv("LEARNING_AGENT_CURRICULUM_INDEX", raising=False)
+    assert get_curriculum_index() is None
+
+    missing = tmp_path / "missing"
+    monkeypatch.setenv("LEARNING_AGENT_CURRICULUM_INDEX", str(missing))
+    assert get_curriculum_index() is None
+    assert get_curriculum_index() is None
+    assert capsys.readouterr().out.count("curriculum retrieval disabled") == 1
+
+    build_index(RECORDS, tmp_path / "index")
+    monkeypatch.setenv("LEARNING_AGENT_CURRICULUM_INDEX", str(tmp_path / "index"))
+    shared = get_curriculum_index()
+    assert isinstance(shared, CurriculumIndex)
+    assert get_curriculum_index() is shared
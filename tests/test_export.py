@@ -0,0 +1,77 @@
+"""Tests for HTML and PDF session export"""
+
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+
+from agent import LearningAgent
+from agent.engine import AgentEngine
+from agent.export import export_session, iter_blocks
+from agent.render_queue import RENDER_QUEUE
+from agent.session import Message
+from tools import TOOL_REGISTRY
+
+from fake_openai import FakeClient, completion
+
+
+def make_session(tmp_path):
+    diagram = tmp_path / "parabola.png"
+    figure = Figure(figsize=(2, 2))
+    figure.add_subplot().plot([0, 1, 2], [0, 1, 4])
+    figure.savefig(diagram)
+    messages = [
+        Message("user", "Solve $x^2 - 4 = 0$"),
+        Message("assistant", None, tool_calls=(("call_0", "plot_quadratic_function", '{"a": 1, "b": 0, "c": -4}'),)),
+        Message("tool", f"Diagram created successfully: {diagram}", tool_call_id="call_0"),
+        Message("assistant", "**Step 1:** $x^2 = 4$, so $x = \\pm 2$ and \\(\\frac{4}{2} = 2\\). <b>Done</b>"),
+        Message("system", f"Diagram created successfully: {diagram}", tool_call_id="call_0"),
+    ]
+    return SimpleNamespace(state=SimpleNamespace(messages=messages))
+
+
+def test_blocks_follow_the_conversation(tmp_path):
+    kinds = [kind for kind, _ in iter_blocks(make_session(tmp_path))]
+    assert kinds == ["user", "diagram", "assistant", "diagram"]
+
+
+def test_html_is_self_contained(tmp_path):
+    page = export_session(make_session(tmp_path), tmp_path / "session.html").read_text(encoding="utf-8")
+    assert "://" not in page  # nothing is fetched when the file is opened
+    assert page.count('<img class="math"') == 4
+    assert page.count("data:image/png;base64,") == 2
+    assert "&lt;b&gt;Done&lt;/b&gt;" in page
+    assert "<strong>Step 1:</strong>" in page
+
+
+def test_pdf_is_written(tmp_path):
+    path = export_session(make_session(tmp_path), tmp_path / "session.pdf")
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+def test_a_cleaned_up_diagram_is_rendered_through_the_queue(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.delenv("LEARNING_AGENT_RENDER_SOCKET", raising=False)
+    redrawn = tmp_path / "redrawn.png"
+
+    def plot(**args):
+        figure = Figure(figsize=(2, 2))
+        figure.add_subplot().plot([0, 1], [args["c"], args["m"] + args["c"]])
+        figure.savefig(redrawn)
+        return str(redrawn)
+
+    engine = AgentEngine(registry=TOOL_REGISTRY, client=FakeClient(lambda request: completion("unused")))
+    engine.tool_functions = {"plot_linear_function": plot}
+    agent = LearningAgent(engine=engine)
+    agent.state.messages = [
+        Message("user", "Draw y = 2x + 1"),
+        Message("assistant", None, tool_calls=(("call_0", "plot_linear_function", '{"m": 2, "c": 1}'),)),
+        Message("tool", f"Diagram created successfully: {tmp_path / 'removed.png'}", tool_call_id="call_0"),
+    ]
+    submitted = RENDER_QUEUE.stats()["submitted"]
+
+    page = export_session(agent, tmp_path / "session.html").read_text(encoding="utf-8")
+
+    assert page.count("data:image/png;base64,") == 1
+    assert RENDER_QUEUE.stats()["submitted"] == submitted + 1
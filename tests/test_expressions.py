@@ -0,0 +1,50 @@
+"""Tests for the safe expression compiler"""
+
+import numpy as np
+import pytest
+
+from tools.expressions import ExpressionError, MAX_EXPONENT, adaptive_viewport, compile_expression
+
+
+@pytest.mark.parametrize("source, x, expected", [
+    ("2x + 1", [0.0, 1.0], [1.0, 3.0]),
+    ("y = x^2", [-2.0, 3.0], [4.0, 9.0]),
+    ("(x-2)(x+3)", [2.0, 0.0], [0.0, -6.0]),
+    ("x²", [3.0], [9.0]),
+    ("x^-2", [2.0], [0.25]),
+    ("2sin(x)", [0.0], [0.0]),
+    ("where(x < 4, 5x, 20)", [1.0, 5.0], [5.0, 20.0]),
+    ("where(x > 0 and x < 2, 1, 0)", [-1.0, 1.0, 3.0], [0.0, 1.0, 0.0]),
+    ("where(x < 0 or x > 2, 1, 0)", [-1.0, 1.0, 3.0], [1.0, 0.0, 1.0]),
+])
+def test_school_notation_compiles(source, x, expected):
+    assert np.allclose(compile_expression(source)(np.array(x)), expected)
+
+
+def test_undefined_points_become_nan():
+    y = compile_expression("1/x")(np.array([0.0, 2.0]))
+    assert np.isnan(y[0]) and y[1] == 0.5
+
+
+@pytest.mark.parametrize("source", [
+    "x^-'a'",
+    "x^'a'",
+    "x^x",
+    f"x^{MAX_EXPONENT + 1}",
+    "__import__('os')",
+    "x.real",
+    "y + 1",
+    "lambda: 1",
+    "sin(x, x)",
+    "x" * 300,
+])
+def test_unsafe_or_unsupported_formulas_are_rejected(source):
+    with pytest.raises(ExpressionError):
+        compile_expression(source)
+
+
+def test_viewport_contains_roots():
+    x, ys, (y_min, y_max) = adaptive_viewport([compile_expression("(x-2)(x+3)")])
+    assert x.min() < -3 and x.max() > 2
+    assert ys.shape == (1, x.size)
+    assert y_min <= -6.25 < y_max
@@ -0,0 +1,79 @@
+"""Tests for the vectorized triangle solver"""
+
+import math
+
+import numpy as np
+import pytest
+
+from tools.geometry import (
+    AMBIGUOUS, IMPOSSIBLE, INCONSISTENT, INSUFFICIENT, SOLVED, TriangleError,
+    complete_from_type, solve_triangle, solve_triangles,
+)
+
+
+def test_three_sides():
+    triangle = solve_triangle([3, 4, 5])
+    assert triangle.status == SOLVED
+    assert triangle.angles == pytest.approx((36.8699, 53.1301, 90.0), abs=1e-3)
+    assert triangle.area == pytest.approx(6.0)
+    assert triangle.circumradius == pytest.approx(2.5)
+    assert triangle.angle_kind == "right" and triangle.right_angle_index == 2
+    assert triangle.side_kind == "scalene"
+
+
+def test_vertices_follow_the_conventions():
+    a, b, c = 7, 5, 6
+    triangle = solve_triangle([a, b, c])
+    (ax, ay), (bx, by), (cx, cy) = triangle.vertices
+    assert (ax, ay) == (0, 0) and by == pytest.approx(0) and bx == pytest.approx(c)
+    assert math.dist((bx, by), (cx, cy)) == pytest.approx(a)
+    assert math.dist((ax, ay), (cx, cy)) == pytest.approx(b)
+
+
+def test_two_angles_and_a_side():
+    triangle = solve_triangle(sides=[None, None, 10], angles=[60, 60, None])
+    assert triangle.sides == pytest.approx((10, 10, 10))
+    assert triangle.side_kind == "equilateral"
+
+
+def test_side_side_angle_with_two_solutions_uses_the_acute_one():
+    triangle = solve_triangle(sides=[8, 10, None], angles=[50, None, None])
+    assert triangle.status == AMBIGUOUS
+    assert triangle.angles[1] < 90
+
+
+def test_rounded_values_are_accepted():
+    # sqrt(10) given as 3.16
+    triangle = solve_triangle(sides=[3.16, 1, 3], angles=[None, None, 71.57])
+    assert triangle.status == SOLVED
+
+
+@pytest.mark.parametrize("sides, angles, message", [
+    ([1, 2, 10], None, "no triangle"),
+    ([3, 4, 5], [60, 60, 60], "contradict"),
+    ([3, None, None], None, "needs three sides"),
+])
+def test_unusable_measurements_raise(sides, angles, message):
+    with pytest.raises(TriangleError, match=message):
+        solve_triangle(sides, angles)
+
+
+def test_batch_solves_every_row_and_flags_the_rest():
+    nan = np.nan
+    batch = solve_triangles(
+        sides=[[3, 4, 5], [1, 2, 10], [3, 4, 5], [3, nan, nan]],
+        angles=[[nan] * 3, [nan] * 3, [60, 60, 60], [nan] * 3],
+    )
+    assert batch.status.tolist() == [SOLVED, IMPOSSIBLE, INCONSISTENT, INSUFFICIENT]
+    assert batch.ok.tolist() == [True, False, False, False]
+    assert batch.row(0).area == pytest.approx(6.0)
+
+
+@pytest.mark.parametrize("sides, angles, triangle_type, expected", [
+    (None, None, "isosceles", ([5, 5, 4], [None, None, None])),
+    ([4, 0, 0], None, "equilateral", ([4, 4, 4], [None, None, None])),
+    ([3, 4, 0], None, "right", ([3, 4, None], [None, None, 90])),
+    ([3, 5, 0], None, "isosceles", ([3, 5, 5], [None, None, None])),
+])
+def test_complete_from_type(sides, angles, triangle_type, expected):
+    assert complete_from_type(sides, angles, triangle_type) == expected
@@ -0,0 +1,58 @@
+"""Tests for the local linear and quadratic equation solver"""
+
+import pytest
+
+from agent.math_solver import solve_problem
+
+
+@pytest.mark.parametrize("message, answer", [
+    ("Solve 2x+3=7", "x = 2"),
+    ("Can you solve 3x - 4 = 11 for me?", "x = 5"),
+    ("Solve x/2+1=3", "x = 4"),
+    ("Solve 0.5x = 2", "x = 4"),
+    ("Solve x^2-5x+6=0", "x = 2 or x = 3"),
+    ("Solve x^2 = 4x", "x = 0 or x = 4"),
+    ("Solve x^2-2=0", "x = ±√2"),
+    ("Solve x^2+2x+5=0", "no real roots"),
+])
+def test_solves_one_variable_equations(message, answer):
+    solution = solve_problem(message)
+    assert solution is not None
+    assert solution.answer == answer
+
+
+def test_stray_leading_letter_is_dropped():
+    solution = solve_problem("x 2x + 3 = 7")
+    assert solution is not None
+    assert solution.answer == "x = 2"
+
+
+@pytest.mark.parametrize("message", [
+    "Solve x/(x-1)=1",          # no solution: x = 1 is excluded
+    "Solve (x^2-1)/(x-1)=2",    # no solution: x = 1 is excluded
+    "Solve 3/x=1",
+    "Solve 2x+3y=7",            # two unknowns
+    "Solve 1e2x=1",             # a number is never dropped to make the rest parse
+    "Solve 2x+3=2x+5",          # no variable left
+    "What is 2+3?",
+    "Solve 2x+3=7 and 3x-1=8",  # two equations: answering one would drop the other
+    "Solve x+1=2, x^2=9",
+    "factorise x^2 - 5x + 6",   # asks for (x - 2)(x - 3), not the roots
+    "Factorize x^2-5x+6=0",
+])
+def test_leaves_other_problems_to_the_model(message):
+    assert solve_problem(message) is None
+
+
+def test_working_ends_with_the_answer():
+    solution = solve_problem("Solve x^2-5x+6=0")
+    assert solution.degree == 2
+    assert solution.facts().endswith("- Answer: x = 2 or x = 3")
+    assert "x = 2 or x = 3" in solution.answer_text()
+
+
+def test_factorise_and_solve_is_still_solved():
+    solution = solve_problem("Factorise and solve x^2-5x+6=0")
+    assert solution is not None and solution.requested
+    assert solution.answer == "x = 2 or x = 3"
+    assert any(step.startswith("Factorise: ") for step in solution.steps)
@@ -0,0 +1,119 @@
+"""Tests for the fast/strong model routing cascade"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent import LearningAgent
+from agent.engine import AgentEngine
+from agent.model_router import ModelRouter, Route
+from tools import TOOL_REGISTRY
+
+from fake_openai import USAGE, FakeClient, completion
+
+FAST = Route("fast", "fast-model", 800)
+STRONG = Route("strong", "strong-model", 2000)
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.delenv("LEARNING_AGENT_CASSETTE", raising=False)
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(fast=FAST, strong=STRONG)
+
+
+@pytest.mark.parametrize("message, route, reason", [
+    ("thanks!", "fast", "small talk"),
+    ("What is a tissue?", "fast", "simple turn"),
+    ("Solve 2x + 3 = 7", "strong", "multi-step maths/science"),
+    ("Draw a triangle with sides 3, 4 and 5", "strong", "diagram tool likely"),
+    (" ".join(["word"] * 41), "strong", "long message"),
+])
+def test_classification(router, message, route, reason):
+    decision = router.classify(message)
+    assert decision.route.name == route
+    assert reason in decision.reasons
+
+
+def test_follow_up_inherits_the_previous_question(router):
+    history = [{"role": "user", "content": "Solve x^2 - 5x + 6 = 0"}, {"role": "assistant", "content": "x = 2 or 3"}]
+    decision = router.classify("why?", history)
+    assert decision.features["follow_up"]
+    assert decision.route is STRONG
+
+
+def test_deep_conversation_goes_strong(router):
+    history = [{"role": "user", "content": "hi"}] * 9
+    assert router.classify("What is a tissue?", history).reasons == ["deep conversation"]
+
+
+def message(content=None, tool_calls=None):
+    return SimpleNamespace(content=content, tool_calls=tool_calls)
+
+
+@pytest.mark.parametrize("reply, finish_reason, confident", [
+    (message("Osmosis is the movement of water across a membrane."), "stop", True),
+    (message("I'm not sure, but it might be 4."), "stop", False),
+    (message("Osmosis is"), "length", False),
+    (message(""), "stop", False),
+    (message(None, tool_calls=[object()]), "tool_calls", True),
+])
+def test_check_confidence(router, reply, finish_reason, confident):
+    assert router.check_confidence(reply, finish_reason) is confident
+
+
+def test_record_and_report(router):
+    router.record("fast", 0.2, {"prompt_tokens": 100, "completion_tokens": 10})
+    router.record("fast", 0.4, {"prompt_tokens": 300, "completion_tokens": 30})
+    router.record("strong", 1.0, {"prompt_tokens": 500, "completion_tokens": 50}, escalated=True)
+
+    report = router.report()
+
+    assert report["fast"]["turns"] == 2 and report["fast"]["escalations"] == 0
+    assert report["fast"]["model"] == "fast-model"
+    assert report["fast"]["mean_latency_s"] == 0.3
+    assert report["fast"]["mean_prompt_tokens"] == 200
+    assert report["strong"] == pytest.approx({
+        "turns": 1, "escalations": 1, "latency_s": 1.0, "prompt_tokens": 500, "completion_tokens": 50,
+        "model": "strong-model", "mean_latency_s": 1.0, "mean_prompt_tokens": 500, "mean_completion_tokens": 50,
+    })
+
+
+def make_agent(router, script):
+    engine = AgentEngine(registry=TOOL_REGISTRY, client=FakeClient(script))
+    return LearningAgent(engine=engine, router=router)
+
+
+def test_unsure_fast_answer_is_escalated(router):
+    def script(request):
+        if request["model"] == FAST.model:
+            return completion("I'm not sure what a tissue is.")
+        return completion("A tissue is a group of similar cells.")
+
+    agent = make_agent(router, script)
+
+    answer = asyncio.run(agent.chat("What is a tissue?"))
+
+    models = [call["model"] for call in agent.engine.client.chat.completions.calls]
+    assert answer == "A tissue is a group of similar cells."
+    assert models == [FAST.model, STRONG.model]
+    report = router.report()
+    assert set(report) == {"strong"}
+    assert report["strong"]["escalations"] == 1
+    assert report["strong"]["prompt_tokens"] == 2 * USAGE["prompt_tokens"]
+
+
+def test_confident_fast_answer_is_kept(router):
+    agent = make_agent(router, lambda request: completion("A tissue is a group of similar cells."))
+
+    asyncio.run(agent.chat("What is a tissue?"))
+
+    assert [call["model"] for call in agent.engine.client.chat.completions.calls] == [FAST.model]
+    assert agent.engine.client.chat.completions.calls[0]["max_tokens"] == FAST.max_tokens
+    assert router.report()["fast"]["turns"] == 1
+    assert agent.last_route.route is FAST
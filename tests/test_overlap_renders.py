@@ -0,0 +1,95 @@
+"""Tests for diagrams rendered alongside the final answer"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent import LearningAgent
+from agent.engine import AgentEngine
+from agent.learning_agent import RENDER_FLIGHT
+from agent.render_queue import RENDER_QUEUE
+from tools import TOOL_REGISTRY
+
+from fake_openai import FakeClient, FakeStream, completion
+
+TOOL_CALLS = [
+    ("plot_quadratic_function", {"a": 1, "b": -5, "c": 6}),
+    ("plot_linear_function", {"m": 2, "c": 1}),
+    ("draw_triangle", {"sides": [3, 4, 5]}),
+    ("plot_linear_function", {"m": 3, "c": 1}),
+]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.delenv("LEARNING_AGENT_RENDER_SOCKET", raising=False)
+    monkeypatch.delenv("LEARNING_AGENT_CASSETTE", raising=False)
+
+
+def script(request):
+    if request.get("stream"):
+        return FakeStream(["The ", "answer."])
+    if request.get("tool_choice") != "none" and request["messages"][-1].get("role") == "user":
+        return completion(tool_calls=TOOL_CALLS)
+    return completion("Plain answer")
+
+
+class Renders:
+    """Tool functions that record their calls instead of drawing"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def functions(self):
+        def tool(name):
+            def render(**args):
+                time.sleep(self.delay)
+                with self._lock:
+                    self.calls.append(name)
+                return f"diagrams/{name}_{len(self.calls)}.png"
+            return render
+        return {name: tool(name) for name in TOOL_REGISTRY.functions()}
+
+
+def make_agent(renders: Renders) -> LearningAgent:
+    engine = AgentEngine(registry=TOOL_REGISTRY, client=FakeClient(script))
+    engine.tool_functions = renders.functions()
+    return LearningAgent(engine=engine, overlap_renders=True)
+
+
+async def reply(agent: LearningAgent) -> str:
+    return "".join([part async for part in agent.chat_stream("Draw these for me")])
+
+
+def test_more_diagrams_than_the_session_quota_are_all_delivered():
+    assert len(TOOL_CALLS) > RENDER_QUEUE.session_limit
+    renders = Renders()
+    agent = make_agent(renders)
+    rejected = RENDER_QUEUE.stats()["rejected"]
+
+    text = asyncio.run(reply(agent))
+
+    assert text.count("Diagram created successfully") == len(TOOL_CALLS)
+    assert "❌" not in text
+    assert len(agent.last_diagrams) == len(TOOL_CALLS)
+    assert RENDER_QUEUE.stats()["rejected"] == rejected
+
+
+def test_identical_overlapped_renders_are_shared():
+    renders = Renders(delay=0.2)
+    followers = RENDER_FLIGHT.followers
+
+    async def two_sessions():
+        return await asyncio.gather(reply(make_agent(renders)), reply(make_agent(renders)))
+
+    texts = asyncio.run(two_sessions())
+
+    for text in texts:
+        assert text.count("Diagram created successfully") == len(TOOL_CALLS)
+    assert RENDER_FLIGHT.followers > followers
+    assert len(renders.calls) < 2 * len(TOOL_CALLS)
@@ -0,0 +1,88 @@
+"""Tests for the byte-stable request prefix across turns"""
+
+import asyncio
+import json
+
+import pytest
+
+from agent import LearningAgent
+from agent.curriculum_index import REFERENCE_HEADER, CurriculumIndex, build_index
+from agent.engine import AgentEngine
+from agent.math_solver import FACTS, SOLUTION_HEADER
+from tools import TOOL_REGISTRY
+
+from fake_openai import FakeClient, FakeStream, completion
+
+RECORDS = [
+    ("Linear Equations", "A linear equation in one variable has one solution. Collect the variable terms on one side."),
+    ("Motion", "Velocity is the rate of change of displacement."),
+]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.delenv("LEARNING_AGENT_RENDER_SOCKET", raising=False)
+    monkeypatch.delenv("LEARNING_AGENT_CASSETTE", raising=False)
+    monkeypatch.delenv("LEARNING_AGENT_CURRICULUM_INDEX", raising=False)
+
+
+def script(request):
+    if request.get("stream"):
+        return FakeStream(["The ", "answer."])
+    if request.get("tool_choice") != "none" and request["messages"][-1].get("role") == "user":
+        return completion(tool_calls=[("plot_linear_function", {"m": 2, "c": 3})])
+    return completion("Plain answer")
+
+
+def make_agent(tmp_path) -> LearningAgent:
+    build_index(RECORDS, tmp_path)
+    engine = AgentEngine(registry=TOOL_REGISTRY, client=FakeClient(script),
+                         curriculum_index=CurriculumIndex(tmp_path))
+    engine.tool_functions = {name: (lambda **args: "diagrams/line.png") for name in TOOL_REGISTRY.functions()}
+    return LearningAgent(engine=engine, math_solver=FACTS)
+
+
+def encoded(messages):
+    return [json.dumps(message, sort_keys=True, ensure_ascii=False) for message in messages]
+
+
+def test_each_turn_starts_with_every_byte_of_the_previous_turn(tmp_path):
+    agent = make_agent(tmp_path)
+    questions = [
+        "Solve the linear equation 2x + 3 = 7",
+        "Why do we collect the variable terms on one side of a linear equation?",
+        "Draw y = 2x + 3 and solve 2x + 3 = 0",
+    ]
+
+    async def conversation():
+        turns = []
+        for question in questions:
+            calls = agent.engine.client.chat.completions.calls
+            first = len(calls)
+            async for _ in agent.chat_stream(question):
+                pass
+            turns.append(calls[first:])
+        return turns
+
+    turns = asyncio.run(conversation())
+
+    extras = [m["content"] for m in turns[0][0]["messages"] if m["role"] == "system"][1:]
+    assert any(content.startswith(REFERENCE_HEADER) for content in extras)
+    assert any(content.startswith(SOLUTION_HEADER) for content in extras)
+    for previous, following in zip(turns, turns[1:]):
+        later = encoded(following[0]["messages"])
+        for request in previous:
+            earlier = encoded(request["messages"])
+            assert later[:len(earlier)] == earlier
+            assert json.dumps(request["tools"], sort_keys=True) == json.dumps(following[0]["tools"], sort_keys=True)
+
+
+def test_extras_go_just_before_their_question(tmp_path):
+    agent = make_agent(tmp_path)
+    asyncio.run(agent.chat("Solve the linear equation 2x + 3 = 7"))
+
+    roles = [(m["role"], (m["content"] or "")[:20]) for m in agent.conversation_history]
+    assert [role for role, _ in roles[:4]] == ["system", "system", "system", "user"]
+    assert roles[1][1].startswith(REFERENCE_HEADER[:20])
+    assert roles[2][1].startswith(SOLUTION_HEADER[:20])
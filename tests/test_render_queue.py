@@ -0,0 +1,77 @@
+"""Tests for render admission control: priorities, quotas, deadlines and shared tickets"""
+
+import asyncio
+import threading
+
+import pytest
+
+from agent.render_queue import RenderQueue, RenderQuotaExceeded, RenderSkipped, RenderTicket
+
+
+def blocked_queue(**kwargs):
+    """A one-slot queue whose first render holds the slot until release is set"""
+    queue = RenderQueue(max_concurrent=1, start_deadline=1.0, late_deadline=5.0, **kwargs)
+    release = threading.Event()
+    blocker = queue.submit(lambda: release.wait(5) and "blocker")
+    return queue, blocker, release
+
+
+def test_lower_priority_value_runs_first():
+    queue, _, release = blocked_queue()
+    order = []
+    later = queue.submit(lambda: order.append("later"), priority=1)
+    first = queue.submit(lambda: order.append("first"), priority=0)
+    release.set()
+
+    async def finish():
+        await first.wait(5)
+        await later.wait(5)
+
+    asyncio.run(finish())
+    assert order == ["first", "later"]
+
+
+def test_session_quota_rejects_extra_renders():
+    queue, _, release = blocked_queue(session_limit=2)
+    queue.submit(lambda: None, session="a")
+    queue.submit(lambda: None, session="a")
+    with pytest.raises(RenderQuotaExceeded):
+        queue.submit(lambda: None, session="a")
+    queue.submit(lambda: None, session="b")
+    release.set()
+    assert queue.stats()["rejected"] == 1
+
+
+def test_expired_render_is_skipped():
+    queue, _, release = blocked_queue()
+    late = queue.submit(lambda: "late", expires_in=0.0)
+    release.set()
+    with pytest.raises(RenderSkipped):
+        asyncio.run(late.wait(5))
+    assert queue.stats()["expired"] == 1
+
+
+def test_one_waiter_cancelling_keeps_a_shared_render():
+    queue, _, release = blocked_queue()
+    ticket = queue.submit(lambda: "diagram.png")
+    leader, follower = ticket.waiter(), ticket.waiter()
+    follower.cancel()
+    assert ticket.state == RenderTicket.QUEUED
+    release.set()
+    assert asyncio.run(leader.wait(5)) == "diagram.png"
+    with pytest.raises(RenderSkipped):
+        asyncio.run(follower.wait(5))
+
+
+def test_last_waiter_cancelling_drops_the_render():
+    queue, _, release = blocked_queue()
+    ticket = queue.submit(lambda: "diagram.png")
+    waiters = [ticket.waiter(), ticket.waiter()]
+    for waiter in waiters:
+        waiter.cancel()
+    waiters[0].cancel()     # cancelling twice detaches once
+    assert ticket.state == RenderTicket.CANCELLED
+    release.set()
+    with pytest.raises(RenderSkipped):
+        asyncio.run(ticket.wait(5))
+    assert queue.stats()["cancelled"] == 1
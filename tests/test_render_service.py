@@ -0,0 +1,87 @@
+"""Tests for the render service's result cache"""
+
+import asyncio
+import hashlib
+import os
+
+from agent.render_service import RenderService
+from agent.single_flight import request_key
+
+
+class FakePool:
+    """Writes one file per distinct request, like the diagram tools"""
+
+    workers = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.renders = 0
+
+    def render(self, tool_name, tool_args):
+        self.renders += 1
+        digest = hashlib.sha1(request_key(tool_name, tool_args).encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(self.directory, f"{tool_name}_{digest}.png")
+        with open(path, "w") as f:
+            f.write(f"{tool_args['values']}\n")
+        return path
+
+    def stats(self):
+        return {"renders": self.renders}
+
+
+def make_service(tmp_path):
+    service = RenderService(socket_path=str(tmp_path / "render.sock"), workers=1)
+    service.pool = FakePool(str(tmp_path))
+    return service
+
+
+def test_repeat_is_served_from_cache(tmp_path):
+    service = make_service(tmp_path)
+
+    async def scenario():
+        args = {"graph_type": "distance_time", "values": [[0, 0], [1, 2]]}
+        first = await service.render("plot_motion_graph", args)
+        second = await service.render("plot_motion_graph", dict(args))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second
+    assert service.pool.renders == 1
+    assert service.stats()["cache_hits"] == 1
+
+
+def test_removed_file_is_rendered_again(tmp_path):
+    service = make_service(tmp_path)
+    args = {"graph_type": "speed_time", "values": [[0, 1], [2, 3]]}
+
+    async def scenario():
+        path = await service.render("plot_motion_graph", args)
+        os.remove(path)
+        return await service.render("plot_motion_graph", args)
+
+    assert os.path.exists(asyncio.run(scenario()))
+    assert service.pool.renders == 2
+
+
+def test_concurrent_motion_graphs_keep_their_own_files(tmp_path):
+    service = RenderService(socket_path=str(tmp_path / "render.sock"), workers=2)
+    requests = [
+        {"graph_type": "distance-time", "values": [[0, 0], [1, 2], [2, 4]]},
+        {"graph_type": "distance-time", "values": [[0, 0], [1, 5], [2, 10]]},
+    ]
+
+    async def scenario():
+        first = await asyncio.gather(*(service.render("plot_motion_graph", args) for args in requests))
+        again = await asyncio.gather(*(service.render("plot_motion_graph", args) for args in requests))
+        return first, again
+
+    try:
+        first, again = asyncio.run(scenario())
+        with open(first[0], "rb") as a, open(first[1], "rb") as b:
+            assert a.read() != b.read()
+    finally:
+        service.pool.close()
+
+    assert first[0] != first[1]
+    assert again == first
+    assert service.stats()["cache_hits"] == 2
@@ -0,0 +1,67 @@
+"""Tests for supervised render workers and the soak benchmark's leak check"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agent.render_workers import RenderWorkerError, RenderWorkerPool
+from benchmarks.render_soak import generation_growth
+
+MB = 2**20
+
+
+def test_workers_are_recycled_and_keep_their_peaks():
+    pool = RenderWorkerPool(1, max_renders=2, memory_limit_mb=4096)
+    try:
+        for m in (1, 2, 3):
+            pool.render("plot_linear_function", {"m": m, "c": 0, "filename": "test_worker_linear.png"})
+        with pytest.raises(RenderWorkerError):
+            pool.render("plot_linear_function", {"m": 1, "c": 0, "filename": "missing_folder/x.png"})
+        history = pool.worker_history()
+        stats = pool.stats()
+    finally:
+        pool.close()
+
+    assert stats["spawned"] == 2 and stats["recycled_renders"] == 2
+    assert [(generation, renders) for generation, renders, _, _ in history] == [(1, 2), (2, 2)]
+    for _, _, first, peak in history:
+        assert 0 < first <= peak
+
+
+def test_parallel_motion_graphs_of_one_type_get_their_own_files():
+    requests = [
+        {"graph_type": "velocity-time", "values": [[0, 0], [1, 3], [2, 6]]},
+        {"graph_type": "velocity-time", "values": [[0, 4], [1, 4], [2, 4]]},
+    ]
+    pool = RenderWorkerPool(2)
+    try:
+        with ThreadPoolExecutor(2) as threads:
+            paths = list(threads.map(lambda args: pool.render("plot_motion_graph", args), requests))
+        assert pool.stats()["spawned"] == 2
+    finally:
+        pool.close()
+
+    assert paths[0] != paths[1]
+    with open(paths[0], "rb") as first, open(paths[1], "rb") as second:
+        assert first.read() != second.read()
+
+
+def test_growth_compares_first_and_last_generation_peaks():
+    # Two workers, three generations; every life starts at 100 MB and peaks 10 MB higher per generation
+    history = [(g * 2 + w + 1, 200, 100 * MB, (110 + 10 * g) * MB) for g in range(3) for w in range(2)]
+    history.append((7, 50, 100 * MB, 105 * MB))  # still live, part of a life: not compared
+    first, last, within = generation_growth(history, workers=2, max_renders=200, memory_limit=400 * MB)
+    assert (first, last) == (110, 130)
+    assert within == 30
+
+
+def test_recycling_hides_no_leak_behind_a_falling_total():
+    # Live RSS drops after each recycle, but every generation peaks at the memory ceiling
+    history = [(1, 200, 100 * MB, 150 * MB), (2, 120, 100 * MB, 400 * MB), (3, 90, 100 * MB, 400 * MB)]
+    first, last, _ = generation_growth(history, workers=1, max_renders=200, memory_limit=400 * MB)
+    assert last - first == 250
+
+
+def test_too_few_generations_to_compare():
+    history = [(1, 200, 100 * MB, 120 * MB), (2, 10, 100 * MB, 101 * MB)]
+    assert generation_growth(history, workers=1, max_renders=200, memory_limit=400 * MB) is None
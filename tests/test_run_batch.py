@@ -0,0 +1,123 @@
+"""Tests for the bulk question runner's pacing, retries, resume and artifacts"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import run_batch as batch
+
+
+def test_rate_gate_spaces_request_starts():
+    gate = batch.RateGate(requests_per_minute=600)  # one start every 0.1 s
+
+    async def three_starts():
+        starts = []
+        for _ in range(3):
+            await gate.wait()
+            starts.append(time.monotonic())
+        return starts
+
+    starts = asyncio.run(three_starts())
+    assert starts[2] - starts[0] >= 0.19
+
+
+def test_rate_gate_pause_holds_every_worker():
+    gate = batch.RateGate()
+
+    async def paused_start():
+        gate.pause(0.2)
+        started = time.monotonic()
+        await gate.wait()
+        return time.monotonic() - started
+
+    assert asyncio.run(paused_start()) >= 0.19
+
+
+def error_with(headers):
+    return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+@pytest.mark.parametrize("headers, low, high", [
+    ({"retry-after": "7"}, 7, 7),
+    ({"retry-after": "0"}, 1, 1),           # never sooner than a second
+    ({"retry-after": "soon"}, 8, 9),        # unparseable: backoff for attempt 3
+    ({}, 8, 9),
+])
+def test_retry_after_header_or_backoff(headers, low, high):
+    assert low <= batch._retry_after_seconds(error_with(headers), attempt=3) <= high
+
+
+def test_backoff_is_capped():
+    assert batch._retry_after_seconds(ValueError("no response"), attempt=20) <= 61
+
+
+def test_resume_skips_only_successful_ids(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "q1", "error": None}) + "\n"
+        + json.dumps({"id": 2, "error": None}) + "\n"
+        + json.dumps({"id": "q3", "error": "RateLimitError: slow down"}) + "\n"
+        + '{"id": "q4", "err',                      # interrupted mid-line
+        encoding="utf-8",
+    )
+    assert batch.load_completed_ids(output) == {"q1", "2"}
+    assert batch.load_completed_ids(tmp_path / "missing.jsonl") == set()
+
+
+@pytest.mark.parametrize("question_id", ["../x", "..", "a/b", "/etc/passwd", "a\\..\\b"])
+def test_artifact_folders_stay_inside_the_artifacts_dir(tmp_path, question_id):
+    diagram = tmp_path / "line.png"
+    diagram.write_bytes(b"png")
+    artifacts = tmp_path / "artifacts"
+
+    copied = batch.copy_artifacts([str(diagram)], artifacts, question_id)
+
+    assert len(copied) == 1
+    assert artifacts.resolve() in (tmp_path / copied[0]).resolve().parents
+
+
+def test_safe_ids_keep_their_name_and_others_never_collide():
+    assert batch.artifact_folder_name("ch2-q14") == "ch2-q14"
+    assert batch.artifact_folder_name("a/b") != batch.artifact_folder_name("a_b")
+
+
+class FakeAgent:
+    def __init__(self, **kwargs):
+        self.last_diagrams = ["diagrams/line.png"]
+        self.last_usage = {"total_tokens": 10}
+
+    async def chat(self, question):
+        return f"answer to {question}"
+
+
+def test_failed_copy_fails_only_that_question(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "LearningAgent", FakeAgent)
+
+    def copy(diagrams, artifacts_dir, question_id):
+        if question_id == "bad":
+            raise PermissionError("read-only folder")
+        return diagrams
+
+    monkeypatch.setattr(batch, "copy_artifacts", copy)
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("".join(
+        json.dumps({"id": question_id, "question": "Why?"}) + "\n"
+        for question_id in ("good", "bad", "good", "other")
+    ), encoding="utf-8")
+    results = tmp_path / "results.jsonl"
+
+    asyncio.run(batch.run_batch(questions, results, concurrency=2, artifacts_dir=tmp_path / "artifacts"))
+
+    records = {}
+    for line in results.read_text(encoding="utf-8").splitlines():
+        record = json.loads(line)
+        assert record["id"] not in records  # the repeated id is answered once
+        records[record["id"]] = record
+    assert set(records) == {"good", "bad", "other"}
+    assert records["good"]["error"] is None and records["other"]["error"] is None
+    assert "read-only folder" in records["bad"]["error"]
+    assert records["bad"]["answer"] == "answer to Why?"
+    assert batch.load_completed_ids(results) == {"good", "other"}
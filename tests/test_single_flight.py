@@ -0,0 +1,148 @@
+"""Tests for coalescing identical concurrent work"""
+
+import asyncio
+
+import pytest
+
+from agent.single_flight import FlightCancelled, SingleFlight, StreamFlight, request_key
+
+
+def test_request_key_ignores_argument_order():
+    assert request_key("tool", {"a": 1, "b": 2}) == request_key("tool", {"b": 2, "a": 1})
+    assert request_key("tool", {"a": 1}) != request_key("tool", {"a": 2})
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "diagram.png"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert runs == [1]
+    assert [result for result, _ in results] == ["diagram.png"] * 5
+    assert sorted(leader for _, leader in results) == [False] * 4 + [True]
+    assert flight.stats() == {"leaders": 1, "followers": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter_and_nothing_is_cached():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("bad arguments")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            await flight.do("key", work)
+
+    asyncio.run(scenario())
+    assert len(runs) == 2
+
+
+def test_work_survives_until_its_last_waiter_leaves():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled and len(flight) == 1
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == [1] and len(flight) == 0
+        for task in (first, second):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(scenario())
+
+
+class Upstream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+def test_stream_is_fanned_out_and_late_joiners_replay():
+    flight = StreamFlight()
+    opened = []
+
+    async def open_stream():
+        opened.append(Upstream(["a", "b", "c"]))
+        return opened[-1]
+
+    async def read(delay):
+        await asyncio.sleep(delay)
+        stream, _ = await flight.subscribe("key", open_stream)
+        return [chunk async for chunk in stream]
+
+    async def scenario():
+        return await asyncio.gather(read(0), read(0.015))
+
+    assert asyncio.run(scenario()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_stream_is_closed_when_every_subscriber_stops():
+    flight = StreamFlight()
+    upstream = Upstream(["a"] * 100)
+
+    async def open_stream():
+        return upstream
+
+    async def scenario():
+        stream, leader = await flight.subscribe("key", open_stream)
+        assert leader
+        async for _ in stream:
+            break
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert upstream.closed
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_shared_work_is_not_a_cancellation_of_the_waiter():
+    flight = SingleFlight()
+
+    async def work():
+        raise asyncio.CancelledError()
+
+    async def scenario():
+        with pytest.raises(FlightCancelled):
+            await flight.do("key", work)
+
+    asyncio.run(scenario())
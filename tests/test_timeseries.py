@@ -0,0 +1,102 @@
+"""Tests for motion data loading, derived series and LTTB downsampling"""
+
+import numpy as np
+import pytest
+
+from tools import timeseries
+from tools.timeseries import derive_series, load_series, lttb, resolve_data_file
+
+
+def test_lttb_keeps_the_endpoints_and_one_point_per_bucket():
+    times = np.arange(1000, dtype=float)
+    values = np.sin(times / 50)
+
+    t, v = lttb(times, values, 100)
+
+    assert len(t) == len(v) == 100
+    assert (t[0], v[0]) == (times[0], values[0])
+    assert (t[-1], v[-1]) == (times[-1], values[-1])
+    assert np.all(np.diff(t) > 0)
+    assert np.isin(t, times).all()
+
+
+def test_lttb_keeps_a_spike():
+    times = np.arange(500, dtype=float)
+    values = np.zeros(500)
+    values[321] = 10.0
+    t, v = lttb(times, values, 20)
+    assert 321.0 in t and v.max() == 10.0
+
+
+@pytest.mark.parametrize("threshold", [10, 11, 50, 2])
+def test_lttb_returns_everything_at_or_above_n_or_below_three(threshold):
+    times = np.arange(10, dtype=float)
+    values = times ** 2
+    t, v = lttb(times, values, threshold)
+    assert np.array_equal(t, times) and np.array_equal(v, values)
+
+
+def test_derived_velocity_and_acceleration():
+    times = np.linspace(0, 4, 41)
+    distance = 3 * times + 0.5 * 2 * times ** 2           # u = 3 m/s, a = 2 m/s²
+    velocity = derive_series(times, distance, "velocity")
+    assert velocity[1:-1] == pytest.approx(3 + 2 * times[1:-1])
+    assert derive_series(times, velocity, "acceleration")[2:-2] == pytest.approx(2)
+
+
+def test_derived_area_is_the_displacement():
+    times = np.array([0.0, 1.0, 2.0, 4.0])
+    velocity = np.array([0.0, 2.0, 2.0, 6.0])
+    assert derive_series(times, velocity, "area").tolist() == [0.0, 1.0, 3.0, 11.0]
+
+
+def test_repeated_timestamps_do_not_divide_by_zero():
+    times = np.array([0.0, 1.0, 1.0, 2.0, 3.0])
+    distance = np.array([0.0, 2.0, 2.0, 4.0, 6.0])
+    velocity = derive_series(times, distance, "velocity")
+    assert np.isfinite(velocity).all()
+    assert velocity == pytest.approx(2.0)
+
+
+def test_unknown_derived_series():
+    with pytest.raises(ValueError):
+        derive_series([0, 1], [0, 1], "jerk")
+
+
+def test_load_series_drops_non_finite_and_sorts(tmp_path):
+    data = np.array([[2.0, 20.0], [0.0, 0.0], [1.0, np.nan], [1.5, 15.0]])
+    path = tmp_path / "log.npy"
+    np.save(path, data)
+    times, values = load_series(path)
+    assert times.tolist() == [0.0, 1.5, 2.0]
+    assert values.tolist() == [0.0, 15.0, 20.0]
+
+    transposed = load_series(data.T)
+    assert transposed[0].tolist() == [0.0, 1.5, 2.0]
+
+
+def test_load_series_reads_csv_with_a_header(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("time,distance\n0,0\n1,2\n2,4\n", encoding="utf-8")
+    times, values = load_series(path)
+    assert times.tolist() == [0.0, 1.0, 2.0] and values.tolist() == [0.0, 2.0, 4.0]
+
+
+@pytest.mark.parametrize("name", ["../secret.csv", "/etc/passwd.csv", "nested/../../secret.csv"])
+def test_resolve_data_file_stays_inside_data_dir(tmp_path, monkeypatch, name):
+    data_dir = tmp_path / "data"
+    (data_dir / "nested").mkdir(parents=True)
+    (tmp_path / "secret.csv").write_text("0,0\n", encoding="utf-8")
+    monkeypatch.setattr(timeseries, "DATA_DIR", data_dir)
+    with pytest.raises(ValueError, match="inside"):
+        resolve_data_file(name)
+
+
+def test_resolve_data_file_finds_a_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(timeseries, "DATA_DIR", tmp_path)
+    (tmp_path / "run.csv").write_text("0,0\n", encoding="utf-8")
+    assert resolve_data_file("run.csv") == (tmp_path / "run.csv").resolve()
+    with pytest.raises(ValueError, match="not found"):
+        resolve_data_file("missing.csv")
+    with pytest.raises(ValueError, match="unsupported"):
+        resolve_data_file("run.exe")
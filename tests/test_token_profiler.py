@@ -0,0 +1,81 @@
+"""Tests for the per-component prompt token profiler"""
+
+import json
+from types import SimpleNamespace
+
+from agent import token_profiler
+from agent.curriculum_index import REFERENCE_HEADER
+from agent.math_solver import SOLUTION_HEADER
+from agent.token_profiler import (
+    COMPONENTS, TOKENS_PER_MESSAGE, TOKENS_PER_REQUEST, TokenProfiler, count_tokens,
+)
+
+TOOLS = [{"type": "function", "function": {"name": "plot_linear_function", "parameters": {"type": "object"}}}]
+
+MESSAGES = [
+    {"role": "system", "content": "You are a patient tutor."},
+    {"role": "user", "content": "Plot y = 2x + 1"},
+    {"role": "assistant", "content": None, "tool_calls": [
+        {"id": "call_0", "type": "function",
+         "function": {"name": "plot_linear_function", "arguments": '{"m": 2, "c": 1}'}},
+    ]},
+    {"role": "tool", "tool_call_id": "call_0", "content": "Diagram created successfully: line.png"},
+    {"role": "assistant", "content": "Here is the line."},
+    {"role": "system", "content": f"{REFERENCE_HEADER}: a line has a constant slope."},
+    {"role": "system", "content": f"{SOLUTION_HEADER} for 2x + 1 = 0: x = -1/2"},
+    {"role": "user", "content": "Where does it cross the x-axis?"},
+]
+
+
+def test_every_message_lands_in_its_component():
+    profile = TokenProfiler().profile_request(MESSAGES, TOOLS, label="tool_check")
+    c = profile.components
+
+    assert set(c) == set(COMPONENTS)
+    assert c["system_prompt"] == count_tokens(MESSAGES[0]["content"])
+    assert c["history_user"] == count_tokens(MESSAGES[1]["content"])
+    assert c["current_message"] == count_tokens(MESSAGES[-1]["content"])
+    assert c["tool_calls"] == count_tokens("plot_linear_function") + count_tokens('{"m": 2, "c": 1}')
+    assert c["tool_results"] == count_tokens(MESSAGES[3]["content"])
+    assert c["history_assistant"] == count_tokens(MESSAGES[4]["content"])
+    assert c["curriculum_reference"] == count_tokens(MESSAGES[5]["content"])
+    assert c["verified_working"] == count_tokens(MESSAGES[6]["content"])
+    assert c["tool_schemas"] == count_tokens(json.dumps(TOOLS, separators=(",", ":")))
+    assert c["overhead"] == TOKENS_PER_REQUEST + TOKENS_PER_MESSAGE * len(MESSAGES)
+    assert profile.estimated_total == sum(c.values())
+
+
+def test_schema_counts_follow_content_not_identity(monkeypatch):
+    profiler = TokenProfiler()
+    short = profiler.profile_request(MESSAGES[:2], [dict(TOOLS[0])]).components["tool_schemas"]
+    longer = TOOLS + [{"type": "function", "function": {"name": "draw_triangle", "parameters": {"type": "object"}}}]
+    assert profiler.profile_request(MESSAGES[:2], longer).components["tool_schemas"] > short
+    assert profiler.profile_request(MESSAGES[:2], list(TOOLS)).components["tool_schemas"] == short
+
+    monkeypatch.setattr(token_profiler, "SCHEMA_CACHE_SIZE", 2)
+    for i in range(5):
+        tools = [{"type": "function", "function": {"name": f"tool_{i}"}}]
+        profiler.profile_request(MESSAGES[:2], tools)
+    assert len(profiler._schema_cache) == 2
+
+
+def test_report_aggregates_and_compares_with_usage(tmp_path):
+    profiler = TokenProfiler(window=2)
+    for label in ("tool_check", "final_stream", "final_stream"):
+        profile = profiler.profile_request(MESSAGES, TOOLS, label=label)
+        profiler.record(profile, SimpleNamespace(prompt_tokens=profile.estimated_total * 2))
+
+    report = profiler.report()
+
+    assert report["requests"] == 3
+    assert report["totals"]["system_prompt"] == 3 * count_tokens(MESSAGES[0]["content"])
+    assert abs(sum(report["share"].values()) - 1) < 0.01
+    assert report["rolling_by_label"] == {
+        "final_stream": {"requests": 2, "estimated_tokens": 2 * profile.estimated_total},
+    }
+    assert report["estimate_vs_actual"] == 0.5
+    assert "Estimate / API prompt_tokens: 0.5" in profiler.format_report()
+
+    path = tmp_path / "tokens.json"
+    profiler.dump(path, include_requests=True)
+    assert len(json.loads(path.read_text())["recent_requests"]) == 2
@@ -0,0 +1,52 @@
+"""Tests for tool call argument validation, repair and cache keys"""
+
+import pytest
+
+from tools import TOOL_REGISTRY
+from tools.validation import ToolArgumentError, ToolArgumentValidator
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return TOOL_REGISTRY.validator
+
+
+def test_numbers_are_normalized_into_one_cache_key(validator):
+    first = validator.validate("plot_quadratic_function", {"a": "1", "b": 2.00000001, "c": 1})
+    second = validator.validate("plot_quadratic_function", '{"c": 1, "b": 2, "a": 1}')
+    assert first.args == {"a": 1, "b": 2, "c": 1}
+    assert first.key == second.key
+
+
+@pytest.mark.parametrize("tool_name, arguments, message", [
+    ("plot_quadratic", {"a": 1, "b": 2, "c": 1}, "unknown tool"),
+    ("plot_quadratic_function", "{bad", "not valid JSON"),
+    ("plot_quadratic_function", {"a": 1, "b": 2}, "missing required"),
+    ("plot_quadratic_function", {"a": 0, "b": 2, "c": 1}, "must not be 0"),
+    ("draw_triangle", {"sides": [1, 2, 10]}, "no triangle"),
+    ("draw_cell_diagram", {"cell_type": "animal", "highlight": ["chloroplast"]}, "no chloroplast"),
+    ("plot_expressions", {"expressions": ["x^-'a'"]}, "exponents must be numbers"),
+    ("plot_expressions", {"expressions": ["import os"]}, "expression"),
+])
+def test_unusable_arguments_raise_tool_argument_error(validator, tool_name, arguments, message):
+    with pytest.raises(ToolArgumentError, match=message):
+        validator.validate(tool_name, arguments)
+
+
+def test_one_sided_range_is_repaired(validator):
+    call = validator.validate("plot_expressions", {"expressions": ["2x+1"], "x_min": 3})
+    assert "x_min" not in call.args
+    assert call.repairs == ["ignored a one-sided x range"]
+
+
+def test_unexpected_check_failures_become_tool_argument_errors():
+    schema = {"type": "function", "function": {"name": "tool", "parameters": {
+        "type": "object", "properties": {"n": {"type": "number"}}, "required": ["n"],
+    }}}
+
+    def broken_check(args, repairs):
+        return args["n"] + "1"
+
+    validator = ToolArgumentValidator([schema], {"tool": broken_check})
+    with pytest.raises(ToolArgumentError, match="TypeError"):
+        validator.validate("tool", {"n": 1})
@@ -9,10 +9,19 @@ from .diagram_tools import (
     draw_cell_diagram,
     plot_motion_graph,
     draw_triangle,
+    plot_expressions,
+    animate_motion,
     DIAGRAM_TOOLS,
+    TOOL_REGISTRY,
     get_tool_functions,
+    get_tool_validator,
     cleanup_old_diagrams
 )
+from .registry import ToolRegistry, ToolSpec
+from .validation import ToolArgumentError, ToolArgumentValidator
+from .expressions import ExpressionError, compile_expression
+from .timeseries import load_series, derive_series, lttb
+from .geometry import TriangleError, solve_triangle, solve_triangles
 
 __all__ = [
     'plot_quadratic_function',
@@ -20,7 +29,23 @@ __all__ = [
     'draw_cell_diagram',
     'plot_motion_graph',
     'draw_triangle',
+    'plot_expressions',
+    'animate_motion',
     'DIAGRAM_TOOLS',
+    'TOOL_REGISTRY',
     'get_tool_functions',
-    'cleanup_old_diagrams'
+    'get_tool_validator',
+    'cleanup_old_diagrams',
+    'ToolRegistry',
+    'ToolSpec',
+    'ToolArgumentError',
+    'ToolArgumentValidator',
+    'ExpressionError',
+    'compile_expression',
+    'load_series',
+    'derive_series',
+    'lttb',
+    'TriangleError',
+    'solve_triangle',
+    'solve_triangles'
 ]
@@ -0,0 +1,214 @@
+"""
+Motion Animations
+Blitted frame rendering of an object moving in sync with its motion graph, encoded to GIF, APNG or MP4 in memory
+"""
+
+import io
+import shutil
+import subprocess
+import threading
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Output format -> file suffix (APNG is an animated .png)
+ANIMATION_FORMATS = {"gif": ".gif", "apng": ".png", "mp4": ".mp4"}
+
+# Frame budget: enough for smooth motion, small enough to encode in well under a second
+MAX_FRAMES = 60
+DEFAULT_FRAMES = 40
+FRAMES_PER_SECOND = 12
+
+# Frames are smaller than still diagrams: 8 x 5.5 in at 80 dpi = 640 x 440 px
+ANIMATION_SIZE = (8, 5.5)
+ANIMATION_DPI = 80
+
+# Samples of the curve when it comes from initial velocity and acceleration
+MODEL_SAMPLES = 200
+
+GRAPH_LABELS = {
+    "distance-time": "Distance (m)",
+    "velocity-time": "Velocity (m/s)",
+}
+
+
+def ffmpeg_available() -> bool:
+    """Whether MP4 can be encoded (needs the ffmpeg executable)"""
+    return shutil.which("ffmpeg") is not None
+
+
+def motion_series(graph_type: str, values=None, initial_velocity: float = 0.0,
+                  acceleration: float = 0.0, duration: float = 10.0
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The graph's curve and the object's position over time
+
+    Args:
+        graph_type: "distance-time" or "velocity-time"
+        values: Optional [time, value] pairs; otherwise uniform acceleration
+            from initial_velocity over duration seconds is used
+
+    Returns:
+        (times, graph values, positions along the track)
+    """
+    if values is not None:
+        pairs = np.asarray(values, dtype=float)
+        times, graph = pairs[:, 0], pairs[:, 1]
+    else:
+        times = np.linspace(0.0, duration, MODEL_SAMPLES)
+        if graph_type == "distance-time":
+            graph = initial_velocity * times + 0.5 * acceleration * times**2
+        else:
+            graph = initial_velocity + acceleration * times
+
+    if graph_type == "distance-time":
+        positions = graph
+    else:
+        # Displacement is the area under the velocity-time graph
+        steps = np.diff(times) * (graph[1:] + graph[:-1]) / 2
+        positions = np.concatenate(([0.0], np.cumsum(steps)))
+    return times, graph, positions
+
+
+def _padded_limits(low: float, high: float) -> Tuple[float, float]:
+    pad = max((high - low) * 0.08, 0.5)
+    return low - pad, high + pad
+
+
+def render_frames(graph_type: str, times: np.ndarray, graph: np.ndarray, positions: np.ndarray,
+                  frames: int = DEFAULT_FRAMES) -> Iterator[np.ndarray]:
+    """
+    Yield the animation's frames as RGB arrays
+
+    Everything that does not move (axes, grid, labels, the faint full curve
+    and the track) is drawn once. Each frame restores that background, draws
+    only the new piece of the traced curve and saves the result as the next
+    background, then draws the moving artists (marker, object, clock) on top.
+    """
+    figure = Figure(figsize=ANIMATION_SIZE, dpi=ANIMATION_DPI)
+    canvas = FigureCanvasAgg(figure)
+    track_ax, graph_ax = figure.subplots(2, 1, gridspec_kw={"height_ratios": [1, 3]})
+
+    track_ax.set_xlim(*_padded_limits(positions.min(), positions.max()))
+    track_ax.set_ylim(-1, 1)
+    track_ax.axhline(-0.35, color="0.4", linewidth=2)
+    track_ax.set_yticks([])
+    track_ax.set_xlabel("Position (m)", fontsize=10)
+    track_ax.set_title(graph_type.replace("-", " ").title(), fontsize=13, fontweight="bold")
+
+    graph_ax.plot(times, graph, color="0.85", linewidth=2)
+    graph_ax.set_xlim(*_padded_limits(times.min(), times.max()))
+    graph_ax.set_ylim(*_padded_limits(min(graph.min(), 0), max(graph.max(), 0)))
+    graph_ax.axhline(0, color="k", linewidth=0.5)
+    graph_ax.grid(True, alpha=0.3)
+    graph_ax.set_xlabel("Time (s)", fontsize=11)
+    graph_ax.set_ylabel(GRAPH_LABELS[graph_type], fontsize=11)
+    figure.tight_layout()
+
+    segment, = graph_ax.plot([], [], "b-", linewidth=2.5, animated=True)
+    marker, = graph_ax.plot([], [], "ro", markersize=9, animated=True)
+    body, = track_ax.plot([], [], "s", color="tab:orange", markersize=18, animated=True)
+    clock = graph_ax.text(0.02, 0.94, "", transform=graph_ax.transAxes, fontsize=11,
+                          verticalalignment="top", animated=True)
+
+    canvas.draw()
+    background = canvas.copy_from_bbox(figure.bbox)
+
+    frame_times = np.linspace(times[0], times[-1], max(2, frames))
+    frame_graph = np.interp(frame_times, times, graph)
+    frame_positions = np.interp(frame_times, times, positions)
+    previous = 0
+    for i, t in enumerate(frame_times):
+        canvas.restore_region(background)
+        # New trace piece: last frame's point, the samples passed since, this frame's point
+        piece = slice(np.searchsorted(times, frame_times[previous], side="right"),
+                      np.searchsorted(times, t, side="left"))
+        segment.set_data(
+            np.concatenate(([frame_times[previous]], times[piece], [t])),
+            np.concatenate(([frame_graph[previous]], graph[piece], [frame_graph[i]])),
+        )
+        graph_ax.draw_artist(segment)
+        background = canvas.copy_from_bbox(figure.bbox)
+        previous = i
+
+        marker.set_data([t], [frame_graph[i]])
+        body.set_data([frame_positions[i]], [0])
+        clock.set_text(f"t = {t:.1f} s")
+        for artist in (marker, clock):
+            graph_ax.draw_artist(artist)
+        track_ax.draw_artist(body)
+        yield np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+
+
+def encode_animation(frames: Iterator[np.ndarray], fmt: str, fps: int = FRAMES_PER_SECOND) -> bytes:
+    """
+    Encode frames into an in-memory GIF, APNG or MP4
+
+    MP4 frames are piped to ffmpeg as they are produced. GIF and APNG frames
+    are held until the file is written (at most MAX_FRAMES of 640 x 440).
+    """
+    if fmt == "mp4":
+        return _encode_mp4(frames, fps)
+
+    from PIL import Image
+
+    images = [Image.fromarray(frame) for frame in frames]
+    duration = round(1000 / fps)
+    buffer = io.BytesIO()
+    if fmt == "gif":
+        # One palette for every frame, taken from the last one (it has the whole trace and
+        # every moving artist): no flicker, and mapping onto it without dithering is cheap
+        palette = images[-1].quantize(colors=128)
+        no_dither = getattr(Image, "Dither", Image).NONE
+        images = [image.quantize(palette=palette, dither=no_dither) for image in images]
+        # optimize=False skips Pillow's per-frame palette/bbox search (about 15x faster, files
+        # somewhat larger)
+        images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:],
+                       duration=duration, loop=0, optimize=False)
+    else:
+        images[0].save(buffer, format="PNG", save_all=True, append_images=images[1:],
+                       duration=duration, loop=0)
+    return buffer.getvalue()
+
+
+def _encode_mp4(frames: Iterator[np.ndarray], fps: int) -> bytes:
+    """Pipe raw frames through ffmpeg (H.264, fragmented so it can be written to a pipe)"""
+    first = next(frames)
+    # yuv420p needs even dimensions
+    height, width = first.shape[0] // 2 * 2, first.shape[1] // 2 * 2
+    process = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+         "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+         "-vcodec", "libx264", "-pix_fmt", "yuv420p",
+         "-movflags", "frag_keyframe+empty_moov", "-f", "mp4", "-"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    error: Optional[BaseException] = None
+
+    def feed():
+        nonlocal error
+        try:
+            for frame in _chain(first, frames):
+                process.stdin.write(np.ascontiguousarray(frame[:height, :width]).tobytes())
+        except BaseException as e:
+            error = e
+        finally:
+            process.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    data = process.stdout.read()
+    writer.join()
+    stderr = process.stderr.read().decode("utf-8", errors="replace")
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.strip() or 'no output'}")
+    if error is not None:
+        raise error
+    return data
+
+
+def _chain(first: np.ndarray, rest: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+    yield first
+    yield from rest
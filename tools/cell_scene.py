@@ -0,0 +1,289 @@
+"""
+Declarative Cell Diagram Scenes
+Plant and animal cells described as data, compiled once to vector paths and re-styled per request
+"""
+
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path as VectorPath
+from matplotlib.transforms import Affine2D, Bbox
+
+# Shapes are (kind, *params):
+#   ("ellipse", x, y, width, height)   ("circle", x, y, radius)
+#   ("rect", x, y, width, height)      ("line", [(x, y), ...])
+Shape = tuple
+
+
+class Organelle:
+    """One named part of a cell: shapes drawn with one style, plus its label"""
+
+    __slots__ = ("name", "label", "shapes", "style", "label_at", "label_style", "layer", "extra",
+                 "show_label")
+
+    def __init__(self, name: str, label: str, shapes: Sequence[Shape], style: dict,
+                 label_at: Tuple[float, float], label_style: dict = None, layer: int = 2,
+                 extra: bool = False, show_label: bool = True):
+        """
+        Args:
+            name: Identifier used by the tool ("mitochondria", "golgi", ...)
+            label: Text shown on the diagram
+            shapes: Geometry, see Shape
+            style: PathPatch properties (edgecolor, facecolor, linewidth, alpha)
+            label_at: Label position in cell coordinates
+            label_style: Text properties for the label
+            layer: Drawing order (higher is on top)
+            extra: Hidden unless asked for (organelles beyond the basic syllabus diagram)
+            show_label: Label shown by default (otherwise only when highlighted or asked for)
+        """
+        self.name = name
+        self.label = label
+        self.shapes = tuple(shapes)
+        self.style = style
+        self.label_at = label_at
+        self.label_style = label_style or {"fontsize": 9, "style": "italic"}
+        self.layer = layer
+        self.extra = extra
+        self.show_label = show_label
+
+
+def _wavy_arc(cx: float, cy: float, radius: float, start: float, end: float, waves: int = 6) -> Shape:
+    """Folded membrane around the nucleus (endoplasmic reticulum)"""
+    theta = np.linspace(np.radians(start), np.radians(end), 80)
+    r = radius + 0.08 * np.sin(theta * waves * 2)
+    return ("line", list(zip(cx + r * np.cos(theta), cy + r * np.sin(theta))))
+
+
+def _golgi(x: float, y: float) -> List[Shape]:
+    """Stack of flattened sacs"""
+    return [("ellipse", x, y + 0.16 * i, 1.0 - 0.12 * abs(i), 0.1) for i in range(-2, 3)]
+
+
+def _cell_scenes() -> Dict[str, Tuple[str, List[Organelle]]]:
+    plant = [
+        Organelle("cell_wall", "Cell Wall", [("rect", 0.5, 0.5, 8, 6)],
+                  {"edgecolor": "darkgreen", "facecolor": "lightgreen", "linewidth": 4, "alpha": 0.3},
+                  (4.5, 0.3), {"ha": "center", "fontsize": 11, "fontweight": "bold", "color": "darkgreen"},
+                  layer=0),
+        Organelle("cell_membrane", "Cell Membrane", [("rect", 0.7, 0.7, 7.6, 5.6)],
+                  {"edgecolor": "blue", "facecolor": "none", "linewidth": 2},
+                  (4.5, 6.45), {"ha": "center", "fontsize": 9, "style": "italic", "color": "blue"},
+                  layer=1, show_label=False),
+        Organelle("vacuole", "Vacuole", [("rect", 1.5, 1.2, 1.5, 4)],
+                  {"edgecolor": "cyan", "facecolor": "lightcyan", "linewidth": 2, "alpha": 0.5},
+                  (2.25, 3.2), {"ha": "center", "fontsize": 9, "rotation": 90}),
+        Organelle("endoplasmic_reticulum", "Endoplasmic\nReticulum",
+                  [_wavy_arc(4.5, 3.5, 1.1, 200, 340), _wavy_arc(4.5, 3.5, 1.35, 210, 330)],
+                  {"edgecolor": "darkorange", "facecolor": "none", "linewidth": 1.5},
+                  (4.5, 1.75), {"ha": "center", "fontsize": 8, "style": "italic"}, layer=3, extra=True),
+        Organelle("nucleus", "Nucleus", [("circle", 4.5, 3.5, 0.8)],
+                  {"edgecolor": "purple", "facecolor": "lavender", "linewidth": 2},
+                  (4.5, 3.5), {"ha": "center", "va": "center", "fontsize": 9, "fontweight": "bold"}, layer=4),
+        Organelle("chloroplast", "Chloroplasts",
+                  [("ellipse", x, y, 0.6, 0.4) for x, y in [(2.5, 2), (6.5, 2), (2, 4.5), (7, 4.5), (3.5, 5.5), (5.5, 1.5)]],
+                  {"edgecolor": "green", "facecolor": "lightgreen", "linewidth": 1.5},
+                  (7.5, 4.5), {"fontsize": 10, "style": "italic"}, layer=5),
+        Organelle("mitochondria", "Mitochondria",
+                  [("ellipse", x, y, 0.5, 0.3) for x, y in [(5.5, 5.5), (6.5, 5)]],
+                  {"edgecolor": "red", "facecolor": "pink", "linewidth": 1.5},
+                  (6.5, 5.7), layer=5),
+        Organelle("golgi", "Golgi\nApparatus", _golgi(6.6, 3.3),
+                  {"edgecolor": "goldenrod", "facecolor": "lemonchiffon", "linewidth": 1.2},
+                  (6.6, 2.55), {"ha": "center", "fontsize": 8, "style": "italic"}, layer=5, extra=True),
+        Organelle("ribosomes", "Ribosomes",
+                  [("circle", x, y, 0.05) for x, y in [(3.4, 2.4), (5.6, 2.5), (3.6, 4.6), (5.4, 4.7), (4.5, 5.0)]],
+                  {"edgecolor": "black", "facecolor": "black", "linewidth": 0.5},
+                  (5.5, 4.95), {"fontsize": 8, "style": "italic"}, layer=6, extra=True),
+    ]
+    animal = [
+        Organelle("cell_membrane", "Cell Membrane", [("ellipse", 4.5, 3.5, 7, 5)],
+                  {"edgecolor": "blue", "facecolor": "lightyellow", "linewidth": 3, "alpha": 0.3},
+                  (4.5, 0.8), {"ha": "center", "fontsize": 11, "fontweight": "bold", "color": "blue"},
+                  layer=0),
+        Organelle("endoplasmic_reticulum", "Endoplasmic\nReticulum",
+                  [_wavy_arc(4.5, 3.5, 1.3, 20, 160), _wavy_arc(4.5, 3.5, 1.55, 30, 150)],
+                  {"edgecolor": "darkorange", "facecolor": "none", "linewidth": 1.5},
+                  (4.5, 5.25), {"ha": "center", "fontsize": 8, "style": "italic"}, layer=3, extra=True),
+        Organelle("nucleus", "Nucleus", [("circle", 4.5, 3.5, 1)],
+                  {"edgecolor": "purple", "facecolor": "lavender", "linewidth": 2},
+                  (4.5, 3.5), {"ha": "center", "va": "center", "fontsize": 10, "fontweight": "bold"}, layer=4),
+        Organelle("mitochondria", "Mitochondria",
+                  [("ellipse", x, y, 0.5, 0.3) for x, y in [(2.5, 2), (6.5, 2.5), (2, 4.5), (6.8, 4.5), (3.5, 5.5), (5.5, 1.8)]],
+                  {"edgecolor": "red", "facecolor": "pink", "linewidth": 1.5},
+                  (7.5, 4.5), {"fontsize": 10, "style": "italic"}, layer=5),
+        Organelle("vacuole", "Small\nVacuoles",
+                  [("circle", x, y, 0.15) for x, y in [(2.2, 3), (3, 1.8), (6, 5.2)]],
+                  {"edgecolor": "cyan", "facecolor": "lightcyan", "linewidth": 1},
+                  (2.2, 2.5), {"ha": "center", "fontsize": 8, "style": "italic"}, layer=5),
+        Organelle("golgi", "Golgi\nApparatus", _golgi(6.4, 3.4),
+                  {"edgecolor": "goldenrod", "facecolor": "lemonchiffon", "linewidth": 1.2},
+                  (6.4, 2.75), {"ha": "center", "fontsize": 8, "style": "italic"}, layer=5, extra=True),
+        Organelle("lysosomes", "Lysosomes",
+                  [("circle", x, y, 0.13) for x, y in [(2.8, 4.9), (3.0, 2.6), (5.9, 1.6)]],
+                  {"edgecolor": "darkviolet", "facecolor": "plum", "linewidth": 1},
+                  (1.7, 5.1), {"fontsize": 8, "style": "italic"}, layer=5, extra=True),
+        Organelle("ribosomes", "Ribosomes",
+                  [("circle", x, y, 0.05) for x, y in [(3.2, 4.8), (5.8, 4.7), (3.8, 2.3), (5.2, 2.5), (4, 5.8)]],
+                  {"edgecolor": "black", "facecolor": "black", "linewidth": 0.5},
+                  (5.8, 5.8), layer=6),
+    ]
+    return {
+        "plant": ("Plant Cell Structure", plant),
+        "animal": ("Animal Cell Structure", animal),
+    }
+
+
+CELL_SCENES = _cell_scenes()
+
+# Every organelle name any scene knows (for the tool schema)
+ORGANELLES = sorted({organelle.name for _, parts in CELL_SCENES.values() for organelle in parts})
+
+# Styles layered on top of an organelle's own style for each variant
+HIGHLIGHT_STYLE = {"edgecolor": "orangered", "alpha": 1.0}
+HIGHLIGHT_LABEL = {"fontweight": "bold", "color": "orangered",
+                   "bbox": {"boxstyle": "round,pad=0.3", "facecolor": "lightyellow", "edgecolor": "orangered"}}
+FADED_ALPHA = 0.12
+
+
+def _shape_path(shape: Shape) -> VectorPath:
+    kind = shape[0]
+    if kind == "line":
+        return VectorPath(np.asarray(shape[1], dtype=float))
+    if kind == "circle":
+        _, x, y, radius = shape
+        return Affine2D().scale(radius).translate(x, y).transform_path(VectorPath.unit_circle())
+    if kind == "ellipse":
+        _, x, y, width, height = shape
+        return Affine2D().scale(width / 2, height / 2).translate(x, y).transform_path(VectorPath.unit_circle())
+    if kind == "rect":
+        _, x, y, width, height = shape
+        return Affine2D().scale(width, height).translate(x, y).transform_path(VectorPath.unit_rectangle())
+    raise ValueError(f"unknown shape kind {kind!r}")
+
+
+class CellScene:
+    """
+    A cell diagram compiled once into one figure of vector patches
+
+    Each organelle becomes a single compound PathPatch and a label. Variants
+    (highlight, isolate, zoom, extra organelles) only change artist
+    properties and view limits, then the base style is restored.
+    """
+
+    def __init__(self, cell_type: str):
+        title, organelles = CELL_SCENES[cell_type]
+        self.cell_type = cell_type
+        self.title = title
+        self.organelles = {organelle.name: organelle for organelle in organelles}
+        self._lock = threading.Lock()
+
+        self.figure = Figure(figsize=(12, 10))
+        self.ax = self.figure.add_subplot()
+        self.ax.set_aspect("equal")
+        self.ax.axis("off")
+        self.base_limits = ((0, 9), (0, 7))
+
+        self._patches: Dict[str, PathPatch] = {}
+        self._labels = {}
+        self._extents: Dict[str, Bbox] = {}
+        for organelle in organelles:
+            path = VectorPath.make_compound_path(*(_shape_path(shape) for shape in organelle.shapes))
+            self._extents[organelle.name] = path.get_extents()
+            patch = PathPatch(path, zorder=organelle.layer, **organelle.style)
+            self.ax.add_patch(patch)
+            self._patches[organelle.name] = patch
+            self._labels[organelle.name] = self.ax.text(
+                *organelle.label_at, organelle.label, zorder=10, clip_on=True, **organelle.label_style
+            )
+        self._reset()
+
+    def _reset(self):
+        for name, organelle in self.organelles.items():
+            patch, label = self._patches[name], self._labels[name]
+            patch.set(visible=not organelle.extra, **{"alpha": None, **organelle.style})
+            label.set(visible=organelle.show_label and not organelle.extra, color="black", fontweight="normal", bbox=None)
+            label.set(**organelle.label_style)
+        self.ax.set_xlim(*self.base_limits[0])
+        self.ax.set_ylim(*self.base_limits[1])
+        self.ax.set_title(self.title, fontsize=16, fontweight="bold", pad=20)
+
+    def _zoom_to(self, names: Iterable[str]):
+        boxes = [self._extents[name] for name in names]
+        boxes += [Bbox.from_bounds(*self.organelles[name].label_at, 0, 0) for name in names]
+        box = Bbox.union(boxes)
+        pad = max(0.6, 0.3 * max(box.width, box.height))
+        (x0, x1), (y0, y1) = self.base_limits
+        self.ax.set_xlim(max(x0, box.x0 - pad), min(x1, box.x1 + pad))
+        self.ax.set_ylim(max(y0, box.y0 - pad), min(y1, box.y1 + pad))
+
+    def render(self, path: Path, highlight: Sequence[str] = (), isolate: bool = False,
+               zoom: bool = False, extras: Sequence[str] = (), dpi: int = 150) -> Path:
+        """
+        Save one variant of the scene
+
+        Args:
+            path: Output image path
+            highlight: Organelles to emphasise
+            isolate: Fade everything except the highlighted organelles
+            zoom: Zoom the view onto the highlighted organelles
+            extras: Extra organelles (Golgi, ER, ...) to show
+            dpi: Output resolution
+        """
+        highlight = [name for name in highlight if name in self.organelles]
+        with self._lock:
+            try:
+                for name in list(extras) + highlight:
+                    if name in self.organelles:
+                        self._patches[name].set_visible(True)
+                        self._labels[name].set_visible(True)
+                for name in highlight:
+                    patch = self._patches[name]
+                    patch.set(linewidth=patch.get_linewidth() * 2, **HIGHLIGHT_STYLE)
+                    self._labels[name].set(**HIGHLIGHT_LABEL)
+                if isolate and highlight:
+                    for name in self.organelles:
+                        if name not in highlight:
+                            self._patches[name].set_alpha(FADED_ALPHA)
+                            self._labels[name].set_visible(False)
+                if zoom and highlight:
+                    self._zoom_to(highlight)
+                if highlight:
+                    names = ", ".join(self.organelles[name].label.replace("\n", " ") for name in highlight)
+                    self.ax.set_title(f"{self.title.replace(' Structure', '')}: {names}",
+                                      fontsize=16, fontweight="bold", pad=20)
+                self.figure.savefig(path, dpi=dpi, bbox_inches="tight")
+            finally:
+                self._reset()
+        return path
+
+
+@lru_cache(maxsize=None)
+def get_cell_scene(cell_type: str) -> CellScene:
+    """The compiled scene for "plant" or "animal" (built on first use)"""
+    return CellScene(cell_type)
+
+
+def organelles_for(cell_type: str) -> List[str]:
+    """Organelle names drawn in a cell type's scene"""
+    return [organelle.name for organelle in CELL_SCENES[cell_type][1]]
+
+
+def variant_filename(cell_type: str, highlight: Sequence[str] = (), isolate: bool = False,
+                     zoom: bool = False, extras: Sequence[str] = ()) -> str:
+    """Stable file name for a scene variant, so repeated requests reuse the image"""
+    parts = [f"{cell_type}_cell"]
+    if highlight:
+        parts.append("hl-" + "-".join(sorted(highlight)))
+        if isolate:
+            parts.append("isolated")
+        if zoom:
+            parts.append("zoom")
+    extras = sorted(set(extras) - set(highlight))
+    if extras:
+        parts.append("with-" + "-".join(extras))
+    return "_".join(parts) + ".png"
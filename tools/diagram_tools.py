@@ -9,13 +9,66 @@ import numpy as np
 from pathlib import Path
 from typing import List, Tuple
 import json
+import hashlib
 import time
 import os
+import functools
+
+from .registry import ToolRegistry
+from .validation import (
+    check_quadratic_args, check_motion_args, check_expression_args, check_triangle_args, check_cell_args,
+    check_animation_args
+)
+from .expressions import compile_expression, adaptive_viewport
+from .timeseries import SeriesSource, load_series, derive_series, lttb, resolve_data_file
+from .cell_scene import ORGANELLES, get_cell_scene, variant_filename
+from .animation import (
+    ANIMATION_FORMATS, DEFAULT_FRAMES, MAX_FRAMES, encode_animation, motion_series, render_frames
+)
+from .facts import (
+    quadratic_facts, linear_facts, cell_facts, motion_facts, triangle_facts,
+    expression_facts, animation_facts
+)
+from .geometry import AMBIGUOUS, STATUS_MESSAGES, complete_from_type, solve_triangle
 
 # Create diagrams directory
 DIAGRAMS_DIR = Path("diagrams")
 DIAGRAMS_DIR.mkdir(exist_ok=True)
 
+# Files the diagram tools write and their media types (animations are .gif, .png or .mp4)
+DIAGRAM_MEDIA_TYPES = {".png": "image/png", ".gif": "image/gif", ".mp4": "video/mp4"}
+DIAGRAM_SUFFIXES = tuple(DIAGRAM_MEDIA_TYPES)
+
+# Motion graphs with more samples than this are drawn as a plain line
+MOTION_MARKER_LIMIT = 50
+
+DERIVED_LABELS = {
+    "velocity": "Velocity (m/s)",
+    "acceleration": "Acceleration (m/s²)",
+    "area": "Displacement (m)",
+}
+
+# Every diagram tool registers its schema here with the @TOOL_REGISTRY.tool decorator
+TOOL_REGISTRY = ToolRegistry()
+
+
+def _closes_figures(function):
+    """
+    Close every pyplot figure a tool opens, also when it raises
+    
+    pyplot keeps open figures in a global registry, so a figure left behind
+    by a failed render stays in memory for the life of the process.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        before = set(plt.get_fignums())
+        try:
+            return function(*args, **kwargs)
+        finally:
+            for number in set(plt.get_fignums()) - before:
+                plt.close(number)
+    return wrapper
+
 
 def cleanup_old_diagrams(max_age_seconds: int = 3600):
     """
@@ -30,8 +83,8 @@ def cleanup_old_diagrams(max_age_seconds: int = 3600):
     current_time = time.time()
     deleted_count = 0
     
-    for file_path in DIAGRAMS_DIR.glob("*.png"):
-        if file_path.is_file():
+    for file_path in DIAGRAMS_DIR.iterdir():
+        if file_path.is_file() and file_path.suffix in DIAGRAM_SUFFIXES:
             file_age = current_time - file_path.stat().st_mtime
             if file_age > max_age_seconds:
                 try:
@@ -44,6 +97,31 @@ def cleanup_old_diagrams(max_age_seconds: int = 3600):
         print(f"Cleaned up {deleted_count} old diagram(s)")
 
 
+@TOOL_REGISTRY.tool(
+    description="Generate a visual graph of a quadratic function (parabola) showing the curve, vertex, and roots. Use this when explaining quadratic equations, parabolas, or solving x² equations.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "a": {
+                "type": "number",
+                "description": "Coefficient of x² term (e.g., 1 for x², 2 for 2x²)"
+            },
+            "b": {
+                "type": "number",
+                "description": "Coefficient of x term (e.g., -5 for -5x)"
+            },
+            "c": {
+                "type": "number",
+                "description": "Constant term (e.g., 6 for +6)"
+            }
+        },
+        "required": ["a", "b", "c"]
+    },
+    subjects=("maths",),
+    check=check_quadratic_args,
+    facts=quadratic_facts,
+)
+@_closes_figures
 def plot_quadratic_function(a: float, b: float, c: float, filename: str = None) -> str:
     """
     Plot a quadratic function y = ax² + bx + c
@@ -60,7 +138,12 @@ def plot_quadratic_function(a: float, b: float, c: float, filename: str = None)
     if filename is None:
         filename = f"quadratic_{a}x²+{b}x+{c}.png".replace("-", "neg")
     
-    x = np.linspace(-10, 10, 400)
+    # Centre the window on the vertex and widen it to fit both roots,
+    # instead of a fixed -10..10 window that can crop them
+    vertex_x = -b / (2 * a)
+    discriminant = b**2 - 4*a*c
+    half_width = max(5.0, 1.5 * np.sqrt(max(discriminant, 0)) / abs(a))
+    x = np.linspace(vertex_x - half_width, vertex_x + half_width, 400)
     y = a * x**2 + b * x + c
     
     plt.figure(figsize=(10, 8))
@@ -70,12 +153,10 @@ def plot_quadratic_function(a: float, b: float, c: float, filename: str = None)
     plt.grid(True, alpha=0.3)
     
     # Mark vertex
-    vertex_x = -b / (2 * a)
     vertex_y = a * vertex_x**2 + b * vertex_x + c
     plt.plot(vertex_x, vertex_y, 'ro', markersize=10, label=f'Vertex ({vertex_x:.2f}, {vertex_y:.2f})')
     
     # Find and mark x-intercepts (roots) if they exist
-    discriminant = b**2 - 4*a*c
     if discriminant >= 0:
         root1 = (-b + np.sqrt(discriminant)) / (2*a)
         root2 = (-b - np.sqrt(discriminant)) / (2*a)
@@ -85,7 +166,9 @@ def plot_quadratic_function(a: float, b: float, c: float, filename: str = None)
     plt.ylabel('y', fontsize=12)
     plt.title(f'Quadratic Function: y = {a}x² + {b}x + {c}', fontsize=14, fontweight='bold')
     plt.legend(fontsize=10)
-    plt.ylim(-20, 20)
+    y_low, y_high = min(y.min(), 0), max(y.max(), 0)
+    pad = max((y_high - y_low) * 0.05, 1)
+    plt.ylim(y_low - pad, y_high + pad)
     
     filepath = DIAGRAMS_DIR / filename
     plt.savefig(filepath, dpi=150, bbox_inches='tight')
@@ -94,6 +177,26 @@ def plot_quadratic_function(a: float, b: float, c: float, filename: str = None)
     return str(filepath.absolute())
 
 
+@TOOL_REGISTRY.tool(
+    description="Generate a visual graph of a linear function (straight line) showing the line, slope, and intercepts. Use when explaining linear equations, slopes, or y = mx + c.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "m": {
+                "type": "number",
+                "description": "Slope of the line (rise/run)"
+            },
+            "c": {
+                "type": "number",
+                "description": "Y-intercept (where line crosses y-axis)"
+            }
+        },
+        "required": ["m", "c"]
+    },
+    subjects=("maths",),
+    facts=linear_facts,
+)
+@_closes_figures
 def plot_linear_function(m: float, c: float, filename: str = None) -> str:
     """
     Plot a linear function y = mx + c
@@ -140,231 +243,317 @@ def plot_linear_function(m: float, c: float, filename: str = None) -> str:
     return str(filepath.absolute())
 
 
-def draw_cell_diagram(cell_type: str, filename: str = None) -> str:
+@TOOL_REGISTRY.tool(
+    description="Generate a labeled diagram of a plant or animal cell showing all major organelles. Can highlight, isolate or zoom in on organelles and add extra ones (Golgi apparatus, endoplasmic reticulum, lysosomes, ribosomes). Use when explaining cell structure, organelles, where an organelle is, or differences between plant and animal cells.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "cell_type": {
+                "type": "string",
+                "enum": ["plant", "animal"],
+                "description": "Type of cell to draw: 'plant' or 'animal'"
+            },
+            "highlight": {
+                "type": "array",
+                "description": "Organelles to emphasise, e.g. [\"mitochondria\"] for 'where are the mitochondria?'",
+                "items": {"type": "string", "enum": ORGANELLES},
+                "maxItems": 4
+            },
+            "isolate": {
+                "type": "boolean",
+                "description": "Fade everything except the highlighted organelles"
+            },
+            "zoom": {
+                "type": "boolean",
+                "description": "Zoom in on the highlighted organelles"
+            },
+            "extra_organelles": {
+                "type": "array",
+                "description": "Organelles not shown in the basic diagram to add",
+                "items": {"type": "string", "enum": ORGANELLES},
+                "maxItems": 4
+            }
+        },
+        "required": ["cell_type"]
+    },
+    subjects=("science",),
+    check=check_cell_args,
+    facts=cell_facts,
+)
+def draw_cell_diagram(cell_type: str, filename: str = None, highlight: List[str] = None,
+                      isolate: bool = False, zoom: bool = False,
+                      extra_organelles: List[str] = None) -> str:
     """
     Draw a labeled diagram of plant or animal cell
     
+    The cell is a scene compiled once per process (see cell_scene.py); each
+    call only restyles it and saves the image. With the default file name,
+    which names the whole variant, an image already on disk is reused.
+    
     Args:
         cell_type: Either "plant" or "animal"
         filename: Optional custom filename
+        highlight: Organelles to emphasise
+        isolate: Fade everything except the highlighted organelles
+        zoom: Zoom in on the highlighted organelles
+        extra_organelles: Extra organelles to show (Golgi, ER, ...)
     
     Returns:
         Path to the saved diagram
     """
-    if filename is None:
-        filename = f"{cell_type}_cell.png"
-    
-    fig, ax = plt.subplots(figsize=(12, 10))
-    
-    if cell_type.lower() == "plant":
-        # Plant cell - rectangular with cell wall
-        cell_wall = patches.Rectangle((0.5, 0.5), 8, 6, linewidth=4, 
-                                      edgecolor='darkgreen', facecolor='lightgreen', alpha=0.3)
-        ax.add_patch(cell_wall)
-        
-        # Cell membrane (inside cell wall)
-        cell_membrane = patches.Rectangle((0.7, 0.7), 7.6, 5.6, linewidth=2,
-                                         edgecolor='blue', facecolor='none')
-        ax.add_patch(cell_membrane)
-        
-        # Nucleus
-        nucleus = patches.Circle((4.5, 3.5), 0.8, edgecolor='purple', 
-                                facecolor='lavender', linewidth=2)
-        ax.add_patch(nucleus)
-        ax.text(4.5, 3.5, 'Nucleus', ha='center', va='center', fontsize=9, fontweight='bold')
-        
-        # Chloroplasts (multiple)
-        for x, y in [(2.5, 2), (6.5, 2), (2, 4.5), (7, 4.5), (3.5, 5.5), (5.5, 1.5)]:
-            chloroplast = patches.Ellipse((x, y), 0.6, 0.4, edgecolor='green',
-                                         facecolor='lightgreen', linewidth=1.5)
-            ax.add_patch(chloroplast)
-        ax.text(7.5, 4.5, 'Chloroplasts', fontsize=10, style='italic')
-        
-        # Large vacuole
-        vacuole = patches.Rectangle((1.5, 1.2), 1.5, 4, edgecolor='cyan',
-                                   facecolor='lightcyan', linewidth=2, alpha=0.5)
-        ax.add_patch(vacuole)
-        ax.text(2.25, 3.2, 'Vacuole', ha='center', fontsize=9, rotation=90)
-        
-        # Mitochondria
-        for x, y in [(5.5, 5.5), (6.5, 5)]:
-            mito = patches.Ellipse((x, y), 0.5, 0.3, edgecolor='red',
-                                  facecolor='pink', linewidth=1.5)
-            ax.add_patch(mito)
-        ax.text(6.5, 5.7, 'Mitochondria', fontsize=9, style='italic')
-        
-        ax.text(4.5, 0.3, 'Cell Wall', ha='center', fontsize=11, 
-               fontweight='bold', color='darkgreen')
-        
-        title = 'Plant Cell Structure'
-        
-    else:  # animal cell
-        # Animal cell - irregular oval shape
-        cell_membrane = patches.Ellipse((4.5, 3.5), 7, 5, edgecolor='blue',
-                                       facecolor='lightyellow', linewidth=3, alpha=0.3)
-        ax.add_patch(cell_membrane)
-        
-        # Nucleus
-        nucleus = patches.Circle((4.5, 3.5), 1, edgecolor='purple',
-                                facecolor='lavender', linewidth=2)
-        ax.add_patch(nucleus)
-        ax.text(4.5, 3.5, 'Nucleus', ha='center', va='center', fontsize=10, fontweight='bold')
-        
-        # Mitochondria (multiple)
-        for x, y in [(2.5, 2), (6.5, 2.5), (2, 4.5), (6.8, 4.5), (3.5, 5.5), (5.5, 1.8)]:
-            mito = patches.Ellipse((x, y), 0.5, 0.3, edgecolor='red',
-                                  facecolor='pink', linewidth=1.5)
-            ax.add_patch(mito)
-        ax.text(7.5, 4.5, 'Mitochondria', fontsize=10, style='italic')
-        
-        # Small vacuoles
-        for x, y in [(2.2, 3), (3, 1.8), (6, 5.2)]:
-            vac = patches.Circle((x, y), 0.15, edgecolor='cyan',
-                                facecolor='lightcyan', linewidth=1)
-            ax.add_patch(vac)
-        ax.text(2.2, 2.5, 'Small\nVacuoles', ha='center', fontsize=8, style='italic')
-        
-        # Ribosomes (small dots)
-        for x, y in [(3.2, 4.8), (5.8, 4.7), (3.8, 2.3), (5.2, 2.5), (4, 5.8)]:
-            ax.plot(x, y, 'ko', markersize=3)
-        ax.text(5.8, 5.8, 'Ribosomes', fontsize=9, style='italic')
-        
-        ax.text(4.5, 0.8, 'Cell Membrane', ha='center', fontsize=11,
-               fontweight='bold', color='blue')
-        
-        title = 'Animal Cell Structure'
-    
-    ax.set_xlim(0, 9)
-    ax.set_ylim(0, 7)
-    ax.set_aspect('equal')
-    ax.axis('off')
-    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    cell_type = "plant" if cell_type.lower() == "plant" else "animal"
+    highlight = highlight or []
+    extra_organelles = extra_organelles or []
+    reuse = filename is None
+    if reuse:
+        filename = variant_filename(cell_type, highlight, isolate, zoom, extra_organelles)
     
     filepath = DIAGRAMS_DIR / filename
-    plt.savefig(filepath, dpi=150, bbox_inches='tight')
-    plt.close()
+    if reuse and filepath.is_file():
+        # Same variant drawn before: keep it fresh for cleanup_old_diagrams and reuse it
+        os.utime(filepath)
+        return str(filepath.absolute())
+    get_cell_scene(cell_type).render(filepath, highlight=highlight, isolate=isolate,
+                                     zoom=zoom, extras=extra_organelles)
     
     return str(filepath.absolute())
 
 
-def plot_motion_graph(graph_type: str, values: List[Tuple[float, float]], 
-                     labels: dict = None, filename: str = None) -> str:
+@TOOL_REGISTRY.tool(
+    description="Generate physics motion graphs (distance-time, velocity-time, or acceleration-time). Use when explaining motion, speed, velocity, or acceleration concepts.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "graph_type": {
+                "type": "string",
+                "enum": ["distance-time", "velocity-time", "acceleration-time"],
+                "description": "Type of motion graph"
+            },
+            "values": {
+                "type": "array",
+                "description": "Array of [time, value] pairs, e.g., [[0, 0], [2, 10], [4, 20]]",
+                "items": {
+                    "type": "array",
+                    "items": {"type": "number"}
+                }
+            },
+            "data_file": {
+                "type": "string",
+                "description": "Name of a lab data file (CSV, .npy or raw float64 pairs) in the data folder, instead of values"
+            },
+            "derived": {
+                "type": "string",
+                "enum": ["velocity", "acceleration", "area"],
+                "description": "Optional second graph: velocity from distance-time, acceleration or area under the curve (displacement) from velocity-time"
+            }
+        },
+        "required": ["graph_type"]
+    },
+    subjects=("science",),
+    check=check_motion_args,
+    facts=motion_facts,
+)
+@_closes_figures
+def plot_motion_graph(graph_type: str, values: SeriesSource = None,
+                     labels: dict = None, filename: str = None,
+                     data_file: str = None, derived: str = None,
+                     max_points: int = None) -> str:
     """
     Plot motion graphs (distance-time, velocity-time, acceleration-time)
     
     Args:
         graph_type: "distance-time", "velocity-time", or "acceleration-time"
-        values: List of (time, value) tuples
+        values: List of (time, value) tuples, an (n, 2) array or a data file path
         labels: Dict with 'title', 'xlabel', 'ylabel'
         filename: Optional custom filename
+        data_file: Data file name inside DATA_DIR (used when values is not given)
+        derived: Optional "velocity", "acceleration" or "area" series drawn below
+        max_points: Points drawn per line (default: one per horizontal pixel)
     
     Returns:
         Path to the saved diagram
     """
-    if filename is None:
-        filename = f"{graph_type.replace('-', '_')}_graph.png"
-    
-    times, vals = zip(*values) if values else ([], [])
-    
-    plt.figure(figsize=(10, 8))
-    plt.plot(times, vals, 'b-', linewidth=2, marker='o', markersize=8)
-    plt.grid(True, alpha=0.3)
-    plt.axhline(y=0, color='k', linestyle='-', linewidth=0.5)
-    plt.axvline(x=0, color='k', linestyle='-', linewidth=0.5)
+    if values is None and data_file is not None:
+        values = resolve_data_file(data_file)
+    times, vals = load_series(values if values is not None else [])
     
+    if filename is None:
+        # Named after what is drawn, so different requests never share a file
+        digest = hashlib.sha1(json.dumps([graph_type, labels, derived, max_points],
+                                         sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        digest.update(np.ascontiguousarray(times, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(vals, dtype=np.float64).tobytes())
+        filename = f"{graph_type.replace('-', '_')}_graph_{digest.hexdigest()[:12]}.png"
+    
+    figure_width, dpi = 10, 150
+    if max_points is None:
+        # Roughly one point per horizontal pixel of the axes
+        max_points = int(figure_width * dpi * 0.8)
+    
+    rows = 2 if derived else 1
+    fig, axes = plt.subplots(rows, 1, figsize=(figure_width, 8), sharex=True, squeeze=False)
+    axes = axes[:, 0]
+    
+    # Derived series are computed on the full data before downsampling
+    series = [(axes[0], times, vals)]
+    if derived:
+        series.append((axes[1], times, derive_series(times, vals, derived)))
+    
+    for ax, t, v in series:
+        plot_t, plot_v = lttb(t, v, max_points)
+        style = dict(marker='o', markersize=8) if len(t) <= MOTION_MARKER_LIMIT else {}
+        ax.plot(plot_t, plot_v, 'b-', linewidth=2 if len(t) <= MOTION_MARKER_LIMIT else 1, **style)
+        ax.grid(True, alpha=0.3)
+        ax.axhline(y=0, color='k', linestyle='-', linewidth=0.5)
+        ax.axvline(x=0, color='k', linestyle='-', linewidth=0.5)
+    
+    ax = axes[0]
     if labels:
-        plt.title(labels.get('title', graph_type.replace('-', ' ').title()), 
-                 fontsize=14, fontweight='bold')
-        plt.xlabel(labels.get('xlabel', 'Time (s)'), fontsize=12)
-        plt.ylabel(labels.get('ylabel', 'Value'), fontsize=12)
+        ax.set_title(labels.get('title', graph_type.replace('-', ' ').title()), 
+                     fontsize=14, fontweight='bold')
+        axes[-1].set_xlabel(labels.get('xlabel', 'Time (s)'), fontsize=12)
+        ax.set_ylabel(labels.get('ylabel', 'Value'), fontsize=12)
     else:
-        plt.title(graph_type.replace('-', ' ').title(), fontsize=14, fontweight='bold')
-        plt.xlabel('Time (s)', fontsize=12)
+        ax.set_title(graph_type.replace('-', ' ').title(), fontsize=14, fontweight='bold')
+        axes[-1].set_xlabel('Time (s)', fontsize=12)
         
         if 'distance' in graph_type:
-            plt.ylabel('Distance (m)', fontsize=12)
+            ax.set_ylabel('Distance (m)', fontsize=12)
         elif 'velocity' in graph_type:
-            plt.ylabel('Velocity (m/s)', fontsize=12)
+            ax.set_ylabel('Velocity (m/s)', fontsize=12)
         else:
-            plt.ylabel('Acceleration (m/s²)', fontsize=12)
+            ax.set_ylabel('Acceleration (m/s²)', fontsize=12)
+    
+    if derived:
+        axes[1].set_ylabel(DERIVED_LABELS[derived], fontsize=12)
     
     filepath = DIAGRAMS_DIR / filename
-    plt.savefig(filepath, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.savefig(filepath, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
     
     return str(filepath.absolute())
 
 
+@TOOL_REGISTRY.tool(
+    description="Generate an accurately drawn, labeled triangle. Give sides and/or angles to draw a specific triangle (SSS, SAS, ASA, AAS or SSA), or just a triangle type for a typical example. Use when explaining geometry, types of triangles, congruence, or triangle properties.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "sides": {
+                "type": "array",
+                "description": "Side lengths [a, b, c] where a = BC, b = CA, c = AB; use 0 for an unknown side",
+                "items": {"type": "number"},
+                "minItems": 3,
+                "maxItems": 3
+            },
+            "angles": {
+                "type": "array",
+                "description": "Angles [A, B, C] in degrees; use 0 for an unknown angle",
+                "items": {"type": "number"},
+                "minItems": 3,
+                "maxItems": 3
+            },
+            "triangle_type": {
+                "type": "string",
+                "enum": ["equilateral", "isosceles", "scalene", "right"],
+                "description": "Type of triangle to draw when no (or too few) measurements are given"
+            },
+            "show_special_points": {
+                "type": "boolean",
+                "description": "Also draw the medians, centroid and circumcircle"
+            }
+        },
+        "required": []
+    },
+    subjects=("maths",),
+    check=check_triangle_args,
+    facts=triangle_facts,
+)
+@_closes_figures
 def draw_triangle(sides: List[float] = None, angles: List[float] = None,
-                 triangle_type: str = None, filename: str = None) -> str:
+                 triangle_type: str = None, filename: str = None,
+                 show_special_points: bool = False) -> str:
     """
-    Draw a triangle with given properties
+    Draw a triangle solved from its measurements
     
     Args:
-        sides: List of 3 side lengths
-        angles: List of 3 angles (in degrees)
+        sides: List of 3 side lengths [a, b, c] (a = BC, b = CA, c = AB), 0 for unknown
+        angles: List of 3 angles [A, B, C] in degrees, 0 for unknown
         triangle_type: "equilateral", "isosceles", "scalene", "right"
         filename: Optional custom filename
+        show_special_points: Draw medians, centroid and circumcircle
     
     Returns:
         Path to the saved diagram
     """
+    triangle = solve_triangle(*complete_from_type(sides, angles, triangle_type))
+    points = np.array(triangle.vertices)
+    centroid = np.array(triangle.centroid)
+    right = triangle.right_angle_index
+    
     if filename is None:
-        filename = f"triangle_{triangle_type or 'custom'}.png"
+        measures = "_".join(f"{side:.4g}" for side in triangle.sides)
+        filename = f"triangle_{measures}{'_centres' if show_special_points else ''}.png"
     
     fig, ax = plt.subplots(figsize=(10, 8))
     
-    # Default to equilateral if nothing specified
-    if triangle_type == "equilateral" or (not sides and not angles):
-        points = np.array([[0, 0], [4, 0], [2, 3.464]])
-        sides = [4, 4, 4]
-        angles = [60, 60, 60]
-    elif triangle_type == "right":
-        points = np.array([[0, 0], [4, 0], [0, 3]])
-        sides = [4, 3, 5]
-        angles = [90, 53.13, 36.87]
-    elif triangle_type == "isosceles":
-        points = np.array([[0, 0], [4, 0], [2, 3]])
-        sides = [4, 3.16, 3.16]
-        angles = [90, 45, 45]
-    else:
-        # Default scalene
-        points = np.array([[0, 0], [5, 0], [2, 3]])
-        sides = [5, 3.6, 3.16]
-        angles = [59, 56, 65]
-    
     # Draw triangle
-    triangle = patches.Polygon(points, closed=True, edgecolor='blue',
-                              facecolor='lightblue', linewidth=2, alpha=0.3)
-    ax.add_patch(triangle)
-    
-    # Label vertices
-    labels = ['A', 'B', 'C']
-    offsets = [(-0.3, -0.3), (0.3, -0.3), (0, 0.3)]
-    for i, (point, label, offset) in enumerate(zip(points, labels, offsets)):
+    ax.add_patch(patches.Polygon(points, closed=True, edgecolor='blue',
+                                 facecolor='lightblue', linewidth=2, alpha=0.3))
+    
+    # Label vertices outside the triangle and their angles inside it
+    for i, (point, label, angle) in enumerate(zip(points, 'ABC', triangle.angles)):
+        outward = point - centroid
+        outward /= np.linalg.norm(outward)
         ax.plot(point[0], point[1], 'ro', markersize=8)
-        ax.text(point[0] + offset[0], point[1] + offset[1], label,
-               fontsize=14, fontweight='bold')
-    
-    # Label sides
-    if sides:
-        mid_points = [
-            (points[0] + points[1]) / 2,
-            (points[1] + points[2]) / 2,
-            (points[2] + points[0]) / 2
-        ]
-        side_offsets = [(0, -0.5), (0.5, 0.3), (-0.5, 0.3)]
-        for i, (mid, side, offset) in enumerate(zip(mid_points, sides, side_offsets)):
-            ax.text(mid[0] + offset[0], mid[1] + offset[1], f'{side:.1f}',
-                   fontsize=11, style='italic', color='darkblue')
-    
-    ax.set_xlim(-1, 6)
-    ax.set_ylim(-1, 5)
+        ax.annotate(label, point, xytext=outward * 20, textcoords='offset points',
+                    ha='center', va='center', fontsize=14, fontweight='bold')
+        ax.annotate(f'{_format_measure(angle)}°', point, xytext=-outward * (44 if i == right else 32), textcoords='offset points',
+                    ha='center', va='center', fontsize=10, color='darkred')
+    
+    # Label sides at their midpoints, pushed away from the centroid
+    for side, (start, end) in zip(triangle.sides, ((1, 2), (2, 0), (0, 1))):
+        mid = (points[start] + points[end]) / 2
+        outward = mid - centroid
+        outward /= np.linalg.norm(outward)
+        ax.annotate(_format_measure(side), mid, xytext=outward * 16, textcoords='offset points',
+                    ha='center', va='center', fontsize=11, style='italic', color='darkblue')
+    
+    # Right-angle square
+    if right is not None:
+        corner = points[right]
+        size = 0.08 * min(triangle.sides)
+        legs = [points[i] - corner for i in range(3) if i != right]
+        u, v = (leg / np.linalg.norm(leg) * size for leg in legs)
+        ax.plot(*np.array([corner + u, corner + u + v, corner + v]).T, color='blue', linewidth=1.5)
+    
+    extent = [points]
+    if show_special_points:
+        for i in range(3):
+            opposite = (points[(i + 1) % 3] + points[(i + 2) % 3]) / 2
+            ax.plot(*np.array([points[i], opposite]).T, color='green', linestyle=':', linewidth=1.2)
+        ax.plot(*centroid, 'g^', markersize=9, label='Centroid G')
+        circumcentre = np.array(triangle.circumcentre)
+        ax.plot(*circumcentre, 'mx', markersize=10, mew=2, label='Circumcentre O')
+        ax.add_patch(patches.Circle(circumcentre, triangle.circumradius, fill=False,
+                                    edgecolor='purple', linestyle='--', linewidth=1.2))
+        extent.append(circumcentre + triangle.circumradius * np.array([[-1, -1], [1, 1]]))
+        ax.legend(loc='upper right')
+    
+    extent = np.vstack(extent)
+    low, high = extent.min(axis=0), extent.max(axis=0)
+    pad = 0.15 * (high - low).max()
+    ax.set_xlim(low[0] - pad, high[0] + pad)
+    ax.set_ylim(low[1] - pad, high[1] + pad)
     ax.set_aspect('equal')
     ax.axis('off')
     
-    title = f'{triangle_type.title() if triangle_type else "Triangle"}'
-    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    title = f'{triangle.side_kind.title()} {triangle.angle_kind.title()} Triangle'
+    ax.set_title(f'{title}\nArea = {_format_measure(triangle.area)} sq units',
+                 fontsize=16, fontweight='bold', pad=20)
+    if triangle.status == AMBIGUOUS:
+        ax.text(0.5, -0.02, f'Note: {STATUS_MESSAGES[AMBIGUOUS]}', transform=ax.transAxes,
+                ha='center', fontsize=10, style='italic')
     
     filepath = DIAGRAMS_DIR / filename
     plt.savefig(filepath, dpi=150, bbox_inches='tight')
@@ -373,6 +562,176 @@ def draw_triangle(sides: List[float] = None, angles: List[float] = None,
     return str(filepath.absolute())
 
 
+def _format_measure(value: float) -> str:
+    """Up to two decimals without trailing zeros (60, 53.13, 3.5)"""
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+@TOOL_REGISTRY.tool(
+    description="Plot one or more functions of x on the same axes, e.g. cubics, factor forms like (x-2)(x+3), square roots, trigonometric or piecewise functions, or several curves to compare. The view is chosen automatically to show roots and turning points. Use for any graph that is not a plain straight line or quadratic.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "expressions": {
+                "type": "array",
+                "description": "Formulas in x, e.g. [\"x^3 - 3x\", \"(x-2)(x+3)\"]. Supports + - * / ^, sqrt, abs, sin, cos, tan, exp, log, pi, and where(condition, a, b) for piecewise functions",
+                "items": {"type": "string"},
+                "minItems": 1,
+                "maxItems": 6
+            },
+            "x_min": {
+                "type": "number",
+                "description": "Optional left edge of the x-axis (give together with x_max)"
+            },
+            "x_max": {
+                "type": "number",
+                "description": "Optional right edge of the x-axis (give together with x_min)"
+            },
+            "title": {
+                "type": "string",
+                "description": "Optional graph title"
+            }
+        },
+        "required": ["expressions"]
+    },
+    subjects=("maths", "science"),
+    check=check_expression_args,
+    facts=expression_facts,
+)
+@_closes_figures
+def plot_expressions(expressions: List[str], x_min: float = None, x_max: float = None,
+                     title: str = None, filename: str = None) -> str:
+    """
+    Plot several functions of x together with an automatic viewport
+    
+    Args:
+        expressions: Formulas in x (e.g. "x^3 - 3x", "(x-2)(x+3)")
+        x_min: Optional left edge of the x-axis
+        x_max: Optional right edge of the x-axis
+        title: Optional graph title
+        filename: Optional custom filename
+    
+    Returns:
+        Path to the saved diagram
+    """
+    compiled = [compile_expression(expression) for expression in expressions]
+    if filename is None:
+        key = json.dumps([expressions, x_min, x_max, title], ensure_ascii=False)
+        filename = f"expressions_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.png"
+    
+    x_range = (x_min, x_max) if x_min is not None and x_max is not None else None
+    x, ys, y_limits = adaptive_viewport(compiled, x_range)
+    
+    plt.figure(figsize=(10, 8))
+    for expression, y in zip(expressions, ys):
+        plt.plot(x, y, linewidth=2, label=f'y = {expression}')
+    plt.axhline(y=0, color='k', linestyle='-', linewidth=0.5)
+    plt.axvline(x=0, color='k', linestyle='-', linewidth=0.5)
+    plt.grid(True, alpha=0.3)
+    
+    plt.xlabel('x', fontsize=12)
+    plt.ylabel('y', fontsize=12)
+    plt.title(title or 'Graph of ' + ', '.join(expressions), fontsize=14, fontweight='bold')
+    plt.legend(fontsize=10)
+    plt.xlim(x[0], x[-1])
+    plt.ylim(*y_limits)
+    
+    filepath = DIAGRAMS_DIR / filename
+    plt.savefig(filepath, dpi=150, bbox_inches='tight')
+    plt.close()
+    
+    return str(filepath.absolute())
+
+
+@TOOL_REGISTRY.tool(
+    description="Generate an animation of an object moving along a track while its distance-time or velocity-time graph is drawn in sync. Give [time, value] pairs, or an initial velocity, acceleration and duration for uniform or uniformly accelerated motion. Use when explaining motion, speed, velocity or acceleration and seeing the motion happen helps.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "graph_type": {
+                "type": "string",
+                "enum": ["distance-time", "velocity-time"],
+                "description": "Graph drawn alongside the moving object"
+            },
+            "values": {
+                "type": "array",
+                "description": "Array of [time, value] pairs, e.g., [[0, 0], [2, 10], [4, 20]]",
+                "items": {
+                    "type": "array",
+                    "items": {"type": "number"}
+                }
+            },
+            "initial_velocity": {
+                "type": "number",
+                "description": "Initial velocity u in m/s, used when values is not given (default 0)"
+            },
+            "acceleration": {
+                "type": "number",
+                "description": "Constant acceleration a in m/s², used when values is not given (default 0)"
+            },
+            "duration": {
+                "type": "number",
+                "description": "Seconds of motion, used when values is not given (default 10)"
+            },
+            "frames": {
+                "type": "integer",
+                "description": f"Number of frames (default {DEFAULT_FRAMES}, at most {MAX_FRAMES})"
+            },
+            "output_format": {
+                "type": "string",
+                "enum": list(ANIMATION_FORMATS),
+                "description": "gif (default), apng (animated PNG) or mp4"
+            }
+        },
+        "required": ["graph_type"]
+    },
+    subjects=("science",),
+    check=check_animation_args,
+    facts=animation_facts,
+)
+def animate_motion(graph_type: str, values: List[List[float]] = None, initial_velocity: float = 0.0,
+                   acceleration: float = 0.0, duration: float = 10.0, frames: int = DEFAULT_FRAMES,
+                   output_format: str = "gif", filename: str = None) -> str:
+    """
+    Animate an object moving in sync with its motion graph
+    
+    Frames are blitted (see tools.animation) and encoded in memory. The
+    default filename is derived from the motion parameters, so asking for
+    the same motion again reuses the existing file.
+    
+    Args:
+        graph_type: "distance-time" or "velocity-time"
+        values: Optional [time, value] pairs
+        initial_velocity: Initial velocity (m/s) when values is not given
+        acceleration: Acceleration (m/s²) when values is not given
+        duration: Seconds of motion when values is not given
+        frames: Number of frames (capped at MAX_FRAMES)
+        output_format: "gif", "apng" or "mp4"
+        filename: Optional custom filename
+    
+    Returns:
+        Path to the saved animation
+    """
+    frames = min(max(int(frames), 2), MAX_FRAMES)
+    if filename is None:
+        motion = [graph_type, values] if values is not None else [graph_type, initial_velocity, acceleration, duration]
+        digest = hashlib.sha1(json.dumps(motion + [frames]).encode("utf-8")).hexdigest()[:12]
+        filename = f"motion_{graph_type.replace('-', '_')}_{digest}{ANIMATION_FORMATS[output_format]}"
+        if (DIAGRAMS_DIR / filename).is_file():
+            return str((DIAGRAMS_DIR / filename).absolute())
+    
+    times, graph, positions = motion_series(graph_type, values, initial_velocity, acceleration, duration)
+    data = encode_animation(render_frames(graph_type, times, graph, positions, frames), output_format)
+    
+    # Written under a temporary name first so a reader never sees half a file
+    filepath = DIAGRAMS_DIR / filename
+    partial = filepath.with_name(filepath.name + ".part")
+    partial.write_bytes(data)
+    os.replace(partial, filepath)
+    
+    return str(filepath.absolute())
+
+
 def get_tool_functions():
     """
     Get a dictionary mapping tool names to their functions
@@ -380,123 +739,18 @@ def get_tool_functions():
     Returns:
         Dict of tool name -> function
     """
-    return {
-        "plot_quadratic_function": plot_quadratic_function,
-        "plot_linear_function": plot_linear_function,
-        "draw_cell_diagram": draw_cell_diagram,
-        "plot_motion_graph": plot_motion_graph,
-        "draw_triangle": draw_triangle,
-    }
-
-
-# Tool definitions for the agent to use
-DIAGRAM_TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "plot_quadratic_function",
-            "description": "Generate a visual graph of a quadratic function (parabola) showing the curve, vertex, and roots. Use this when explaining quadratic equations, parabolas, or solving x² equations.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "a": {
-                        "type": "number",
-                        "description": "Coefficient of x² term (e.g., 1 for x², 2 for 2x²)"
-                    },
-                    "b": {
-                        "type": "number",
-                        "description": "Coefficient of x term (e.g., -5 for -5x)"
-                    },
-                    "c": {
-                        "type": "number",
-                        "description": "Constant term (e.g., 6 for +6)"
-                    }
-                },
-                "required": ["a", "b", "c"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "plot_linear_function",
-            "description": "Generate a visual graph of a linear function (straight line) showing the line, slope, and intercepts. Use when explaining linear equations, slopes, or y = mx + c.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "m": {
-                        "type": "number",
-                        "description": "Slope of the line (rise/run)"
-                    },
-                    "c": {
-                        "type": "number",
-                        "description": "Y-intercept (where line crosses y-axis)"
-                    }
-                },
-                "required": ["m", "c"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "draw_cell_diagram",
-            "description": "Generate a labeled diagram of a plant or animal cell showing all major organelles. Use when explaining cell structure, organelles, or differences between plant and animal cells.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "cell_type": {
-                        "type": "string",
-                        "enum": ["plant", "animal"],
-                        "description": "Type of cell to draw: 'plant' or 'animal'"
-                    }
-                },
-                "required": ["cell_type"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "plot_motion_graph",
-            "description": "Generate physics motion graphs (distance-time, velocity-time, or acceleration-time). Use when explaining motion, speed, velocity, or acceleration concepts.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "graph_type": {
-                        "type": "string",
-                        "enum": ["distance-time", "velocity-time", "acceleration-time"],
-                        "description": "Type of motion graph"
-                    },
-                    "values": {
-                        "type": "array",
-                        "description": "Array of [time, value] pairs, e.g., [[0, 0], [2, 10], [4, 20]]",
-                        "items": {
-                            "type": "array",
-                            "items": {"type": "number"}
-                        }
-                    }
-                },
-                "required": ["graph_type", "values"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "draw_triangle",
-            "description": "Generate a labeled triangle diagram. Use when explaining geometry, types of triangles, or triangle properties.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "triangle_type": {
-                        "type": "string",
-                        "enum": ["equilateral", "isosceles", "scalene", "right"],
-                        "description": "Type of triangle to draw"
-                    }
-                },
-                "required": ["triangle_type"]
-            }
-        }
-    }
-]
+    return TOOL_REGISTRY.functions()
+
+
+def get_tool_validator():
+    """
+    Get the argument validator compiled from the registered tool schemas
+    
+    Returns:
+        ToolArgumentValidator shared by all agents
+    """
+    return TOOL_REGISTRY.validator
+
+
+# Tool definitions for the agent to use, in registration order
+DIAGRAM_TOOLS = TOOL_REGISTRY.schemas()
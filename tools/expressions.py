@@ -0,0 +1,288 @@
+"""
+Safe Expression Compiler for Function Plotting
+Turns student-style formulas into vectorized NumPy functions without eval
+"""
+
+import ast
+import re
+from functools import lru_cache
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPONENT = 12
+MAX_NODES = 200
+
+# Widest x-range the viewport search looks at, and how many roots/extrema
+# the automatic view tries to fit
+SEARCH_RANGE = (-50.0, 50.0)
+MAX_FEATURES = 8
+
+FUNCTIONS = {
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "sqrt": np.sqrt,
+    "abs": np.abs,
+    "exp": np.exp,
+    "log": np.log,
+    "ln": np.log,
+    "log10": np.log10,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "sign": np.sign,
+}
+
+# Two- and three-argument helpers, mainly for piecewise motion
+MULTI_ARG_FUNCTIONS = {
+    "min": (2, np.minimum),
+    "max": (2, np.maximum),
+    "where": (3, np.where),
+}
+
+CONSTANTS = {"pi": np.pi, "e": np.e}
+
+BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+}
+
+COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+}
+
+_TOKEN_PATTERN = re.compile(r"\s*(\d+\.?\d*|\.\d+|[A-Za-z_][A-Za-z_0-9]*|\*\*|<=|>=|\S)")
+_CALLABLE_NAMES = set(FUNCTIONS) | set(MULTI_ARG_FUNCTIONS)
+# Words that join conditions ("x > 0 and x < 4"), never multiplied into their neighbours
+_LOGIC_WORDS = {"and", "or"}
+
+
+class ExpressionError(ValueError):
+    """Raised when a formula is not a safe, plottable function of x"""
+
+
+def _normalize(text: str) -> str:
+    """Rewrite school notation (y = ..., ^, ², implicit multiplication) into Python syntax"""
+    text = text.strip()
+    text = re.sub(r"^\s*(y|f\s*\(\s*x\s*\))\s*=", "", text)
+    text = text.replace("^", "**").replace("²", "**2").replace("³", "**3")
+    text = text.replace("×", "*").replace("÷", "/").replace("−", "-").replace("π", "pi")
+
+    tokens = _TOKEN_PATTERN.findall(text)
+    out: List[str] = []
+    for token in tokens:
+        if out:
+            prev = out[-1]
+            prev_is_value = prev[0].isdigit() or prev[0] == "." or prev == ")" or (
+                prev[0].isalpha() and prev not in _CALLABLE_NAMES and prev not in _LOGIC_WORDS
+            )
+            next_is_value = token[0].isdigit() or token[0] == "." or token == "(" or (
+                token[0].isalpha() and token not in _LOGIC_WORDS
+            )
+            # 2x, 3(x+1), (x-2)(x+3), x(x-1), 2pi
+            if prev_is_value and next_is_value:
+                out.append("*")
+        out.append(token)
+    return " ".join(out)
+
+
+def _compile_node(node: ast.AST, counter: List[int]) -> Callable:
+    counter[0] += 1
+    if counter[0] > MAX_NODES:
+        raise ExpressionError("expression is too complex")
+
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, counter)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda x: value
+
+    if isinstance(node, ast.Name):
+        if node.id == "x":
+            return lambda x: x
+        if node.id in CONSTANTS:
+            value = CONSTANTS[node.id]
+            return lambda x: value
+        raise ExpressionError(f"unknown name {node.id!r} (use x as the variable)")
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile_node(node.operand, counter)
+        if isinstance(node.op, ast.USub):
+            return lambda x: np.negative(operand(x))
+        return operand
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        if isinstance(node.op, ast.Pow):
+            exponent = node.right
+            if isinstance(exponent, ast.UnaryOp):
+                exponent = exponent.operand
+            if not (isinstance(exponent, ast.Constant) and isinstance(exponent.value, (int, float))
+                    and not isinstance(exponent.value, bool)):
+                raise ExpressionError("exponents must be numbers")
+            if abs(exponent.value) > MAX_EXPONENT:
+                raise ExpressionError(f"exponents are limited to {MAX_EXPONENT}")
+        op = BINARY_OPS[type(node.op)]
+        left = _compile_node(node.left, counter)
+        right = _compile_node(node.right, counter)
+        return lambda x: op(left(x), right(x))
+
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in COMPARE_OPS:
+        op = COMPARE_OPS[type(node.ops[0])]
+        left = _compile_node(node.left, counter)
+        right = _compile_node(node.comparators[0], counter)
+        return lambda x: op(left(x), right(x))
+
+    if isinstance(node, ast.BoolOp):
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        parts = [_compile_node(value, counter) for value in node.values]
+
+        def combine(x):
+            result = parts[0](x)
+            for part in parts[1:]:
+                result = op(result, part(x))
+            return result
+        return combine
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        args = [_compile_node(arg, counter) for arg in node.args]
+        if name in FUNCTIONS:
+            if len(args) != 1:
+                raise ExpressionError(f"{name}() takes one argument")
+            function, arg = FUNCTIONS[name], args[0]
+            return lambda x: function(arg(x))
+        if name in MULTI_ARG_FUNCTIONS:
+            arity, function = MULTI_ARG_FUNCTIONS[name]
+            if len(args) != arity:
+                raise ExpressionError(f"{name}() takes {arity} arguments")
+            return lambda x: function(*(arg(x) for arg in args))
+        raise ExpressionError(f"unknown function {name!r}")
+
+    raise ExpressionError(f"unsupported syntax: {type(node).__name__}")
+
+
+class CompiledExpression:
+    """A validated formula and its vectorized evaluator"""
+
+    __slots__ = ("source", "python_source", "_function")
+
+    def __init__(self, source: str, python_source: str, function: Callable):
+        self.source = source
+        self.python_source = python_source
+        self._function = function
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            y = self._function(x)
+        y = np.broadcast_to(np.asarray(y, dtype=float), x.shape).copy()
+        y[~np.isfinite(y)] = np.nan
+        return y
+
+
+@lru_cache(maxsize=512)
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    Compile a formula in x into a NumPy function (cached per formula)
+
+    Args:
+        source: e.g. "x^3 - 2x", "(x-2)(x+3)", "y = 2sin(x)", "where(x < 4, 5x, 20)"
+
+    Returns:
+        CompiledExpression callable on a NumPy array of x values
+
+    Raises:
+        ExpressionError: if the formula uses anything outside the whitelist
+    """
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    python_source = _normalize(source)
+    try:
+        tree = ast.parse(python_source, mode="eval")
+    except SyntaxError:
+        raise ExpressionError(f"could not read {source!r} as a formula in x")
+    return CompiledExpression(source, python_source, _compile_node(tree, [0]))
+
+
+def evaluate_many(expressions: Sequence[CompiledExpression], x: np.ndarray) -> np.ndarray:
+    """Evaluate several curves on one shared x grid, returning a (curves, points) array"""
+    return np.vstack([expression(x) for expression in expressions])
+
+
+def _interesting_points(x: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """x positions of roots, turning points and kinks across all curves"""
+    points = []
+    for y in ys:
+        finite = np.isfinite(y)
+        sign = np.sign(y)
+        roots = np.nonzero(finite[:-1] & finite[1:] & (sign[:-1] * sign[1:] <= 0))[0]
+        slope_sign = np.sign(np.round(np.diff(y), 9))
+        turns = np.nonzero(slope_sign[:-1] != slope_sign[1:])[0] + 1
+        points.append(x[roots])
+        points.append(x[turns])
+    return np.concatenate(points) if points else np.array([])
+
+
+def adaptive_viewport(expressions: Sequence[CompiledExpression],
+                      x_range: Tuple[float, float] = None) -> Tuple[np.ndarray, np.ndarray, Tuple[float, float]]:
+    """
+    Choose x-range, sample density and y-limits from the curves' roots and extrema
+
+    Args:
+        expressions: Compiled curves to show together
+        x_range: Optional fixed (x_min, x_max) chosen by the caller
+
+    Returns:
+        (x samples, y values per curve, (y_min, y_max))
+    """
+    if x_range is None:
+        coarse_x = np.linspace(SEARCH_RANGE[0], SEARCH_RANGE[1], 4001)
+        points = np.unique(_interesting_points(coarse_x, evaluate_many(expressions, coarse_x)))
+        if points.size > MAX_FEATURES:
+            # Periodic curves: show the features nearest the origin, not all of them
+            points = points[np.argsort(np.abs(points))[:MAX_FEATURES]]
+        if points.size:
+            low, high = float(points.min()), float(points.max())
+            centre = (low + high) / 2
+            half_width = max(0.7 * (high - low), 5.0)
+            x_min, x_max = centre - half_width, centre + half_width
+            # Keep the origin in view when it is close to the action
+            if 0 < x_min < half_width:
+                x_min = -0.1 * half_width
+            if 0 > x_max > -half_width:
+                x_max = 0.1 * half_width
+        else:
+            x_min, x_max = -10.0, 10.0
+        x_min, x_max = max(x_min, SEARCH_RANGE[0]), min(x_max, SEARCH_RANGE[1])
+    else:
+        x_min, x_max = x_range
+
+    # Denser sampling for wiggly curves (many turning points in the window)
+    probe_x = np.linspace(x_min, x_max, 400)
+    turns = _interesting_points(probe_x, evaluate_many(expressions, probe_x)).size
+    samples = int(np.clip(400 + 100 * turns, 400, 4000))
+    x = np.linspace(x_min, x_max, samples)
+    ys = evaluate_many(expressions, x)
+
+    finite = ys[np.isfinite(ys)]
+    if finite.size:
+        # Percentiles ignore asymptotes (tan, 1/x) when choosing y-limits
+        y_low, y_high = np.percentile(finite, [1, 99])
+        y_low, y_high = min(y_low, 0.0), max(y_high, 0.0)
+    else:
+        y_low, y_high = -10.0, 10.0
+    pad = max((y_high - y_low) * 0.1, 1.0)
+    y_limits = (float(y_low - pad), float(y_high + pad))
+
+    # Break the line at jumps so asymptotes are not drawn as vertical strokes
+    jump = np.abs(np.diff(ys, axis=1)) > (y_limits[1] - y_limits[0])
+    ys[:, 1:][jump] = np.nan
+    return x, ys, y_limits
@@ -0,0 +1,200 @@
+"""
+Diagram Facts
+What each diagram will show, computed from its arguments without drawing anything
+"""
+
+from typing import List
+
+import numpy as np
+
+from .animation import motion_series
+from .cell_scene import organelles_for
+from .expressions import SEARCH_RANGE, MAX_FEATURES, compile_expression
+from .geometry import STATUS_MESSAGES, SOLVED, complete_from_type, solve_triangle
+from .timeseries import load_series, resolve_data_file
+
+# Samples used to locate roots and turning points of arbitrary formulas
+FACT_SAMPLES = 4001
+
+
+def _number(value: float) -> str:
+    """Up to four significant figures, no trailing zeros (2.5, -0.25, 1.333)"""
+    value = float(value)
+    if abs(value) < 1e-9:
+        value = 0.0
+    return f"{value:.4g}"
+
+
+def _point(x: float, y: float) -> str:
+    return f"({_number(x)}, {_number(y)})"
+
+
+def _polynomial(*terms) -> str:
+    """"2x² - 5x + 6" from (coefficient, power suffix) pairs, skipping zero terms"""
+    text = ""
+    for coefficient, suffix in terms:
+        if coefficient == 0:
+            continue
+        magnitude = _number(abs(coefficient))
+        if magnitude == "1" and suffix:
+            magnitude = ""
+        sign = "-" if coefficient < 0 else "+"
+        text += f" {sign} {magnitude}{suffix}" if text else f"{'-' if coefficient < 0 else ''}{magnitude}{suffix}"
+    return text or "0"
+
+
+def _lines(facts: List[str]) -> str:
+    return "\n".join(f"- {fact}" for fact in facts)
+
+
+def quadratic_facts(args: dict) -> str:
+    """Vertex, axis, discriminant, roots and intercepts of y = ax² + bx + c"""
+    a, b, c = args["a"], args["b"], args["c"]
+    vertex_x = -b / (2 * a)
+    vertex_y = c - b * b / (4 * a)
+    discriminant = b * b - 4 * a * c
+    facts = [
+        f"Equation: y = {_polynomial((a, 'x²'), (b, 'x'), (c, ''))}",
+        f"Opens {'upwards' if a > 0 else 'downwards'}; "
+        f"{'minimum' if a > 0 else 'maximum'} value {_number(vertex_y)} at the vertex {_point(vertex_x, vertex_y)}",
+        f"Axis of symmetry: x = {_number(vertex_x)}",
+        f"Discriminant b² - 4ac = {_number(discriminant)}",
+    ]
+    if discriminant > 0:
+        roots = sorted(((-b - discriminant ** 0.5) / (2 * a), (-b + discriminant ** 0.5) / (2 * a)))
+        facts.append(f"Two real roots: x = {_number(roots[0])} and x = {_number(roots[1])}")
+    elif discriminant == 0:
+        facts.append(f"One repeated root: x = {_number(vertex_x)} (the vertex touches the x-axis)")
+    else:
+        facts.append("No real roots: the parabola does not cross the x-axis")
+    facts.append(f"y-intercept: {_point(0, c)}")
+    return _lines(facts)
+
+
+def linear_facts(args: dict) -> str:
+    """Slope and intercepts of y = mx + c"""
+    m, c = args["m"], args["c"]
+    facts = [f"Equation: y = {_polynomial((m, 'x'), (c, ''))}", f"Slope: {_number(m)}"]
+    if m > 0:
+        facts.append("The line rises from left to right")
+    elif m < 0:
+        facts.append("The line falls from left to right")
+    else:
+        facts.append("The line is horizontal")
+    facts.append(f"y-intercept: {_point(0, c)}")
+    if m != 0:
+        facts.append(f"x-intercept: {_point(-c / m, 0)}")
+    return _lines(facts)
+
+
+def cell_facts(args: dict) -> str:
+    """Organelles shown and emphasised in a cell diagram"""
+    cell_type = "plant" if args["cell_type"].lower() == "plant" else "animal"
+    shown = organelles_for(cell_type) + [
+        name for name in args.get("extra_organelles") or [] if name not in organelles_for(cell_type)
+    ]
+    facts = [f"{cell_type.title()} cell showing: {', '.join(shown)}"]
+    if args.get("highlight"):
+        how = " (everything else faded)" if args.get("isolate") else ""
+        facts.append(f"Highlighted: {', '.join(args['highlight'])}{how}")
+        if args.get("zoom"):
+            facts.append("Zoomed in on the highlighted organelles")
+    return _lines(facts)
+
+
+def _series_facts(graph_type: str, times: np.ndarray, values: np.ndarray) -> List[str]:
+    """Start, end and the quantity each motion graph encodes"""
+    facts = [f"Time from {_number(times[0])} s to {_number(times[-1])} s"]
+    span = times[-1] - times[0]
+    if graph_type == "distance-time":
+        change = values[-1] - values[0]
+        facts.append(f"Distance goes from {_number(values[0])} m to {_number(values[-1])} m")
+        if span > 0:
+            facts.append(f"Average velocity (overall slope): {_number(change / span)} m/s")
+    else:
+        unit, area_name, area_unit = (
+            ("m/s", "Displacement (area under the graph)", "m") if graph_type == "velocity-time"
+            else ("m/s²", "Change in velocity (area under the graph)", "m/s")
+        )
+        facts.append(f"Starts at {_number(values[0])} {unit} and ends at {_number(values[-1])} {unit}")
+        facts.append(f"Largest value {_number(values.max())} {unit}, smallest {_number(values.min())} {unit}")
+        area = float(np.sum(np.diff(times) * (values[1:] + values[:-1]) / 2))
+        facts.append(f"{area_name}: {_number(area)} {area_unit}")
+        if graph_type == "velocity-time" and span > 0:
+            facts.append(f"Average acceleration: {_number((values[-1] - values[0]) / span)} m/s²")
+    return facts
+
+
+def motion_facts(args: dict) -> str:
+    """Key quantities of a motion graph, from its values or data file"""
+    source = args.get("values")
+    if source is None and args.get("data_file"):
+        source = resolve_data_file(args["data_file"])
+    times, values = load_series(source if source is not None else [])
+    if len(times) < 2:
+        raise ValueError("a motion graph needs at least two points")
+    facts = _series_facts(args["graph_type"], times, values)
+    facts.append(f"{len(times)} data points")
+    return _lines(facts)
+
+
+def animation_facts(args: dict) -> str:
+    """Key quantities of an animated motion, including where the object ends up"""
+    times, graph, positions = motion_series(
+        args["graph_type"], args.get("values"), args.get("initial_velocity", 0.0),
+        args.get("acceleration", 0.0), args.get("duration", 10.0),
+    )
+    facts = _series_facts(args["graph_type"], times, graph)
+    facts.append(f"The object moves from {_number(positions[0])} m to {_number(positions[-1])} m along the track")
+    return _lines(facts)
+
+
+def triangle_facts(args: dict) -> str:
+    """The solved triangle's sides, angles, area and kind"""
+    triangle = solve_triangle(*complete_from_type(
+        args.get("sides"), args.get("angles"), args.get("triangle_type")
+    ))
+    a, b, c = (_number(side) for side in triangle.sides)
+    angle_a, angle_b, angle_c = (_number(angle) for angle in triangle.angles)
+    facts = [
+        f"Sides: BC = a = {a}, CA = b = {b}, AB = c = {c}",
+        f"Angles: A = {angle_a}°, B = {angle_b}°, C = {angle_c}°",
+        f"{triangle.side_kind.title()} {triangle.angle_kind} triangle",
+        f"Area: {_number(triangle.area)} sq units; perimeter: {_number(sum(triangle.sides))}",
+    ]
+    if triangle.status != SOLVED:
+        facts.append(STATUS_MESSAGES[triangle.status])
+    return _lines(facts)
+
+
+def expression_facts(args: dict) -> str:
+    """y-intercept, roots and turning points of each plotted formula"""
+    x_min, x_max = SEARCH_RANGE
+    if args.get("x_min") is not None and args.get("x_max") is not None:
+        x_min, x_max = args["x_min"], args["x_max"]
+    x = np.linspace(x_min, x_max, FACT_SAMPLES)
+    facts = []
+    for source in args["expressions"]:
+        expression = compile_expression(source)
+        y = expression(x)
+        finite = np.isfinite(y)
+        crossings = np.nonzero(finite[:-1] & finite[1:] & (np.sign(y[:-1]) * np.sign(y[1:]) < 0))[0]
+        # Linear interpolation inside each sign change, plus samples that are exactly zero
+        roots = x[crossings] - y[crossings] * (x[crossings + 1] - x[crossings]) / (y[crossings + 1] - y[crossings])
+        roots = np.concatenate((roots, x[finite & (y == 0)]))
+        slope = np.sign(np.round(np.diff(y), 9))
+        turns = np.nonzero(finite[1:-1] & (slope[:-1] * slope[1:] < 0))[0] + 1
+        parts = []
+        at_zero = expression(np.zeros(1))[0]
+        if np.isfinite(at_zero):
+            parts.append(f"y-intercept {_number(at_zero)}")
+        if roots.size:
+            nearest = np.sort(roots[np.argsort(np.abs(roots))[:MAX_FEATURES]])
+            parts.append("roots near x = " + ", ".join(_number(root) for root in nearest))
+        else:
+            parts.append(f"no roots between x = {_number(x_min)} and {_number(x_max)}")
+        if turns.size:
+            nearest = np.sort(turns[np.argsort(np.abs(x[turns]))[:MAX_FEATURES]])
+            parts.append("turning points near " + ", ".join(_point(x[i], y[i]) for i in nearest))
+        facts.append(f"y = {source}: " + "; ".join(parts))
+    return _lines(facts)
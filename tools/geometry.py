@@ -0,0 +1,326 @@
+"""
+Triangle Geometry Engine
+Solves SSS/SAS/SSA/ASA/AAS triangles in closed form, vectorized over whole batches
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Status codes, one per solved row
+SOLVED = 0
+AMBIGUOUS = 1      # SSA with two possible triangles: the acute one is returned
+INSUFFICIENT = 2
+IMPOSSIBLE = 3
+INCONSISTENT = 4
+
+STATUS_MESSAGES = {
+    SOLVED: "solved",
+    AMBIGUOUS: "two triangles fit these values (side-side-angle); the one with the acute angle is used",
+    INSUFFICIENT: "needs three sides, two sides and an angle, or two angles and a side",
+    IMPOSSIBLE: "no triangle has these measurements",
+    INCONSISTENT: "the given sides and angles contradict each other",
+}
+
+# Given values may be rounded by the student (3.16 for sqrt(10)); they only
+# have to agree with the solution this closely
+SIDE_TOLERANCE = 0.01   # relative
+ANGLE_TOLERANCE = 0.5   # degrees
+
+# Digits kept for memoization keys
+KEY_PRECISION = 6
+
+# Sides [a, b, c] drawn when only a triangle type is asked for
+TYPE_DEFAULTS = {
+    "equilateral": [4, 4, 4],
+    "isosceles": [5, 5, 4],
+    "scalene": [4, 5, 6],
+    "right": [5, 4, 3],   # right angle at A, legs along the axes
+}
+
+# Length of AB when only angles are given
+SHAPE_ONLY_SIDE = 5
+
+
+class TriangleError(ValueError):
+    """Raised when a single triangle cannot be solved"""
+
+
+class TriangleBatch:
+    """
+    Solved triangles, one row per input, with NaN rows where status is not usable
+
+    Conventions: sides are [a, b, c] with a = BC opposite A, b = CA opposite B,
+    c = AB opposite C; angles are [A, B, C] in degrees. Vertices are placed
+    with A at the origin and AB along the positive x-axis.
+    """
+
+    __slots__ = ("sides", "angles", "vertices", "area", "centroid", "circumcentre",
+                 "circumradius", "status")
+
+    def __init__(self, sides, angles, vertices, area, centroid, circumcentre, circumradius, status):
+        self.sides = sides
+        self.angles = angles
+        self.vertices = vertices
+        self.area = area
+        self.centroid = centroid
+        self.circumcentre = circumcentre
+        self.circumradius = circumradius
+        self.status = status
+
+    def __len__(self):
+        return len(self.status)
+
+    @property
+    def ok(self) -> np.ndarray:
+        """Rows that describe a real triangle"""
+        return self.status <= AMBIGUOUS
+
+    def row(self, index: int) -> "Triangle":
+        """One solved triangle"""
+        return Triangle(
+            tuple(self.sides[index].tolist()), tuple(self.angles[index].tolist()),
+            tuple(map(tuple, self.vertices[index].tolist())), float(self.area[index]),
+            tuple(self.centroid[index].tolist()), tuple(self.circumcentre[index].tolist()),
+            float(self.circumradius[index]), int(self.status[index]),
+        )
+
+
+class Triangle:
+    """A single solved triangle (see TriangleBatch for conventions)"""
+
+    __slots__ = ("sides", "angles", "vertices", "area", "centroid", "circumcentre",
+                 "circumradius", "status")
+
+    def __init__(self, sides, angles, vertices, area, centroid, circumcentre, circumradius, status):
+        self.sides: Tuple[float, float, float] = sides
+        self.angles: Tuple[float, float, float] = angles
+        self.vertices: Tuple[Tuple[float, float], ...] = vertices
+        self.area = area
+        self.centroid: Tuple[float, float] = centroid
+        self.circumcentre: Tuple[float, float] = circumcentre
+        self.circumradius = circumradius
+        self.status = status
+
+    @property
+    def side_kind(self) -> str:
+        """"equilateral", "isosceles" or "scalene" """
+        a, b, c = self.sides
+        close = lambda x, y: abs(x - y) <= SIDE_TOLERANCE * max(x, y)
+        equal_pairs = close(a, b) + close(b, c) + close(a, c)
+        return "equilateral" if equal_pairs == 3 else "isosceles" if equal_pairs else "scalene"
+
+    @property
+    def angle_kind(self) -> str:
+        """"right", "obtuse" or "acute" """
+        largest = max(self.angles)
+        if abs(largest - 90) <= ANGLE_TOLERANCE:
+            return "right"
+        return "obtuse" if largest > 90 else "acute"
+
+    @property
+    def right_angle_index(self) -> Optional[int]:
+        """Index of the right angle, if there is one"""
+        for i, angle in enumerate(self.angles):
+            if abs(angle - 90) <= ANGLE_TOLERANCE:
+                return i
+        return None
+
+
+def _as_rows(values, n_hint: int = None) -> np.ndarray:
+    if values is None:
+        return np.full((n_hint or 1, 3), np.nan)
+    return np.array(values, dtype=float).reshape(-1, 3)
+
+
+def solve_triangles(sides=None, angles=None) -> TriangleBatch:
+    """
+    Solve many triangles at once
+
+    Args:
+        sides: (n, 3) array-like of [a, b, c]; NaN marks an unknown side
+        angles: (n, 3) array-like of [A, B, C] in degrees; NaN marks an unknown angle
+
+    Returns:
+        TriangleBatch with every quantity filled in where the row could be solved.
+        Over-specified rows are checked for consistency.
+    """
+    n = None
+    if sides is not None:
+        n = _as_rows(sides).shape[0]
+    elif angles is not None:
+        n = _as_rows(angles).shape[0]
+    s = _as_rows(sides, n).copy()
+    ang = np.radians(_as_rows(angles, n))
+    if s.shape != ang.shape:
+        raise ValueError("sides and angles must describe the same number of triangles")
+    given_s = s.copy()
+    given_a = np.degrees(ang)
+    rows = np.arange(len(s))
+    status = np.zeros(len(s), dtype=np.int8)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bad = np.any(given_s <= 0, axis=1) | np.any((given_a <= 0) | (given_a >= 180), axis=1)
+        status[bad] = IMPOSSIBLE
+        known_s = ~np.isnan(s)
+        known_a = ~np.isnan(ang)
+        n_sides = known_s.sum(axis=1)
+
+        # Two angles fix the third
+        two_angles = known_a.sum(axis=1) == 2
+        if two_angles.any():
+            missing = np.argmin(known_a, axis=1)
+            third = np.pi - np.nansum(ang, axis=1)
+            status[two_angles & (third <= 0) & (status == SOLVED)] = IMPOSSIBLE
+            ang[rows[two_angles], missing[two_angles]] = third[two_angles]
+            known_a = ~np.isnan(ang)
+        n_angles = known_a.sum(axis=1)
+
+        # SAS: two sides and the angle between them (the one opposite the missing side)
+        missing_side = np.argmin(known_s, axis=1)
+        included_known = known_a[rows, missing_side]
+        sas = (n_sides == 2) & included_known & (n_angles < 3)
+        if sas.any():
+            j, k = (missing_side + 1) % 3, (missing_side + 2) % 3
+            sj, sk = s[rows, j], s[rows, k]
+            third_side = np.sqrt(sj ** 2 + sk ** 2 - 2 * sj * sk * np.cos(ang[rows, missing_side]))
+            s[rows[sas], missing_side[sas]] = third_side[sas]
+
+        # SSA: two sides and an angle opposite one of them
+        ssa = (n_sides == 2) & ~included_known & (n_angles == 1)
+        if ssa.any():
+            j = np.argmax(known_a, axis=1)                      # the known angle (a known side's opposite)
+            k = 3 - missing_side - j                            # the other known side
+            sj, sk = s[rows, j], s[rows, k]
+            sin_k = sk * np.sin(ang[rows, j]) / sj
+            status[ssa & (sin_k > 1 + 1e-12) & (status == SOLVED)] = IMPOSSIBLE
+            angle_k = np.arcsin(np.clip(sin_k, -1, 1))
+            two_solutions = (sj < sk) & (ang[rows, j] < np.pi / 2) & (sin_k < 1 - 1e-12)
+            status[ssa & two_solutions & (status == SOLVED)] = AMBIGUOUS
+            ang[rows[ssa], k[ssa]] = angle_k[ssa]
+            remaining = np.pi - ang[rows, j] - angle_k
+            ang[rows[ssa], missing_side[ssa]] = remaining[ssa]
+            known_a = ~np.isnan(ang)
+            n_angles = known_a.sum(axis=1)
+
+        # ASA/AAS (and SSA after the step above): law of sines from any known side
+        known_s = ~np.isnan(s)
+        n_sides = known_s.sum(axis=1)
+        sines = (n_angles == 3) & (n_sides >= 1) & (n_sides < 3)
+        if sines.any():
+            reference = np.argmax(known_s, axis=1)
+            scale = s[rows, reference] / np.sin(ang[rows, reference])
+            filled = np.where(np.isnan(s), scale[:, None] * np.sin(ang), s)
+            s[sines] = filled[sines]
+
+        # Every solvable row now has three sides: angles follow from the law of cosines
+        complete = ~np.isnan(s).any(axis=1)
+        status[~complete & (status == SOLVED)] = INSUFFICIENT
+        a, b, c = s[:, 0], s[:, 1], s[:, 2]
+        inequality = (a + b > c) & (b + c > a) & (a + c > b)
+        status[complete & ~inequality & (status <= AMBIGUOUS)] = IMPOSSIBLE
+
+        cos_a = np.clip((b ** 2 + c ** 2 - a ** 2) / (2 * b * c), -1, 1)
+        cos_b = np.clip((a ** 2 + c ** 2 - b ** 2) / (2 * a * c), -1, 1)
+        angle_a, angle_b = np.arccos(cos_a), np.arccos(cos_b)
+        solved_angles = np.degrees(np.stack([angle_a, angle_b, np.pi - angle_a - angle_b], axis=1))
+
+        # Over-specified input must agree with the solution
+        side_off = np.abs(s - given_s) > SIDE_TOLERANCE * given_s
+        angle_off = np.abs(solved_angles - given_a) > ANGLE_TOLERANCE
+        disagree = np.any(side_off & ~np.isnan(given_s), axis=1) | np.any(angle_off & ~np.isnan(given_a), axis=1)
+        status[disagree & (status <= AMBIGUOUS)] = INCONSISTENT
+
+        usable = status <= AMBIGUOUS
+        s[~usable] = np.nan
+        solved_angles[~usable] = np.nan
+        a, b, c = s[:, 0], s[:, 1], s[:, 2]
+        angle_a = np.radians(solved_angles[:, 0])
+
+        cx, cy = b * np.cos(angle_a), b * np.sin(angle_a)
+        zeros = np.zeros(len(s))
+        vertices = np.stack([
+            np.stack([zeros, zeros], axis=1),
+            np.stack([c, zeros], axis=1),
+            np.stack([cx, cy], axis=1),
+        ], axis=1)
+        vertices[~usable] = np.nan
+        area = 0.5 * b * c * np.sin(angle_a)
+        centroid = vertices.mean(axis=1)
+        circumcentre = np.stack([c / 2, (b ** 2 - c * cx) / (2 * cy)], axis=1)
+        circumradius = a / (2 * np.sin(angle_a))
+
+    return TriangleBatch(s, solved_angles, vertices, area, centroid, circumcentre, circumradius, status)
+
+
+def _key(values: Optional[Sequence[Optional[float]]]) -> Tuple[Optional[float], ...]:
+    if values is None:
+        return (None,) * 3
+    if len(values) != 3:
+        raise TriangleError("give exactly three sides and three angles (use None for unknowns)")
+    return tuple(
+        None if value is None else round(float(value), KEY_PRECISION) for value in values
+    )
+
+
+@lru_cache(maxsize=1024)
+def _solve_cached(sides: Tuple[Optional[float], ...], angles: Tuple[Optional[float], ...]) -> Triangle:
+    as_row = lambda values: [np.nan if value is None else value for value in values]
+    return solve_triangles([as_row(sides)], [as_row(angles)]).row(0)
+
+
+def solve_triangle(sides: Sequence[Optional[float]] = None,
+                   angles: Sequence[Optional[float]] = None) -> Triangle:
+    """
+    Solve one triangle (memoized)
+
+    Args:
+        sides: [a, b, c] with None for unknown sides
+        angles: [A, B, C] in degrees with None for unknown angles
+
+    Returns:
+        Triangle (status SOLVED or AMBIGUOUS)
+
+    Raises:
+        TriangleError: if the values do not describe exactly one usable triangle
+    """
+    triangle = _solve_cached(_key(sides), _key(angles))
+    if triangle.status > AMBIGUOUS:
+        raise TriangleError(STATUS_MESSAGES[triangle.status])
+    return triangle
+
+
+def complete_from_type(sides: Optional[Sequence[Optional[float]]], angles: Optional[Sequence[Optional[float]]],
+                       triangle_type: Optional[str] = None) -> Tuple[list, list]:
+    """
+    Fill in what a triangle type implies when the measurements alone are not enough
+
+    Zeros count as unknown. With no measurements at all the type's default
+    triangle is used and angles alone get a standard AB; "equilateral" copies a known side to all three; "right"
+    adds the right angle between two given legs; "isosceles" repeats the
+    longer of two given sides.
+
+    Returns:
+        (sides, angles) as lists of three values with None for unknowns
+    """
+    sides = [value or None for value in (sides or [None] * 3)]
+    angles = [value or None for value in (angles or [None] * 3)]
+    known_sides = [i for i, value in enumerate(sides) if value is not None]
+    if not known_sides and not any(angles):
+        return list(TYPE_DEFAULTS.get(triangle_type, TYPE_DEFAULTS["equilateral"])), angles
+    if not known_sides:
+        # Angles fix only the shape: draw it with AB of a standard length
+        return [None, None, SHAPE_ONLY_SIDE], angles
+    if len(known_sides) == 3 or len(sides) != 3 or len(angles) != 3:
+        return sides, angles
+
+    if triangle_type == "equilateral" and known_sides:
+        return [sides[known_sides[0]]] * 3, angles
+    if len(known_sides) == 2 and not any(angles):
+        missing = 3 - sum(known_sides)
+        if triangle_type == "right":
+            angles[missing] = 90
+        elif triangle_type == "isosceles":
+            sides[missing] = max(sides[i] for i in known_sides)
+    return sides, angles
@@ -0,0 +1,118 @@
+"""
+Tool Registry
+Single place where each diagram tool's function, schema and subjects are registered
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .validation import ToolArgumentValidator
+
+
+class ToolSpec:
+    """One registered tool: implementation, OpenAI schema and routing metadata"""
+
+    __slots__ = ("name", "function", "schema", "subjects", "check", "facts")
+
+    def __init__(self, name: str, function: Callable, schema: dict,
+                 subjects: Sequence[str], check: Optional[Callable] = None,
+                 facts: Optional[Callable] = None):
+        self.name = name
+        self.function = function
+        self.schema = schema
+        self.subjects = frozenset(subjects)
+        self.check = check
+        self.facts = facts
+
+
+class ToolRegistry:
+    """
+    Ordered collection of tools
+
+    The OpenAI tool list, the name -> function dict and the argument
+    validator are all derived from the registered specs.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._validator: Optional[ToolArgumentValidator] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(self._specs.values())
+
+    def __len__(self):
+        return len(self._specs)
+
+    def tool(self, description: str, parameters: dict, subjects: Sequence[str],
+             check: Optional[Callable] = None, facts: Optional[Callable] = None):
+        """
+        Decorator that registers a function as a tool
+
+        Args:
+            description: Description shown to the model
+            parameters: JSON schema of the arguments the model may send
+            subjects: Subjects the tool belongs to (used to pick tools per request)
+            check: Optional semantic check(args, repairs) run after schema validation
+            facts: Optional facts(args) -> str describing what the diagram shows,
+                computed from the arguments without drawing
+
+        Returns:
+            Decorator returning the function unchanged
+        """
+        def register(function: Callable) -> Callable:
+            name = function.__name__
+            schema = {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": description,
+                    "parameters": parameters,
+                },
+            }
+            self._specs[name] = ToolSpec(name, function, schema, subjects, check, facts)
+            self._validator = None
+            return function
+        return register
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def schemas(self, names: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Tool definitions for OpenAI function calling
+
+        Args:
+            names: Optional subset of tool names (registry order is kept)
+        """
+        if names is None:
+            return [spec.schema for spec in self._specs.values()]
+        wanted = set(names)
+        return [spec.schema for spec in self._specs.values() if spec.name in wanted]
+
+    def functions(self) -> Dict[str, Callable]:
+        """Dict mapping tool names to their functions"""
+        return {name: spec.function for name, spec in self._specs.items()}
+
+    def subjects(self) -> Dict[str, frozenset]:
+        """Dict mapping tool names to the subjects they serve"""
+        return {name: spec.subjects for name, spec in self._specs.items()}
+
+    def facts(self) -> Dict[str, Callable]:
+        """Dict mapping tool names to their facts functions (tools that have one)"""
+        return {name: spec.facts for name, spec in self._specs.items() if spec.facts}
+
+    @property
+    def validator(self) -> ToolArgumentValidator:
+        """Argument validator compiled from every registered schema and check"""
+        if self._validator is None:
+            self._validator = ToolArgumentValidator(
+                self.schemas(),
+                {name: spec.check for name, spec in self._specs.items() if spec.check},
+            )
+        return self._validator
@@ -0,0 +1,176 @@
+"""
+Time-Series Helpers for Motion Graphs
+Loads large (time, value) datasets, derives kinematic series and downsamples them with LTTB
+"""
+
+import os
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+
+# Folder that data_file arguments from the model are resolved against
+DATA_DIR = Path(os.getenv("LEARNING_AGENT_DATA_DIR", "data"))
+
+# Raw binary files hold little-endian float64 (time, value) pairs back to back
+BINARY_SUFFIXES = (".bin", ".f64", ".dat")
+TEXT_SUFFIXES = (".csv", ".txt", ".tsv")
+NUMPY_SUFFIXES = (".npy",)
+
+# Derived series and the graph type each one can be computed from
+DERIVED_SERIES = {
+    "velocity": "distance-time",
+    "acceleration": "velocity-time",
+    "area": "velocity-time",
+}
+
+SeriesSource = Union[str, Path, np.ndarray, list, tuple]
+
+
+def resolve_data_file(name: str) -> Path:
+    """
+    Resolve a data file name inside DATA_DIR
+
+    Raises:
+        ValueError: if the path escapes DATA_DIR, does not exist or has an unknown type
+    """
+    root = DATA_DIR.resolve()
+    path = (root / name).resolve()
+    if root not in path.parents:
+        raise ValueError(f"data files must be inside {DATA_DIR}/")
+    if path.suffix.lower() not in BINARY_SUFFIXES + TEXT_SUFFIXES + NUMPY_SUFFIXES:
+        raise ValueError(f"unsupported data file type {path.suffix!r}")
+    if not path.is_file():
+        raise ValueError(f"data file {name!r} not found")
+    return path
+
+
+def _load_text(path: Path) -> np.ndarray:
+    delimiter = "\t" if path.suffix.lower() == ".tsv" else ","
+    with open(path, encoding="utf-8") as f:
+        first = f.readline()
+    try:
+        [float(cell) for cell in first.split(delimiter)[:2]]
+        skiprows = 0
+    except ValueError:
+        skiprows = 1  # header row
+    return np.loadtxt(path, delimiter=delimiter, skiprows=skiprows, usecols=(0, 1), ndmin=2)
+
+
+def load_series(source: SeriesSource) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turn pairs, an array or a data file into (times, values) arrays
+
+    .npy and raw binary files are memory-mapped rather than parsed or copied.
+    The finiteness and ordering checks still read every sample once (the
+    pages stay in the OS cache, not this process's heap); the data is only
+    copied when non-finite samples are dropped or the times are sorted.
+
+    Args:
+        source: List of [time, value] pairs, an (n, 2) or (2, n) array, or a file path
+
+    Returns:
+        (times, values) as 1-D arrays (possibly memory-mapped views)
+    """
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        suffix = path.suffix.lower()
+        if suffix in NUMPY_SUFFIXES:
+            data = np.load(path, mmap_mode="r")
+        elif suffix in BINARY_SUFFIXES:
+            data = np.memmap(path, dtype="<f8", mode="r")
+            data = data[: data.size - data.size % 2].reshape(-1, 2)
+        else:
+            data = _load_text(path)
+    else:
+        data = np.asarray(source, dtype=float)
+
+    if data.ndim != 2 or 2 not in data.shape:
+        raise ValueError("motion data must be (time, value) pairs")
+    if data.shape[1] != 2:
+        data = data.T
+    times, values = data[:, 0], data[:, 1]
+
+    finite = np.isfinite(times) & np.isfinite(values)
+    if not finite.all():
+        times, values = times[finite], values[finite]
+    if times.size > 1 and np.any(times[1:] < times[:-1]):
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+    return times, values
+
+
+def derive_series(times: np.ndarray, values: np.ndarray, kind: str) -> np.ndarray:
+    """
+    Compute a derived series over the full-resolution data
+
+    Args:
+        times: Sample times
+        values: Distance (for velocity) or velocity (for acceleration/area)
+        kind: "velocity", "acceleration" (slope) or "area" (running area under the curve)
+
+    Returns:
+        Array aligned with times
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if kind in ("velocity", "acceleration"):
+        if times.size < 2:
+            return np.zeros_like(values)
+        # Repeated timestamps (common in sensor logs) would divide by zero
+        unique = np.concatenate(([True], np.diff(times) > 0))
+        if not unique.all():
+            return np.interp(times, times[unique], derive_series(times[unique], values[unique], kind))
+        return np.gradient(values, times)
+    if kind == "area":
+        steps = 0.5 * (values[1:] + values[:-1]) * np.diff(times)
+        return np.concatenate(([0.0], np.cumsum(steps)))
+    raise ValueError(f"unknown derived series {kind!r}")
+
+
+def lttb(times: np.ndarray, values: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of threshold - 2 buckets,
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves peaks and the overall shape.
+
+    Args:
+        times: Sorted sample times
+        values: Sample values
+        threshold: Number of points to keep
+
+    Returns:
+        (times, values) with at most threshold points
+    """
+    n = len(times)
+    if threshold >= n or threshold < 3:
+        return np.asarray(times, dtype=float), np.asarray(values, dtype=float)
+
+    # Bucket i covers [bounds[i], bounds[i + 1]) of the interior points 1..n-2
+    bounds = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    counts = np.diff(bounds)
+    interior_t = np.asarray(times[1:n - 1], dtype=float)
+    interior_v = np.asarray(values[1:n - 1], dtype=float)
+    starts = bounds[:-1] - 1
+    mean_t = np.add.reduceat(interior_t, starts) / counts
+    mean_v = np.add.reduceat(interior_v, starts) / counts
+    # The point after the last bucket is the final sample
+    next_t = np.append(mean_t[1:], float(times[n - 1]))
+    next_v = np.append(mean_v[1:], float(values[n - 1]))
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a_t, a_v = float(times[0]), float(values[0])
+    for i in range(threshold - 2):
+        lo, hi = starts[i], starts[i] + counts[i]
+        bucket_t = interior_t[lo:hi]
+        bucket_v = interior_v[lo:hi]
+        area = np.abs((a_t - next_t[i]) * (bucket_v - a_v) - (a_t - bucket_t) * (next_v[i] - a_v))
+        best = int(np.argmax(area))
+        keep[i + 1] = lo + best + 1
+        a_t, a_v = bucket_t[best], bucket_v[best]
+
+    return np.asarray(times[keep], dtype=float), np.asarray(values[keep], dtype=float)
@@ -0,0 +1,320 @@
+"""
+Tool Call Argument Validation
+Compiles the DIAGRAM_TOOLS schemas into fast validators with semantic checks and normalization
+"""
+
+import json
+import math
+from typing import Callable, Dict, List, Optional
+
+from .expressions import ExpressionError, compile_expression
+from .timeseries import DERIVED_SERIES, resolve_data_file
+from .geometry import TriangleError, complete_from_type, solve_triangle
+from .cell_scene import organelles_for
+from .animation import MAX_FRAMES, ffmpeg_available
+
+# Largest coefficient/value accepted from the model; beyond this plots are meaningless
+MAX_ABS_VALUE = 1e6
+
+# Digits kept when normalizing numbers, so 0.30000000000000004 and 0.3 share a cache key
+NUMBER_PRECISION = 6
+
+
+class ToolArgumentError(ValueError):
+    """Raised when a tool call's arguments cannot be used or repaired"""
+
+
+class ValidatedCall:
+    """Normalized arguments for one tool call plus a stable cache key"""
+
+    __slots__ = ("tool_name", "args", "key", "repairs")
+
+    def __init__(self, tool_name: str, args: dict, repairs: List[str]):
+        self.tool_name = tool_name
+        self.args = args
+        self.key = cache_key(tool_name, args)
+        self.repairs = repairs
+
+
+def cache_key(tool_name: str, args: dict) -> str:
+    """Canonical string for a tool name plus normalized arguments"""
+    return tool_name + ":" + json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _canonical_number(value, path: str):
+    if isinstance(value, bool):
+        raise ToolArgumentError(f"{path} must be a number, got a boolean")
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            raise ToolArgumentError(f"{path} must be a number, got {value!r}")
+    if not isinstance(value, (int, float)):
+        raise ToolArgumentError(f"{path} must be a number, got {type(value).__name__}")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ToolArgumentError(f"{path} must be a finite number")
+    if abs(value) > MAX_ABS_VALUE:
+        raise ToolArgumentError(f"{path} is too large (limit {MAX_ABS_VALUE:g})")
+    value = round(value, NUMBER_PRECISION)
+    # Integral values become ints so 1 and 1.0 render (and cache) identically
+    return int(value) if value.is_integer() else value
+
+
+def _enum_token(value: str) -> str:
+    return value.strip().lower().replace("_", "-").replace(" ", "-")
+
+
+def _compile_property(schema: dict) -> Callable:
+    """Turn one JSON-schema property into a checker/normalizer closure"""
+    kind = schema.get("type")
+
+    if "enum" in schema:
+        choices = {_enum_token(str(choice)): choice for choice in schema["enum"]}
+        allowed = ", ".join(str(choice) for choice in schema["enum"])
+
+        def check_enum(value, path):
+            if not isinstance(value, str):
+                raise ToolArgumentError(f"{path} must be one of: {allowed}")
+            token = _enum_token(value)
+            if token not in choices:
+                raise ToolArgumentError(f"{path} must be one of: {allowed} (got {value!r})")
+            return choices[token]
+        return check_enum
+
+    if kind in ("number", "integer"):
+        def check_number(value, path):
+            number = _canonical_number(value, path)
+            if kind == "integer" and not isinstance(number, int):
+                raise ToolArgumentError(f"{path} must be a whole number")
+            return number
+        return check_number
+
+    if kind == "string":
+        def check_string(value, path):
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                raise ToolArgumentError(f"{path} must be a string")
+            return str(value).strip()
+        return check_string
+
+    if kind == "boolean":
+        def check_boolean(value, path):
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+                return value.strip().lower() == "true"
+            raise ToolArgumentError(f"{path} must be true or false")
+        return check_boolean
+
+    if kind == "array":
+        check_item = _compile_property(schema.get("items", {}))
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def check_array(value, path):
+            if not isinstance(value, (list, tuple)):
+                raise ToolArgumentError(f"{path} must be an array")
+            if min_items is not None and len(value) < min_items:
+                raise ToolArgumentError(f"{path} needs at least {min_items} item(s)")
+            if max_items is not None and len(value) > max_items:
+                raise ToolArgumentError(f"{path} allows at most {max_items} item(s)")
+            return [check_item(item, f"{path}[{i}]") for i, item in enumerate(value)]
+        return check_array
+
+    if kind == "object":
+        return _compile_object(schema)
+
+    def check_any(value, path):
+        return value
+    return check_any
+
+
+def _compile_object(schema: dict) -> Callable:
+    properties = {
+        name: _compile_property(prop) for name, prop in schema.get("properties", {}).items()
+    }
+    required = tuple(schema.get("required", ()))
+
+    def check_object(value, path, repairs: Optional[List[str]] = None):
+        if not isinstance(value, dict):
+            raise ToolArgumentError(f"{path or 'arguments'} must be an object")
+        missing = [name for name in required if value.get(name) is None]
+        if missing:
+            raise ToolArgumentError(f"missing required argument(s): {', '.join(missing)}")
+
+        result = {}
+        for name, item in value.items():
+            checker = properties.get(name)
+            if checker is None:
+                # Unknown keys would raise TypeError in the tool function: drop them
+                if repairs is not None:
+                    repairs.append(f"dropped unknown argument {name!r}")
+                continue
+            if item is None:
+                continue
+            result[name] = checker(item, f"{path}.{name}" if path else name)
+        return result
+    return check_object
+
+
+# ---------------------------------------------------------------------------
+# Tool-specific semantic checks: registered with each tool, run after the
+# schema pass, may repair arguments in place
+
+def check_quadratic_args(args: dict, repairs: List[str]):
+    if args["a"] == 0:
+        raise ToolArgumentError(
+            "a must not be 0 (that is a linear function - use plot_linear_function instead)"
+        )
+
+
+def check_motion_args(args: dict, repairs: List[str]):
+    if args.get("data_file"):
+        try:
+            resolve_data_file(args["data_file"])
+        except ValueError as e:
+            raise ToolArgumentError(f"data_file: {e}")
+        if args.pop("values", None) is not None:
+            repairs.append("ignored values because data_file was given")
+    else:
+        values = args.get("values")
+        if not values:
+            raise ToolArgumentError("values must contain at least one [time, value] pair")
+        for i, pair in enumerate(values):
+            if len(pair) != 2:
+                raise ToolArgumentError(f"values[{i}] must be a [time, value] pair")
+        if any(values[i][0] > values[i + 1][0] for i in range(len(values) - 1)):
+            values.sort(key=lambda pair: pair[0])
+            repairs.append("sorted values by time")
+
+    derived = args.get("derived")
+    if derived and DERIVED_SERIES[derived] != args["graph_type"]:
+        raise ToolArgumentError(
+            f"derived={derived!r} needs a {DERIVED_SERIES[derived]} graph, not {args['graph_type']}"
+        )
+
+
+def check_expression_args(args: dict, repairs: List[str]):
+    expressions = [expression for expression in args["expressions"] if expression]
+    if not expressions:
+        raise ToolArgumentError("expressions must contain at least one formula in x")
+    for expression in expressions:
+        try:
+            compile_expression(expression)
+        except ExpressionError as e:
+            raise ToolArgumentError(f"expression {expression!r}: {e}")
+    args["expressions"] = expressions
+
+    x_min, x_max = args.get("x_min"), args.get("x_max")
+    if (x_min is None) != (x_max is None):
+        args.pop("x_min", None)
+        args.pop("x_max", None)
+        repairs.append("ignored a one-sided x range")
+    elif x_min is not None and x_min >= x_max:
+        raise ToolArgumentError("x_min must be smaller than x_max")
+
+
+def check_triangle_args(args: dict, repairs: List[str]):
+    for name in ("sides", "angles"):
+        if any(value < 0 for value in args.get(name, ())):
+            raise ToolArgumentError(f"{name} must not be negative (use 0 for unknown values)")
+    try:
+        solve_triangle(*complete_from_type(args.get("sides"), args.get("angles"), args.get("triangle_type")))
+    except TriangleError as e:
+        raise ToolArgumentError(f"triangle: {e}")
+
+
+def check_cell_args(args: dict, repairs: List[str]):
+    available = organelles_for(args["cell_type"])
+    highlight = list(dict.fromkeys(args.get("highlight", [])))
+    for name in highlight:
+        if name not in available:
+            raise ToolArgumentError(
+                f"{args['cell_type']} cells have no {name.replace('_', ' ')} in this diagram"
+            )
+    args["highlight"] = highlight
+    extras = [name for name in dict.fromkeys(args.get("extra_organelles", [])) if name in available]
+    if len(extras) != len(args.get("extra_organelles", [])):
+        repairs.append(f"dropped extra organelles not drawn in a {args['cell_type']} cell")
+    args["extra_organelles"] = extras
+    for flag in ("isolate", "zoom"):
+        if args.get(flag) and not highlight:
+            args.pop(flag)
+            repairs.append(f"ignored {flag} because nothing is highlighted")
+
+
+def check_animation_args(args: dict, repairs: List[str]):
+    values = args.get("values")
+    if values is not None:
+        for i, pair in enumerate(values):
+            if len(pair) != 2:
+                raise ToolArgumentError(f"values[{i}] must be a [time, value] pair")
+        if any(values[i][0] > values[i + 1][0] for i in range(len(values) - 1)):
+            values.sort(key=lambda pair: pair[0])
+            repairs.append("sorted values by time")
+        if len(values) < 2 or values[0][0] == values[-1][0]:
+            raise ToolArgumentError("values must cover a time span (at least two different times)")
+    elif not 0 < args.get("duration", 10) <= 3600:
+        raise ToolArgumentError("duration must be between 0 and 3600 seconds")
+
+    frames = args.get("frames")
+    if frames is not None and not 2 <= frames <= MAX_FRAMES:
+        args["frames"] = min(max(frames, 2), MAX_FRAMES)
+        repairs.append(f"limited frames to {args['frames']}")
+    if args.get("output_format") == "mp4" and not ffmpeg_available():
+        args["output_format"] = "gif"
+        repairs.append("made a GIF because MP4 encoding is not available")
+
+
+class ToolArgumentValidator:
+    """Validators compiled once from tool schemas, applied to every tool call"""
+
+    def __init__(self, tool_schemas: List[dict], semantic_checks: Dict[str, Callable] = None):
+        """
+        Args:
+            tool_schemas: Tool definitions in OpenAI function-calling format
+            semantic_checks: Dict of tool name -> check(args, repairs) run after the schema pass
+        """
+        self._validators = {
+            tool["function"]["name"]: _compile_object(tool["function"].get("parameters", {}))
+            for tool in tool_schemas
+        }
+        self._semantic_checks = semantic_checks or {}
+
+    def validate(self, tool_name: str, raw_arguments) -> ValidatedCall:
+        """
+        Check, repair and normalize a tool call's arguments
+
+        Args:
+            tool_name: Name of the tool the model called
+            raw_arguments: JSON string (as sent by the model) or an already parsed dict
+
+        Returns:
+            ValidatedCall with normalized args and a stable cache key
+
+        Raises:
+            ToolArgumentError: if the arguments are unusable
+        """
+        validator = self._validators.get(tool_name)
+        if validator is None:
+            raise ToolArgumentError(f"unknown tool {tool_name!r}")
+
+        if isinstance(raw_arguments, str):
+            try:
+                raw_arguments = json.loads(raw_arguments or "{}")
+            except ValueError as e:
+                raise ToolArgumentError(f"arguments are not valid JSON ({e})")
+
+        repairs: List[str] = []
+        try:
+            args = validator(raw_arguments, "", repairs)
+            check = self._semantic_checks.get(tool_name)
+            if check is not None:
+                check(args, repairs)
+        except ToolArgumentError:
+            raise
+        except Exception as e:
+            # A check tripping over an input it did not expect must not end the turn
+            raise ToolArgumentError(f"arguments could not be checked ({type(e).__name__}: {e})")
+        return ValidatedCall(tool_name, args, repairs)
+
@@ -10,14 +10,27 @@ if str(Path(__file__).parent.parent) not in sys.path:
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import streamlit as st
-import asyncio
 import os
 from PIL import Image
 import re
+import tempfile
+from concurrent.futures import CancelledError
 
 # Import from modular packages
 from agent import LearningAgent
-from tools import cleanup_old_diagrams, get_tool_functions, DIAGRAM_TOOLS
+from agent.export import export_session
+from agent.cancellation import CANCELLATION_STATS
+from agent.prompt_cache import PROMPT_CACHE_STATS
+from agent.profiling import SamplingProfiler
+from agent.render_queue import RENDER_QUEUE
+from agent.render_workers import get_render_pool
+from tools import cleanup_old_diagrams, TOOL_REGISTRY
+
+try:
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # older Streamlit: closed tabs are not detected
+    Runtime = get_script_run_ctx = None
 
 
 # Page configuration
@@ -83,24 +96,32 @@ def init_session_state():
         st.session_state.initialized = False
 
 
-async def get_agent_response(agent, question):
+async def get_agent_response(agent, question, profile=None):
     """Get response from agent (async)"""
     response_text = ""
     diagrams = []
     
-    async for chunk in agent.chat_stream(question):
+    async for chunk in agent.chat_stream(question, profile=profile):
         response_text += chunk
         
         # Check if chunk mentions diagram creation
         if "Creating diagram:" in chunk or "Diagram created successfully:" in chunk:
             # Extract diagram path if present
             if "Q:" in chunk or "diagrams/" in chunk:
-                paths = re.findall(r'(?:Q:\\workspace\\LearningAgent\\)?diagrams[/\\][\w\-\.]+\.png', chunk)
+                paths = re.findall(r'(?:Q:\\workspace\\LearningAgent\\)?diagrams[/\\][\w\-\.]+\.(?:png|gif|mp4)', chunk)
                 diagrams.extend(paths)
     
     return response_text, diagrams
 
 
+def browser_session_gone() -> bool:
+    """True once the browser tab behind this script run was closed or reloaded"""
+    if get_script_run_ctx is None or not Runtime.exists():
+        return False
+    ctx = get_script_run_ctx()
+    return ctx is not None and not Runtime.instance().is_active_session(ctx.session_id)
+
+
 def display_diagram(diagram_path):
     """Display a generated diagram"""
     try:
@@ -110,11 +131,16 @@ def display_diagram(diagram_path):
         else:
             diagram_path = Path(diagram_path)
         
-        if diagram_path.exists():
+        if not diagram_path.exists():
+            st.warning(f"Diagram not found: {diagram_path}")
+        elif diagram_path.suffix == ".mp4":
+            st.video(str(diagram_path))
+        elif diagram_path.suffix == ".gif":
+            # Passed as a path so Streamlit keeps the animation
+            st.image(str(diagram_path), caption=diagram_path.name, use_container_width=True)
+        else:
             image = Image.open(diagram_path)
             st.image(image, caption=diagram_path.name, use_container_width=True)
-        else:
-            st.warning(f"Diagram not found: {diagram_path}")
     except Exception as e:
         st.error(f"Error displaying diagram: {e}")
 
@@ -171,12 +197,68 @@ def main():
         st.markdown("---")
         if st.button("Clear Conversation", use_container_width=True):
             st.session_state.messages = []
+            st.session_state.export_file = None
             if st.session_state.agent:
+                # Also cancels a reply still running for this session
                 st.session_state.agent.clear_history()
             # Clean up diagrams when clearing conversation
             cleanup_old_diagrams(max_age_seconds=0)
             st.rerun()
         
+        if st.session_state.agent and st.session_state.messages:
+            export_format = st.selectbox("Export format", ["HTML", "PDF"])
+            if st.button("Export Session", use_container_width=True):
+                suffix = ".pdf" if export_format == "PDF" else ".html"
+                with st.spinner("Exporting session..."):
+                    with tempfile.TemporaryDirectory() as tmp:
+                        path = export_session(st.session_state.agent, Path(tmp) / f"session{suffix}")
+                        st.session_state.export_file = (path.name, path.read_bytes())
+            if st.session_state.get("export_file"):
+                name, data = st.session_state.export_file
+                st.download_button(
+                    f"Download {name}", data, file_name=name,
+                    mime="application/pdf" if name.endswith(".pdf") else "text/html",
+                    use_container_width=True,
+                )
+        
+        abandoned = CANCELLATION_STATS.stats()
+        if abandoned["turns_cancelled"]:
+            with st.expander("Abandoned replies"):
+                st.json(abandoned)
+        
+        render_queue = RENDER_QUEUE.stats()
+        if render_queue["submitted"]:
+            with st.expander("Render queue"):
+                st.json(render_queue)
+                pool = get_render_pool()
+                if pool is not None:
+                    st.json(pool.stats())
+        
+        if st.session_state.agent and st.session_state.agent.prompt_cache_stats()["requests"]:
+            with st.expander("Prompt cache"):
+                st.caption("This session")
+                st.json(st.session_state.agent.prompt_cache_stats())
+                st.caption("All sessions")
+                st.json(PROMPT_CACHE_STATS.stats())
+        
+        st.checkbox(
+            "Profile replies", key="profile_replies",
+            help="Sample where Python time goes in each reply and page render "
+                 "(speedscope and flamegraph files are written to profiles/)",
+        )
+        reports = [
+            report for report in (
+                st.session_state.agent.last_sampled_profile if st.session_state.agent else None,
+                st.session_state.get("last_render_profile"),
+            ) if report is not None
+        ]
+        if reports:
+            with st.expander("Profiles"):
+                for report in reports:
+                    st.code(report.summary, language=None)
+                    for kind, path in report.files.items():
+                        st.caption(f"{kind}: {path}")
+        
         st.markdown("---")
         st.markdown("### Tips")
         st.markdown("""
@@ -194,14 +276,8 @@ def main():
     if not st.session_state.initialized:
         try:
             with st.spinner("Initializing AI Agent..."):
-                # Get tool functions and diagram tool definitions
-                tool_functions = get_tool_functions()
-                
-                # Create agent with tools
-                st.session_state.agent = LearningAgent(
-                    tool_functions=tool_functions,
-                    diagram_tools=DIAGRAM_TOOLS
-                )
+                # Create agent with the registered diagram tools
+                st.session_state.agent = LearningAgent(registry=TOOL_REGISTRY)
                 st.session_state.initialized = True
                 st.success("Agent ready! Ask me anything about CBSE Std 9 subjects!")
         except ValueError as e:
@@ -253,9 +329,14 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 try:
-                    # Run async function
-                    response, diagrams = asyncio.run(
-                        get_agent_response(st.session_state.agent, prompt)
+                    # Run on the shared engine's event loop so the API client's
+                    # connections are reused across messages and sessions.
+                    # A closed or reloaded tab cancels the reply (stream,
+                    # pending renders) and rolls the agent's history back.
+                    agent = st.session_state.agent
+                    response, diagrams = agent.engine.run_sync(
+                        get_agent_response(agent, prompt, st.session_state.get("profile_replies") or None),
+                        cancel_when=browser_session_gone,
                     )
                     
                     # Display response with enhanced math rendering
@@ -277,6 +358,10 @@ def main():
                         "diagrams": diagrams
                     })
                     
+                except CancelledError:
+                    # Nobody is left to see this reply
+                    st.session_state.messages.pop()
+                    st.stop()
                 except Exception as e:
                     error_msg = f"❌ Error: {str(e)}"
                     st.error(error_msg)
@@ -295,5 +380,22 @@ def main():
     """, unsafe_allow_html=True)
 
 
+def run_page():
+    """One Streamlit render pass, sampled when profiling is switched on in the sidebar"""
+    if not st.session_state.get("profile_replies"):
+        main()
+        return
+    profiler = SamplingProfiler("web_render")
+    profiler.start()
+    try:
+        main()
+    finally:
+        # Shown in the sidebar on the next pass
+        try:
+            st.session_state.last_render_profile = profiler.stop()
+        except OSError as e:
+            st.warning(f"Could not write the profile: {e}")
+
+
 if __name__ == "__main__":
-    main()
+    run_page()